@@ -0,0 +1,75 @@
+"""A string-keyed map persisted in the bot's Matrix account data, split over a few entries.
+
+There is no database (AD-1); bookkeeping that must survive a restart lives in account data on the
+bot user, usually as one blob (the lifecycle ledger, the control-room cursor). That stops working
+for a map with an entry per *room* or per *user* on a large homeserver: a single blob grows past
+what is sensible to rewrite on every change, and past what Synapse accepts in one request.
+
+:class:`ShardedAccountDataStore` spreads such a map over a fixed number of account-data types
+(``<data_type>.0`` … ``<data_type>.<n-1>``), assigning each key to a shard by a stable hash. A load
+reads every shard concurrently; a save rewrites only the shards that hold the keys that changed.
+Changing the shard count orphans what was stored under the old layout, so it is a constant of each
+caller, not configuration.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from onbot.logging import get_logger
+from onbot.reconciler.state import SCHEMA_VERSION
+
+log = get_logger(__name__)
+
+DEFAULT_SHARDS = 16
+
+
+class ShardedAccountDataStore:
+    """Persist a ``str → JSON`` map across ``shards`` account-data entries of the bot user."""
+
+    def __init__(self, client: Any, bot_id: str, data_type: str, *, shards: int = DEFAULT_SHARDS) -> None:
+        self.client = client
+        self.bot_id = bot_id
+        self.data_type = data_type
+        self.shards = shards
+
+    def shard_of(self, key: str) -> int:
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") % self.shards
+
+    def _shard_type(self, shard: int) -> str:
+        return f"{self.data_type}.{shard}"
+
+    async def load(self) -> dict[str, Any]:
+        raw = await asyncio.gather(
+            *(self.client.get_account_data(self.bot_id, self._shard_type(i)) for i in range(self.shards))
+        )
+        entries: dict[str, Any] = {}
+        for content in raw:
+            if content and content.get("schema_version") == SCHEMA_VERSION:
+                entries.update(content.get("entries") or {})
+        return entries
+
+    async def save(self, entries: Mapping[str, Any], *, keys: Iterable[str] | None = None) -> None:
+        """Write the shards holding ``keys`` (every shard when ``None``) from the complete ``entries``.
+
+        A key in ``keys`` that is absent from ``entries`` is thereby deleted from its shard.
+        """
+        shards = set(range(self.shards)) if keys is None else {self.shard_of(k) for k in keys}
+        if not shards:
+            return
+        by_shard: dict[int, dict[str, Any]] = {i: {} for i in shards}
+        for key, value in entries.items():
+            shard = self.shard_of(key)
+            if shard in by_shard:
+                by_shard[shard][key] = value
+        for shard in sorted(shards):
+            await self.client.set_account_data(
+                self.bot_id,
+                self._shard_type(shard),
+                {"schema_version": SCHEMA_VERSION, "entries": by_shard[shard]},
+            )
+        log.debug("saved %d of %d shards of %s", len(shards), self.shards, self.data_type)
@@ -1,7 +1,8 @@
 """Fan a single announcement out into every user's notice board (G4.6).
 
 The bot's ``m.direct`` account data already maps every onboarded user to the direct room the bot
-opened with them, so it *is* the broadcast target list and needs no separate bookkeeping. Those
+opened with them, so it *is* the broadcast target list and needs no separate bookkeeping. It is read
+from the :class:`~onbot.onboarding.direct_rooms.DirectRoomIndex` the welcome flow keeps current. Those
 rooms are read-only notice boards (:mod:`onbot.onboarding.notice_board`) — announcements are exactly
 what they exist for.
 
@@ -17,33 +18,73 @@ actually buy:
 1. ``ApiClientSynapseAdmin.override_ratelimit`` on the bot, called best-effort at startup
    (:mod:`onbot.app`). This is the real fix: it lifts the limiter for the bot account entirely.
 2. The concurrency bound below. An unbounded ``gather`` over 500 rooms opens 500 sockets and hits
-   the limiter as hard as it possibly can; a small semaphore keeps the send rate civil even when
-   step 1 did not happen.
-3. The shared retry in :class:`~onbot.clients.base.BaseApiClient`, which does list 429 in
-   ``RETRYABLE_STATUS_CODES``. Note this is a *blind* exponential backoff — 4 attempts, ~3.5s of
-   cumulative waiting, and it ignores the ``retry_after_ms`` Synapse hands back. It absorbs a brief
-   burst, not a sustained throttle, so it is the last line rather than the first.
+   the limiter as hard as it possibly can. The bound is adaptive
+   (:class:`~onbot.admin.concurrency.AdaptiveConcurrency`): it starts at a civil five rooms at a
+   time, and grows while sends come back quickly, up to ``performance.broadcast_max_concurrency``.
+   It halves on a 429 or on a send slower than ``performance.broadcast_slow_send_ms``. With step 1
+   in place it climbs to the ceiling; without it, it settles just under the limiter's budget.
+3. The shared retry in :class:`~onbot.clients.base.BaseApiClient`, which retries a 429 after the
+   ``retry_after_ms`` Synapse hands back, and the per-host
+   :class:`~onbot.clients.ratelimit.RateLimiter` behind it, which holds *every* send to the
+   homeserver for that long rather than just the one that was refused — so a throttled fan-out
+   slows down as a whole instead of each room burning its own 4 attempts. It still gives up after
+   those attempts, so it smooths a throttle rather than outlasting one.
 
 A room that still fails after all of that is reported, not raised: one unreachable room must not
 silence the announcement for everybody else.
+
+**Resuming.** Every broadcast has an id and a journal of the rooms it has reached
+(:mod:`onbot.admin.broadcast_journal`). :meth:`BroadcastService.resume` sends the journalled message
+to every target room that is not in it. That covers rooms whose send failed, rooms the run never got
+to, and users onboarded since. While a broadcast runs, :attr:`BroadcastService.progress` says how far
+it has got; ``!status`` in the control room reports it.
 """
 
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import hashlib
+import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 
+from onbot.admin.broadcast_journal import BroadcastJournal
+from onbot.admin.concurrency import AdaptiveConcurrency
 from onbot.clients.matrix import ApiClientMatrix
 from onbot.config import OnbotConfig
 from onbot.logging import get_logger
+from onbot.onboarding.direct_rooms import DirectRoomIndex
 
 log = get_logger(__name__)
 
-M_DIRECT = "m.direct"
 NOTICE_MSGTYPE = "m.notice"
 
-# How many rooms are written to at once. Deliberately small: see the module docstring.
-DEFAULT_CONCURRENCY = 5
+# How many rooms are written to at once when a broadcast starts. Deliberately small: the adaptive
+# bound grows from here only as fast as the homeserver shows it can keep up (module docstring).
+INITIAL_CONCURRENCY = 5
+
+# How often a running broadcast writes its journal and logs its progress.
+JOURNAL_FLUSH_INTERVAL_SEC = 5.0
+
+
+def broadcast_txn_id(broadcast_id: str, room_id: str) -> str:
+    """The transaction id of one broadcast's send into one room; the same on every attempt.
+
+    A resumed broadcast re-sends into a room whose delivery never reached the journal with this same
+    id, and Synapse returns the original event instead of posting the message twice.
+    """
+    digest = hashlib.sha256(f"{broadcast_id}\n{room_id}".encode()).hexdigest()[:32]
+    return f"onbot-broadcast-{digest}"
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = round(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
 
 
 @dataclass(frozen=True, slots=True)
@@ -64,6 +105,9 @@ class BroadcastResult:
 
     sent: list[str] = field(default_factory=list)
     failures: list[BroadcastFailure] = field(default_factory=list)
+    broadcast_id: str = ""
+    # Rooms a resumed broadcast skipped because an earlier run had already delivered to them.
+    already_delivered: int = 0
 
     @property
     def sent_count(self) -> int:
@@ -76,11 +120,50 @@ class BroadcastResult:
     def summary(self) -> str:
         """One line an operator can read, in the CLI or back in the control room."""
         line = f"sent to {self.sent_count} rooms, {self.failed_count} failed"
+        if self.already_delivered:
+            line += f" ({self.already_delivered} already had it)"
+        if self.broadcast_id:
+            line = f"broadcast {self.broadcast_id}: {line}"
         if self.failures:
             line += "\n" + "\n".join(f"  - {failure}" for failure in self.failures)
         return line
 
 
+@dataclass(slots=True)
+class BroadcastProgress:
+    """How far a running broadcast has got; its ``str`` is the ``!status`` line."""
+
+    broadcast_id: str
+    total: int
+    concurrency: AdaptiveConcurrency
+    clock: Callable[[], float]
+    started_at: float
+    sent: int = 0
+    failed: int = 0
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    def rate(self) -> float:
+        """Rooms finished per second so far."""
+        elapsed = self.clock() - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> float | None:
+        """Seconds until the last room is done at the current rate; ``None`` before there is one."""
+        rate = self.rate()
+        return (self.total - self.done) / rate if rate > 0 else None
+
+    def __str__(self) -> str:
+        eta = self.eta()
+        return (
+            f"broadcast {self.broadcast_id}: {self.sent}/{self.total} sent, {self.failed} failed, "
+            f"{self.rate():.1f} rooms/s, ETA {'unknown' if eta is None else _format_duration(eta)}, "
+            f"{self.concurrency.stats()}"
+        )
+
+
 class BroadcastService:
     """Send one message into every direct room the bot manages."""
 
@@ -89,12 +172,22 @@ class BroadcastService:
         client: ApiClientMatrix,
         config: OnbotConfig,
         *,
-        concurrency: int = DEFAULT_CONCURRENCY,
+        concurrency: int | None = None,
+        direct: DirectRoomIndex | None = None,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
         self.client = client
         self.config = config
         self.bot_id = config.synapse_server.bot_user_id
-        self._concurrency = max(1, concurrency)
+        self.server_name = config.synapse_server.server_name
+        self.direct = direct if direct is not None else DirectRoomIndex(client, self.bot_id)
+        # The ceiling of the adaptive bound; the bound itself starts lower and finds its level.
+        ceiling = config.performance.broadcast_max_concurrency if concurrency is None else concurrency
+        self._max_concurrency = max(1, ceiling)
+        self._slow_send_sec = config.performance.broadcast_slow_send_ms / 1000
+        self._clock = clock
+        # The broadcast under way, if any.
+        self.progress: BroadcastProgress | None = None
 
     async def target_rooms(self) -> dict[str, str]:
         """Map ``room_id -> user_id`` for every notice board the bot should announce into.
@@ -103,7 +196,7 @@ class BroadcastService:
         never touches. A user with several direct rooms gets all of them — they are all rooms the
         bot opened.
         """
-        direct = await self.client.get_account_data(self.bot_id, M_DIRECT)
+        direct = await self.direct.rooms()
         ignored = {self.bot_id, *self.config.matrix_user_ignore_list}
         rooms: dict[str, str] = {}
         for user_id, room_ids in sorted(direct.items()):
@@ -115,25 +208,90 @@ class BroadcastService:
 
     async def broadcast(self, message: str) -> BroadcastResult:
         """Send ``message`` as ``m.notice`` to every target room, bounded and fail-soft."""
-        rooms = await self.target_rooms()
+        journal = await BroadcastJournal.create(self.client, self.bot_id, self.server_name, message)
+        return await self._fan_out(journal)
+
+    async def resume(self, broadcast_id: str) -> BroadcastResult:
+        """Continue broadcast ``broadcast_id``: send its message to every target room it has not reached.
+
+        Raises :class:`~onbot.admin.broadcast_journal.BroadcastNotFoundError` for an unknown id.
+        """
+        journal = await BroadcastJournal.load(self.client, self.bot_id, self.server_name, broadcast_id)
+        log.info(
+            "resuming broadcast %s: %d rooms already have it%s",
+            journal.broadcast_id,
+            len(journal.delivered),
+            " (the last run reached the end of its room list)" if journal.completed else "",
+        )
+        return await self._fan_out(journal)
+
+    async def _fan_out(self, journal: BroadcastJournal) -> BroadcastResult:
+        targets = await self.target_rooms()
+        rooms = {room: user for room, user in targets.items() if room not in journal.delivered}
+        result = BroadcastResult(
+            broadcast_id=journal.broadcast_id, already_delivered=len(targets) - len(rooms)
+        )
         if not rooms:
-            log.warning("broadcast: the bot manages no direct rooms; nothing to send")
-            return BroadcastResult()
+            if targets:
+                log.info("broadcast %s: every room already has it", journal.broadcast_id)
+            else:
+                log.warning("broadcast: the bot manages no direct rooms; nothing to send")
+            await journal.finish()
+            return result
 
-        log.info("broadcasting to %d rooms (concurrency %d)", len(rooms), self._concurrency)
-        semaphore = asyncio.Semaphore(self._concurrency)
-        result = BroadcastResult()
+        concurrency = AdaptiveConcurrency(
+            initial=INITIAL_CONCURRENCY,
+            maximum=self._max_concurrency,
+            slow_after=self._slow_send_sec,
+            clock=self._clock,
+        )
+        progress = BroadcastProgress(
+            journal.broadcast_id, len(rooms), concurrency, self._clock, started_at=self._clock()
+        )
+        log.info(
+            "broadcast %s: sending to %d rooms (resume with `onbot broadcast --resume %s`)",
+            journal.broadcast_id,
+            len(rooms),
+            journal.broadcast_id,
+        )
 
         async def _send(room_id: str, user_id: str) -> None:
-            async with semaphore:
+            async with concurrency.slot():
                 try:
-                    await self.client.send_text_message(room_id, message, msgtype=NOTICE_MSGTYPE)
+                    event_id = await self.client.send_text_message(
+                        room_id,
+                        journal.message,
+                        msgtype=NOTICE_MSGTYPE,
+                        txn_id=broadcast_txn_id(journal.broadcast_id, room_id),
+                    )
                 except Exception as exc:
                     log.warning("broadcast to %s (%s) failed: %s", room_id, user_id, exc)
                     result.failures.append(BroadcastFailure(room_id, user_id, str(exc)))
-                else:
-                    result.sent.append(room_id)
+                    progress.failed += 1
+                    raise  # let the bound see a 429; gather(return_exceptions=True) absorbs it
+                result.sent.append(room_id)
+                journal.record(room_id, event_id)
+                progress.sent += 1
+
+        async def _checkpoint() -> None:
+            while True:
+                await asyncio.sleep(JOURNAL_FLUSH_INTERVAL_SEC)
+                await journal.flush()
+                log.info("%s", progress)
 
-        await asyncio.gather(*(_send(room, user) for room, user in rooms.items()))
+        self.progress = progress
+        checkpoints = asyncio.create_task(_checkpoint())
+        try:
+            await asyncio.gather(*(_send(room, user) for room, user in rooms.items()), return_exceptions=True)
+        finally:
+            checkpoints.cancel()
+            # Its flush may be mid-save; let it settle first, so the final flush below sees every
+            # room that is not yet written.
+            with contextlib.suppress(asyncio.CancelledError):
+                await checkpoints
+            self.progress = None
+            # On cancellation too: whatever was delivered must be in the journal for --resume.
+            await journal.flush()
+        await journal.finish()
         log.info("broadcast finished: %s", result.summary())
         return result
@@ -0,0 +1,143 @@
+"""Which rooms one broadcast has reached, kept in account data so it can be resumed.
+
+A broadcast into thousands of rooms runs for minutes. If the process dies half way through (a
+deploy, an OOM kill, an operator's Ctrl-C), the announcement has reached some users and not
+others. Until now nothing recorded which, so the only choices were to leave the rest uninformed or
+to send everyone a second copy.
+
+Every broadcast now gets a short id and a :class:`BroadcastJournal` on the bot user:
+
+* a **header** (``<prefix>.broadcast.<id>``) holding the message, so
+  ``onbot broadcast --resume <id>`` needs nothing but the id, and whether the run completed;
+* the **delivered rooms**, as ``room_id → event_id`` in a
+  :class:`~onbot.account_data.ShardedAccountDataStore` under ``<prefix>.broadcast.<id>.delivered``,
+  since on a large server one blob would outgrow what Synapse accepts in a single write.
+
+The fan-out records each room as its send returns and flushes the journal every few seconds and
+once more when it stops, however it stops. A resumed run skips every room in the journal. A room
+whose send went out just before a crash but never reached the journal is sent again with the same
+transaction id (:func:`onbot.admin.broadcast.broadcast_txn_id`), and Synapse answers that with the
+original event rather than a second message. Synapse remembers transaction ids for a limited time
+only, so resuming soon after the crash is what makes the "exactly once" hold.
+
+Writing the journal is best-effort. A broadcast whose journal cannot be written still goes out; it
+just cannot be resumed. Matrix has no way to delete account data, so journals are left behind. The
+header is small and the delivered map is spread over a few shards, so that costs little.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+import uuid
+from typing import Any
+
+from onbot.account_data import ShardedAccountDataStore
+from onbot.logging import get_logger
+from onbot.reconciler.state import SCHEMA_VERSION, event_type_name
+
+log = get_logger(__name__)
+
+# Shards of each broadcast's delivered-room map. Fixed per journal: see ShardedAccountDataStore.
+JOURNAL_SHARDS = 8
+
+_BROADCAST_ID = re.compile(r"[0-9a-f]{12}")
+
+
+class BroadcastNotFoundError(LookupError):
+    """``--resume`` named a broadcast the bot has no journal for."""
+
+
+def broadcast_account_data_type(server_name: str, broadcast_id: str) -> str:
+    """Account-data type of a broadcast's header, e.g. ``org.company.onbot.broadcast.3f2a9c1b7d4e``."""
+    return event_type_name(server_name, f"broadcast.{broadcast_id}")
+
+
+def new_broadcast_id() -> str:
+    """A fresh id, short enough to type into ``onbot broadcast --resume``."""
+    return uuid.uuid4().hex[:12]
+
+
+class BroadcastJournal:
+    """One broadcast's message and the rooms it has been delivered to, persisted in account data."""
+
+    def __init__(self, client: Any, bot_id: str, server_name: str, broadcast_id: str, message: str) -> None:
+        self.client = client
+        self.bot_id = bot_id
+        self.broadcast_id = broadcast_id
+        self.message = message
+        self.completed = False
+        self.delivered: dict[str, str] = {}
+        self._header_type = broadcast_account_data_type(server_name, broadcast_id)
+        self._store = ShardedAccountDataStore(
+            client, bot_id, f"{self._header_type}.delivered", shards=JOURNAL_SHARDS
+        )
+        self._dirty: set[str] = set()
+        self._started_at = int(time.time())
+
+    @classmethod
+    async def create(cls, client: Any, bot_id: str, server_name: str, message: str) -> BroadcastJournal:
+        """Start the journal of a new broadcast; a failed header write only costs resumability."""
+        journal = cls(client, bot_id, server_name, new_broadcast_id(), message)
+        try:
+            await journal._write_header()
+        except Exception:
+            log.exception(
+                "could not start the journal of broadcast %s; it cannot be resumed", journal.broadcast_id
+            )
+        return journal
+
+    @classmethod
+    async def load(cls, client: Any, bot_id: str, server_name: str, broadcast_id: str) -> BroadcastJournal:
+        """Re-open a broadcast's journal; raises :class:`BroadcastNotFoundError` if there is none."""
+        broadcast_id = broadcast_id.strip().lower()
+        if not _BROADCAST_ID.fullmatch(broadcast_id):
+            raise BroadcastNotFoundError(f"{broadcast_id!r} is not a broadcast id")
+        header = await client.get_account_data(bot_id, broadcast_account_data_type(server_name, broadcast_id))
+        if header.get("schema_version") != SCHEMA_VERSION or not isinstance(header.get("message"), str):
+            raise BroadcastNotFoundError(f"no journal for broadcast {broadcast_id}")
+        journal = cls(client, bot_id, server_name, broadcast_id, header["message"])
+        journal.completed = bool(header.get("completed"))
+        journal._started_at = int(header.get("started_at") or journal._started_at)
+        journal.delivered = {str(k): str(v) for k, v in (await journal._store.load()).items()}
+        return journal
+
+    def record(self, room_id: str, event_id: str) -> None:
+        """Note that ``room_id`` has the message; written by the next :meth:`flush`."""
+        self.delivered[room_id] = event_id
+        self._dirty.add(room_id)
+
+    async def flush(self) -> None:
+        """Persist the rooms recorded since the last flush; best-effort, retried on the next flush."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        try:
+            await self._store.save(self.delivered, keys=dirty)
+        except BaseException as exc:
+            # Cancelled mid-save too: the rooms must stay dirty, or --resume would send to them again.
+            self._dirty |= dirty
+            if not isinstance(exc, Exception):
+                raise
+            log.exception("could not save the journal of broadcast %s", self.broadcast_id)
+
+    async def finish(self) -> None:
+        """Flush, and mark the broadcast as having reached the end of its room list."""
+        await self.flush()
+        self.completed = True
+        try:
+            await self._write_header()
+        except Exception:
+            log.exception("could not mark broadcast %s as completed", self.broadcast_id)
+
+    async def _write_header(self) -> None:
+        await self.client.set_account_data(
+            self.bot_id,
+            self._header_type,
+            {
+                "schema_version": SCHEMA_VERSION,
+                "message": self.message,
+                "started_at": self._started_at,
+                "completed": self.completed,
+            },
+        )
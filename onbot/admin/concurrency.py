@@ -0,0 +1,114 @@
+"""A concurrency limit that finds its own level: additive increase, multiplicative decrease (AIMD).
+
+The broadcast fan-out used to send into at most five rooms at a time, whatever the homeserver could
+take. Five is too few when ``override_ratelimit`` lifted Synapse's limiter for the bot: a
+6,000-room announcement then crawls along at a fraction of what the server would happily accept.
+It is too many when the override was refused, because every send beyond the limiter's budget comes
+back as a 429 and is retried.
+
+:class:`AdaptiveConcurrency` replaces the fixed bound with the rule TCP uses for its congestion
+window:
+
+* **Additive increase.** Once as many sends have succeeded in a row as the limit currently allows
+  (one "window"), the limit grows by one. Growth is therefore slow and linear, and it stops at
+  ``maximum``.
+* **Multiplicative decrease.** A send refused with HTTP 429, or one that took longer than
+  ``slow_after`` seconds, halves the limit, down to ``minimum``. Slowness counts because
+  :class:`~onbot.clients.base.BaseApiClient` retries a 429 itself, after the wait Synapse asks for.
+  A throttled send that eventually got through therefore shows up as a slow success, not as an
+  error.
+* **One cut per window.** Every send that was already in flight when the limit was cut saw the same
+  congestion. Letting each of them halve the limit again would collapse it to ``minimum`` on a
+  single burst of 429s. Only a send started after the last cut may cut it again.
+
+Other errors (a room the bot was kicked from, a forbidden send) say nothing about load and leave the
+limit alone. Lowering the limit does not interrupt sends already under way; it only holds back new
+ones until enough of those have finished.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+from onbot.clients.base import ApiError
+from onbot.logging import get_logger
+
+log = get_logger(__name__)
+
+
+class AdaptiveConcurrency:
+    """An AIMD-sized bound on concurrent operations; see the module docstring."""
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        maximum: int,
+        minimum: int = 1,
+        slow_after: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.slow_after = slow_after
+        self.increases = 0
+        self.decreases = 0
+        self._clock = clock
+        self._in_flight = 0
+        self._successes = 0  # in a row, since the limit last changed
+        self._epoch = 0  # bumped on every cut; a send started in an older epoch cannot cut again
+        self._changed = asyncio.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for room under the limit, hold it for the block, and learn from how the block went."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        epoch, started = self._epoch, self._clock()
+        succeeded = throttled = False
+        try:
+            yield
+            succeeded = True
+        except ApiError as exc:
+            throttled = exc.status_code == 429
+            raise
+        finally:
+            slow = self._clock() - started > self.slow_after
+            async with self._changed:
+                self._in_flight -= 1
+                if throttled or slow:
+                    self._decrease(epoch, "throttled" if throttled else "slow")
+                elif succeeded:
+                    self._increase()
+                self._changed.notify_all()
+
+    def _increase(self) -> None:
+        self._successes += 1
+        if self._successes < self.limit or self.limit >= self.maximum:
+            return
+        self.limit += 1
+        self.increases += 1
+        self._successes = 0
+
+    def _decrease(self, epoch: int, reason: str) -> None:
+        if epoch != self._epoch:
+            return  # this send saw the congestion that already caused the last cut
+        self._epoch += 1
+        self._successes = 0
+        lowered = max(self.minimum, self.limit // 2)
+        if lowered < self.limit:
+            log.info("concurrency %d -> %d (%s send)", self.limit, lowered, reason)
+            self.limit = lowered
+            self.decreases += 1
+
+    def stats(self) -> str:
+        return f"concurrency {self.limit} (range {self.minimum}-{self.maximum}, {self.decreases} cuts)"
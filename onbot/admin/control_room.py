@@ -14,8 +14,17 @@ on the server on every single restart of the bot. Two independent guards, delibe
   the second.
 
 An event is marked seen and the cursor persisted **before** the command runs, not after. If the bot
-dies mid-``!announce`` the announcement is lost rather than half-sent-and-then-repeated: for a
-command that pages the entire company, at-most-once is the failure mode you want.
+dies mid-``!announce`` the command is not run again on restart: for a command that pages the entire
+company, at-most-once is the failure mode you want. The broadcast's journal still knows which rooms
+were reached, and the summary names its id, so an operator can finish it with
+``onbot broadcast --resume <id>`` (:mod:`onbot.admin.broadcast_journal`). An orderly shutdown
+cancels the announcement, waits for its journal, and posts that command in the room.
+
+**An announcement runs beside the sync stream, not inside it.** Sending into thousands of rooms
+takes minutes, and the sync pump calls its handlers one after another. Running ``!announce`` inline
+would stall every other consumer of the stream for that long, including ``!status``, which is how an
+admin watches the broadcast's progress. It runs as a background task instead, one at a time; a
+second ``!announce`` meanwhile is refused with the first one's progress.
 
 **Authorisation is the allowlist, never the power level.** The room's power levels let any member
 speak — that is the point of a discussion room. If someone gets themselves into it, their power
@@ -28,6 +37,8 @@ that group must lose their commands within a TTL, not on the next restart of the
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import time
 from collections import deque
 from typing import Any
@@ -36,9 +47,12 @@ from onbot import __version__
 from onbot.admin.admins import AdminResolver
 from onbot.admin.broadcast import BroadcastService
 from onbot.admin.commands import ANNOUNCE, STATUS, Command, help_text, parse_command
+from onbot.clients.circuit import CircuitBreakerRegistry
 from onbot.clients.matrix import ApiClientMatrix, SyncResult
+from onbot.clients.ratelimit import RateLimiter
 from onbot.config import OnbotConfig
 from onbot.logging import get_logger
+from onbot.onboarding.queue import WelcomeQueue
 from onbot.reconciler.engine import ReconcilerEngine
 from onbot.reconciler.state import event_type_name
 
@@ -64,6 +78,9 @@ class ControlRoomHandler:
         admins: AdminResolver,
         *,
         engine: ReconcilerEngine | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+        onboarding: WelcomeQueue | None = None,
         started_at_ms: int | None = None,
         remembered_events: int = MAX_REMEMBERED_EVENTS,
     ) -> None:
@@ -72,11 +89,15 @@ class ControlRoomHandler:
         self.broadcast = broadcast
         self.admins = admins
         self.engine = engine
+        self.rate_limiter = rate_limiter
+        self.circuit_breakers = circuit_breakers
+        self.onboarding = onboarding
         self.bot_id = config.synapse_server.bot_user_id
         self.room_id: str | None = None
         self._started_at_ms = started_at_ms if started_at_ms is not None else int(time.time() * 1000)
         self._seen: deque[str] = deque(maxlen=remembered_events)
         self._cursor_type = event_type_name(config.synapse_server.server_name, CURSOR_STATE_NAME)
+        self._announcement: asyncio.Task[None] | None = None
 
     async def start(self, room_id: str) -> None:
         """Bind to the provisioned control room and restore the handled-event cursor."""
@@ -156,8 +177,46 @@ class ControlRoomHandler:
         if not message:
             await self._reply("Nothing to announce. Usage: !announce <message>")
             return
-        result = await self.broadcast.broadcast(message)
-        await self._reply(result.summary())
+        if self._announcement is not None and not self._announcement.done():
+            progress = self.broadcast.progress
+            await self._reply(
+                f"Another announcement is still being sent ({progress or 'starting'}). "
+                "Try again once it has finished."
+            )
+            return
+        await self._reply("Sending the announcement; !status shows how far it has got.")
+        self._announcement = asyncio.create_task(self._run_announcement(message))
+
+    async def _run_announcement(self, message: str) -> None:
+        try:
+            result = await self.broadcast.broadcast(message)
+            await self._reply(result.summary())
+        except Exception:
+            log.exception("the announcement could not be completed")
+
+    async def aclose(self) -> None:
+        """Cancel the announcement under way, if any, and say in the room how to finish it (shutdown).
+
+        Called once the sync pump has stopped and before the clients close: the broadcast writes its
+        journal as it unwinds, so ``--resume`` knows exactly which rooms are left.
+        """
+        task, self._announcement = self._announcement, None
+        if task is None or task.done():
+            return
+        progress = self.broadcast.progress
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        note = "The announcement was interrupted by a shutdown."
+        if progress is not None:
+            note += (
+                f" {progress}. Send it to the remaining rooms with: "
+                f"onbot broadcast --resume {progress.broadcast_id}"
+            )
+        try:
+            await self._reply(note)
+        except Exception:
+            log.exception("could not report the interrupted announcement")
 
     async def _status(self) -> str:
         rooms = await self.broadcast.target_rooms()
@@ -165,7 +224,16 @@ class ControlRoomHandler:
             last = "not yet"
         else:
             last = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(self.engine.last_reconcile_at))
-        return f"onbot {__version__} — last reconcile: {last} — managed rooms: {len(rooms)}"
+        status = f"onbot {__version__} — last reconcile: {last} — managed rooms: {len(rooms)}"
+        if self.rate_limiter is not None:
+            status += f"\nrequests: {self.rate_limiter.stats()}"
+        if self.circuit_breakers is not None:
+            status += f"\nupstreams: {self.circuit_breakers.stats()}"
+        if self.onboarding is not None:
+            status += f"\nonboarding: {self.onboarding.stats()}"
+        if self.broadcast.progress is not None:
+            status += f"\n{self.broadcast.progress}"
+        return status
 
     async def _reply(self, text: str) -> None:
         assert self.room_id is not None
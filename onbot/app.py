@@ -11,19 +11,26 @@ import asyncio
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
+from typing import Any
 
+from onbot.account_data import ShardedAccountDataStore
 from onbot.admin.admins import AdminResolver
 from onbot.admin.broadcast import BroadcastService
+from onbot.admin.broadcast_journal import BroadcastNotFoundError
 from onbot.admin.control_room import ControlRoomHandler
 from onbot.auth.token_provider import (
     OAuth2ClientCredentialsTokenProvider,
     StaticTokenProvider,
     TokenProvider,
 )
+from onbot.clients import jsondecode
 from onbot.clients.authentik import ApiClientAuthentik
+from onbot.clients.circuit import CircuitBreakerRegistry
 from onbot.clients.mas_admin import ApiClientMasAdmin
 from onbot.clients.matrix import ApiClientMatrix, CSApiEffectors
+from onbot.clients.ratelimit import RateLimiter
 from onbot.clients.synapse_admin import ApiClientSynapseAdmin
+from onbot.clients.transport import TransportRegistry
 from onbot.config import OnbotConfig, SynapseServer
 from onbot.discovery import DiscoveryPoller
 from onbot.events import EventBus, Signal
@@ -36,30 +43,87 @@ from onbot.lifecycle.accounts import (
 )
 from onbot.logging import get_logger
 from onbot.media import MediaUploader
+from onbot.onboarding.direct_rooms import DirectRoomIndex
 from onbot.onboarding.listener import OnboardingListener
+from onbot.onboarding.queue import WelcomeQueue
 from onbot.onboarding.welcome import WelcomeService
+from onbot.onboarding.welcomed import WelcomedLedger, welcomed_account_data_type
+from onbot.reconciler.classification import RoomClassificationIndex, classification_account_data_type
 from onbot.reconciler.engine import ReconcilerEngine
 from onbot.rooms.admin import AdminRoomProvisioner
+from onbot.state_cache import RoomStateCache
 from onbot.sync import SyncPump
 
 log = get_logger(__name__)
 
 
-def build_matrix_token_provider(synapse: SynapseServer) -> TokenProvider:
+def build_matrix_token_provider(
+    synapse: SynapseServer,
+    *,
+    renew_at_fraction: float | None = None,
+    transports: TransportRegistry | None = None,
+) -> TokenProvider:
     """Pick the bot's auth strategy (AD-6): OAuth2 client-credentials if configured, else a static
-    compatibility/legacy token. Raises if neither is provided."""
+    compatibility/legacy token. Raises if neither is provided.
+
+    ``renew_at_fraction`` turns on background token renewal; only worth it for the long-running
+    service, not a one-shot command that exits long before its first token expires."""
     if synapse.oauth2 is not None:
         return OAuth2ClientCredentialsTokenProvider(
             token_endpoint=synapse.oauth2.token_endpoint,
             client_id=synapse.oauth2.client_id,
             client_secret=synapse.oauth2.client_secret,
             scope=synapse.oauth2.scope,
+            renew_at_fraction=renew_at_fraction,
+            client=transports.client_for(synapse.oauth2.token_endpoint) if transports is not None else None,
         )
     if synapse.bot_access_token:
         return StaticTokenProvider(synapse.bot_access_token)
     raise ValueError("synapse_server needs either bot_access_token or an oauth2 block")
 
 
+def _build_rate_limiter(config: OnbotConfig) -> RateLimiter:
+    return RateLimiter(config.performance.http_rate_limit_per_sec, config.performance.http_rate_limit_burst)
+
+
+def _build_circuit_breakers(config: OnbotConfig) -> CircuitBreakerRegistry | None:
+    performance = config.performance
+    if performance.circuit_breaker_failure_threshold <= 0:
+        return None
+    return CircuitBreakerRegistry(
+        failure_threshold=performance.circuit_breaker_failure_threshold,
+        reset_after=performance.circuit_breaker_reset_sec,
+    )
+
+
+def _client_options(
+    config: OnbotConfig,
+    rate_limiter: RateLimiter,
+    transports: TransportRegistry,
+    circuit_breakers: CircuitBreakerRegistry | None = None,
+) -> dict[str, Any]:
+    """The :class:`~onbot.clients.base.BaseApiClient` options every API client of the app shares."""
+    performance = config.performance
+    return {
+        "rate_limiter": rate_limiter,
+        "circuit_breakers": circuit_breakers,
+        "transports": transports,
+        "page_concurrency": performance.pagination_concurrency,
+        "coalesce_gets": performance.coalesce_identical_reads,
+        "get_cache_ttls": performance.read_cache_ttl_sec,
+    }
+
+
+def _build_transports(config: OnbotConfig) -> TransportRegistry:
+    performance = config.performance
+    return TransportRegistry(
+        max_connections=performance.http_max_connections_per_host,
+        max_keepalive_connections=performance.http_keepalive_connections_per_host,
+        keepalive_expiry=performance.http_keepalive_expiry_sec,
+        http2=performance.http2,
+    )
+
+
 async def _relax_bot_ratelimit(admin: ApiClientSynapseAdmin, config: OnbotConfig) -> None:
     """Lift Synapse's per-user send limit for the bot, best-effort.
 
@@ -99,6 +163,9 @@ async def _build_control_room(
     engine: ReconcilerEngine,
     admins: AdminResolver,
     events: EventBus,
+    rate_limiter: RateLimiter | None = None,
+    circuit_breakers: CircuitBreakerRegistry | None = None,
+    onboarding: WelcomeQueue | None = None,
 ) -> ControlRoomHandler | None:
     """Provision the admin control room and bind its command router (ADR-0010), or ``None``.
 
@@ -119,7 +186,16 @@ async def _build_control_room(
     # Re-invite on every reconcile, so somebody added to the Authentik admin group gets into the
     # room on the same tick that grants them the right to command the bot.
     events.subscribe(Signal.reconcile_completed, provisioner.on_reconcile)
-    handler = ControlRoomHandler(matrix, config, broadcast, admins, engine=engine)
+    handler = ControlRoomHandler(
+        matrix,
+        config,
+        broadcast,
+        admins,
+        engine=engine,
+        rate_limiter=rate_limiter,
+        circuit_breakers=circuit_breakers,
+        onboarding=onboarding,
+    )
     await handler.start(room_id)
     return handler
 
@@ -133,27 +209,42 @@ class App:
     broadcast: BroadcastService
     pump: SyncPump
     discovery: DiscoveryPoller
+    control_room: ControlRoomHandler | None = None
 
 
 @asynccontextmanager
 async def build_app(config: OnbotConfig) -> AsyncIterator[App]:
     """Construct the reconciler + onboarding with their clients, closing them on exit."""
+    # One request budget, one connection pool and one circuit breaker per host, shared by every
+    # client below (see onbot/clients/ratelimit.py, transport.py and circuit.py).
+    log.info("decoding API responses with %s", jsondecode.BACKEND)
+    rate_limiter = _build_rate_limiter(config)
+    transports = _build_transports(config)
+    circuit_breakers = _build_circuit_breakers(config)
+    client_options = _client_options(config, rate_limiter, transports, circuit_breakers)
     authentik = ApiClientAuthentik(
         url=config.authentik_server.url,
         api_key=config.authentik_server.api_key,
+        **client_options,
     )
     # One MAS-aware token provider shared by the admin + CS clients (same bot identity, AD-6).
-    token_provider = build_matrix_token_provider(config.synapse_server)
+    token_provider = build_matrix_token_provider(
+        config.synapse_server,
+        renew_at_fraction=config.performance.oauth2_renew_at_fraction,
+        transports=transports,
+    )
     admin = ApiClientSynapseAdmin(
         server_url=config.synapse_server.server_url,
         token_provider=token_provider,
         admin_api_path=config.synapse_server.admin_api_path,
+        **client_options,
     )
     matrix = ApiClientMatrix(
         server_url=config.synapse_server.server_url,
         token_provider=token_provider,
         server_name=config.synapse_server.server_name,
         room_version=config.synapse_server.room_version,
+        **client_options,
     )
     # Negotiate CS-API capabilities up front (sliding sync / authenticated media); best-effort so a
     # transient failure does not block startup — the listener re-checks and falls back if needed.
@@ -168,7 +259,7 @@ async def build_app(config: OnbotConfig) -> AsyncIterator[App]:
     await _relax_bot_ratelimit(admin, config)
     # One uploader for the bot avatar, the group rooms and the onboarding rooms: it caches by source
     # URL, so the bot's avatar is fetched and uploaded once no matter how many rooms wear it.
-    media = MediaUploader(matrix)
+    media = MediaUploader(matrix, transports=transports)
     await _apply_bot_avatar(matrix, config, media)
     events = EventBus()
     # Lifecycle enforcement: under MAS only the MAS admin API can revoke a live session (§7 Q1), so
@@ -183,7 +274,10 @@ async def build_app(config: OnbotConfig) -> AsyncIterator[App]:
                 client_id=config.mas_admin.client_id,
                 client_secret=config.mas_admin.client_secret,
                 scope="urn:mas:admin",
+                renew_at_fraction=config.performance.oauth2_renew_at_fraction,
+                client=transports.client_for(config.mas_admin.url),
             ),
+            **client_options,
         )
         lifecycle_effectors = MasLifecycleEffectors(mas_admin, synapse_admin=admin)
     else:
@@ -195,26 +289,80 @@ async def build_app(config: OnbotConfig) -> AsyncIterator[App]:
         ),
         effectors=lifecycle_effectors,
     )
-    effectors = CSApiEffectors(matrix, media=media)
+    # Actual room state, kept current from the sync stream; only ever consulted while the stream is
+    # live, so a pass without a running pump (reconcile-once) reads Synapse as before.
+    state_cache = (
+        RoomStateCache(config.synapse_server.server_name) if config.performance.sync_state_cache else None
+    )
+    effectors = CSApiEffectors(matrix, media=media, state_cache=state_cache)
+    # Which unmapped rooms are known not to be ours, so obsolete-room teardown stops re-reading them.
+    classification = (
+        RoomClassificationIndex(
+            ShardedAccountDataStore(
+                matrix,
+                config.synapse_server.bot_user_id,
+                classification_account_data_type(config.synapse_server.server_name),
+            ),
+            config.synapse_server.server_name,
+            reverify_after_sec=config.performance.room_classification_reverify_sec,
+        )
+        if config.performance.room_classification_reverify_sec > 0
+        else None
+    )
     engine = ReconcilerEngine(
-        config, authentik, admin, effectors=effectors, events=events, lifecycle=lifecycle
+        config,
+        authentik,
+        admin,
+        effectors=effectors,
+        events=events,
+        lifecycle=lifecycle,
+        state_cache=state_cache,
+        classification=classification,
     )
-    welcome = WelcomeService(matrix, config, admin=admin, media=media)
-    listener = OnboardingListener(matrix, welcome, config, events)
+    # One m.direct for the welcome flow and the broadcasts, kept current from the sync stream.
+    direct = DirectRoomIndex(matrix, config.synapse_server.bot_user_id)
+    welcome = WelcomeService(matrix, config, admin=admin, media=media, direct=direct)
+    # Who has been welcomed with the current messages, so a restart does not re-check everybody.
+    ledger = WelcomedLedger(
+        ShardedAccountDataStore(
+            matrix,
+            config.synapse_server.bot_user_id,
+            welcomed_account_data_type(config.synapse_server.server_name),
+        ),
+        config.welcome_new_users_messages or [],
+    )
+    await ledger.ensure_loaded()
+    listener = OnboardingListener(matrix, welcome, config, events, ledger=ledger)
     listener.start()  # subscribe onboarding to the reconciler's user-provisioned signal (AD-4)
-    broadcast = BroadcastService(matrix, config)
+    broadcast = BroadcastService(matrix, config, direct=direct)
     # One sync connection, fanned out to every consumer of the event stream (see onbot/sync.py).
-    pump = SyncPump(matrix)
+    pump = SyncPump(
+        matrix, required_state=state_cache.required_state if state_cache else None, account_data=True
+    )
+    if state_cache is not None:
+        pump.register(state_cache)  # first, so every later handler sees the slice already applied
+    if classification is not None:
+        pump.register(classification)
+    pump.register(direct)
     pump.register(listener)
     # Watches Authentik cheaply and wakes the engine on a real change, so the engine's own tick can
     # stay slow (see onbot/discovery.py).
     discovery = DiscoveryPoller(authentik, config, engine.trigger)
     admins = AdminResolver(authentik, config)
-    control_room = await _build_control_room(matrix, config, broadcast, engine, admins, events)
+    control_room = await _build_control_room(
+        matrix, config, broadcast, engine, admins, events, rate_limiter, circuit_breakers, listener.queue
+    )
     if control_room is not None:
         pump.register(control_room)
     try:
-        yield App(engine=engine, listener=listener, broadcast=broadcast, pump=pump, discovery=discovery)
+        yield App(
+            engine=engine,
+            listener=listener,
+            broadcast=broadcast,
+            pump=pump,
+            discovery=discovery,
+            control_room=control_room,
+        )
     finally:
         await effectors.aclose()
         await media.aclose()
@@ -223,39 +371,107 @@ async def build_app(config: OnbotConfig) -> AsyncIterator[App]:
         await matrix.aclose()
         if mas_admin is not None:
             await mas_admin.aclose()
+        await transports.aclose()
 
 
 async def run_service(config: OnbotConfig) -> None:
-    """Run the reconcile loop, the Authentik poll and the sync pump concurrently until stopped."""
+    """Run the reconcile loop, the Authentik poll, the sync pump and the onboarding workers until stopped."""
     async with build_app(config) as app:
-        # The engine owns the signal handlers; when it stops, stop the other two loops too.
+        # The engine owns the signal handlers; when it stops, stop the other loops too.
         async def _reconcile() -> None:
             try:
                 await app.engine.run()
             finally:
                 app.pump.request_stop()
                 app.discovery.request_stop()
+                app.listener.queue.request_stop()
 
-        await asyncio.gather(_reconcile(), app.pump.run(), app.discovery.run())
+        try:
+            await asyncio.gather(_reconcile(), app.pump.run(), app.discovery.run(), app.listener.queue.run())
+        finally:
+            # A running !announce: cancel it and let it write its journal while the clients are open.
+            if app.control_room is not None:
+                await app.control_room.aclose()
+        await app.listener.ledger.flush()
 
 
 async def run_reconcile_once(config: OnbotConfig) -> None:
     """Run a single reconcile pass and exit (``onbot reconcile-once``).
 
     Onboarding still fires for users discovered this pass — the listener is subscribed to the bus —
-    but the long-running sync stream is not started.
+    and the command waits for those welcomes before exiting; the long-running sync stream is not
+    started.
     """
     async with build_app(config) as app:
-        await app.engine.reconcile_once()
+        workers = asyncio.create_task(app.listener.queue.run())
+        try:
+            await app.engine.reconcile_once()
+            await app.listener.queue.drain()
+        finally:
+            app.listener.queue.request_stop()
+            await workers
+            await app.listener.ledger.flush()
 
 
-async def run_broadcast(config: OnbotConfig, message: str) -> int:
-    """Send one announcement to every managed direct room (``onbot broadcast``).
+async def run_plan(config: OnbotConfig) -> int:
+    """Print what one reconcile pass would change, and change nothing (``onbot plan``).
+
+    Builds only the clients a pass reads through rather than the whole app, whose startup registers
+    the bot's device, sets its avatar and provisions the admin room — all writes.
+    """
+    rate_limiter = _build_rate_limiter(config)
+    transports = _build_transports(config)
+    client_options = _client_options(config, rate_limiter, transports, _build_circuit_breakers(config))
+    authentik = ApiClientAuthentik(
+        url=config.authentik_server.url,
+        api_key=config.authentik_server.api_key,
+        **client_options,
+    )
+    token_provider = build_matrix_token_provider(config.synapse_server, transports=transports)
+    admin = ApiClientSynapseAdmin(
+        server_url=config.synapse_server.server_url,
+        token_provider=token_provider,
+        admin_api_path=config.synapse_server.admin_api_path,
+        **client_options,
+    )
+    matrix = ApiClientMatrix(
+        server_url=config.synapse_server.server_url,
+        token_provider=token_provider,
+        server_name=config.synapse_server.server_name,
+        room_version=config.synapse_server.room_version,
+        **client_options,
+    )
+    effectors = CSApiEffectors(matrix, media=MediaUploader(matrix, transports=transports))
+    try:
+        plan = await ReconcilerEngine(config, authentik, admin, effectors=effectors).plan_once()
+    finally:
+        await effectors.aclose()
+        await authentik.aclose()
+        await admin.aclose()
+        await matrix.aclose()
+        await transports.aclose()
+    print(plan.render())
+    return 0
+
+
+async def run_broadcast(config: OnbotConfig, message: str | None, *, resume: str | None = None) -> int:
+    """Send one announcement to every managed direct room, or resume one (``onbot broadcast``).
 
     Returns a shell exit code: non-zero when any room refused the message, so a script can tell a
-    partial delivery from a clean one.
+    partial delivery from a clean one, and 2 when ``resume`` names no known broadcast.
     """
     async with build_app(config) as app:
-        result = await app.broadcast.broadcast(message)
+        if resume is not None:
+            try:
+                result = await app.broadcast.resume(resume)
+            except BroadcastNotFoundError as exc:
+                print(f"cannot resume: {exc}")
+                return 2
+        else:
+            assert message is not None
+            result = await app.broadcast.broadcast(message)
     print(result.summary())
-    return 1 if result.failures else 0
+    if result.failures:
+        print(f"retry the failed rooms with: onbot broadcast --resume {result.broadcast_id}")
+        return 1
+    return 0
@@ -17,11 +17,25 @@ not care which is in use:
 Both satisfy the :class:`TokenProvider` protocol — a single ``async get_token()`` —
 which :class:`~onbot.clients.base.BaseApiClient` calls per request, so a token can
 rotate underneath a long-lived client without reconstructing it.
+
+**One refresh at a time.** Every request asks for the token, so when it goes stale
+the broadcast workers, the reconcile and the sync long-poll all notice at once. Each
+used to fire its own refresh: a burst of identical requests at MAS's token endpoint,
+and with a refresh token, a race in which the first rotation invalidates the token
+the others are still presenting. Refreshes are now *single-flight* — the first caller
+starts one and everybody else awaits that same request.
+
+**Renewing ahead of time.** With ``renew_at_fraction`` set, a background task renews
+the token once that fraction of its lifetime has passed, so requests find a fresh
+token waiting rather than stopping to fetch one. If that renewal fails the request
+path still refreshes on demand, as it would without it.
 """
 
 from __future__ import annotations
 
+import asyncio
 import time
+from contextlib import suppress
 from typing import Protocol, runtime_checkable
 
 import httpx
@@ -34,6 +48,9 @@ log = get_logger(__name__)
 # the cutoff (clock skew + network latency margin).
 _EXPIRY_MARGIN_SEC = 30.0
 
+# After a failed background renewal, try again this much later (the request path may get there first).
+_RENEW_RETRY_SEC = 30.0
+
 
 @runtime_checkable
 class TokenProvider(Protocol):
@@ -67,6 +84,10 @@ class OAuth2ClientCredentialsTokenProvider:
     it is within :data:`_EXPIRY_MARGIN_SEC` of expiring, then refresh it — via the
     ``refresh_token`` grant when one was issued, else a fresh ``client_credentials``
     exchange. Client authentication uses HTTP Basic per RFC 6749 §2.3.1.
+
+    Concurrent refreshes share one request (see the module docstring). ``renew_at_fraction``
+    (between 0 and 1) additionally renews every token in the background once that fraction of
+    its lifetime has passed.
     """
 
     def __init__(
@@ -77,7 +98,10 @@ class OAuth2ClientCredentialsTokenProvider:
         client_secret: str,
         scope: str | None = None,
         client: httpx.AsyncClient | None = None,
+        renew_at_fraction: float | None = None,
     ) -> None:
+        if renew_at_fraction is not None and not 0 < renew_at_fraction < 1:
+            raise ValueError("renew_at_fraction must be between 0 and 1")
         self._token_endpoint = token_endpoint
         self._client_id = client_id
         self._client_secret = client_secret
@@ -87,11 +111,41 @@ class OAuth2ClientCredentialsTokenProvider:
         self._access_token: str | None = None
         self._refresh_token: str | None = None
         self._expires_at: float = 0.0
+        self._renew_at_fraction = renew_at_fraction
+        self._renew_at: float = 0.0
+        # The refresh in flight, which every caller that finds the token stale awaits.
+        self._inflight: asyncio.Future[str] | None = None
+        self._renewal: asyncio.Task[None] | None = None
 
     async def get_token(self) -> str:
         if self._access_token is not None and time.monotonic() < self._expires_at - _EXPIRY_MARGIN_SEC:
             return self._access_token
-        return await self._refresh()
+        return await self._refresh_once()
+
+    async def _refresh_once(self) -> str:
+        """Join the refresh in flight, or start it. Shielded: one caller giving up cancels nobody's."""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+            self._inflight.add_done_callback(self._refresh_done)
+        return await asyncio.shield(self._inflight)
+
+    def _refresh_done(self, refresh: asyncio.Future[str]) -> None:
+        self._inflight = None
+        if not refresh.cancelled():
+            refresh.exception()  # every waiter has seen it; do not warn about it again at shutdown
+
+    async def _renew_in_background(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, self._renew_at - time.monotonic()))
+            try:
+                await self._refresh_once()
+            except Exception:
+                log.warning(
+                    "background OAuth2 token renewal failed; retrying in %.0fs",
+                    _RENEW_RETRY_SEC,
+                    exc_info=True,
+                )
+                await asyncio.sleep(_RENEW_RETRY_SEC)
 
     async def _refresh(self) -> str:
         if self._refresh_token is not None:
@@ -130,9 +184,19 @@ class OAuth2ClientCredentialsTokenProvider:
         expires_in = payload.get("expires_in")
         # Default to a conservative lifetime if the server omits expires_in.
         seconds = float(expires_in) if isinstance(expires_in, int | float) else 300.0
-        self._expires_at = time.monotonic() + seconds
+        now = time.monotonic()
+        self._expires_at = now + seconds
+        if self._renew_at_fraction is not None:
+            self._renew_at = now + seconds * self._renew_at_fraction
+            if self._renewal is None:
+                self._renewal = asyncio.create_task(self._renew_in_background())
 
     async def aclose(self) -> None:
+        if self._renewal is not None:
+            self._renewal.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._renewal
+            self._renewal = None
         if self._owns_http:
             await self._http.aclose()
 
@@ -4,7 +4,8 @@ Sub-commands mirror the operational surface from ``BATTLE_PLAN.md`` §4:
 
 * ``run``             — long-running service: scheduled reconcile + (Phase 4) onboarding
 * ``reconcile-once``  — run a single idempotent reconcile and exit
-* ``broadcast``       — send one announcement to every user's notice board (G4.6)
+* ``plan``            — print what a reconcile would change, without changing anything
+* ``broadcast``       — send one announcement to every user's notice board (G4.6), or resume one
 * ``generate-config`` — emit a documented example config (G11.2)
 * ``healthcheck``     — probe dependencies for container/orchestrator health (Phase 8)
 
@@ -33,15 +34,28 @@ def build_parser() -> argparse.ArgumentParser:
     sub = parser.add_subparsers(dest="command", required=True)
     sub.add_parser("run", help="Run the bot service (reconcile loop + onboarding).")
     sub.add_parser("reconcile-once", help="Run a single reconcile pass and exit.")
+    sub.add_parser(
+        "plan",
+        help="Print the changes a reconcile pass would make, without making them.",
+        description=(
+            "Read Authentik and the homeserver exactly as a reconcile pass does and print every "
+            "change it would make, room by room. Nothing is written."
+        ),
+    )
     bcast = sub.add_parser(
         "broadcast",
         help="Send a message to every user's onboarding room.",
         description=(
             "Send one message, as a notice, into the read-only onboarding room of every user the "
-            "bot has onboarded. Exits non-zero if any room could not be reached."
+            "bot has onboarded. Exits non-zero if any room could not be reached. Every broadcast "
+            "prints an id; --resume <id> sends the same message to every room it has not reached "
+            "yet, after a crash or to retry the rooms that failed."
         ),
     )
-    bcast.add_argument("message", help="The message to send, e.g. 'Maintenance at 22:00 UTC'.")
+    bcast.add_argument("message", nargs="?", help="The message to send, e.g. 'Maintenance at 22:00 UTC'.")
+    bcast.add_argument(
+        "--resume", metavar="ID", default=None, help="Continue an earlier broadcast instead of starting one."
+    )
     gen = sub.add_parser("generate-config", help="Write a documented example configuration file.")
     gen.add_argument("-o", "--output", default=None, help="Write to this path instead of stdout.")
     sub.add_parser("healthcheck", help="Check connectivity to required services.")
@@ -60,7 +74,10 @@ def _cmd_generate_config(output: str | None) -> int:
 
 
 def main(argv: Sequence[str] | None = None) -> int:
-    args = build_parser().parse_args(argv)
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "broadcast" and (args.message is None) == (args.resume is None):
+        parser.error("broadcast needs either a message or --resume <id>, not both")
     configure_logging(args.log_level)
     log.info("onbot %s — command %r", __version__, args.command)
 
@@ -88,8 +105,10 @@ def main(argv: Sequence[str] | None = None) -> int:
     if args.command == "reconcile-once":
         asyncio.run(app.run_reconcile_once(config))
         return 0
+    if args.command == "plan":
+        return asyncio.run(app.run_plan(config))
     if args.command == "broadcast":
-        return asyncio.run(app.run_broadcast(config, args.message))
+        return asyncio.run(app.run_broadcast(config, args.message, resume=args.resume))
 
     raise SystemExit(f"unknown command {args.command!r}")  # pragma: no cover
 
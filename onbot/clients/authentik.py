@@ -3,12 +3,24 @@
 Ported from legacy ``onbot/api_client_authentik.py`` onto the async :class:`BaseApiClient`.
 Fixes carried over from BATTLE_PLAN §3: full pagination (legacy read only page 1), no stray
 ``print`` debugging, and typed errors via the base client.
+
+Each user in a listing embeds the *full* object of every group it is in (``groups_obj``: the group's
+attributes, its parent, its roles), so on a large tenant the same group objects are held thousands
+of times over for the whole of a pass. :meth:`ApiClientAuthentik.list_users` keeps only what the bot
+reads of them — see :func:`compact_user`.
+
+Group listings filter on attributes server-side where Authentik can express the predicate:
+:func:`plan_attribute_filters` turns exact matches and single-path presence checks into Authentik's
+``attributes`` query (its JSON keys are Django lookups, so ``{"chat__level__isnull": false}`` means
+"has ``chat.level``"). That only narrows the transfer: presence and truthiness are still checked on
+what comes back, because Authentik returns the unfiltered listing for a filter it cannot apply.
 """
 
 from __future__ import annotations
 
 import json
 from collections.abc import Sequence
+from dataclasses import dataclass, field
 from typing import Any
 
 from onbot.clients.base import BaseApiClient
@@ -29,6 +41,89 @@ def _next_page_params(page: Any, current: dict[str, Any]) -> dict[str, Any] | No
     return {**current, "page": next_page}
 
 
+def _remaining_page_params(page: Any, current: dict[str, Any]) -> list[dict[str, Any]] | None:
+    """Every page after this one, from ``pagination.current`` and ``pagination.total_pages``."""
+    pagination = (page or {}).get("pagination", {})
+    number, total = pagination.get("current"), pagination.get("total_pages")
+    if not isinstance(number, int) or not isinstance(total, int):
+        return None
+    return [{**current, "page": n} for n in range(number + 1, total + 1)]
+
+
+# What is kept of each entry of a user's ``groups_obj``.
+_GROUP_REF_FIELDS = ("pk", "name")
+
+
+def compact_user(user: dict[str, Any]) -> dict[str, Any]:
+    """``user`` with ``groups_obj`` cut down to each group's pk and name, and ``roles_obj`` dropped.
+
+    Every other field, ``attributes`` included, is kept: the MXID mapping attribute may point
+    anywhere in the user object.
+    """
+    compact = {k: v for k, v in user.items() if k not in ("groups_obj", "roles_obj")}
+    if "groups_obj" in user:
+        compact["groups_obj"] = [
+            {f: g[f] for f in _GROUP_REF_FIELDS if f in g} for g in user["groups_obj"] or []
+        ]
+    return compact
+
+
+def _compact_users(page: Any) -> list[dict[str, Any]]:
+    return [compact_user(u) for u in page["results"]]
+
+
+@dataclass(frozen=True, slots=True)
+class AttributeFilterPlan:
+    """How a group listing's attribute predicates split between Authentik and the client.
+
+    ``query`` is sent as the ``attributes`` parameter. ``has`` / ``non_empty`` are what is left for
+    the client: dotted paths of which a group must carry at least one (with a truthy value, for
+    ``non_empty``). ``pushed`` describes each predicate sent to the server, for the log.
+    """
+
+    query: dict[str, Any] = field(default_factory=dict)
+    has: list[str] = field(default_factory=list)
+    non_empty: list[str] = field(default_factory=list)
+    pushed: list[str] = field(default_factory=list)
+
+
+def _lookup(path: str) -> str | None:
+    """The Django JSON lookup for a dotted attribute path, or ``None`` if it cannot be written as one."""
+    keys = path.split(".")
+    if any(not key or "__" in key for key in keys):
+        return None
+    return "__".join(keys)
+
+
+def plan_attribute_filters(
+    exact: dict[str, Any] | None = None,
+    has: Sequence[str] | None = None,
+    non_empty: Sequence[str] | None = None,
+) -> AttributeFilterPlan:
+    """Push what Authentik's ``attributes`` query can express; keep the rest for the client.
+
+    * ``exact`` (Authentik's own ``__`` notation) is pushed as is.
+    * ``has`` / ``non_empty``: one path is pushed as ``<path>__isnull: false``, which narrows the
+      listing to groups that have the attribute. Several paths mean *any of them*, which the query
+      (an AND of its keys) cannot say, so nothing is pushed for them.
+
+    Every ``has`` and ``non_empty`` path stays in the local remainder, pushed or not. The query is
+    only a hint: Authentik answers an ``attributes`` filter it cannot apply with the unfiltered
+    listing rather than an error.
+    """
+    plan = AttributeFilterPlan(query=dict(exact or {}))
+    plan.pushed.extend(f"{key} == {value!r}" for key, value in plan.query.items())
+    for paths, remainder in ((has, plan.has), (non_empty, plan.non_empty)):
+        if not paths:
+            continue
+        remainder.extend(paths)
+        lookup = _lookup(paths[0]) if len(paths) == 1 else None
+        if lookup is not None:
+            plan.query[f"{lookup}__isnull"] = False
+            plan.pushed.append(f"has {paths[0]}")
+    return plan
+
+
 class ApiClientAuthentik(BaseApiClient):
     def __init__(self, url: str, api_key: str, **kwargs: Any) -> None:
         super().__init__(base_url=f"{url.rstrip('/')}/api/v3", auth_token=api_key, **kwargs)
@@ -42,8 +137,13 @@ class ApiClientAuthentik(BaseApiClient):
         filter_by_attribute: str | dict[str, Any] | None = None,
         filter_is_superuser: bool | None = None,
         filter_is_active: bool | None = True,
+        filter_updated_after: str | None = None,
     ) -> list[dict[str, Any]]:
-        """List users (https://<authentik>/api/v3/#get-/core/users/), following all pages."""
+        """List users (https://<authentik>/api/v3/#get-/core/users/), following all pages.
+
+        Each user is returned through :func:`compact_user`. ``filter_updated_after`` (an ISO
+        timestamp, as Authentik reports ``last_updated``) asks only for users changed after it.
+        """
         if isinstance(filter_by_attribute, dict):
             filter_by_attribute = json.dumps(filter_by_attribute)
         params = {
@@ -53,13 +153,15 @@ class ApiClientAuthentik(BaseApiClient):
             "is_superuser": filter_is_superuser,
             "is_active": filter_is_active,
             "path": filter_by_path,
+            "last_updated__gt": filter_updated_after,
             "page_size": _DEFAULT_PAGE_SIZE,
         }
         return await self.paginate_collect(
             "core/users/",
             params=params,
-            extract_items=lambda page: page["results"],
+            extract_items=_compact_users,
             next_params=_next_page_params,
+            remaining_params=_remaining_page_params,
         )
 
     async def list_groups(
@@ -72,18 +174,42 @@ class ApiClientAuthentik(BaseApiClient):
         filter_has_attributes: Sequence[str] | None = None,
         filter_has_non_empty_attributes: Sequence[str] | None = None,
         include_inactive_users_obj: bool = False,
+        include_users: bool = True,
+        filter_updated_after: str | None = None,
     ) -> list[dict[str, Any]]:
         """List groups (https://<authentik>/api/v3/#get-/core/groups/), following all pages.
 
-        ``filter_has_attributes`` / ``filter_has_non_empty_attributes`` are client-side filters on
-        dotted attribute paths (Authentik's query API can't express them). Inactive users are
-        stripped from each group's ``users_obj`` unless ``include_inactive_users_obj``.
+        ``filter_has_attributes`` / ``filter_has_non_empty_attributes`` keep groups carrying at
+        least one of the given dotted attribute paths (with a truthy value, for the latter). As much
+        of them as Authentik can evaluate is sent with the query (:func:`plan_attribute_filters`);
+        the rest is applied to the listing. Inactive users are stripped from each group's
+        ``users_obj`` unless ``include_inactive_users_obj``.
+
+        With ``include_users=False`` Authentik leaves out ``users_obj`` — the full record of every
+        member, repeated in every group — and the groups come back without it (a server too old for
+        the parameter sends it anyway; it is dropped here). Membership is then read from the users'
+        ``groups_obj`` instead.
+
+        ``filter_updated_after`` asks only for groups changed after that ``last_updated``. An
+        Authentik that cannot filter groups by it ignores the parameter and lists them all.
         """
+        plan = plan_attribute_filters(
+            filter_by_attribute, filter_has_attributes, filter_has_non_empty_attributes
+        )
+        if plan.pushed:
+            log.debug(
+                "listing groups; attribute filters sent to Authentik: %s; checked locally: %s",
+                ", ".join(plan.pushed),
+                ", ".join([f"has {p}" for p in plan.has] + [f"non-empty {p}" for p in plan.non_empty])
+                or "nothing",
+            )
         params = {
             "members_by_username": filter_members_by_username,
             "members_by_pk": filter_members_by_pk,
-            "attributes": (json.dumps(filter_by_attribute) if filter_by_attribute else None),
+            "attributes": json.dumps(plan.query) if plan.query else None,
             "is_superuser": filter_is_superuser,
+            "include_users": None if include_users else "false",
+            "last_updated__gt": filter_updated_after,
             "page_size": _DEFAULT_PAGE_SIZE,
         }
         groups: list[dict[str, Any]] = await self.paginate_collect(
@@ -91,28 +217,29 @@ class ApiClientAuthentik(BaseApiClient):
             params=params,
             extract_items=lambda page: page["results"],
             next_params=_next_page_params,
+            remaining_params=_remaining_page_params,
         )
 
-        if not include_inactive_users_obj:
+        if not include_users:
+            for group in groups:
+                group.pop("users_obj", None)
+        elif not include_inactive_users_obj:
             for group in groups:
                 self._remove_inactive_users_from_group(group)
 
-        if filter_has_attributes:
+        if plan.has:
             groups = [
                 g
                 for g in groups
-                if any(
-                    dict_has_nested_attr(g.get("attributes", {}), attr.split("."))
-                    for attr in filter_has_attributes
-                )
+                if any(dict_has_nested_attr(g.get("attributes", {}), attr.split(".")) for attr in plan.has)
             ]
-        if filter_has_non_empty_attributes:
+        if plan.non_empty:
             groups = [
                 g
                 for g in groups
                 if any(
                     dict_has_nested_attr(g.get("attributes", {}), attr.split("."), must_have_val=True)
-                    for attr in filter_has_non_empty_attributes
+                    for attr in plan.non_empty
                 )
             ]
         return groups
@@ -4,23 +4,60 @@ AD-7: one pooled ``httpx.AsyncClient`` with bearer-auth injection, retries on tr
 (tenacity), a generic pagination helper, and typed errors. This replaces the legacy per-call
 ``requests`` churn and the ``access_token.lstrip("Bearer ")`` token-corruption bug (BATTLE_PLAN §3):
 tokens are stored bare and the ``Bearer`` prefix is added exactly once here.
+
+**Server-supplied delays win.** A 429 (or 503) that says how long to wait — Synapse's
+``retry_after_ms`` in the body, or a standard ``Retry-After`` header — is retried after exactly that
+long (capped at :data:`MAX_RETRY_AFTER_SEC`), not after the exponential guess used for errors that
+say nothing. With a shared :class:`~onbot.clients.ratelimit.RateLimiter` the delay pauses every
+client talking to that host, not just the one that was told.
+
+**An outage fails fast.** With a shared :class:`~onbot.clients.circuit.CircuitBreakerRegistry`,
+consecutive transport errors and 5xx responses from one host open its circuit, and requests to it
+then raise :class:`~onbot.clients.circuit.CircuitOpenError` at once (never retried) until a trial
+request gets through again.
+
+**Identical reads can share one request** (``coalesce_gets``). Welcomes running side by side, a
+broadcast and the control room all read the bot's ``m.direct`` account data; several subsystems read
+the same Authentik groups. With coalescing on, a :meth:`get_json` that finds the very same GET (URL
+and query) already in flight on this client waits for that one instead of sending its own, and
+``get_cache_ttls`` may keep the answer for a few seconds for paths matching a pattern. Any write
+(PUT, POST, DELETE) to a path drops what is cached or in flight for it, so a client always reads
+its own writes. Every caller gets its own copy of the result to change as it likes. The state is
+per client instance, and one instance is one auth identity.
+
+Response bodies are decoded by :mod:`~onbot.clients.jsondecode`, with ``orjson`` or ``msgspec`` when
+one is installed.
 """
 
 from __future__ import annotations
 
-from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+import asyncio
+import copy
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable, Mapping
+from contextlib import aclosing
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from fnmatch import fnmatchcase
+from itertools import islice
 from types import TracebackType
 from typing import Any
 
 import httpx
 from tenacity import (
     AsyncRetrying,
+    RetryCallState,
     retry_if_exception,
     stop_after_attempt,
     wait_exponential,
 )
 
 from onbot.auth.token_provider import StaticTokenProvider, TokenProvider
+from onbot.clients.circuit import CircuitBreakerRegistry
+from onbot.clients.jsondecode import loads as json_loads
+from onbot.clients.ratelimit import RateLimiter
+from onbot.clients.transport import TransportRegistry
 from onbot.logging import get_logger
 
 log = get_logger(__name__)
@@ -28,6 +65,13 @@ log = get_logger(__name__)
 # Transient HTTP statuses worth retrying (rate-limit + gateway/server errors).
 RETRYABLE_STATUS_CODES: frozenset[int] = frozenset({429, 500, 502, 503, 504})
 
+# A coalescing key: the URL and its sorted, non-``None`` query parameters.
+_GetKey = tuple[str, tuple[tuple[str, str], ...]]
+
+# The longest server-requested wait honoured before a retry. A server asking for more is waited on
+# for this long and then tried again, which uses up an attempt rather than stalling a pass for good.
+MAX_RETRY_AFTER_SEC = 60.0
+
 
 class ApiError(Exception):
     """A non-2xx API response, carrying enough context to debug without re-reading logs."""
@@ -38,11 +82,15 @@ class ApiError(Exception):
         url: str,
         status_code: int,
         payload: Any = None,
+        *,
+        retry_after: float | None = None,
     ) -> None:
         self.method = method
         self.url = url
         self.status_code = status_code
         self.payload = payload
+        # Seconds the server asked us to wait before trying again, if it said.
+        self.retry_after = retry_after
         super().__init__(f"{method} {url} -> HTTP {status_code}: {payload!r}")
 
     @property
@@ -57,6 +105,9 @@ def _is_retryable_exc(exc: BaseException) -> bool:
     return isinstance(exc, httpx.TransportError)
 
 
+_exponential_wait = wait_exponential(multiplier=0.5, max=10)
+
+
 class BaseApiClient:
     """Thin async wrapper over ``httpx.AsyncClient`` with auth, retries and pagination."""
 
@@ -69,9 +120,33 @@ class BaseApiClient:
         max_retry_attempts: int = 4,
         timeout: float = 30.0,
         client: httpx.AsyncClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+        circuit_breakers: CircuitBreakerRegistry | None = None,
+        page_concurrency: int = 1,
+        transports: TransportRegistry | None = None,
+        coalesce_gets: bool = False,
+        get_cache_ttls: Mapping[str, float] | None = None,
     ) -> None:
         self._base_url = base_url.rstrip("/") + "/"
         self._max_retry_attempts = max_retry_attempts
+        # Pages of one listing fetched at once by :meth:`paginate`; 1 fetches strictly one by one.
+        self.page_concurrency = max(1, page_concurrency)
+        # Shared with every other client of the same host when the app passes one in; a client on
+        # its own still honours retry delays, just without pausing anyone else.
+        self.rate_limiter = rate_limiter
+        # Shared the same way: once a host's circuit opens, every client's requests to it fail fast
+        # with CircuitOpenError (never retried) until the trial request gets through.
+        self.circuit_breakers = circuit_breakers
+        # GET coalescing and its micro-cache (see the module docstring). Cache patterns are matched
+        # against the path relative to the base URL, e.g. ``v3/user/*/account_data/m.direct``.
+        self._get_cache_ttls = [(pattern, ttl) for pattern, ttl in (get_cache_ttls or {}).items() if ttl > 0]
+        self._coalesce_gets = coalesce_gets or bool(self._get_cache_ttls)
+        self._gets_in_flight: dict[_GetKey, asyncio.Future[Any]] = {}
+        self._get_cache: dict[_GetKey, tuple[float, Any]] = {}
+        # Bumped by every write to a URL, so a read that was in flight across the write is not cached.
+        self._write_generation: dict[str, int] = {}
+        self.gets_coalesced = 0
+        self.gets_cached = 0
         # Auth is resolved per request (AD-6): a static token or an OAuth2 provider that may
         # rotate the token underneath this long-lived client. A bare token is just the static case.
         if token_provider is None:
@@ -80,9 +155,18 @@ class BaseApiClient:
             token_provider = StaticTokenProvider(auth_token)
         self._token_provider = token_provider
         headers = {"Accept": "application/json"}
+        # With a transport registry the connection pool is shared with every other client of the
+        # same host, so this client's timeout and headers go with each request instead of onto
+        # the pool, and closing this client leaves the pool to the registry.
+        self._shared_transport = client is None and transports is not None
+        self._request_options: dict[str, Any] = (
+            {"timeout": timeout, "headers": headers} if self._shared_transport else {}
+        )
+        if client is None and transports is not None:
+            client = transports.client_for(self._base_url)
         self._client = client or httpx.AsyncClient(headers=headers, timeout=timeout)
         # When an external client is injected (tests), make sure the Accept header is present.
-        if client is not None:
+        if client is not None and not self._shared_transport:
             self._client.headers.update(headers)
 
     async def __aenter__(self) -> BaseApiClient:
@@ -97,7 +181,8 @@ class BaseApiClient:
         await self.aclose()
 
     async def aclose(self) -> None:
-        await self._client.aclose()
+        if not self._shared_transport:
+            await self._client.aclose()
         await self._token_provider.aclose()
 
     def _build_url(self, path: str) -> str:
@@ -111,10 +196,22 @@ class BaseApiClient:
         """Per-request Authorization header (the token may have rotated; see AD-6)."""
         return {"Authorization": f"Bearer {await self._token_provider.get_token()}"}
 
+    def _retry_wait(self, state: RetryCallState) -> float:
+        """The server's delay when it gave one, else exponential backoff.
+
+        With a rate limiter the server's delay has already paused the whole origin (see
+        :meth:`_error`), and the next attempt waits it out in :meth:`_send`; waiting here as well
+        would wait twice.
+        """
+        exc = state.outcome.exception() if state.outcome is not None else None
+        if isinstance(exc, ApiError) and exc.retry_after is not None:
+            return 0.0 if self.rate_limiter is not None else min(exc.retry_after, MAX_RETRY_AFTER_SEC)
+        return _exponential_wait(state)
+
     async def _with_retry(self, do: Callable[[], Awaitable[Any]]) -> Any:
         async for attempt in AsyncRetrying(
             stop=stop_after_attempt(self._max_retry_attempts),
-            wait=wait_exponential(multiplier=0.5, max=10),
+            wait=self._retry_wait,
             retry=retry_if_exception(_is_retryable_exc),
             reraise=True,
         ):
@@ -122,6 +219,41 @@ class BaseApiClient:
                 return await do()
         raise AssertionError("unreachable")  # pragma: no cover
 
+    async def _send(self, method: str, url: str, *, long_poll: bool = False, **kwargs: Any) -> httpx.Response:
+        """One HTTP attempt: past the origin's circuit breaker, then its turn in the rate limiter."""
+        breaker = self.circuit_breakers.breaker(url) if self.circuit_breakers is not None else None
+        if breaker is not None:
+            breaker.before_request(long_poll=long_poll)
+        if self._request_options:
+            kwargs["headers"] = {**self._request_options["headers"], **(kwargs.get("headers") or {})}
+            kwargs.setdefault("timeout", self._request_options["timeout"])
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(url)
+            response = await self._client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon(long_poll=long_poll)
+            raise
+        if breaker is not None:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        return response
+
+    def _error(self, method: str, url: str, response: httpx.Response) -> ApiError:
+        """The :class:`ApiError` for a failed response; pauses the origin if the server said to wait."""
+        payload = _safe_payload(response)
+        retry_after = _retry_after(response, payload)
+        if retry_after is not None and self.rate_limiter is not None:
+            self.rate_limiter.pause(url, min(retry_after, MAX_RETRY_AFTER_SEC))
+        return ApiError(method, url, response.status_code, payload, retry_after=retry_after)
+
     async def request_json(
         self,
         method: str,
@@ -129,24 +261,31 @@ class BaseApiClient:
         *,
         params: Mapping[str, Any] | None = None,
         json_body: Any = None,
+        long_poll: bool = False,
     ) -> Any:
-        """Perform a request with retries, returning decoded JSON (``None`` for empty bodies)."""
+        """Perform a request with retries, returning decoded JSON (``None`` for empty bodies).
+
+        ``long_poll`` marks a request the server may hold open (sliding sync), so that it does not
+        take a half-open circuit's only trial slot; see :mod:`onbot.clients.circuit`.
+        """
         url = self._build_url(path)
         # Drop ``None`` query params so callers can pass optional filters uniformly.
         clean_params = {k: v for k, v in (params or {}).items() if v is not None}
 
         async def _do() -> Any:
             headers = await self._auth_headers()
-            response = await self._client.request(
-                method, url, params=clean_params or None, json=json_body, headers=headers
+            response = await self._send(
+                method, url, params=clean_params or None, json=json_body, headers=headers, long_poll=long_poll
             )
             if response.status_code >= 400:
-                raise ApiError(method, url, response.status_code, _safe_payload(response))
+                raise self._error(method, url, response)
             if not response.content:
                 return None
-            return response.json()
+            return json_loads(response.content)
 
-        return await self._with_retry(_do)
+        if method == "GET" or not self._coalesce_gets:
+            return await self._with_retry(_do)
+        return await self._write(url, _do)
 
     async def request_raw(
         self,
@@ -171,21 +310,75 @@ class BaseApiClient:
             req_headers = await self._auth_headers()
             if headers:
                 req_headers.update(headers)
-            response = await self._client.request(
+            response = await self._send(
                 method, url, params=clean_params or None, content=content, headers=req_headers
             )
             if response.status_code >= 400:
-                raise ApiError(method, url, response.status_code, _safe_payload(response))
+                raise self._error(method, url, response)
             if not parse_json:
                 return response.content
             if not response.content:
                 return None
-            return response.json()
-
-        return await self._with_retry(_do)
+            return json_loads(response.content)
+
+        if method == "GET" or not self._coalesce_gets:
+            return await self._with_retry(_do)
+        return await self._write(url, _do)
+
+    async def _write(self, url: str, do: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a write, forgetting reads of ``url`` both before it starts and once it is done."""
+        self._forget_reads(url)
+        try:
+            return await self._with_retry(do)
+        finally:
+            self._forget_reads(url)
+
+    def _forget_reads(self, url: str) -> None:
+        self._write_generation[url] = self._write_generation.get(url, 0) + 1
+        for key in [k for k in self._get_cache if k[0] == url]:
+            del self._get_cache[key]
+        # Callers already waiting on a read keep it; later callers must not join it.
+        for key in [k for k in self._gets_in_flight if k[0] == url]:
+            del self._gets_in_flight[key]
 
     async def get_json(self, path: str, *, params: Mapping[str, Any] | None = None) -> Any:
-        return await self.request_json("GET", path, params=params)
+        if not self._coalesce_gets:
+            return await self.request_json("GET", path, params=params)
+        return copy.deepcopy(await self._coalesced_get(path, params))
+
+    async def _coalesced_get(self, path: str, params: Mapping[str, Any] | None) -> Any:
+        url = self._build_url(path)
+        key: _GetKey = (url, tuple(sorted((k, repr(v)) for k, v in (params or {}).items() if v is not None)))
+        cached = self._get_cache.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self.gets_cached += 1
+                return cached[1]
+            del self._get_cache[key]
+        read = self._gets_in_flight.get(key)
+        if read is None:
+            read = asyncio.ensure_future(self.request_json("GET", path, params=params))
+            self._gets_in_flight[key] = read
+            generation = self._write_generation.get(url, 0)
+            read.add_done_callback(lambda done: self._get_done(key, generation, done))
+        else:
+            self.gets_coalesced += 1
+        # Shielded: a caller that gives up must not cancel the read for the others waiting on it.
+        return await asyncio.shield(read)
+
+    def _get_done(self, key: _GetKey, generation: int, read: asyncio.Future[Any]) -> None:
+        if self._gets_in_flight.get(key) is read:
+            del self._gets_in_flight[key]
+        if read.cancelled() or read.exception() is not None:
+            return
+        url = key[0]
+        ttl = self._cache_ttl(url)
+        if ttl > 0 and self._write_generation.get(url, 0) == generation:
+            self._get_cache[key] = (time.monotonic() + ttl, read.result())
+
+    def _cache_ttl(self, url: str) -> float:
+        relative = url.removeprefix(self._base_url)
+        return next((ttl for pattern, ttl in self._get_cache_ttls if fnmatchcase(relative, pattern)), 0.0)
 
     async def post_json(self, path: str, *, json_body: Any = None) -> Any:
         return await self.request_json("POST", path, json_body=json_body)
@@ -203,21 +396,86 @@ class BaseApiClient:
         params: Mapping[str, Any] | None = None,
         extract_items: Callable[[Any], list[Any]],
         next_params: Callable[[Any, dict[str, Any]], dict[str, Any] | None],
+        remaining_params: Callable[[Any, dict[str, Any]], list[dict[str, Any]] | None] | None = None,
     ) -> AsyncIterator[Any]:
         """Yield items across all pages (fixes the legacy 'no pagination → silent truncation' bug).
 
         ``extract_items`` pulls the item list out of a page; ``next_params`` returns the query params
         for the next page given the current page and current params, or ``None`` when exhausted.
+
+        With :attr:`page_concurrency` above 1 the listing stops being one round-trip after another:
+
+        * the next page is requested as soon as the current one arrives, while the caller is still
+          working through its items;
+        * for APIs that report their size on the first page, ``remaining_params`` returns the params
+          of every page after it, and those are fetched up to :attr:`page_concurrency` at a time.
+
+        Items come out in page order either way. A listing that grew while it was being fetched
+        carries on from the last page through ``next_params``, as the one-by-one walk would have.
         """
         current: dict[str, Any] = dict(params or {})
-        while True:
-            page = await self.get_json(path, params=current)
-            for item in extract_items(page):
-                yield item
-            follow = next_params(page, current)
-            if follow is None:
-                return
-            current = follow
+        if self.page_concurrency <= 1:
+            while True:
+                page = await self.request_json("GET", path, params=current)
+                for item in extract_items(page):
+                    yield item
+                follow = next_params(page, current)
+                if follow is None:
+                    return
+                current = follow
+
+        ahead = self._fetch_page(path, current)
+        try:
+            page = await ahead
+            rest = remaining_params(page, current) if remaining_params is not None else None
+            if rest:
+                for item in extract_items(page):
+                    yield item
+                async with aclosing(self._pages_in_order(path, rest)) as pages:
+                    async for current, page in pages:  # noqa: B007 - the last page is followed below
+                        for item in extract_items(page):
+                            yield item
+                follow = next_params(page, current)
+                if follow is None:
+                    return
+                current = follow
+                ahead = self._fetch_page(path, current)
+                page = await ahead
+            while True:
+                follow = next_params(page, current)
+                if follow is not None:
+                    ahead = self._fetch_page(path, follow)  # in flight while this page is consumed
+                for item in extract_items(page):
+                    yield item
+                if follow is None:
+                    return
+                current = follow
+                page = await ahead
+        finally:
+            _discard(ahead)
+
+    def _fetch_page(self, path: str, params: dict[str, Any]) -> asyncio.Future[Any]:
+        return asyncio.ensure_future(self.request_json("GET", path, params=params))
+
+    async def _pages_in_order(
+        self, path: str, all_params: list[dict[str, Any]]
+    ) -> AsyncGenerator[tuple[dict[str, Any], Any]]:
+        """Fetch the pages ``all_params`` name, a bounded window at a time, yielding them in order."""
+        queue = iter(all_params)
+        window: deque[tuple[dict[str, Any], asyncio.Future[Any]]] = deque(
+            (p, self._fetch_page(path, p)) for p in islice(queue, self.page_concurrency)
+        )
+        try:
+            while window:
+                page_params, fetch = window[0]
+                page = await fetch
+                window.popleft()
+                if (following := next(queue, None)) is not None:
+                    window.append((following, self._fetch_page(path, following)))
+                yield page_params, page
+        finally:
+            for _, fetch in window:
+                _discard(fetch)
 
     async def paginate_collect(
         self,
@@ -226,18 +484,59 @@ class BaseApiClient:
         params: Mapping[str, Any] | None = None,
         extract_items: Callable[[Any], list[Any]],
         next_params: Callable[[Any, dict[str, Any]], dict[str, Any] | None],
+        remaining_params: Callable[[Any, dict[str, Any]], list[dict[str, Any]] | None] | None = None,
     ) -> list[Any]:
         items: list[Any] = []
         async for item in self.paginate(
-            path, params=params, extract_items=extract_items, next_params=next_params
+            path,
+            params=params,
+            extract_items=extract_items,
+            next_params=next_params,
+            remaining_params=remaining_params,
         ):
             items.append(item)
         return items
 
 
+def _discard(fetch: asyncio.Future[Any]) -> None:
+    """Drop a page fetch nobody will await: cancel it, or mark its failure as seen."""
+    if not fetch.done():
+        fetch.cancel()
+    elif not fetch.cancelled():
+        fetch.exception()
+
+
 def _safe_payload(response: httpx.Response) -> Any:
     """Best-effort decode of an error body for diagnostics (APIs often embed helpful detail)."""
     try:
         return response.json()
     except ValueError, UnicodeDecodeError:
         return response.text
+
+
+def _retry_after(response: httpx.Response, payload: Any) -> float | None:
+    """Seconds a 429/503 asked us to wait: Synapse's ``retry_after_ms``, else ``Retry-After``.
+
+    ``Retry-After`` may be a number of seconds or an HTTP date. Anything unparseable counts as not
+    having said, and falls back to exponential backoff.
+    """
+    if response.status_code not in (429, 503):
+        return None
+    if isinstance(payload, dict):
+        ms = payload.get("retry_after_ms")
+        if isinstance(ms, int | float) and not isinstance(ms, bool) and ms >= 0:
+            return ms / 1000
+    header = response.headers.get("Retry-After")
+    if header is None:
+        return None
+    try:
+        return max(0.0, float(header))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(header)
+    except TypeError, ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max(0.0, (when - datetime.now(UTC)).total_seconds())
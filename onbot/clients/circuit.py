@@ -0,0 +1,173 @@
+"""Fail fast while an upstream is down, instead of retrying into it.
+
+Every request through :class:`~onbot.clients.base.BaseApiClient` retries transient failures with
+backoff, which is right for a blip and wrong for an outage: with Synapse down, a reconcile over 800
+rooms spends minutes asleep in retries before it finally fails, while the sync pump and the welcome
+flow pile up retries of their own against the same dead host.
+
+A :class:`CircuitBreaker` per origin (shared by every client of that host, like the rate limiter)
+watches for consecutive failures — transport errors and 5xx responses — and after
+``failure_threshold`` of them in a row **opens**: every request to that host then fails at once with
+:class:`CircuitOpenError`, without touching the network. After ``reset_after`` seconds it goes
+**half-open** and lets exactly one trial request through. If the trial succeeds the circuit closes
+and traffic resumes; if it fails the circuit opens for another ``reset_after``.
+
+A long-poll (a sliding-sync request the server may hold for 30 s before answering) is a poor trial:
+while it waits, every other request to the host would be refused although the host may long be
+back. So a long-poll may take the trial slot only when nothing else is in flight, and never keeps a
+short request out: while a long-poll is the trial, one short request goes through alongside it, and
+whichever answers first decides.
+
+Only failures that say the server is in trouble count. A 4xx (including 429, which the rate limiter
+handles) is the server working as intended and resets the count like any success.
+
+:class:`CircuitOpenError` is not retried. The engine treats it as the end of the pass — there is no
+point planning room 2 against a server that refused room 1 — and reports the state of every circuit
+in ``onbot healthcheck`` and ``!status`` through :meth:`CircuitBreakerRegistry.stats`.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from enum import StrEnum
+
+from onbot.clients.ratelimit import origin_of
+from onbot.logging import get_logger
+
+log = get_logger(__name__)
+
+
+class CircuitState(StrEnum):
+    closed = "closed"
+    open = "open"
+    half_open = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """A request was refused without being sent, because its upstream's circuit is open."""
+
+    def __init__(self, origin: str, retry_in: float) -> None:
+        self.origin = origin
+        self.retry_in = retry_in
+        super().__init__(f"{origin} is unavailable (circuit open); next attempt in {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    """The circuit for one origin."""
+
+    def __init__(
+        self,
+        origin: str,
+        *,
+        failure_threshold: int = 5,
+        reset_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.origin = origin
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after = reset_after
+        self._clock = clock
+        self.state = CircuitState.closed
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._long_poll_trial_in_flight = False
+
+    def before_request(self, *, long_poll: bool = False) -> None:
+        """Let the request through, or raise :class:`CircuitOpenError`.
+
+        ``long_poll`` marks a request the server may legitimately hold open; see the module docstring
+        for how it is treated while half-open.
+        """
+        if self.state is CircuitState.closed:
+            return
+        remaining = self._opened_at + self.reset_after - self._clock()
+        if self.state is CircuitState.open and remaining <= 0:
+            self.state = CircuitState.half_open
+        if self.state is CircuitState.half_open:
+            if long_poll and not (self._trial_in_flight or self._long_poll_trial_in_flight):
+                self._long_poll_trial_in_flight = True
+                log.info("%s: circuit half-open, sending a long-poll as the trial", self.origin)
+                return
+            if not long_poll and not self._trial_in_flight:
+                self._trial_in_flight = True
+                log.info("%s: circuit half-open, sending one trial request", self.origin)
+                return
+        raise CircuitOpenError(self.origin, max(0.0, remaining))
+
+    def record_success(self) -> None:
+        if self.state is not CircuitState.closed:
+            log.info("%s: circuit closed, the upstream answered again", self.origin)
+        self.state = CircuitState.closed
+        self.failures = 0
+        self._trial_in_flight = self._long_poll_trial_in_flight = False
+
+    def abandon(self, *, long_poll: bool = False) -> None:
+        """A request let through ended without an answer either way (cancelled); free its trial slot."""
+        if long_poll:
+            self._long_poll_trial_in_flight = False
+        else:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state is CircuitState.half_open or (
+            self.state is CircuitState.closed and self.failures >= self.failure_threshold
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = CircuitState.open
+        self.opened += 1
+        self._opened_at = self._clock()
+        self._trial_in_flight = self._long_poll_trial_in_flight = False
+        log.warning(
+            "%s: circuit open after %d consecutive failures; failing its requests for %.0fs",
+            self.origin,
+            self.failures,
+            self.reset_after,
+        )
+
+
+class CircuitBreakerRegistry:
+    """The per-origin circuits, created on first use, all with the same thresholds."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        reset_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        origin = origin_of(url)
+        breaker = self._breakers.get(origin)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                origin,
+                failure_threshold=self.failure_threshold,
+                reset_after=self.reset_after,
+                clock=self._clock,
+            )
+            self._breakers[origin] = breaker
+        return breaker
+
+    def open_circuits(self) -> list[str]:
+        """Origins currently refusing requests (open, or half-open awaiting their trial)."""
+        return sorted(o for o, b in self._breakers.items() if b.state is not CircuitState.closed)
+
+    def stats(self) -> str:
+        """Per origin: state, consecutive failures, and how often it has opened."""
+        if not self._breakers:
+            return "no requests yet"
+        return "; ".join(
+            f"{origin} {b.state} ({b.failures} consecutive failures, opened {b.opened}x)"
+            for origin, b in sorted(self._breakers.items())
+        )
@@ -23,13 +23,14 @@ without knowing the wire shape.
 from __future__ import annotations
 
 import uuid
-from collections.abc import Mapping
+from collections.abc import Mapping, Sequence
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any
 from urllib.parse import quote
 
 if TYPE_CHECKING:
     from onbot.media import MediaUploader
+    from onbot.state_cache import RoomStateCache
 
 from onbot.auth.token_provider import TokenProvider
 from onbot.clients.base import ApiError, BaseApiClient
@@ -42,6 +43,13 @@ log = get_logger(__name__)
 # MSC4186 Simplified Sliding Sync. Unstable path — gated by version negotiation (Phase 6).
 SLIDING_SYNC_PATH = "unstable/org.matrix.simplified_msc3575/sync"
 
+# What the sync stream subscribes to when no caller asks for more: every room's member state.
+DEFAULT_SYNC_REQUIRED_STATE: tuple[tuple[str, str], ...] = (("m.room.member", "*"),)
+
+# How many rooms the sync list covers unless asked for more. Rooms past the window (ordered by most
+# recent activity) are not streamed at all; the sync pump widens it when the bot has more rooms.
+DEFAULT_SYNC_WINDOW = 1000
+
 ENCRYPTION_ALGORITHM = "m.megolm.v1.aes-sha2"
 
 
@@ -56,6 +64,8 @@ class RoomSync:
     room_id: str
     timeline: list[dict[str, Any]] = field(default_factory=list)
     required_state: list[dict[str, Any]] = field(default_factory=list)
+    # True the first time this connection sends the room: `required_state` is then complete.
+    initial: bool = False
 
     def member_events(self) -> list[dict[str, Any]]:
         return [ev for ev in (*self.required_state, *self.timeline) if ev.get("type") == "m.room.member"]
@@ -67,6 +77,19 @@ class SyncResult:
 
     pos: str | None
     rooms: list[RoomSync] = field(default_factory=list)
+    # True when the request carried no ``pos``: a fresh connection, not a continuation.
+    initial: bool = False
+    # Global account data of the bot that changed since ``pos`` (type -> content); only filled when
+    # the ``account_data`` extension was requested.
+    account_data: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # How many rooms the list matched (the server's ``count``), and how many the request's window
+    # covered. While ``room_count > window``, rooms drop out of the stream without a word.
+    room_count: int | None = None
+    window: int | None = None
+
+    @property
+    def covers_every_room(self) -> bool:
+        return self.room_count is None or self.window is None or self.room_count <= self.window
 
 
 class ApiClientMatrix(BaseApiClient):
@@ -403,15 +426,21 @@ class ApiClientMatrix(BaseApiClient):
 
     # --- messaging -----------------------------------------------------------
 
-    async def send_text_message(self, room_id: str, body: str, *, msgtype: str = "m.text") -> str:
-        """Send a textual message; returns the event id. Uses a unique transaction id.
+    async def send_text_message(
+        self, room_id: str, body: str, *, msgtype: str = "m.text", txn_id: str | None = None
+    ) -> str:
+        """Send a textual message; returns the event id. Uses a unique transaction id unless given one.
 
         ``msgtype`` is ``m.text`` for a plain message and ``m.notice`` for one the client should not
         auto-reply to or notify on as loudly — the convention for bot-originated messages, used by
         the broadcast fan-out.
         https://spec.matrix.org/latest/client-server-api/#mnotice
+
+        A caller-chosen ``txn_id`` makes the send idempotent: the homeserver answers a repeat of the
+        same transaction id from the same device with the original event instead of a new one.
+        https://spec.matrix.org/latest/client-server-api/#transaction-identifiers
         """
-        txn = uuid.uuid4().hex
+        txn = txn_id or uuid.uuid4().hex
         result = await self.put_json(
             f"v3/rooms/{room_id}/send/m.room.message/{txn}",
             json_body={"msgtype": msgtype, "body": body},
@@ -435,12 +464,24 @@ class ApiClientMatrix(BaseApiClient):
 
     # --- sync stream (Simplified Sliding Sync, MSC4186) ----------------------
 
-    async def sliding_sync(self, pos: str | None = None, *, timeout_ms: int = 30000) -> SyncResult:
+    async def sliding_sync(
+        self,
+        pos: str | None = None,
+        *,
+        timeout_ms: int = 30000,
+        required_state: Sequence[Sequence[str]] = DEFAULT_SYNC_REQUIRED_STATE,
+        account_data: bool = False,
+        window: int = DEFAULT_SYNC_WINDOW,
+    ) -> SyncResult:
         """One Simplified Sliding Sync round-trip, normalised to :class:`SyncResult`.
 
         Long-polls server-side for up to ``timeout_ms``; pass the returned ``pos`` back to continue
         the stream. Subscribes to all rooms and asks for member state so the listener can react to
-        joins (AD-3). The wire shape is unstable (Phase 6 negotiation) — kept behind this method.
+        joins (AD-3), plus any further ``[event_type, state_key]`` pairs in ``required_state``. With
+        ``account_data``, the account-data extension is enabled too, and the bot's changed global
+        account data comes back in :attr:`SyncResult.account_data`. The list covers the ``window``
+        most recently active rooms; :attr:`SyncResult.room_count` says how many there are in all.
+        The wire shape is unstable (Phase 6 negotiation) — kept behind this method.
 
         Raises :class:`SyncNotSupportedError` if version negotiation ran and the server does not
         advertise Simplified Sliding Sync, so the listener can fall back to the signal-only path.
@@ -452,26 +493,44 @@ class ApiClientMatrix(BaseApiClient):
         params: dict[str, Any] = {"timeout": timeout_ms}
         if pos:
             params["pos"] = pos
-        body = {
+        body: dict[str, Any] = {
             "lists": {
                 "onbot": {
-                    "ranges": [[0, 1000]],
-                    "required_state": [["m.room.member", "*"]],
+                    "ranges": [[0, window - 1]],
+                    "required_state": [list(entry) for entry in required_state],
                     "timeline_limit": 50,
                 }
             }
         }
-        data = await self.request_json("POST", SLIDING_SYNC_PATH, params=params, json_body=body)
+        if account_data:
+            body["extensions"] = {"account_data": {"enabled": True}}
+        data = await self.request_json(
+            "POST", SLIDING_SYNC_PATH, params=params, json_body=body, long_poll=timeout_ms > 0
+        )
         data = data or {}
+        global_account_data = ((data.get("extensions") or {}).get("account_data") or {}).get("global") or []
+        count = ((data.get("lists") or {}).get("onbot") or {}).get("count")
         rooms = [
             RoomSync(
                 room_id=room_id,
                 timeline=list((room or {}).get("timeline", [])),
                 required_state=list((room or {}).get("required_state", [])),
+                initial=bool((room or {}).get("initial")),
             )
             for room_id, room in (data.get("rooms") or {}).items()
         ]
-        return SyncResult(pos=data.get("pos"), rooms=rooms)
+        return SyncResult(
+            pos=data.get("pos"),
+            rooms=rooms,
+            initial=not pos,
+            account_data={
+                str(ev["type"]): ev.get("content") or {}
+                for ev in global_account_data
+                if isinstance(ev, dict) and ev.get("type")
+            },
+            room_count=count if isinstance(count, int) else None,
+            window=window,
+        )
 
 
 def _parse_mxc(mxc_uri: str) -> tuple[str, str]:
@@ -487,11 +546,20 @@ def _parse_mxc(mxc_uri: str) -> tuple[str, str]:
 class CSApiEffectors:
     """Concrete :class:`~onbot.reconciler.effectors.MatrixEffectors` backed by the CS API.
 
-    Replaces ``DryRunEffectors`` when the bot runs for real (Phase 3 deferral resolved).
+    Replaces ``DryRunEffectors`` when the bot runs for real (Phase 3 deferral resolved). With a
+    :class:`~onbot.state_cache.RoomStateCache`, state reads are answered from the sync stream when it
+    can, and every write is applied to the cache as well.
     """
 
-    def __init__(self, client: ApiClientMatrix, *, media: MediaUploader | None = None) -> None:
+    def __init__(
+        self,
+        client: ApiClientMatrix,
+        *,
+        media: MediaUploader | None = None,
+        state_cache: RoomStateCache | None = None,
+    ) -> None:
         self.client = client
+        self.state_cache = state_cache
         self._owns_media = media is None
         if media is None:
             # Local import avoids a module-level cycle (onbot.media imports ApiClientMatrix).
@@ -542,18 +610,27 @@ class CSApiEffectors:
 
     async def kick_user(self, room_id: str, user_id: str, reason: str | None = None) -> None:
         await self.client.kick_user(room_id, user_id, reason)
+        if self.state_cache is not None:
+            self.state_cache.note_membership(room_id, user_id, "leave")
 
     async def get_room_power_levels(self, room_id: str) -> dict[str, Any]:
+        if self.state_cache is not None:
+            hit, content = self.state_cache.lookup_state(room_id, "m.room.power_levels")
+            if hit:
+                return content or {}
         return await self.client.get_room_power_levels(room_id)
 
     async def set_room_power_levels(self, room_id: str, power_levels: dict[str, Any]) -> None:
         await self.client.set_room_power_levels(room_id, power_levels)
+        self._note_state(room_id, "m.room.power_levels", power_levels)
 
     async def set_room_name(self, room_id: str, name: str) -> None:
         await self.client.set_room_name(room_id, name)
+        self._note_state(room_id, "m.room.name", {"name": name})
 
     async def set_room_topic(self, room_id: str, topic: str) -> None:
         await self.client.set_room_topic(room_id, topic)
+        self._note_state(room_id, "m.room.topic", {"topic": topic})
 
     async def set_room_avatar(self, room_id: str, mxc_uri: str) -> None:
         await self.client.set_room_avatar(room_id, mxc_uri)
@@ -564,7 +641,16 @@ class CSApiEffectors:
     async def get_room_state(
         self, room_id: str, event_type: str, state_key: str = ""
     ) -> dict[str, Any] | None:
+        if self.state_cache is not None:
+            hit, content = self.state_cache.lookup_state(room_id, event_type, state_key)
+            if hit:
+                return content
         return await self.client.get_room_state_event(room_id, event_type, state_key)
 
     async def put_room_state(self, room_id: str, event_type: str, content: dict[str, Any]) -> None:
         await self.client.put_room_state_event(room_id, event_type, content)
+        self._note_state(room_id, event_type, content)
+
+    def _note_state(self, room_id: str, event_type: str, content: dict[str, Any]) -> None:
+        if self.state_cache is not None:
+            self.state_cache.note_state(room_id, event_type, content)
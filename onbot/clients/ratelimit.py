@@ -0,0 +1,156 @@
+"""One request budget per host, shared by every client that talks to it.
+
+Synapse rate-limits the *bot*, not a client object, yet the bot reaches the same homeserver through
+three of them (:class:`~onbot.clients.matrix.ApiClientMatrix`,
+:class:`~onbot.clients.synapse_admin.ApiClientSynapseAdmin`, and MAS next door). Each used to back
+off on its own, blind to the others: while one waited out a 429 the other two carried on sending and
+provoked the next one. A broadcast or a bulk join then burned its retries in a few seconds and gave
+up on rooms that a slightly slower sender would have reached.
+
+A :class:`RateLimiter` keeps one :class:`TokenBucket` per origin (scheme, host and port), and every
+request through :class:`~onbot.clients.base.BaseApiClient` takes a token from it first:
+
+* **Steady rate.** With ``rate`` set, requests to one origin are spread to at most that many per
+  second, after an initial ``burst``. ``0`` (the default) sets no steady cap.
+* **Server pauses.** A 429 that says how long to wait (Synapse's ``retry_after_ms``, or a
+  ``Retry-After`` header) pauses the *whole origin* until then, for every client and every caller
+  sharing it — which is what the server asked for. This applies whatever ``rate`` is.
+
+Waiters are served in arrival order, so a long fan-out cannot starve a reconcile's reads of their
+turn indefinitely. :meth:`RateLimiter.stats` reports what each origin is doing, for ``!status``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from urllib.parse import urlsplit
+
+from onbot.logging import get_logger
+
+log = get_logger(__name__)
+
+
+def origin_of(url: str) -> str:
+    """``scheme://host:port`` of ``url``: what one bucket is shared across."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class TokenBucket:
+    """A token bucket with a server-imposed pause on top. ``rate`` ``0`` means no steady cap."""
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: int = 1,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        # Counters for stats().
+        self.requests = 0
+        self.throttled = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+
+    def _delay(self) -> float:
+        """Seconds until the next request may go; takes the token when that is now."""
+        now = self._clock()
+        pause = self._paused_until - now
+        if pause > 0:
+            return pause
+        if self.rate <= 0:
+            return 0.0
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> float:
+        """Wait for this origin's turn; returns how long that took."""
+        waited = 0.0
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while (delay := self._delay()) > 0:
+                    waited += delay
+                    await self._sleep(delay)
+        finally:
+            self.waiting -= 1
+        self.requests += 1
+        self.total_wait += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request to this origin for ``seconds`` from now (a server said to wait)."""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def current_wait(self) -> float:
+        """How long a request arriving now would wait, not counting callers already queued."""
+        pause = self._paused_until - self._clock()
+        if pause > 0:
+            return pause
+        if self.rate <= 0:
+            return 0.0
+        tokens = min(float(self.burst), self._tokens + (self._clock() - self._updated) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+
+class RateLimiter:
+    """The per-origin buckets, created on first use, all with the same ``rate`` and ``burst``."""
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: int = 1,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        origin = origin_of(url)
+        bucket = self._buckets.get(origin)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, clock=self._clock, sleep=self._sleep)
+            self._buckets[origin] = bucket
+        return bucket
+
+    async def acquire(self, url: str) -> float:
+        return await self.bucket(url).acquire()
+
+    def pause(self, url: str, seconds: float) -> None:
+        log.warning(
+            "%s asked the bot to slow down; pausing requests to it for %.1fs", origin_of(url), seconds
+        )
+        self.bucket(url).pause(seconds)
+
+    def stats(self) -> str:
+        """Per origin: requests, 429 pauses, callers queued, current and cumulative wait."""
+        if not self._buckets:
+            return "no requests yet"
+        rate = f"{self.rate:g}/s" if self.rate > 0 else "uncapped"
+        return "; ".join(
+            f"{origin} ({rate}): {b.requests} requests, {b.throttled} throttled, {b.waiting} waiting, "
+            f"wait now {b.current_wait():.1f}s, waited {b.total_wait:.1f}s in total"
+            for origin, b in sorted(self._buckets.items())
+        )
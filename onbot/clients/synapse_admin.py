@@ -12,7 +12,7 @@ fixing the BATTLE_PLAN §3 bugs:
 
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable
 from typing import Any
 
 from onbot.auth.token_provider import TokenProvider
@@ -38,6 +38,18 @@ def _next_token_params(token_key: str) -> NextParams:
     return _next
 
 
+def _remaining_room_params(page: Any, current: dict[str, Any]) -> list[dict[str, Any]] | None:
+    """Every room-list page after this one: ``v1/rooms`` pages by numeric offset up to ``total_rooms``."""
+    offset, total, limit = (
+        (page or {}).get("next_batch"),
+        (page or {}).get("total_rooms"),
+        current.get("limit"),
+    )
+    if isinstance(offset, int) and isinstance(total, int) and isinstance(limit, int) and limit > 0:
+        return [{**current, "from": start} for start in range(offset, total, limit)]
+    return None
+
+
 class ApiClientSynapseAdmin(BaseApiClient):
     def __init__(
         self,
@@ -65,17 +77,25 @@ class ApiClientSynapseAdmin(BaseApiClient):
             next_params=_next_token_params("next_token"),
         )
 
-    async def list_rooms(self, *, search_term: str | None = None) -> list[dict[str, Any]]:
+    def iter_rooms(self, *, search_term: str | None = None) -> AsyncIterator[dict[str, Any]]:
+        """Stream the room list page by page, for callers that index it rather than keep it whole.
+
+        ``search_term`` is matched by Synapse against room name, canonical alias and room id.
+        """
         # https://element-hq.github.io/synapse/latest/admin_api/rooms.html#list-room-api
-        return await self.paginate_collect(
+        return self.paginate(
             "v1/rooms",
             params={"limit": _DEFAULT_PAGE_SIZE, "search_term": search_term},
             extract_items=lambda page: page["rooms"],
             next_params=lambda page, cur: (
                 {**cur, "from": page["next_batch"]} if page.get("next_batch") is not None else None
             ),
+            remaining_params=_remaining_room_params,
         )
 
+    async def list_rooms(self, *, search_term: str | None = None) -> list[dict[str, Any]]:
+        return [room async for room in self.iter_rooms(search_term=search_term)]
+
     async def list_non_space_rooms(self, *, search_term: str | None = None) -> list[dict[str, Any]]:
         return [r for r in await self.list_rooms(search_term=search_term) if r.get("room_type") != "m.space"]
 
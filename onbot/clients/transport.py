@@ -0,0 +1,74 @@
+"""One pooled HTTP client per upstream host, shared by everything that talks to it.
+
+The bot reaches Synapse through the admin client, the client-server client, the media uploader and
+(under MAS) the OAuth2 token provider, and each used to open its own ``httpx.AsyncClient``: four
+connection pools, four sets of TLS handshakes and idle sockets to the same host, and no way for the
+onboarding path to reuse a connection the reconciler had just warmed up.
+
+:class:`TransportRegistry` hands out one ``httpx.AsyncClient`` per origin (scheme, host and port,
+as in :func:`~onbot.clients.ratelimit.origin_of`), created on first use with the configured pool
+size and keep-alive. The registry owns those clients: whoever borrows one must not close it, and
+:meth:`TransportRegistry.aclose` closes them all at shutdown.
+
+A shared client carries no per-caller settings. Timeouts, headers and redirect handling are passed
+with each request by the borrower, so the sync long-poll's 60-second timeout does not leak into an
+admin call that happens to share its connection pool.
+
+**HTTP/2** multiplexes every request to a host over one connection. It needs the optional ``h2``
+package (``pip install 'httpx[http2]'``); when that is missing the registry says so once and speaks
+HTTP/1.1, which is what the server gets without the option anyway.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+
+import httpx
+
+from onbot.clients.ratelimit import origin_of
+from onbot.logging import get_logger
+
+log = get_logger(__name__)
+
+
+class TransportRegistry:
+    """Lazily created, shared ``httpx.AsyncClient`` instances keyed by origin."""
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 30.0,
+    ) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and importlib.util.find_spec("h2") is None:
+            log.warning("HTTP/2 was requested but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._timeout = timeout
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """The shared client for ``url``'s origin. Do not close it; the registry does."""
+        origin = origin_of(url)
+        client = self._clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(limits=self._limits, http2=self.http2, timeout=self._timeout)
+            self._clients[origin] = client
+        return client
+
+    @property
+    def origins(self) -> list[str]:
+        return sorted(self._clients)
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
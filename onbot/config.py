@@ -970,6 +970,399 @@ class MatrixDynamicRoomSettings(BaseModel):
     ] = "attributes.chatroom_visitor_lobby"
 
 
+# The kinds of write a reconcile plans (see onbot/reconciler/plan.py), for per-kind concurrency limits.
+OperationKind = Literal[
+    "create_room",
+    "join",
+    "kick",
+    "set_power_levels",
+    "set_name",
+    "set_topic",
+    "set_avatar",
+    "put_state",
+    "block",
+    "delete_room",
+]
+
+
+def _default_operation_concurrency() -> dict[OperationKind, int]:
+    return {"create_room": 1, "delete_room": 1}
+
+
+class Performance(BaseModel):
+    """Throughput knobs for large deployments.
+
+    Nothing in here changes *what* the reconciler converges to, only how much of the work is in flight
+    at once and how much of it is skipped because it is known to be redundant. The defaults suit a
+    mid-sized homeserver; raising them trades Synapse/Authentik load for pass latency.
+    """
+
+    reconcile_room_concurrency: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Rooms converged in parallel",
+            description=inspect.cleandoc(
+                """How many group rooms a reconcile converges at the same time — reading their members
+                and power levels, adding and kicking members, and updating their name and topic. The
+                steps for any single room always run in order; only different rooms overlap. A room
+                that fails (say, because the bot lost its power level there) is logged and skipped
+                without holding up the others. `1` converges one room after another."""
+            ),
+            examples=[4, 16],
+        ),
+    ] = 4
+    operation_concurrency: Annotated[
+        dict[OperationKind, Annotated[int, Field(ge=1)]],
+        Field(
+            title="Writes of one kind in flight at once",
+            description=inspect.cleandoc(
+                """A reconcile first works out every change it is going to make, then makes them, in
+                parallel across rooms (see `reconcile_room_concurrency`). This caps how many changes
+                of one kind may be in flight at once across all rooms, so a heavy operation does not
+                pile up on Synapse. The kinds are `create_room`, `join`, `kick`, `set_power_levels`,
+                `set_name`, `set_topic`, `set_avatar`, `put_state`, `block` and `delete_room`; a kind
+                that is not listed is limited only by the number of rooms in flight. Setting this
+                replaces the defaults, so list every kind you want capped."""
+            ),
+            examples=[{"create_room": 1, "delete_room": 1, "join": 8}],
+        ),
+    ] = Field(default_factory=_default_operation_concurrency)
+    http_rate_limit_per_sec: Annotated[
+        float,
+        Field(
+            ge=0,
+            title="Requests per second to one server",
+            description=inspect.cleandoc(
+                """The most requests per second the bot sends to any one server (Synapse, Authentik,
+                MAS), shared by everything the bot is doing at the time — a reconcile, a broadcast,
+                onboarding. Requests beyond it wait their turn rather than fail. `0` sets no steady
+                limit. Either way, when a server answers that the bot is sending too fast and says how
+                long to wait, every request to that server waits that long before the next one goes
+                out."""
+            ),
+            examples=[0, 20],
+        ),
+    ] = 0
+    http_rate_limit_burst: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Requests sent at once before the limit applies",
+            description=inspect.cleandoc(
+                """How many requests to one server may go out back to back, after a quiet spell,
+                before `http_rate_limit_per_sec` starts spacing them. Only matters when that limit is
+                set."""
+            ),
+            examples=[20],
+        ),
+    ] = 20
+    http_max_connections_per_host: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Connections open to one server at most",
+            description=inspect.cleandoc(
+                """All parts of the bot share one pool of connections to each server they talk to
+                (Synapse, Authentik, MAS, avatar hosts). This caps how many connections that pool may
+                hold open to one server at once; a request beyond it waits for a free connection. The
+                event stream keeps one of them busy permanently."""
+            ),
+            examples=[100],
+        ),
+    ] = 100
+    http_keepalive_connections_per_host: Annotated[
+        int,
+        Field(
+            ge=0,
+            title="Idle connections kept open to one server",
+            description=inspect.cleandoc(
+                """How many idle connections to each server are kept open for the next request
+                instead of being closed, so it does not have to connect and negotiate TLS again."""
+            ),
+            examples=[20],
+        ),
+    ] = 20
+    http_keepalive_expiry_sec: Annotated[
+        float,
+        Field(
+            ge=0,
+            title="Close idle connections after (seconds)",
+            description=inspect.cleandoc(
+                """How long an idle connection is kept open before the bot closes it. Keep this below
+                the idle timeout of any reverse proxy in front of your servers, or the bot will try to
+                reuse connections the proxy has already dropped."""
+            ),
+            examples=[30],
+        ),
+    ] = 30
+    http2: Annotated[
+        bool,
+        Field(
+            title="Use HTTP/2 where the server offers it",
+            description=inspect.cleandoc(
+                """Send all requests to a server over a single HTTP/2 connection when the server
+                supports it. Requires the optional `h2` Python package (`pip install 'httpx[http2]'`);
+                without it the bot logs a warning and uses HTTP/1.1."""
+            ),
+        ),
+    ] = False
+    pagination_concurrency: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Pages of one listing fetched at once",
+            description=inspect.cleandoc(
+                """How many pages of a long listing — Authentik's users and groups, Synapse's room list
+                — the bot requests at the same time. Once the first page says how many pages there
+                are, the rest are fetched this many at a time; results are still processed in the
+                order the server lists them. `1` fetches one page after another."""
+            ),
+            examples=[4, 1],
+        ),
+    ] = 4
+    oauth2_renew_at_fraction: Annotated[
+        float | None,
+        Field(
+            gt=0,
+            lt=1,
+            title="Renew OAuth2 tokens early, at this share of their lifetime",
+            description=inspect.cleandoc(
+                """When the bot signs in through OAuth2 (`synapse_server.oauth2`, and the `mas_admin`
+                client), renew each access token in the background once this share of its lifetime
+                has passed — at `0.75`, a token valid for an hour is renewed after 45 minutes — so
+                no request has to stop and wait for a new one. If an early renewal fails, the token
+                is still renewed when it is about to expire, as it is with `null`, which turns early
+                renewal off."""
+            ),
+            examples=[0.75, None],
+        ),
+    ] = 0.75
+    coalesce_identical_reads: Annotated[
+        bool,
+        Field(
+            title="Share identical reads that are in flight",
+            description=inspect.cleandoc(
+                """When two parts of the bot ask a server for exactly the same thing at the same time —
+                several welcomes reading the bot's direct-room list, say — send one request and give
+                every asker the answer. Turn this off only to rule it out while debugging."""
+            ),
+        ),
+    ] = True
+    read_cache_ttl_sec: Annotated[
+        dict[str, Annotated[float, Field(ge=0)]],
+        Field(
+            title="Briefly remember reads of these paths (seconds)",
+            description=inspect.cleandoc(
+                """Keep the answer to a read for this many seconds when its API path matches the
+                pattern (`*` matches anything, paths are relative to each API's base, e.g.
+                `v3/user/*/account_data/m.direct` on the Matrix client-server API), and answer the
+                same read from memory meanwhile. Any change the bot itself makes through that path
+                forgets the remembered answer at once; a change made by someone else may go unseen
+                for up to this long. Empty (the default) remembers nothing."""
+            ),
+            examples=[{"v3/user/*/account_data/m.direct": 5}],
+        ),
+    ] = Field(default_factory=dict)
+    circuit_breaker_failure_threshold: Annotated[
+        int,
+        Field(
+            ge=0,
+            title="Failures in a row before a server is treated as down",
+            description=inspect.cleandoc(
+                """After this many consecutive connection errors or 5xx answers from one server, the
+                bot stops sending it requests for `circuit_breaker_reset_sec`: they fail at once, the
+                running reconcile pass ends early and is retried on the next tick, instead of
+                spending minutes in retries against a server that is down. A 4xx answer does not
+                count. `0` turns this off."""
+            ),
+            examples=[5],
+        ),
+    ] = 5
+    circuit_breaker_reset_sec: Annotated[
+        float,
+        Field(
+            ge=0,
+            title="Seconds before trying a server that was down again",
+            description=inspect.cleandoc(
+                """How long requests to a server counted as down fail without being sent. Then one
+                trial request goes through: if it succeeds, traffic resumes; if not, the server is
+                left alone for this long again. `!status` and `onbot healthcheck` show the state of
+                each server."""
+            ),
+            examples=[30],
+        ),
+    ] = 30.0
+    authentik_full_poll_interval_sec: Annotated[
+        int,
+        Field(
+            ge=0,
+            title="Read all of Authentik on every poll, or only what changed",
+            description=inspect.cleandoc(
+                """`0` (the default): every Authentik poll (`authentik_poll_rate_sec`) reads the whole
+                directory, so its cost grows with the number of users and groups.
+
+                Above `0`: a poll reads the whole directory only once every this many seconds. The
+                polls in between ask Authentik only for users and groups changed since the newest
+                change seen so far (by their `last_updated` time), which costs next to nothing when
+                nothing changed, so `authentik_poll_rate_sec` can drop to a few seconds. A change
+                found this way starts a reconcile of just the users and groups involved. Some
+                changes do not update `last_updated` and only show up at the next full read: deleted
+                users and groups, and members added to or removed from a group."""
+            ),
+            examples=[0, 600],
+        ),
+    ] = 0
+    onboarding_workers: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Welcomes sent at the same time",
+            description=inspect.cleandoc(
+                """How many new users are welcomed in parallel. Welcomes run in the background, so a
+                reconcile pass never waits for them; with many new users at once (a batch import
+                from HR), more workers get everyone their welcome sooner at the cost of more
+                concurrent requests to Synapse."""
+            ),
+            examples=[4],
+        ),
+    ] = 4
+    onboarding_queue_size: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Most users waiting for their welcome",
+            description=inspect.cleandoc(
+                """How many users may wait for a welcome worker. Past this, further users are not
+                queued and get their welcome on a later reconcile pass instead, once the queue has
+                room. The current length is shown by `!status` in the admin room."""
+            ),
+            examples=[10000],
+        ),
+    ] = 10_000
+    batched_welcome_delivery: Annotated[
+        bool,
+        Field(
+            title="Write a user's welcome bookkeeping once, not after every message",
+            description=inspect.cleandoc(
+                """By default the bot records each welcome message in the user's onboarding room the
+                moment it is sent, which is one extra room state event per message. With this on, it
+                sends all of a user's messages first and records them once at the end. A message sent
+                again after a crash or restart is recognised by Synapse as the same message and is
+                not delivered twice, as long as Synapse still remembers the message when the bot
+                comes back. How long it does is up to the homeserver, so a long outage can still
+                deliver a message twice. Roughly halves the writes per welcomed user."""
+            ),
+        ),
+    ] = False
+    broadcast_max_concurrency: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Most rooms an announcement is sent into at the same time",
+            description=inspect.cleandoc(
+                """An announcement (`onbot broadcast`, `!announce`) starts by sending into 5 rooms at
+                a time. It sends into more while Synapse keeps up, and backs off as soon as Synapse
+                throttles the bot or answers slowly. This is as far as it will ever go. When the
+                bot's rate limit could not be lifted at startup (see the logs), Synapse's throttling
+                keeps it well below this anyway."""
+            ),
+            examples=[32],
+        ),
+    ] = 32
+    broadcast_slow_send_ms: Annotated[
+        int,
+        Field(
+            ge=1,
+            title="Send time that makes an announcement slow down",
+            description=inspect.cleandoc(
+                """An announcement message that takes longer than this to send (in milliseconds)
+                is taken as a sign that Synapse is overloaded or throttling the bot, and the
+                announcement halves how many rooms it sends into at once. Raise it on a homeserver
+                that is always slow to answer."""
+            ),
+            examples=[2000],
+        ),
+    ] = 2000
+    sync_state_cache: Annotated[
+        bool,
+        Field(
+            title="Answer room reads from the sync stream",
+            description=inspect.cleandoc(
+                """Keep each managed room's members, power levels, join rule, name, topic and the bot's
+                own bookkeeping state current from the event stream the bot already follows, and
+                answer a reconcile's reads from that copy instead of asking Synapse again. A room the
+                stream has not delivered yet, or any room while the stream is interrupted, is read
+                from Synapse as before. Turn this off only to rule it out while debugging."""
+            ),
+        ),
+    ] = True
+    authentik_snapshot_max_age_sec: Annotated[
+        float,
+        Field(
+            ge=0,
+            title="Reuse the change poll's Authentik read (seconds)",
+            description=inspect.cleandoc(
+                """When the Authentik poll (`authentik_poll_rate_sec`) notices a change, the reconcile
+                it starts works from the users and groups that poll just read, instead of reading the
+                whole directory from Authentik a second time — as long as that read is at most this
+                many seconds old when the reconcile begins. An older read (for example because a long
+                reconcile was still running) is discarded and Authentik is read afresh. `0` always
+                reads afresh."""
+            ),
+            examples=[60, 0],
+        ),
+    ] = 60
+    room_inventory_search_term: Annotated[
+        str | None,
+        Field(
+            title="Only list rooms matching this text",
+            description=inspect.cleandoc(
+                """Ask Synapse only for rooms whose name, alias or room id contains this text when the
+                bot lists the homeserver's rooms at the start of a reconcile, instead of walking every
+                room on the server. Useful when all bot-managed rooms share a recognisable alias
+                part. Rooms that do not match are invisible to the bot: an existing group room that
+                does not match is not recognised (and a new one is created beside it), and it is not
+                torn down when its group disappears. The parent space is always found by its alias,
+                whether it matches or not. `null` lists every room."""
+            ),
+            examples=["authentik"],
+        ),
+    ] = None
+    room_inventory_managed_aliases_only: Annotated[
+        bool,
+        Field(
+            title="Only consider rooms with a managed alias",
+            description=inspect.cleandoc(
+                """Only consider rooms whose alias starts with one of the configured room alias
+                prefixes (`alias_prefix`, dashes removed as in the alias itself) when the bot lists the
+                homeserver's rooms; when all groups share one prefix it is also used as the search
+                text above, so Synapse skips every other room. Requires an `alias_prefix` in
+                `matrix_room_default_settings` and in every per-group override that sets one. A room
+                whose alias was removed or changed by hand is invisible to the bot under this
+                setting."""
+            ),
+        ),
+    ] = False
+    room_classification_reverify_sec: Annotated[
+        int,
+        Field(
+            ge=0,
+            title="Re-check unrelated rooms every (seconds)",
+            description=inspect.cleandoc(
+                """To notice a group room whose group has disappeared, the bot checks each room that
+                is not backed by a live group for its own markers. It remembers (in its account data)
+                which rooms turned out to be unrelated to it and skips them on later reconciles,
+                checking each one again only after roughly this many seconds, so a homeserver with
+                many unrelated rooms is not re-read in full every time. Rooms created or changed in
+                the meantime are re-checked as soon as the bot sees it happen. `0` checks every room
+                on every reconcile."""
+            ),
+            examples=[86400, 0],
+        ),
+    ] = 86400
+
+
 class OnbotConfig(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="ONBOT_", env_nested_delimiter="__")
 
@@ -1262,6 +1655,17 @@ class OnbotConfig(BaseSettings):
         ),
     ] = Field(default_factory=list)
 
+    performance: Annotated[
+        Performance,
+        Field(
+            title="Performance tuning",
+            description=inspect.cleandoc(
+                """How much work the bot keeps in flight against Synapse and Authentik. The defaults are
+                fine for most installations; large homeservers can raise them to shorten a reconcile."""
+            ),
+        ),
+    ] = Field(default_factory=Performance)
+
     @model_validator(mode="after")
     def _visitor_lobby_requires_a_space(self) -> OnbotConfig:
         """A lobby's ``restricted`` join rule needs a space to be restricted *to*.
@@ -1284,6 +1688,29 @@ class OnbotConfig(BaseSettings):
             )
         return self
 
+    @model_validator(mode="after")
+    def _managed_aliases_only_requires_a_prefix(self) -> OnbotConfig:
+        """``room_inventory_managed_aliases_only`` narrows the room listing by ``alias_prefix``.
+
+        A group whose rooms carry no prefix would drop out of the listing and have its room created
+        again on every pass, so the combination is rejected at startup.
+        """
+        if not self.performance.room_inventory_managed_aliases_only:
+            return self
+        default = self.matrix_room_default_settings
+        overrides = self.per_authentik_group_pk_matrix_room_settings.values()
+        prefixes = [
+            default.alias_prefix,
+            *(o.alias_prefix for o in overrides if "alias_prefix" in o.model_fields_set),
+        ]
+        # Dashes are dropped from aliases, so a prefix of only dashes is no prefix at all.
+        if not all((p or "").replace("-", "") for p in prefixes):
+            raise ValueError(
+                "performance.room_inventory_managed_aliases_only requires an alias_prefix for every "
+                "group room: rooms without one would be missed by the room listing and re-created."
+            )
+        return self
+
 
 def get_config_file_path(*, not_exists_ok: bool = False) -> Path | None:
     """Return the YAML config path from ``ONBOT_CONFIG_FILE_PATH`` (default ``config.yml``)."""
@@ -0,0 +1,143 @@
+"""Per-entity digests of the Authentik directory that say *what* changed, not just *that* (pure logic).
+
+The discovery poll used to reduce the whole directory to one SHA-256: build a ``repr`` of every
+user's and group's facts, sort the lot, hash it. That is O(n log n) string work on every poll, and
+the answer is a single bit — the poller could only ask for a full reconcile, and the log could only
+say "authentik changed".
+
+A :class:`DigestTree` keeps one 128-bit digest per entity (pk → digest of its facts) and spreads the
+entities over a fixed number of buckets by a hash of their pk. Each bucket keeps the XOR of its
+entities' digests, which an insert, update or removal adjusts in O(1), and the tree's :attr:`root`
+is a hash of the bucket values. Two trees are compared root first; when the roots differ only the
+buckets whose values differ are opened, so :meth:`DigestTree.diff` costs the number of buckets plus
+the entities in the changed ones — not the size of the directory — and returns an exact
+:class:`EntityDelta`: pks added, removed and modified.
+
+Digests are in-memory only and never leave the process, so nothing here has to be stable across
+versions; ``blake2b`` and ``crc32`` are used for speed, not for any security property.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import zlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+# Enough that a handful of changes touches a handful of buckets on a directory of tens of thousands,
+# few enough that comparing two roots' bucket lists is trivial.
+BUCKETS = 256
+
+
+def entity_digest(facts: tuple[Any, ...]) -> int:
+    """The digest of one entity's facts."""
+    return int.from_bytes(hashlib.blake2b(repr(facts).encode("utf-8"), digest_size=16).digest())
+
+
+def _bucket_of(pk: str) -> int:
+    return zlib.crc32(pk.encode("utf-8")) % BUCKETS
+
+
+@dataclass(frozen=True, slots=True)
+class EntityDelta:
+    """The pks of one kind of entity that appeared, disappeared or changed between two trees."""
+
+    added: frozenset[str] = frozenset()
+    removed: frozenset[str] = frozenset()
+    modified: frozenset[str] = frozenset()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    @property
+    def changed(self) -> frozenset[str]:
+        """Every pk in the delta."""
+        return self.added | self.removed | self.modified
+
+    def __str__(self) -> str:
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.modified)}"
+
+
+class DigestTree:
+    """Per-pk digests of one kind of entity, bucketed under a single root."""
+
+    def __init__(self) -> None:
+        self._members: list[dict[str, int]] = [{} for _ in range(BUCKETS)]
+        self._xor = [0] * BUCKETS
+        self._root: str | None = None
+
+    @classmethod
+    def build(cls, entries: Iterable[tuple[str, tuple[Any, ...]]]) -> DigestTree:
+        """A tree of ``(pk, facts)`` pairs."""
+        tree = cls()
+        for pk, facts in entries:
+            tree.put(pk, facts)
+        return tree
+
+    def __len__(self) -> int:
+        return sum(map(len, self._members))
+
+    def __contains__(self, pk: object) -> bool:
+        return isinstance(pk, str) and pk in self._members[_bucket_of(pk)]
+
+    def put(self, pk: str, facts: tuple[Any, ...]) -> bool:
+        """Record ``pk``'s current facts. Returns whether that added or changed anything."""
+        bucket, digest = _bucket_of(pk), entity_digest(facts)
+        previous = self._members[bucket].get(pk)
+        if previous == digest:
+            return False
+        if previous is not None:
+            self._xor[bucket] ^= previous
+        self._members[bucket][pk] = digest
+        self._xor[bucket] ^= digest
+        self._root = None
+        return True
+
+    def remove(self, pk: str) -> bool:
+        """Forget ``pk``. Returns whether it was there."""
+        bucket = _bucket_of(pk)
+        digest = self._members[bucket].pop(pk, None)
+        if digest is None:
+            return False
+        self._xor[bucket] ^= digest
+        self._root = None
+        return True
+
+    @property
+    def root(self) -> str:
+        """A digest of the whole tree: equal roots mean equal contents."""
+        if self._root is None:
+            data = b"".join(value.to_bytes(16) for value in self._xor)
+            self._root = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return self._root
+
+    def diff(self, newer: DigestTree) -> EntityDelta:
+        """What changed from this tree to ``newer``, opening only the buckets that differ."""
+        if self.root == newer.root:
+            return EntityDelta()
+        added: set[str] = set()
+        removed: set[str] = set()
+        modified: set[str] = set()
+        for bucket in range(BUCKETS):
+            if self._xor[bucket] == newer._xor[bucket]:
+                continue
+            old, new = self._members[bucket], newer._members[bucket]
+            added.update(new.keys() - old.keys())
+            removed.update(old.keys() - new.keys())
+            modified.update(pk for pk in old.keys() & new.keys() if old[pk] != new[pk])
+        return EntityDelta(frozenset(added), frozenset(removed), frozenset(modified))
+
+
+@dataclass(frozen=True, slots=True)
+class DirectoryDelta:
+    """What changed in Authentik between two polls, per kind of entity."""
+
+    users: EntityDelta = EntityDelta()
+    groups: EntityDelta = EntityDelta()
+
+    def __bool__(self) -> bool:
+        return bool(self.users or self.groups)
+
+    def __str__(self) -> str:
+        return f"users {self.users}, groups {self.groups}"
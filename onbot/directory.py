@@ -0,0 +1,181 @@
+"""One read of the Authentik directory per reconcile pass.
+
+A pass used to ask Authentik the same questions several times over: ``list_groups`` once for the
+group→room projection and again for the power-level groups, one full ``list_users`` pagination per
+configured path, and a further full listing of the inactive users for the account lifecycle. On a
+large tenant those listings dominate the pass, and they are not even consistent with each other — a
+group renamed between two of them is seen both ways in the same pass.
+
+:func:`fetch_directory_snapshot` issues the listings once and concurrently and returns a
+:class:`DirectorySnapshot` that every consumer in the pass reads from:
+
+* users are fetched per configured path and deduplicated by pk (a user can sit under two paths);
+* groups are fetched once, unfiltered, and the room groups and the power-level groups (non-empty
+  power-level attribute) are derived from that list in memory. When ``only_groups_with_attributes``
+  narrows the rooms, there are two listings instead, with the filters sent to Authentik (see
+  :func:`~onbot.clients.authentik.plan_attribute_filters`): the room groups, and the groups that
+  carry the power-level attribute. On a tenant with thousands of groups only the ones the bot acts
+  on are transferred. The in-memory filters still run over what arrives, since Authentik silently
+  returns every group for a filter it cannot apply. Groups are fetched without their embedded
+  members (``include_users=False``): who is in a group is already in each user's ``groups_obj``,
+  and ``users_obj`` would repeat the full record of every member in every group they belong to;
+* inactive users are only fetched when the caller needs them (the lifecycle is enabled).
+
+The snapshot is a plain value: it holds no client and does no I/O after construction. That is what
+lets the :class:`~onbot.discovery.DiscoveryPoller`, which reads the same listings to detect a change,
+hand its snapshot to the reconcile it triggers (see ``fetched_at``) instead of both reading them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from onbot.clients.authentik import ApiClientAuthentik
+from onbot.config import OnbotConfig
+from onbot.logging import get_logger
+from onbot.utils import dict_has_nested_attr, get_nested_dict_val_by_path
+
+log = get_logger(__name__)
+
+_MISSING = object()
+
+
+@dataclass(frozen=True, slots=True)
+class DirectorySnapshot:
+    """The Authentik users and groups one reconcile pass works from.
+
+    ``users`` are the active users in the synced set, deduplicated by pk. ``groups`` is every group
+    (without ``users_obj``; membership is in the users' ``groups_obj``), and ``room_groups`` /
+    ``power_level_groups`` are the subsets mirrored as rooms and carrying a power level.
+    ``inactive_users`` is ``None`` when they were not fetched. ``fetched_at`` is the
+    ``time.monotonic()`` at which the listings completed.
+    """
+
+    users: list[dict[str, Any]] = field(default_factory=list)
+    groups: list[dict[str, Any]] = field(default_factory=list)
+    room_groups: list[dict[str, Any]] = field(default_factory=list)
+    power_level_groups: list[dict[str, Any]] = field(default_factory=list)
+    inactive_users: list[dict[str, Any]] | None = None
+    fetched_at: float = 0.0
+
+
+def group_matches_attributes(group: Mapping[str, Any], wanted: Mapping[str, Any] | None) -> bool:
+    """Whether ``group`` carries every attribute in ``wanted`` with exactly that value.
+
+    The in-memory form of Authentik's ``attributes`` query filter, including its ``__`` notation for
+    nested keys (``{"chat__enabled": true}`` matches ``{"chat": {"enabled": true}}``).
+    """
+    attributes = group.get("attributes") or {}
+    for key, value in (wanted or {}).items():
+        actual = get_nested_dict_val_by_path(attributes, key.split("__"), fallback_val=_MISSING)
+        if actual is _MISSING or actual != value:
+            return False
+    return True
+
+
+async def fetch_inactive_users(authentik: ApiClientAuthentik, config: OnbotConfig) -> list[dict[str, Any]]:
+    """The inactive users the account lifecycle looks at, under the same attribute filter."""
+    return await authentik.list_users(
+        filter_by_attribute=config.sync_authentik_users_with_matrix_rooms.sync_only_users_with_authentik_attributes,
+        filter_is_active=False,
+    )
+
+
+async def fetch_directory_snapshot(
+    authentik: ApiClientAuthentik,
+    config: OnbotConfig,
+    *,
+    include_inactive_users: bool = False,
+    updated_after: str | None = None,
+) -> DirectorySnapshot:
+    """Fetch everything a reconcile pass reads from Authentik, with the listings run concurrently.
+
+    With ``updated_after`` (a ``last_updated`` timestamp) only the users and groups changed since
+    then are listed, under the same filters: a partial snapshot, for change detection only.
+    """
+    user_cfg = config.sync_authentik_users_with_matrix_rooms
+    room_cfg = config.sync_matrix_rooms_based_on_authentik_groups
+
+    async def _none() -> list[dict[str, Any]]:
+        return []
+
+    paths: list[str | None] = [*(user_cfg.sync_only_users_in_authentik_pathes or [])] or [None]
+    user_listings = (
+        [
+            authentik.list_users(
+                filter_by_path=path,
+                filter_by_attribute=user_cfg.sync_only_users_with_authentik_attributes,
+                filter_groups_by_pk=user_cfg.sync_only_users_of_groups_with_id,
+                filter_is_active=True,
+                filter_updated_after=updated_after,
+            )
+            for path in paths
+        ]
+        if user_cfg.enabled
+        else []
+    )
+    pl_attr = room_cfg.authentik_group_attr_for_matrix_power_level
+    if not room_cfg.enabled:
+        group_listings = []
+    elif room_cfg.only_groups_with_attributes:
+        group_listings = [
+            authentik.list_groups(
+                filter_by_attribute=room_cfg.only_groups_with_attributes,
+                include_users=False,
+                filter_updated_after=updated_after,
+            ),
+            authentik.list_groups(
+                filter_has_non_empty_attributes=[pl_attr],
+                include_users=False,
+                filter_updated_after=updated_after,
+            ),
+        ]
+    else:
+        group_listings = [authentik.list_groups(include_users=False, filter_updated_after=updated_after)]
+    inactive_listing = fetch_inactive_users(authentik, config) if include_inactive_users else _none()
+    inactive_users, *listings = await asyncio.gather(inactive_listing, *group_listings, *user_listings)
+    per_path = listings[len(group_listings) :]
+
+    groups: list[dict[str, Any]] = []
+    seen_group_pks: set[str] = set()
+    for listing in listings[: len(group_listings)]:
+        for group in listing:
+            if str(group["pk"]) not in seen_group_pks:
+                seen_group_pks.add(str(group["pk"]))
+                groups.append(group)
+
+    users: list[dict[str, Any]] = []
+    seen_pks: set[str] = set()
+    for listing in per_path:
+        for user in listing:
+            if str(user["pk"]) in seen_pks:
+                continue
+            seen_pks.add(str(user["pk"]))
+            users.append(user)
+
+    snapshot = DirectorySnapshot(
+        users=users,
+        groups=groups,
+        room_groups=[g for g in groups if group_matches_attributes(g, room_cfg.only_groups_with_attributes)],
+        power_level_groups=[
+            g
+            for g in groups
+            if dict_has_nested_attr(g.get("attributes", {}), pl_attr.split("."), must_have_val=True)
+        ],
+        inactive_users=inactive_users if include_inactive_users else None,
+        fetched_at=time.monotonic(),
+    )
+    log.debug(
+        "directory snapshot: %d users over %d listings, %d groups (%d rooms, %d power-level)%s",
+        len(users),
+        len(per_path),
+        len(groups),
+        len(snapshot.room_groups),
+        len(snapshot.power_level_groups),
+        f", {len(inactive_users)} inactive users" if include_inactive_users else "",
+    )
+    return snapshot
@@ -12,24 +12,53 @@ fingerprints the answer, and calls the engine's existing on-demand
 Synapse never and writes nothing. The full reconcile then drops to a slow drift-repair safety net
 (``server_tick_rate_sec``), and new-user latency is set by ``authentik_poll_rate_sec`` instead.
 
+What the poll reads is exactly the :class:`~onbot.directory.DirectorySnapshot` a reconcile pass
+starts from, and it is handed over with the trigger; the engine reuses it while it is recent
+(``performance.authentik_snapshot_max_age_sec``), so a change costs one directory read, not two back
+to back.
+
 The fingerprint covers exactly the Authentik facts a reconcile projects onto Matrix — who exists,
-what they are called, which groups they are in, which groups map to rooms and how. It deliberately
-excludes volatile fields (``last_login``, ``last_updated``): a user simply logging in changes nothing
-about the desired Matrix state, and waking the reconciler for it would defeat the purpose.
+what they are called, which groups they are in, and every group's name and attributes (which decide
+the rooms and the power levels). It deliberately excludes volatile fields (``last_login``,
+``last_updated``): a user simply logging in changes nothing about the desired Matrix state, and
+waking the reconciler for it would defeat the purpose.
+
+The fingerprint is kept per entity, as a :class:`~onbot.digest.DigestTree` of users and one of
+groups, so a poll yields not just "something changed" but the exact pks added, removed and modified
+(a :class:`~onbot.digest.DirectoryDelta`). That delta is logged and becomes the trigger's
+:class:`~onbot.reconciler.scope.ReconcileScope`: a new hire converges their own rooms rather than
+every room. Removed pks stay in the scope — the engine kicks a removed user from the rooms it last
+saw them in, and widens the pass to full for a group that is gone.
+
+**Incremental polls.** Reading the whole directory makes a poll cost O(directory), which is what
+kept the interval at tens of seconds. With ``performance.authentik_full_poll_interval_sec`` set, a
+full read only happens at that cadence; the polls in between ask Authentik for the users and groups
+whose ``last_updated`` is newer than the newest one seen so far (the *watermark*), compare each
+against the digest remembered for its pk, and trigger a reconcile scoped to the ones that really
+changed. Those answers are folded into the digest trees, so the next full read only triggers for
+what the incremental polls could not see: deletions, users leaving the synced set, and group
+membership changes (which Authentik makes without touching ``last_updated``). Without a
+watermark — before the first full read, or from an Authentik that does not report
+``last_updated`` — a poll is a full read.
 """
 
 from __future__ import annotations
 
 import asyncio
 import contextlib
-import hashlib
 import json
-from collections.abc import Callable
+import time
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime
 from typing import Any
 
 from onbot.clients.authentik import ApiClientAuthentik
+from onbot.clients.circuit import CircuitOpenError
 from onbot.config import OnbotConfig
+from onbot.digest import DigestTree, DirectoryDelta, EntityDelta
+from onbot.directory import DirectorySnapshot, fetch_directory_snapshot
 from onbot.logging import get_logger
+from onbot.reconciler.scope import ReconcileScope
 from onbot.utils import get_nested_dict_val_by_path
 
 log = get_logger(__name__)
@@ -63,17 +92,71 @@ def _group_facts(group: dict[str, Any]) -> tuple[Any, ...]:
     )
 
 
+def _user_tree(users: Iterable[dict[str, Any]], username_attribute: str) -> DigestTree:
+    return DigestTree.build((str(u["pk"]), _user_facts(u, username_attribute)) for u in users)
+
+
+def _group_tree(groups: Iterable[dict[str, Any]]) -> DigestTree:
+    return DigestTree.build((str(g["pk"]), _group_facts(g)) for g in groups)
+
+
 def fingerprint(users: list[dict[str, Any]], groups: list[dict[str, Any]], username_attribute: str) -> str:
     """A stable digest of everything in Authentik that the reconciler projects onto Matrix.
 
     Order-independent (Authentik does not promise a stable page order) and free of volatile fields,
     so an unchanged directory always yields an unchanged digest.
     """
-    payload = {
-        "users": sorted(repr(_user_facts(u, username_attribute)) for u in users),
-        "groups": sorted(repr(_group_facts(g)) for g in groups),
-    }
-    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{_user_tree(users, username_attribute).root}{_group_tree(groups).root}"
+
+
+def _absorb(
+    known: DigestTree,
+    entities: Iterable[dict[str, Any]],
+    facts_of: Callable[[dict[str, Any]], tuple[Any, ...]],
+) -> EntityDelta:
+    """Record the facts of ``entities`` in ``known``; return the pks that are new or changed.
+
+    An entity Authentik reports as updated may well not have changed in anything the reconciler
+    projects (a login, a password change); those are not returned.
+    """
+    added: set[str] = set()
+    modified: set[str] = set()
+    for entity in entities:
+        pk = str(entity["pk"])
+        existed = pk in known
+        if known.put(pk, facts_of(entity)):
+            (modified if existed else added).add(pk)
+    return EntityDelta(added=frozenset(added), modified=frozenset(modified))
+
+
+def _instant(stamp: str) -> datetime:
+    """A ``last_updated`` stamp as an aware datetime; raises :class:`ValueError` if it is not ISO 8601.
+
+    Stamps are compared as instants, never as strings: Authentik (through DRF) leaves out the
+    fraction when the microseconds are zero, and ``"…T10:00:00Z"`` sorts after ``"…T10:00:00.5Z"``.
+    """
+    parsed = datetime.fromisoformat(stamp)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=UTC)
+
+
+def _newest(entities: Iterable[dict[str, Any]], watermark: str | None) -> str | None:
+    """The latest ``last_updated`` among ``entities`` and ``watermark``, as the server wrote it.
+
+    The original string is kept, to be sent back verbatim as ``last_updated__gt``. Stamps that do not
+    parse are skipped.
+    """
+    newest, newest_at = watermark, _instant(watermark) if watermark is not None else None
+    for entity in entities:
+        stamp = entity.get("last_updated")
+        if not isinstance(stamp, str):
+            continue
+        try:
+            at = _instant(stamp)
+        except ValueError:
+            continue
+        if newest_at is None or at > newest_at:
+            newest, newest_at = stamp, at
+    return newest
 
 
 class DiscoveryPoller:
@@ -83,16 +166,25 @@ class DiscoveryPoller:
         self,
         authentik: ApiClientAuthentik,
         config: OnbotConfig,
-        trigger: Callable[[], None],
+        trigger: Callable[..., None],
         *,
         error_backoff_sec: float = ERROR_BACKOFF_SEC,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
         self.authentik = authentik
         self.config = config
         self.trigger = trigger
         self._error_backoff_sec = error_backoff_sec
+        self._clock = clock
         self._stop = asyncio.Event()
-        self._fingerprint: str | None = None
+        # The facts of every user and group as of the last poll, as per-pk digests; ``None`` until the
+        # first poll has set the baseline. Incremental mode also keeps the newest ``last_updated`` seen
+        # of each kind, and when the directory was last read in full.
+        self._users: DigestTree | None = None
+        self._groups: DigestTree | None = None
+        self._user_watermark: str | None = None
+        self._group_watermark: str | None = None
+        self._full_read_at: float | None = None
 
     def request_stop(self) -> None:
         self._stop.set()
@@ -107,6 +199,12 @@ class DiscoveryPoller:
         while not self._stop.is_set():
             try:
                 await self.poll_once()
+            except CircuitOpenError as exc:
+                log.warning(
+                    "authentik discovery poll paused: %s; backing off %.0fs", exc, self._error_backoff_sec
+                )
+                await self._sleep(self._error_backoff_sec)
+                continue
             except Exception:
                 log.exception("authentik discovery poll failed; backing off %.0fs", self._error_backoff_sec)
                 await self._sleep(self._error_backoff_sec)
@@ -114,48 +212,71 @@ class DiscoveryPoller:
             await self._sleep(interval)
         log.info("authentik discovery poll stopped")
 
+    @property
+    def _username_attribute(self) -> str:
+        return self.config.sync_authentik_users_with_matrix_rooms.authentik_username_mapping_attribute
+
     async def poll_once(self) -> bool:
-        """Fingerprint Authentik once. Returns whether it changed (and a reconcile was triggered).
+        """Poll Authentik once. Returns whether it changed (and a reconcile was triggered).
 
         The very first poll establishes the baseline without triggering: the engine reconciles on
         startup anyway, and firing here would only make it run twice.
         """
-        current = fingerprint(
-            await self._list_users(),
-            await self._list_groups(),
-            self.config.sync_authentik_users_with_matrix_rooms.authentik_username_mapping_attribute,
+        full_every = self.config.performance.authentik_full_poll_interval_sec
+        if (
+            full_every <= 0
+            or self._full_read_at is None
+            or self._clock() - self._full_read_at >= full_every
+            or self._user_watermark is None
+        ):
+            return await self._poll_full(incremental=full_every > 0)
+        return await self._poll_changes()
+
+    async def _poll_full(self, *, incremental: bool) -> bool:
+        # The same read, under the same filters, that a reconcile pass starts from — so the pass this
+        # triggers can take it over instead of reading the directory again.
+        snapshot = await fetch_directory_snapshot(self.authentik, self.config)
+        users = _user_tree(snapshot.users, self._username_attribute)
+        groups = _group_tree(snapshot.groups)
+        if incremental:
+            self._user_watermark = _newest(snapshot.users, self._user_watermark)
+            self._group_watermark = _newest(snapshot.groups, self._group_watermark)
+            self._full_read_at = self._clock()
+        old_users, old_groups = self._users, self._groups
+        self._users, self._groups = users, groups
+        if old_users is None or old_groups is None:
+            return False
+        delta = DirectoryDelta(users=old_users.diff(users), groups=old_groups.diff(groups))
+        return self._changed(delta, snapshot)
+
+    async def _poll_changes(self) -> bool:
+        """Read only what changed since the watermarks; trigger a reconcile scoped to it, if anything."""
+        assert self._users is not None and self._groups is not None  # a full read came first
+        # One timestamp for both kinds, the older one: a group listing ignoring the filter is only
+        # wasteful, whereas asking for groups after the *user* watermark could skip a group change.
+        since = min((w for w in (self._user_watermark, self._group_watermark) if w is not None), key=_instant)
+        changes = await fetch_directory_snapshot(self.authentik, self.config, updated_after=since)
+        # Folding the answers into the trees keeps them in step, so the next full read does not fire
+        # again for these.
+        delta = DirectoryDelta(
+            users=_absorb(self._users, changes.users, lambda u: _user_facts(u, self._username_attribute)),
+            groups=_absorb(self._groups, changes.groups, _group_facts),
         )
-        previous, self._fingerprint = self._fingerprint, current
-        if previous is None or previous == current:
+        self._user_watermark = _newest(changes.users, self._user_watermark)
+        self._group_watermark = _newest(changes.groups, self._group_watermark)
+        return self._changed(delta)
+
+    def _changed(self, delta: DirectoryDelta, snapshot: DirectorySnapshot | None = None) -> bool:
+        """Trigger a reconcile scoped to ``delta``, if it holds anything; return whether it did."""
+        if not delta:
             return False
-        log.info("authentik changed; triggering an out-of-band reconcile")
-        self.trigger()
+        # Removed pks stay in the scope: the engine kicks a removed user from the rooms it remembers
+        # them in, and widens the pass to full for a group that is gone.
+        scope = ReconcileScope.of(user_pks=delta.users.changed, group_pks=delta.groups.changed)
+        log.info("authentik changed (%s); triggering a scoped reconcile", delta)
+        self.trigger(scope, snapshot=snapshot)
         return True
 
-    async def _list_users(self) -> list[dict[str, Any]]:
-        """The same user set the reconciler maps, under the same filters (see ``engine``)."""
-        cfg = self.config.sync_authentik_users_with_matrix_rooms
-        if not cfg.enabled:
-            return []
-        paths: list[str | None] = [*(cfg.sync_only_users_in_authentik_pathes or [])] or [None]
-        users: list[dict[str, Any]] = []
-        for path in paths:
-            users.extend(
-                await self.authentik.list_users(
-                    filter_by_path=path,
-                    filter_by_attribute=cfg.sync_only_users_with_authentik_attributes,
-                    filter_groups_by_pk=cfg.sync_only_users_of_groups_with_id,
-                    filter_is_active=True,
-                )
-            )
-        return users
-
-    async def _list_groups(self) -> list[dict[str, Any]]:
-        settings = self.config.sync_matrix_rooms_based_on_authentik_groups
-        if not settings.enabled:
-            return []
-        return await self.authentik.list_groups(filter_by_attribute=settings.only_groups_with_attributes)
-
     async def _sleep(self, seconds: float) -> None:
         # Sleep, but wake immediately on stop.
         with contextlib.suppress(TimeoutError):
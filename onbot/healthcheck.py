@@ -13,6 +13,11 @@ Exit code contract (suitable for a container ``HEALTHCHECK`` / orchestrator read
 The bot user id from ``/whoami`` is compared against ``synapse_server.bot_user_id``; a mismatch is a
 warning (the token authenticates as a different user than configured) but not a hard failure, since
 the bot can still operate as whoever the token belongs to.
+
+Unless circuit breaking is off, the probes share one
+:class:`~onbot.clients.circuit.CircuitBreakerRegistry` with the thresholds the service runs with,
+and the check ends with a line giving each server's circuit state: whether the failures seen here
+would be enough to make the running bot stop calling that server.
 """
 
 from __future__ import annotations
@@ -23,6 +28,7 @@ from dataclasses import dataclass
 from onbot.app import build_matrix_token_provider
 from onbot.auth.token_provider import OAuth2ClientCredentialsTokenProvider
 from onbot.clients.authentik import ApiClientAuthentik
+from onbot.clients.circuit import CircuitBreakerRegistry
 from onbot.clients.mas_admin import ApiClientMasAdmin, mxid_localpart
 from onbot.clients.matrix import ApiClientMatrix
 from onbot.clients.synapse_admin import ApiClientSynapseAdmin
@@ -77,17 +83,27 @@ async def _probe_mas_admin(mas: ApiClientMasAdmin, bot_user_id: str) -> ProbeRes
 async def run_healthcheck(config: OnbotConfig) -> int:
     """Probe every configured dependency, log a line per result, and return an exit code."""
     token_provider = build_matrix_token_provider(config.synapse_server)
-    authentik = ApiClientAuthentik(url=config.authentik_server.url, api_key=config.authentik_server.api_key)
+    breakers: CircuitBreakerRegistry | None = None
+    if config.performance.circuit_breaker_failure_threshold > 0:
+        breakers = CircuitBreakerRegistry(
+            failure_threshold=config.performance.circuit_breaker_failure_threshold,
+            reset_after=config.performance.circuit_breaker_reset_sec,
+        )
+    authentik = ApiClientAuthentik(
+        url=config.authentik_server.url, api_key=config.authentik_server.api_key, circuit_breakers=breakers
+    )
     admin = ApiClientSynapseAdmin(
         server_url=config.synapse_server.server_url,
         token_provider=token_provider,
         admin_api_path=config.synapse_server.admin_api_path,
+        circuit_breakers=breakers,
     )
     matrix = ApiClientMatrix(
         server_url=config.synapse_server.server_url,
         token_provider=token_provider,
         server_name=config.synapse_server.server_name,
         room_version=config.synapse_server.room_version,
+        circuit_breakers=breakers,
     )
     mas: ApiClientMasAdmin | None = None
     if config.mas_admin is not None:
@@ -99,6 +115,7 @@ async def run_healthcheck(config: OnbotConfig) -> int:
                 client_secret=config.mas_admin.client_secret,
                 scope="urn:mas:admin",
             ),
+            circuit_breakers=breakers,
         )
 
     probes = [
@@ -128,6 +145,8 @@ async def run_healthcheck(config: OnbotConfig) -> int:
             failed = True
             log.error("healthcheck %-14s FAIL — %r", name, result)
 
+    if breakers is not None:
+        log.info("healthcheck circuits: %s", breakers.stats())
     if failed:
         log.error("healthcheck: one or more dependencies are unhealthy")
         return 1
@@ -233,7 +233,15 @@ class AccountLifecycleManager:
         self.effectors = effectors
         self.clock = clock
 
-    async def reconcile_accounts(self, orphaned_mxids: set[str]) -> list[LifecycleOutcome]:
+    async def reconcile_accounts(
+        self, orphaned_mxids: set[str], *, only: set[str] | None = None
+    ) -> list[LifecycleOutcome]:
+        """Decide and act for every orphan and every tracked user, or just for ``only``.
+
+        ``only`` is how a scoped reconcile restricts the pass to the users it looked at: a tracked
+        user outside it is neither re-enabled nor advanced, because the caller did not check whether
+        they are still orphaned.
+        """
         if not self.cfg.enabled:
             return []
         ledger = await self.store.load()
@@ -242,7 +250,10 @@ class AccountLifecycleManager:
         changed = False
 
         # Decide for every orphan and for anyone we are already tracking (so they can be re-enabled).
-        for mxid in sorted(orphaned_mxids | set(ledger.entries)):
+        candidates = orphaned_mxids | set(ledger.entries)
+        if only is not None:
+            candidates &= only
+        for mxid in sorted(candidates):
             entry = ledger.entries.get(mxid)
             action = decide_account_action(
                 is_orphaned=mxid in orphaned_mxids,
@@ -12,6 +12,7 @@ from __future__ import annotations
 import httpx
 
 from onbot.clients.matrix import ApiClientMatrix
+from onbot.clients.transport import TransportRegistry
 from onbot.logging import get_logger
 
 log = get_logger(__name__)
@@ -20,10 +21,21 @@ _DEFAULT_CONTENT_TYPE = "application/octet-stream"
 
 
 class MediaUploader:
-    def __init__(self, client: ApiClientMatrix, *, http_client: httpx.AsyncClient | None = None) -> None:
+    def __init__(
+        self,
+        client: ApiClientMatrix,
+        *,
+        http_client: httpx.AsyncClient | None = None,
+        transports: TransportRegistry | None = None,
+    ) -> None:
         self.client = client
-        self._http = http_client or httpx.AsyncClient(timeout=30.0, follow_redirects=True)
-        self._owns_http = http_client is None
+        # Avatars may live on any host; with a transport registry each is fetched through that
+        # host's shared pool (an avatar served by the homeserver itself reuses its connections).
+        self._transports = transports if http_client is None else None
+        self._http: httpx.AsyncClient | None = http_client
+        if http_client is None and transports is None:
+            self._http = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+        self._owns_http = http_client is None and transports is None
         # Source URL -> mxc URI, so a repeated URL uploads only once (G10.2).
         self._cache: dict[str, str] = {}
 
@@ -32,7 +44,7 @@ class MediaUploader:
         cached = self._cache.get(url)
         if cached is not None:
             return cached
-        response = await self._http.get(url)
+        response = await self._http_for(url).get(url, follow_redirects=True)
         response.raise_for_status()
         raw_type = response.headers.get("content-type", _DEFAULT_CONTENT_TYPE).split(";")[0].strip()
         content_type = raw_type or _DEFAULT_CONTENT_TYPE
@@ -41,6 +53,12 @@ class MediaUploader:
         log.info("uploaded avatar %s -> %s", url, mxc)
         return mxc
 
+    def _http_for(self, url: str) -> httpx.AsyncClient:
+        if self._transports is not None:
+            return self._transports.client_for(url)
+        assert self._http is not None
+        return self._http
+
     async def aclose(self) -> None:
-        if self._owns_http:
+        if self._owns_http and self._http is not None:
             await self._http.aclose()
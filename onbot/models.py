@@ -53,6 +53,10 @@ class MappedUser:
     mxid: str
     matrix_obj: dict[str, Any] | None = None
 
+    @property
+    def pk(self) -> str:
+        return str(self.authentik_obj["pk"])
+
     @property
     def is_superuser(self) -> bool:
         return bool(self.authentik_obj.get("is_superuser"))
@@ -0,0 +1,113 @@
+"""The bot's ``m.direct`` account data, held in memory and written back in batches.
+
+``m.direct`` maps every user to the direct rooms the bot opened with them. It is the welcome flow's
+"one DM per user" record and the broadcast target list (:mod:`onbot.admin.broadcast`). Both used to
+read the whole blob on every call, and the welcome flow rewrote all of it for every room it created:
+onboarding a cohort of N users moved O(N²) bytes. Worse, two welcomes creating rooms at the same
+time each wrote back what they had read, and the later write silently dropped the earlier entry.
+
+:class:`DirectRoomIndex` is the one copy for the whole process:
+
+* **Loaded once**, on first use, and then kept current from the sync stream. It is a
+  :class:`~onbot.sync.SyncPump` handler, and the pump asks for the sliding-sync ``account_data``
+  extension, so a change made by any client of the bot account arrives with the next slice.
+* **Written in batches.** :meth:`~DirectRoomIndex.add` updates memory at once and then waits for a
+  write that includes it. Writes are serialised. Rooms added while one write is in flight all go
+  out in the next write, so a cohort of new users costs a handful of writes, not one each.
+* **Never loses an entry.** A slice's ``m.direct`` is merged into memory, never swapped in. A slice
+  the server assembled just before one of our writes landed would otherwise drop the room that
+  write added, and the next write would then drop it on the server too. The bot never removes a
+  direct room, so adopting the union costs nothing. A room that another client removes stays in
+  the index until the next restart.
+
+Without sliding sync the index still sees every room the bot creates itself. It only misses changes
+made by other clients of the bot account, until the next restart.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from onbot.clients.matrix import SyncResult
+from onbot.logging import get_logger
+
+log = get_logger(__name__)
+
+M_DIRECT = "m.direct"
+
+
+class DirectRoomIndex:
+    """``user_id → [room_id, …]`` from the bot's ``m.direct``, shared by everything that reads it."""
+
+    def __init__(self, client: Any, bot_id: str) -> None:
+        self.client = client
+        self.bot_id = bot_id
+        self._direct: dict[str, list[str]] | None = None
+        self._load_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        # Added in memory but not yet covered by a write that has started.
+        self._unwritten: dict[str, list[str]] = {}
+        self.writes = 0
+
+    async def rooms(self) -> dict[str, list[str]]:
+        """A copy of the whole map, loaded on first use."""
+        direct = await self._loaded()
+        return {user_id: list(room_ids) for user_id, room_ids in direct.items()}
+
+    async def room_for(self, user_id: str) -> str | None:
+        """The first direct room the bot has with ``user_id``, if any."""
+        room_ids = (await self._loaded()).get(user_id) or []
+        return room_ids[0] if room_ids else None
+
+    async def add(self, user_id: str, room_id: str) -> None:
+        """Record ``room_id`` as a direct room with ``user_id``; returns once it has been written."""
+        direct = await self._loaded()
+        for entries in (direct, self._unwritten):
+            room_ids = entries.setdefault(user_id, [])
+            if room_id not in room_ids:
+                room_ids.append(room_id)
+        async with self._write_lock:
+            if user_id not in self._unwritten:
+                return  # a write that started after our add() has already carried it
+            pending, self._unwritten = self._unwritten, {}
+            # A copy: adds made while the request is on its way must not change what it sends.
+            content = {uid: list(room_ids) for uid, room_ids in (self._direct or {}).items()}
+            try:
+                await self.client.set_account_data(self.bot_id, M_DIRECT, content)
+            except BaseException:
+                # Put the entries back, so the next add() (or a retry of this one) writes them.
+                for uid, room_ids in pending.items():
+                    merged = self._unwritten.setdefault(uid, [])
+                    merged.extend(r for r in room_ids if r not in merged)
+                raise
+            self.writes += 1
+            if len(pending) > 1:
+                log.debug("wrote m.direct with %d new direct rooms in one batch", len(pending))
+
+    async def handle_sync(self, result: SyncResult) -> None:
+        """Merge in the server's ``m.direct`` when a slice carries it (a sync-pump handler)."""
+        content = result.account_data.get(M_DIRECT)
+        if content is None:
+            return
+        if self._direct is None:
+            self._direct = _parse(content)
+            return
+        for user_id, room_ids in _parse(content).items():
+            known = self._direct.setdefault(user_id, [])
+            known.extend(r for r in room_ids if r not in known)
+
+    async def _loaded(self) -> dict[str, list[str]]:
+        if self._direct is None:
+            async with self._load_lock:
+                if self._direct is None:
+                    self._direct = _parse(await self.client.get_account_data(self.bot_id, M_DIRECT))
+        return self._direct
+
+
+def _parse(content: dict[str, Any]) -> dict[str, list[str]]:
+    return {
+        str(user_id): [str(r) for r in room_ids]
+        for user_id, room_ids in content.items()
+        if isinstance(room_ids, list)
+    }
@@ -10,7 +10,9 @@ Two trigger paths converge here (AD-4 explicit coupling):
   latency.
 
 Both funnel through :meth:`_maybe_welcome`, which filters out the bot and ignored users and defers to
-the idempotent :class:`~onbot.onboarding.welcome.WelcomeService`. That idempotency is what lets the
+the idempotent :class:`~onbot.onboarding.welcome.WelcomeService`. Neither path waits for it: they
+submit the MXID to :attr:`OnboardingListener.queue`, whose workers run the welcomes off the reconcile
+pass and the sync loop (see :mod:`onbot.onboarding.queue`). That idempotency is what lets the
 listener ignore the sync stream's replay-on-restart entirely: re-welcoming an already-welcomed user
 sends nothing.
 
@@ -18,13 +20,13 @@ Sending nothing is not the same as costing nothing, though. The reconciler emits
 *every* mapped user on *every* pass, and proving a user is already welcomed costs three CS-API reads
 (their DM room from account data, its onbot state event, its power levels). At a few hundred users
 and a short tick that is the bot's entire Matrix traffic, spent to conclude nothing. So the listener
-remembers who it has welcomed in :attr:`OnboardingListener._welcomed` and short-circuits before
+remembers who it has welcomed in :attr:`OnboardingListener.ledger` and short-circuits before
 touching Matrix at all.
 
-The memory is per-process and deliberately not persisted: after a restart the first pass re-checks
-each user once and repopulates it. That is also what keeps ``welcome_new_users_messages`` editable —
-a changed message is picked up on the restart that loads it, and :mod:`onbot.onboarding.welcome`
-then re-sends only the message that actually changed.
+The app persists that memory in account data (:mod:`onbot.onboarding.welcomed`), keyed by a digest
+of the configured messages, so a restart does not re-check every user either. Editing
+``welcome_new_users_messages`` changes the digest. The next pass then re-checks each user once, and
+:mod:`onbot.onboarding.welcome` re-sends only the message that actually changed.
 """
 
 from __future__ import annotations
@@ -33,7 +35,9 @@ from onbot.clients.matrix import ApiClientMatrix, SyncResult
 from onbot.config import OnbotConfig
 from onbot.events import Event, EventBus, Signal
 from onbot.logging import get_logger
+from onbot.onboarding.queue import WelcomeQueue
 from onbot.onboarding.welcome import WelcomeService
+from onbot.onboarding.welcomed import WelcomedLedger
 
 log = get_logger(__name__)
 
@@ -58,32 +62,57 @@ class OnboardingListener:
         welcome: WelcomeService,
         config: OnbotConfig,
         events: EventBus,
+        *,
+        ledger: WelcomedLedger | None = None,
     ) -> None:
         self.client = client
         self.welcome = welcome
         self.config = config
         self.events = events
         self.bot_id = config.synapse_server.bot_user_id
-        # Users this process has already welcomed. Bounded by the directory size; see the module
-        # docstring for why it is not persisted.
-        self._welcomed: set[str] = set()
+        # Users already welcomed with the current messages. Without a store it lives only as long
+        # as the process; see the module docstring.
+        self.ledger = (
+            ledger if ledger is not None else WelcomedLedger(None, config.welcome_new_users_messages or [])
+        )
+        # Both trigger paths only submit here; the app runs the workers (see onboarding/queue.py).
+        self.queue = WelcomeQueue(
+            self._maybe_welcome,
+            workers=config.performance.onboarding_workers,
+            maxsize=config.performance.onboarding_queue_size,
+        )
 
     def start(self) -> None:
-        """Subscribe to the reconciler's user-provisioned signal (call once, before running)."""
+        """Subscribe to the reconciler's signals (call once, before running)."""
         self.events.subscribe(Signal.user_synced, self._on_user_synced)
+        self.events.subscribe(Signal.reconcile_completed, self._on_reconcile_completed)
 
     async def handle_sync(self, result: SyncResult) -> None:
-        """Welcome every user who joined in this sync slice (a :class:`~onbot.sync.SyncPump` handler)."""
+        """Queue every user who joined in this sync slice (a :class:`~onbot.sync.SyncPump` handler)."""
         for mxid in extract_joined_users(result):
-            await self._maybe_welcome(mxid)
+            self._submit(mxid)
 
     async def _on_user_synced(self, event: Event) -> None:
-        await self._maybe_welcome(event.payload["mxid"])
+        self._submit(event.payload["mxid"])
+
+    async def _on_reconcile_completed(self, _event: Event) -> None:
+        # Persist the welcomes completed since the last pass, in one batch.
+        await self.ledger.flush()
+
+    def _wants_welcome(self, mxid: str) -> bool:
+        return (
+            mxid != self.bot_id
+            and mxid not in self.config.matrix_user_ignore_list
+            and not self.ledger.is_welcomed(mxid)
+        )
+
+    def _submit(self, mxid: str) -> None:
+        # Filtered here too, so the pass's re-emission of every known user does not fill the queue.
+        if self._wants_welcome(mxid):
+            self.queue.submit(mxid)
 
     async def _maybe_welcome(self, mxid: str) -> None:
-        if mxid == self.bot_id or mxid in self.config.matrix_user_ignore_list:
-            return
-        if mxid in self._welcomed:
+        if not self._wants_welcome(mxid):
             return
         try:
             await self.welcome.welcome_user(mxid)
@@ -92,4 +121,4 @@ class OnboardingListener:
             # must not cost the user their welcome.
             log.exception("welcome flow failed for %s", mxid)
             return
-        self._welcomed.add(mxid)
+        self.ledger.record(mxid)
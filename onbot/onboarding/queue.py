@@ -0,0 +1,130 @@
+"""Welcomes run off the reconcile pass, on a bounded queue drained by a pool of workers.
+
+The reconciler emits ``user_synced`` for every mapped user and the bus awaits its handlers, so the
+welcome flow used to run inline in the pass: create the DM, force-join, upload the avatar, send every
+message and write its state event. One new hire costs a second; three hundred arriving from an HR
+import cost the pass minutes, during which nobody's rooms converged.
+
+:class:`WelcomeQueue` takes that work off the caller. :meth:`~WelcomeQueue.submit` never waits — it
+records the MXID and returns — and ``workers`` tasks started by :meth:`~WelcomeQueue.run` welcome
+the queued users concurrently, in the order they were submitted.
+
+* **Duplicates coalesce.** An MXID already waiting is not queued twice; the reconciler re-emits
+  every user on every pass, and the sync stream may report the same join a moment later.
+* **Per-user order holds.** A user is never handled by two workers at once. Submitting an MXID
+  that is being welcomed right now queues it again once that run has finished, not beside it.
+* **The bound is a bound.** Past ``maxsize`` waiting users a submission is dropped with a warning.
+  Nothing is lost: a user who was not welcomed is not remembered as welcomed, so the next pass
+  submits them again.
+
+:meth:`~WelcomeQueue.stats` reports the depth in ``!status``. On shutdown the workers finish the
+welcome in hand and leave the rest queued; the next process picks them up on its first pass.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from onbot.logging import get_logger
+
+log = get_logger(__name__)
+
+
+class WelcomeQueue:
+    """A bounded, coalescing FIFO of MXIDs, each handed to ``handler`` by one of ``workers`` tasks."""
+
+    def __init__(
+        self,
+        handler: Callable[[str], Awaitable[None]],
+        *,
+        workers: int = 4,
+        maxsize: int = 10_000,
+    ) -> None:
+        self._handler = handler
+        self.workers = max(1, workers)
+        self.maxsize = max(1, maxsize)
+        # Unbounded underneath, so the wake-up sentinels of request_stop always fit; the bound is
+        # enforced on _waiting in submit().
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue()
+        self._waiting: set[str] = set()
+        self._running: set[str] = set()
+        self._again: set[str] = set()
+        self._stopping = False
+        self._full_warned = False
+        self.done = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        """Users waiting for a worker."""
+        return len(self._waiting)
+
+    @property
+    def in_flight(self) -> int:
+        """Users a worker is welcoming right now."""
+        return len(self._running)
+
+    def submit(self, mxid: str) -> bool:
+        """Queue ``mxid`` without waiting. Returns whether it was queued (not coalesced or dropped)."""
+        if mxid in self._waiting:
+            return False
+        if mxid in self._running:
+            self._again.add(mxid)
+            return True
+        if len(self._waiting) >= self.maxsize:
+            self.dropped += 1
+            if not self._full_warned:
+                self._full_warned = True
+                log.warning(
+                    "onboarding queue full (%d waiting); dropping welcomes until it drains, the next "
+                    "pass submits them again",
+                    len(self._waiting),
+                )
+            return False
+        self._full_warned = False
+        self._waiting.add(mxid)
+        self._queue.put_nowait(mxid)
+        return True
+
+    async def run(self) -> None:
+        """Drain the queue with the worker pool until :meth:`request_stop`."""
+        self._stopping = False
+        log.info("onboarding queue started; %d workers", self.workers)
+        await asyncio.gather(*(self._work() for _ in range(self.workers)))
+        log.info("onboarding queue stopped; %d users left waiting", len(self._waiting))
+
+    def request_stop(self) -> None:
+        self._stopping = True
+        for _ in range(self.workers):
+            self._queue.put_nowait(None)  # wake every idle worker
+
+    async def drain(self) -> None:
+        """Wait until every submitted user has been handled (the workers must be running)."""
+        await self._queue.join()
+
+    def stats(self) -> str:
+        return (
+            f"{self.depth} waiting, {self.in_flight} in progress "
+            f"({self.workers} workers, {self.done} done, {self.dropped} dropped)"
+        )
+
+    async def _work(self) -> None:
+        while True:
+            mxid = await self._queue.get()
+            if mxid is None or self._stopping:
+                self._queue.task_done()
+                return
+            self._waiting.discard(mxid)
+            self._running.add(mxid)
+            try:
+                await self._handler(mxid)
+            except Exception:
+                log.exception("onboarding worker failed for %s", mxid)
+            finally:
+                self._running.discard(mxid)
+                self.done += 1
+                if mxid in self._again:
+                    self._again.discard(mxid)
+                    self.submit(mxid)
+                self._queue.task_done()
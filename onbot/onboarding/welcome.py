@@ -8,7 +8,8 @@ Three layers of idempotency keep the flow safe to call repeatedly (the listener
 reconciler signal *and* a join event):
 
 * **One DM per user** — the bot's ``m.direct`` account data maps each user to their DM room; an
-  existing room is reused rather than re-created.
+  existing room is reused rather than re-created. It is read through the process-wide
+  :class:`~onbot.onboarding.direct_rooms.DirectRoomIndex`, not fetched per welcome.
 * **Each message once** — the DM's onbot ``direct_room`` state event records a content hash per sent
   message (G4.3). Already-sent messages are skipped; only new/changed ones go out.
 * **One force-join ever** — recorded as ``force_joined_at`` in that same state event, so a user who
@@ -21,6 +22,19 @@ written as soon as the room exists and again after each message, never once at t
 are also serialised by :attr:`WelcomeService._locks`, since neither Matrix account data nor room state
 offers a compare-and-set.
 
+**Batched delivery** (``performance.batched_welcome_delivery``) trades those intermediate writes for
+idempotent sends. Each message goes out under a transaction id derived from the room and the
+message's key, so a send repeated after a crash is answered by the homeserver with the original
+event, not a second copy. The messages are then recorded once, after the last of them: one write
+per user instead of one per message, and that many fewer state events in the room's history. A new
+room still gets its state event, with ``force_joined_at``, as soon as it exists, exactly as without
+batching, so the one force-join is on record however the sends end. The per-user lock alone keeps
+the force-join's re-entry out until the final write. How long the homeserver remembers transaction
+ids is implementation-defined and not something the bot can rely on. A send that fails still leads
+to that write, for the messages that did land, so only a real process crash between the sends and
+the write leaves them unrecorded. Those are deduplicated only if the bot comes back while the
+homeserver still remembers their ids; otherwise they go out a second time.
+
 No database: all bookkeeping lives in Matrix account data + room state (AD-1).
 """
 
@@ -36,6 +50,7 @@ from onbot.clients.synapse_admin import ApiClientSynapseAdmin
 from onbot.config import OnbotConfig
 from onbot.logging import get_logger
 from onbot.media import MediaUploader
+from onbot.onboarding.direct_rooms import DirectRoomIndex
 from onbot.onboarding.notice_board import notice_board_power_levels, power_level_drift
 from onbot.reconciler.state import (
     DirectRoomState,
@@ -47,8 +62,6 @@ from onbot.reconciler.state import (
 
 log = get_logger(__name__)
 
-M_DIRECT = "m.direct"
-
 # A force-join the homeserver refuses for a reason of its own (the user is gone, the room is not
 # joinable): degrade to the standing invite rather than failing the whole welcome.
 _FORCE_JOIN_SOFT_FAILURES = (403, 404)
@@ -59,6 +72,11 @@ def _message_key(message: str) -> str:
     return hashlib.sha256(message.encode("utf-8")).hexdigest()[:16]
 
 
+def _welcome_txn_id(room_id: str, key: str) -> str:
+    """The transaction id of one welcome message in one room: the same on every attempt."""
+    return "onbot-welcome-" + hashlib.sha256(f"{room_id}\n{key}".encode()).hexdigest()[:32]
+
+
 class WelcomeService:
     def __init__(
         self,
@@ -67,6 +85,7 @@ class WelcomeService:
         *,
         admin: ApiClientSynapseAdmin | None = None,
         media: MediaUploader | None = None,
+        direct: DirectRoomIndex | None = None,
     ) -> None:
         self.client = client
         self.config = config
@@ -75,6 +94,8 @@ class WelcomeService:
         self.media = media
         self.bot_id = config.synapse_server.bot_user_id
         self.server_name = config.synapse_server.server_name
+        # The process-wide m.direct, shared with the broadcast service; see onboarding/direct_rooms.py.
+        self.direct = direct if direct is not None else DirectRoomIndex(client, self.bot_id)
         self._direct_event_type = event_type_name(self.server_name, OnbotRoomType.direct_room)
         # G4.5: optionally gather onboarding DMs under the managed space (opt-in — 1:1 rooms in a
         # space is a matter of taste). Resolved lazily from the configured space alias and cached.
@@ -95,27 +116,42 @@ class WelcomeService:
             await self._welcome_user(mxid, messages)
 
     async def _welcome_user(self, mxid: str, messages: list[str]) -> None:
+        batched = self.config.performance.batched_welcome_delivery
         room_id, created = await self._ensure_direct_room(mxid)
         if created:
             state = DirectRoomState(user_id=mxid, authentik_server=self.config.authentik_server.url)
             if await self._force_join(room_id, mxid):
                 state.force_joined_at = int(datetime.now(UTC).timestamp())
+            # Batched or not: the force-join must be on record before any send can fail.
             await self._persist(room_id, state)
         else:
             state = await self._load_direct_state(room_id, mxid)
             await self._heal_power_levels(room_id)
 
         sent = 0
-        for message in messages:
-            key = _message_key(message)
-            if key in state.welcome_messages_sent:
-                continue
-            await self.client.send_text_message(room_id, message)
-            state.welcome_messages_sent[key] = datetime.now(UTC).isoformat()
-            # Record each message the moment it lands: a crash (or a restart) between two sends must
-            # not replay the ones already delivered.
-            await self._persist(room_id, state)
-            sent += 1
+        try:
+            for message in messages:
+                key = _message_key(message)
+                if key in state.welcome_messages_sent:
+                    continue
+                if batched:
+                    # A replay after a crash reuses the transaction id, and the server deduplicates it.
+                    await self.client.send_text_message(
+                        room_id, message, txn_id=_welcome_txn_id(room_id, key)
+                    )
+                else:
+                    await self.client.send_text_message(room_id, message)
+                state.welcome_messages_sent[key] = datetime.now(UTC).isoformat()
+                if not batched:
+                    # Record each message the moment it lands: a crash (or a restart) between two
+                    # sends must not replay the ones already delivered.
+                    await self._persist(room_id, state)
+                sent += 1
+        finally:
+            # Also when a later send failed: the ones that landed are recorded, so the retry does not
+            # lean on the server still remembering their transaction ids.
+            if batched and sent:
+                await self._persist(room_id, state)
 
         if sent:
             log.info(
@@ -131,10 +167,9 @@ class WelcomeService:
 
     async def _ensure_direct_room(self, mxid: str) -> tuple[str, bool]:
         """Return ``(room_id, created)`` — reusing the bot's existing DM with ``mxid`` if any."""
-        direct = await self.client.get_account_data(self.bot_id, M_DIRECT)
-        existing = direct.get(mxid) or []
-        if existing:
-            return str(existing[0]), False
+        existing = await self.direct.room_for(mxid)
+        if existing is not None:
+            return existing, False
 
         room_id = await self.client.create_direct_message_room(
             mxid,
@@ -142,8 +177,7 @@ class WelcomeService:
             topic=self.config.onboarding_room_topic,
             power_level_content_override=notice_board_power_levels(),
         )
-        direct.setdefault(mxid, []).append(room_id)
-        await self.client.set_account_data(self.bot_id, M_DIRECT, direct)
+        await self.direct.add(mxid, room_id)
         await self._maybe_place_in_space(room_id)
         await self._maybe_set_avatar(room_id)
         return room_id, True
@@ -0,0 +1,97 @@
+"""Who has been welcomed with the current messages, remembered across restarts.
+
+The listener used to remember who it had welcomed in a plain set, so every restart started from
+nobody. The first pass after a deploy then ran the full proof for every mapped user: their DM from
+``m.direct``, the room's onbot state event and its power levels. On a 6,000-user install that is
+18,000 CS-API reads in one burst, all to conclude that nothing needs sending.
+
+:class:`WelcomedLedger` keeps the answer in the bot's account data. It is a map from each welcomed
+MXID to a digest of the ``welcome_new_users_messages`` they were welcomed with, stored through
+:class:`~onbot.account_data.ShardedAccountDataStore`. A user counts as welcomed only while that
+digest matches the messages configured *now*. Editing, adding or removing a message changes the
+digest, so every user goes through the welcome flow once more.
+:mod:`onbot.onboarding.welcome` then sends only the message that actually changed, and the ledger
+records the new digest.
+
+The ledger is loaded once at startup and written in batches: after every reconcile pass, and when
+the service stops. Losing the last batch costs nothing but a re-check of those users. A ledger that
+cannot be loaded is treated as empty, which is exactly how the bot behaved before.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+
+from onbot.account_data import ShardedAccountDataStore
+from onbot.logging import get_logger
+from onbot.reconciler.state import event_type_name
+
+log = get_logger(__name__)
+
+
+def welcomed_account_data_type(server_name: str) -> str:
+    """Account-data type prefix of the ledger shards, e.g. ``org.company.onbot.welcomed``."""
+    return event_type_name(server_name, "welcomed")
+
+
+def messages_digest(messages: Iterable[str]) -> str:
+    """A short digest of a set of welcome messages; any edit to any message changes it."""
+    keys = sorted(hashlib.sha256(m.encode("utf-8")).hexdigest() for m in messages)
+    return hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest()[:16]
+
+
+class WelcomedLedger:
+    """MXID → digest of the messages they were welcomed with, persisted in account data."""
+
+    def __init__(self, store: ShardedAccountDataStore | None, messages: Iterable[str]) -> None:
+        self.store = store
+        self.digest = messages_digest(messages)
+        self._entries: dict[str, str] = {}
+        self._dirty: set[str] = set()
+        self._loaded = False
+
+    async def ensure_loaded(self) -> None:
+        if self._loaded or self.store is None:
+            return
+        try:
+            raw = await self.store.load()
+        except Exception:
+            log.exception("could not load the welcome ledger; re-checking every user once")
+            return
+        # Anything recorded before the load is newer than what was stored.
+        self._entries = {str(k): str(v) for k, v in raw.items()} | self._entries
+        self._loaded = True
+        current = sum(1 for v in self._entries.values() if v == self.digest)
+        log.info(
+            "welcome ledger loaded: %d users, %d welcomed with the current messages",
+            len(self._entries),
+            current,
+        )
+
+    def is_welcomed(self, mxid: str) -> bool:
+        return self._entries.get(mxid) == self.digest
+
+    def record(self, mxid: str) -> None:
+        """Remember that ``mxid`` now has every currently configured message."""
+        if self._entries.get(mxid) != self.digest:
+            self._entries[mxid] = self.digest
+            self._dirty.add(mxid)
+
+    async def flush(self) -> None:
+        """Persist the users recorded since the last flush; best-effort, retried on the next flush."""
+        if self.store is None or not self._dirty:
+            return
+        # Before a successful load the stored shards are unknown; writing would overwrite them.
+        await self.ensure_loaded()
+        if not self._loaded:
+            return
+        dirty, self._dirty = self._dirty, set()
+        try:
+            await self.store.save(self._entries, keys=dirty)
+        except Exception:
+            self._dirty |= dirty
+            log.exception("could not save the welcome ledger; will retry after the next pass")
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,171 @@
+"""Remembered answers to "is this room one of ours?" for obsolete-room teardown.
+
+Teardown (``ReconcilerEngine._converge_obsolete_rooms``) must find rooms that carry the bot's
+``group_room`` or ``visitor_lobby`` state event but whose group is gone. Every room not backed by a
+live group is a candidate, and the only way to tell is to read both state events — two requests per
+room per pass, almost all of them answered "not found" by the thousands of rooms on the homeserver
+that have nothing to do with the bot.
+
+:class:`RoomClassificationIndex` remembers the answer per room id — a managed type with its group
+id, or *unmanaged* — persisted in account data (:class:`~onbot.account_data.ShardedAccountDataStore`)
+so a restart does not start over. A pass then probes only rooms it has no answer for, which after the
+first pass means new rooms. Answers go stale in three ways, each handled:
+
+* **The room changed.** The sync stream invalidates a room whenever it carries an ``m.room.create``
+  or one of the bot's own state events for it; the engine also records every room it maps to a
+  live group as managed, which covers a pre-existing room adopted by alias.
+* **The answer is old.** Each answer is re-verified after ``reverify_after_sec``, spread over the
+  second half of that period by a hash of the room id so a freshly built index does not expire all
+  at once.
+* **The room is gone.** Answers for rooms that no longer appear in the listing are dropped.
+
+Only *unmanaged* answers let the engine skip work; managed rooms are few and are still read every
+pass, exactly as before.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from onbot.account_data import ShardedAccountDataStore
+from onbot.clients.matrix import SyncResult
+from onbot.logging import get_logger
+from onbot.reconciler.state import OnbotRoomType, event_type_name
+
+log = get_logger(__name__)
+
+UNMANAGED = "unmanaged"
+ROOM_CREATE_EVENT_TYPE = "m.room.create"
+
+
+def classification_account_data_type(server_name: str) -> str:
+    """Account-data type prefix of the index shards, e.g. ``org.company.onbot.room_classes``."""
+    return event_type_name(server_name, "room_classes")
+
+
+@dataclass(frozen=True, slots=True)
+class RoomClass:
+    """What a room was found to be: ``kind`` is an :class:`OnbotRoomType` value or ``unmanaged``."""
+
+    kind: str
+    group_id: str | None
+    verified_at: float
+
+    @property
+    def is_unmanaged(self) -> bool:
+        return self.kind == UNMANAGED
+
+    def to_json(self) -> dict[str, Any]:
+        return {"kind": self.kind, "group_id": self.group_id, "verified_at": self.verified_at}
+
+    @classmethod
+    def from_json(cls, raw: dict[str, Any]) -> RoomClass:
+        return cls(kind=str(raw["kind"]), group_id=raw.get("group_id"), verified_at=float(raw["verified_at"]))
+
+
+def _spread(room_id: str) -> float:
+    """A stable fraction in [0, 1) per room, to stagger re-verification."""
+    return int.from_bytes(hashlib.sha256(room_id.encode("utf-8")).digest()[:4], "big") / 2**32
+
+
+class RoomClassificationIndex:
+    """Per-room managed/unmanaged answers, loaded lazily and saved in batches."""
+
+    def __init__(
+        self,
+        store: ShardedAccountDataStore,
+        server_name: str,
+        *,
+        reverify_after_sec: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self._reverify_after_sec = reverify_after_sec
+        self._clock = clock
+        self._watched_types = frozenset(
+            {
+                ROOM_CREATE_EVENT_TYPE,
+                *(
+                    event_type_name(server_name, t)
+                    for t in (OnbotRoomType.group_room, OnbotRoomType.visitor_lobby)
+                ),
+            }
+        )
+        self._entries: dict[str, RoomClass] = {}
+        self._loaded = False
+        self._dirty: set[str] = set()
+        # Invalidations seen before the first load must survive it.
+        self._invalidated_before_load: set[str] = set()
+
+    async def ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        try:
+            raw = await self.store.load()
+        except Exception:
+            log.exception("could not load the room classification index; probing every room this pass")
+            return
+        for room_id, entry in raw.items():
+            try:
+                self._entries[room_id] = RoomClass.from_json(entry)
+            except KeyError, TypeError, ValueError:
+                self._dirty.add(room_id)  # unreadable: drop it on the next save
+        for room_id in self._invalidated_before_load:
+            self.invalidate(room_id)
+        self._invalidated_before_load.clear()
+        self._loaded = True
+        log.debug("room classification index loaded: %d rooms", len(self._entries))
+
+    def lookup(self, room_id: str) -> RoomClass | None:
+        """The remembered answer for ``room_id``, or ``None`` when it is unknown or due for re-checking."""
+        entry = self._entries.get(room_id)
+        if entry is None:
+            return None
+        max_age = self._reverify_after_sec * (0.5 + 0.5 * _spread(room_id))
+        if self._clock() - entry.verified_at >= max_age:
+            return None
+        return entry
+
+    def record(self, room_id: str, kind: OnbotRoomType | str, group_id: str | None = None) -> None:
+        """Remember what ``room_id`` is; a no-op while an identical answer is still current."""
+        kind = str(kind)
+        current = self.lookup(room_id)
+        if current is not None and current.kind == kind and current.group_id == group_id:
+            return
+        self._entries[room_id] = RoomClass(kind=kind, group_id=group_id, verified_at=self._clock())
+        self._dirty.add(room_id)
+
+    def invalidate(self, room_id: str) -> None:
+        if not self._loaded:
+            self._invalidated_before_load.add(room_id)
+        if self._entries.pop(room_id, None) is not None:
+            self._dirty.add(room_id)
+
+    def retain(self, room_ids: Iterable[str]) -> None:
+        """Forget every room not in ``room_ids`` (rooms that no longer exist)."""
+        keep = set(room_ids)
+        for room_id in [r for r in self._entries if r not in keep]:
+            self.invalidate(room_id)
+
+    async def handle_sync(self, result: SyncResult) -> None:
+        for room in result.rooms:
+            if any(e.get("type") in self._watched_types for e in (*room.timeline, *room.required_state)):
+                self.invalidate(room.room_id)
+
+    async def flush(self) -> None:
+        """Persist the rooms changed since the last flush; best-effort, retried on the next flush."""
+        if not self._loaded or not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        try:
+            await self.store.save({r: e.to_json() for r, e in self._entries.items()}, keys=dirty)
+        except Exception:
+            self._dirty |= dirty
+            log.exception("could not save the room classification index; will retry next pass")
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -4,43 +4,88 @@ Computes *desired* state (from Authentik) vs *actual* state (Synapse) and applie
 a schedule **and** on demand (replacing the legacy ``while True: sleep`` tick loop), and shuts down
 gracefully on SIGINT/SIGTERM. A single ``reconcile_once`` pass is fully re-runnable.
 
+An on-demand pass may be *scoped* (:class:`~onbot.reconciler.scope.ReconcileScope`): it then
+converges only the rooms of the named groups and of the groups the named users are or were in, the
+space membership, and the lifecycle and onboarding of those users. Obsolete-room teardown and the
+space avatar need a view of every room and are left to full passes, which stay the drift-repair net:
+the scheduled tick is always full, and scoped triggers that arrive together are merged.
+
+The Authentik side is read once per pass into a :class:`~onbot.directory.DirectorySnapshot` (users,
+groups and, for the lifecycle, inactive users, fetched concurrently); every step of the pass reads
+from it rather than listing the directory again. A snapshot handed over with the trigger by the
+discovery poll is reused while it is younger than ``performance.authentik_snapshot_max_age_sec``.
+
+The Synapse room list is likewise walked once per pass into a
+:class:`~onbot.reconciler.inventory.RoomInventory`, from which both the space and the group rooms are
+resolved.
+
+Room member lists are read through the sync-fed :class:`~onbot.state_cache.RoomStateCache` when one
+is wired in (the effectors do the same for state events), falling back to the admin API on a miss.
+
 The pure decision logic lives in the sibling modules (``rooms``, ``membership``, ``power_levels``);
-reads go through the Authentik + Synapse-admin clients; writes go through the Synapse-admin client
-(membership/block) and the :class:`MatrixEffectors` seam (CS-API operations, Phase 4).
+reads go through the Authentik + Synapse-admin clients. The engine never writes directly: each pass
+*plans* the changes it wants as typed operations (:mod:`~onbot.reconciler.plan`), and an
+:class:`~onbot.reconciler.executor.OperationExecutor` applies them through the Synapse-admin client
+(membership/block) and the :class:`MatrixEffectors` seam (CS-API operations). ``plan_once`` stops
+short of applying, for ``onbot plan``.
+
+When an upstream's circuit is open (:mod:`~onbot.clients.circuit`) the pass ends at the first
+refused request instead of planning and failing every room in turn; the next tick tries again.
 """
 
 from __future__ import annotations
 
 import asyncio
-import contextlib
 import signal
 import time
+from dataclasses import dataclass, field, replace
 from typing import Any
 
 from pydantic import ValidationError
 
 from onbot.clients.authentik import ApiClientAuthentik
+from onbot.clients.circuit import CircuitOpenError
 from onbot.clients.synapse_admin import ApiClientSynapseAdmin
 from onbot.config import OnbotConfig, SyncMatrixRoomsBasedOnAuthentikGroups
+from onbot.directory import DirectorySnapshot, fetch_directory_snapshot, fetch_inactive_users
 from onbot.events import EventBus, Signal
 from onbot.identity import build_canonical, compute_mxid
 from onbot.lifecycle.accounts import AccountLifecycleManager
 from onbot.logging import get_logger
 from onbot.models import GroupRoomMap, MappedUser, MatrixRoom
+from onbot.reconciler.classification import UNMANAGED, RoomClassificationIndex
 from onbot.reconciler.effectors import DryRunEffectors, MatrixEffectors
+from onbot.reconciler.executor import ExecutionReport, OperationExecutor
+from onbot.reconciler.index import MembershipIndex
+from onbot.reconciler.inventory import SPACE_ROOM_TYPE, RoomInventory, gather_room_inventory
 from onbot.reconciler.join_rules import desired_join_rules, join_rules_change
 from onbot.reconciler.membership import (
-    desired_room_members,
+    desired_room_members_from_index,
     diff_room_membership,
     diff_space_membership,
 )
+from onbot.reconciler.plan import (
+    CreateRoom,
+    CreateSpace,
+    DeleteRoom,
+    JoinUser,
+    KickUser,
+    Operation,
+    PutRoomState,
+    ReconcilePlan,
+    SetPowerLevels,
+    SetRoomAvatar,
+    SetRoomBlocked,
+    SetRoomName,
+    SetRoomTopic,
+)
 from onbot.reconciler.power_levels import (
-    PowerLevelGroup,
-    compute_desired_user_levels,
+    compute_desired_user_levels_from_index,
     extract_power_level_groups,
     merge_power_levels,
 )
-from onbot.reconciler.rooms import build_group_room_maps, resolve_room_settings
+from onbot.reconciler.rooms import build_group_room_maps, managed_alias_prefixes, resolve_room_settings
+from onbot.reconciler.scope import ReconcileScope, affected_group_pks, expand_power_level_groups
 from onbot.reconciler.state import (
     AnyRoomState,
     GroupRoomState,
@@ -51,6 +96,8 @@ from onbot.reconciler.state import (
     event_type_name,
     parse_room_state,
 )
+from onbot.state_cache import RoomStateCache
+from onbot.utils import gather_or_cancel
 
 log = get_logger(__name__)
 
@@ -61,6 +108,23 @@ class ConfigurationError(RuntimeError):
     """Raised when the configuration cannot be satisfied (e.g. required space missing)."""
 
 
+@dataclass(slots=True)
+class _PassInputs:
+    """Everything one pass read before planning: both sides, and the scope it settled on."""
+
+    scope: ReconcileScope | None
+    directory: DirectorySnapshot
+    matrix_users: list[dict[str, Any]]
+    users: list[MappedUser]
+    space: MatrixRoom | None
+    rooms: list[MatrixRoom]
+    group_maps: list[GroupRoomMap]
+    # Before narrowing to the scope: every group mirrored as a room, and every power-level group
+    # with the user pks it lists as members.
+    synced_group_pks: frozenset[str] = frozenset()
+    power_level_members: dict[str, frozenset[str]] = field(default_factory=dict)
+
+
 class ReconcilerEngine:
     def __init__(
         self,
@@ -70,6 +134,8 @@ class ReconcilerEngine:
         effectors: MatrixEffectors | None = None,
         events: EventBus | None = None,
         lifecycle: AccountLifecycleManager | None = None,
+        state_cache: RoomStateCache | None = None,
+        classification: RoomClassificationIndex | None = None,
     ) -> None:
         self.config = config
         self.authentik = authentik
@@ -77,17 +143,47 @@ class ReconcilerEngine:
         self.effectors: MatrixEffectors = effectors or DryRunEffectors()
         self.events = events or EventBus()
         self.lifecycle = lifecycle
+        self.state_cache = state_cache
+        self.classification = classification
         self.server_name = config.synapse_server.server_name
         # Unix timestamp of the last pass that ran to completion; reported by the admin room's
         # `!status` command. ``None`` until the first pass finishes.
         self.last_reconcile_at: float | None = None
         self._stop = asyncio.Event()
         self._trigger = asyncio.Event()
+        # What the next pass should cover: full (the first pass, every scheduled tick, any unscoped
+        # trigger) wins over the union of the scoped triggers received since the last pass.
+        self._full_pass_pending = True
+        self._pending_scope = ReconcileScope()
+        # Each synced user's groups as of the last pass (Authentik user pk -> group pks), so a scoped
+        # pass can find the rooms a user has just *left*. Empty until a full pass has run.
+        self._groups_by_user_pk: dict[str, frozenset[str]] = {}
+        self._has_full_baseline = False
+        # As of the previous pass, for the scoped passes that follow it.
+        self._synced_group_pks: frozenset[str] = frozenset()
+        self._power_level_members: dict[str, frozenset[str]] = {}
+        # The latest Authentik snapshot handed over by a trigger (the discovery poll), for the next pass.
+        self._handoff_snapshot: DirectorySnapshot | None = None
+        # The executor of the pass being planned, so reads can tell a dry-run room that does not exist.
+        self._pass_executor: OperationExecutor | None = None
 
     # --- runtime loop --------------------------------------------------------
 
-    def trigger(self) -> None:
-        """Request an out-of-band reconcile (on-demand) before the next scheduled tick."""
+    def trigger(
+        self, scope: ReconcileScope | None = None, *, snapshot: DirectorySnapshot | None = None
+    ) -> None:
+        """Request an out-of-band reconcile (on-demand) before the next scheduled tick.
+
+        With a ``scope``, only the named Authentik users/groups are converged; without one (or if a
+        full pass is already pending) the pass is full. A ``snapshot`` the caller has just read from
+        Authentik is reused by that pass if it is still recent enough when the pass starts.
+        """
+        if snapshot is not None:
+            self._handoff_snapshot = snapshot
+        if scope is None:
+            self._full_pass_pending = True
+        else:
+            self._pending_scope |= scope
         self._trigger.set()
 
     def request_stop(self) -> None:
@@ -101,8 +197,11 @@ class ReconcilerEngine:
         while not self._stop.is_set():
             # Clear before the pass so a trigger raised *during* it is preserved for the next wait.
             self._trigger.clear()
+            scope = self._take_pending_scope()
             try:
-                await self.reconcile_once()
+                await self.reconcile_once(scope)
+            except CircuitOpenError as exc:
+                log.warning("reconcile pass aborted: %s; will retry next tick", exc)
             except Exception:
                 log.exception("reconcile pass failed; will retry next tick")
             if self._stop.is_set():
@@ -111,9 +210,18 @@ class ReconcilerEngine:
         log.info("reconciler stopped")
 
     async def _wait_for_next_tick(self) -> None:
-        # Wake on an on-demand trigger, or fall through on the scheduled timeout.
-        with contextlib.suppress(TimeoutError):
+        # Wake on an on-demand trigger, or fall through on the scheduled timeout — which is a full pass.
+        try:
             await asyncio.wait_for(self._trigger.wait(), timeout=self.config.server_tick_rate_sec)
+        except TimeoutError:
+            self._full_pass_pending = True
+
+    def _take_pending_scope(self) -> ReconcileScope | None:
+        """Consume what the next pass should cover: ``None`` for a full pass, else the merged scope."""
+        scope = None if self._full_pass_pending else self._pending_scope
+        self._full_pass_pending = False
+        self._pending_scope = ReconcileScope()
+        return scope
 
     def _install_signal_handlers(self) -> None:
         try:
@@ -125,56 +233,225 @@ class ReconcilerEngine:
 
     # --- one convergence pass ------------------------------------------------
 
-    async def reconcile_once(self) -> None:
-        log.info("reconcile: gathering desired (Authentik) and actual (Synapse) state")
-        matrix_users = await self.admin.list_users()
-        users = await self._gather_mapped_users(matrix_users)
-        space = await self._resolve_space()
-        rooms = await self._gather_group_rooms()
-        group_maps = await self._gather_group_room_maps(rooms)
-
-        await self._converge_rooms(group_maps, space)
-        await self._converge_obsolete_rooms(rooms, group_maps)
-        if space is not None:
-            await self._converge_space_avatar(space)
-            await self._converge_space_membership(space, users)
-        await self._converge_room_membership_and_levels(group_maps, users, space)
-        await self._converge_lifecycle(matrix_users, {u.mxid for u in users})
+    async def reconcile_once(self, scope: ReconcileScope | None = None) -> None:
+        """Run one pass: full, or restricted to ``scope`` (see the module docstring)."""
+        inputs = await self._gather_pass(scope)
+        if inputs is None:
+            return
+        scope = inputs.scope
+        for user in inputs.users:
+            if scope is None or user.pk in scope.user_pks:
+                await self.events.emit(Signal.user_synced, mxid=user.mxid)
+
+        await self._plan_and_apply(inputs, self._executor())
+        await self._converge_lifecycle(inputs.directory, inputs.matrix_users, inputs.users, scope)
+        self._remember_groups(inputs.users, scope)
+        self._synced_group_pks = inputs.synced_group_pks
+        self._power_level_members = inputs.power_level_members
         self.last_reconcile_at = time.time()
-        log.info("reconcile: done (%d users, %d group rooms)", len(users), len(group_maps))
+        log.info(
+            "reconcile: done (%d users, %d group rooms%s)",
+            len(inputs.users),
+            len(inputs.group_maps),
+            ", scoped" if scope is not None else "",
+        )
+        if self.state_cache is not None:
+            log.debug("reconcile: room state cache: %s", self.state_cache.stats())
         # Last, and after the timestamp: a subscriber that fails must not make the pass look unfinished.
         await self.events.emit(Signal.reconcile_completed)
 
-    async def _gather_mapped_users(self, matrix_users: list[dict[str, Any]]) -> list[MappedUser]:
+    async def plan_once(self, scope: ReconcileScope | None = None) -> ReconcilePlan:
+        """Work out what a pass would change, without changing anything (``onbot plan``).
+
+        Reads everything a real pass reads. Rooms the pass would create are planned under their
+        alias. Onboarding and the account lifecycle are not part of the plan.
+        """
+        inputs = await self._gather_pass(scope)
+        if inputs is None:
+            return ReconcilePlan()
+        return await self._plan_and_apply(inputs, self._executor(dry_run=True))
+
+    def _executor(self, *, dry_run: bool = False) -> OperationExecutor:
+        perf = self.config.performance
+        return OperationExecutor(
+            self.admin,
+            self.effectors,
+            room_concurrency=perf.reconcile_room_concurrency,
+            operation_concurrency=perf.operation_concurrency,
+            state_cache=self.state_cache,
+            dry_run=dry_run,
+        )
+
+    async def _gather_pass(self, scope: ReconcileScope | None) -> _PassInputs | None:
+        """Read both sides and settle the pass's scope; ``None`` when there is nothing to do."""
+        if scope is not None and not self._has_full_baseline:
+            log.info("reconcile: no full pass has run yet; widening the scoped pass (%s) to full", scope)
+            scope = None
+        if scope is not None and not scope:
+            log.debug("reconcile: empty scope; nothing to do")
+            return None
+        log.info(
+            "reconcile: gathering desired (Authentik) and actual (Synapse) state%s",
+            f" for {scope}" if scope is not None else "",
+        )
+        directory, matrix_users = await gather_or_cancel(self._directory_snapshot(), self.admin.list_users())
+        users = self._gather_mapped_users(directory, matrix_users)
+        inventory = await self._gather_room_inventory()
+        space = await self._find_space(inventory)
+        rooms = self._gather_group_rooms(inventory)
+        group_maps = self._gather_group_room_maps(directory, rooms)
+
+        synced = frozenset(gm.group_pk for gm in group_maps)
+        power_level = {
+            str(g["pk"]): frozenset(str(pk) for pk in g.get("users") or [])
+            for g in directory.power_level_groups
+        }
+        if scope is not None:
+            # A group not mirrored as a room is no reason to widen: its change can only move power
+            # levels, handled below. One that had a room at the last pass and has none now was
+            # deleted or filtered out, and its old room is found only by probing every room for our
+            # state event.
+            vanished = (scope.group_pks & self._synced_group_pks) - synced
+            if vanished:
+                log.info("reconcile: groups %s are no longer synced; running a full pass", sorted(vanished))
+                scope = None
+        if scope is not None:
+            # A power-level group's level applies in every room its members are in.
+            members = {
+                pk: power_level.get(pk, frozenset()) | self._power_level_members.get(pk, frozenset())
+                for pk in power_level.keys() | self._power_level_members.keys()
+            }
+            scope = expand_power_level_groups(scope, users, self._groups_by_user_pk, members)
+            affected = affected_group_pks(scope, users, self._groups_by_user_pk)
+            group_maps = [gm for gm in group_maps if gm.group_pk in affected]
+        return _PassInputs(
+            scope, directory, matrix_users, users, space, rooms, group_maps, synced, power_level
+        )
+
+    async def _plan_and_apply(self, inputs: _PassInputs, executor: OperationExecutor) -> ReconcilePlan:
+        """Plan the pass and apply it with ``executor``, stage by stage; returns everything planned.
+
+        A stage is planned only once the one before has been applied, because it reads what that one
+        created: the space first, then the group rooms and lobbies, then their avatars, then
+        membership, power levels and everything else. Planning a stage only reads.
+        """
+        self._pass_executor = executor
+        try:
+            plan = ReconcilePlan()
+            scope, group_maps = inputs.scope, inputs.group_maps
+            space = inputs.space
+            if space is None and self.config.create_matrix_rooms_in_a_matrix_space.enabled:
+                alias, stage = self._plan_space_creation()
+                report = await self._apply_stage("space", stage, executor, plan)
+                if report.failures:
+                    raise report.failures[0][1]  # no space to put the rooms in: give up on this pass
+                space_id = executor.resolve(alias)
+                assert space_id is not None
+                space = MatrixRoom(room_id=space_id, canonical_alias=alias, is_space=True)
+
+            parent_space_id = space.room_id if space else None
+            await self._apply_stage(
+                "rooms", await self._plan_rooms(group_maps, parent_space_id), executor, plan
+            )
+            self._bind_created_rooms(group_maps, executor)
+
+            stage = ReconcilePlan()
+            if space is not None and scope is None:
+                stage.extend(await self._plan_space_avatar(space))
+            for gm in group_maps:
+                if gm.room is not None:
+                    stage.extend(
+                        await self._plan_avatar(
+                            gm.room.room_id,
+                            OnbotRoomType.group_room,
+                            gm.desired.avatar_source_url,
+                            GroupRoomState(
+                                group_id=gm.group_pk, authentik_server=self.config.authentik_server.url
+                            ),
+                        )
+                    )
+            await self._apply_stage("avatars", stage, executor, plan)
+
+            stage = ReconcilePlan()
+            if scope is None:
+                stage.extend(await self._plan_obsolete_rooms(inputs.rooms, group_maps))
+            if space is not None:
+                stage.extend(await self._plan_space_membership(space, inputs.users))
+            stage.extend(
+                await self._plan_room_membership_and_levels(group_maps, inputs.users, space, inputs.directory)
+            )
+            await self._apply_stage("membership", stage, executor, plan)
+            return plan
+        finally:
+            self._pass_executor = None
+
+    async def _apply_stage(
+        self, name: str, stage: ReconcilePlan, executor: OperationExecutor, plan: ReconcilePlan
+    ) -> ExecutionReport:
+        plan.extend(stage)
+        report = await executor.apply(stage)
+        if report.planned and not executor.dry_run:
+            log.info("reconcile: %s: %s", name, report.summary())
+        return report
+
+    def _bind_created_rooms(self, group_maps: list[GroupRoomMap], executor: OperationExecutor) -> None:
+        """Point each group's map at the room and lobby created for it, if their creation went through."""
+        for gm in group_maps:
+            if gm.room is None:
+                room_id = executor.resolve(gm.desired.canonical_alias)
+                if room_id is not None:
+                    # Created with its name and topic, so they need no separate write this pass.
+                    gm.room = MatrixRoom(
+                        room_id=room_id,
+                        canonical_alias=gm.desired.canonical_alias,
+                        name=gm.desired.name,
+                        topic=gm.desired.topic,
+                    )
+            if gm.lobby is None and gm.lobby_desired is not None:
+                room_id = executor.resolve(gm.lobby_desired.canonical_alias)
+                if room_id is not None:
+                    gm.lobby = MatrixRoom(room_id=room_id, canonical_alias=gm.lobby_desired.canonical_alias)
+
+    async def _directory_snapshot(self) -> DirectorySnapshot:
+        """The handed-off snapshot if it is recent enough, else a fresh read of Authentik."""
+        snapshot, self._handoff_snapshot = self._handoff_snapshot, None
+        if snapshot is not None:
+            age = time.monotonic() - snapshot.fetched_at
+            max_age = self.config.performance.authentik_snapshot_max_age_sec
+            if age <= max_age:
+                log.debug("reconcile: reusing the Authentik snapshot of the discovery poll (%.1fs old)", age)
+                if self._lifecycle_enabled and snapshot.inactive_users is None:
+                    snapshot = replace(
+                        snapshot, inactive_users=await fetch_inactive_users(self.authentik, self.config)
+                    )
+                return snapshot
+            log.debug(
+                "reconcile: handed-off Authentik snapshot is %.1fs old (max %ss); reading afresh",
+                age,
+                max_age,
+            )
+        return await fetch_directory_snapshot(
+            self.authentik, self.config, include_inactive_users=self._lifecycle_enabled
+        )
+
+    def _gather_mapped_users(
+        self, directory: DirectorySnapshot, matrix_users: list[dict[str, Any]]
+    ) -> list[MappedUser]:
         cfg = self.config.sync_authentik_users_with_matrix_rooms
-        if not cfg.enabled:
-            return []
-        configured_paths = cfg.sync_only_users_in_authentik_pathes
-        paths: list[str | None] = [*configured_paths] if configured_paths else [None]
         by_mxid: dict[str, dict[str, Any]] = {}
-        seen_pks: set[str] = set()
-        for path in paths:
-            for user in await self.authentik.list_users(
-                filter_by_path=path,
-                filter_by_attribute=cfg.sync_only_users_with_authentik_attributes,
-                filter_groups_by_pk=cfg.sync_only_users_of_groups_with_id,
-                filter_is_active=True,
-            ):
-                if user["username"] in self.config.authentik_user_ignore_list:
-                    continue
-                if user["pk"] in seen_pks:
-                    continue
-                seen_pks.add(user["pk"])
-                try:
-                    mxid = compute_mxid(
-                        user,
-                        username_attribute=cfg.authentik_username_mapping_attribute,
-                        server_name=self.server_name,
-                    )
-                except KeyError:
-                    log.warning("cannot map MXID for Authentik user %r; skipping", user.get("pk"))
-                    continue
-                by_mxid[mxid] = user
+        for user in directory.users:  # already deduplicated across paths
+            if user["username"] in self.config.authentik_user_ignore_list:
+                continue
+            try:
+                mxid = compute_mxid(
+                    user,
+                    username_attribute=cfg.authentik_username_mapping_attribute,
+                    server_name=self.server_name,
+                )
+            except KeyError:
+                log.warning("cannot map MXID for Authentik user %r; skipping", user.get("pk"))
+                continue
+            by_mxid[mxid] = user
 
         mapped: list[MappedUser] = []
         for matrix_user in matrix_users:
@@ -184,114 +461,179 @@ class ReconcilerEngine:
             authentik_user = by_mxid.get(mxid)
             if authentik_user is not None:
                 mapped.append(MappedUser(authentik_obj=authentik_user, mxid=mxid, matrix_obj=matrix_user))
-                await self.events.emit(Signal.user_synced, mxid=mxid)
         return mapped
 
-    async def _gather_group_rooms(self) -> list[MatrixRoom]:
+    def _remember_groups(self, users: list[MappedUser], scope: ReconcileScope | None) -> None:
+        """Record each user's groups for the next scoped pass; a full pass replaces the whole map."""
+        current = {u.pk: frozenset(u.group_pks) for u in users}
+        if scope is None:
+            self._groups_by_user_pk = current
+            self._has_full_baseline = True
+            return
+        for user_pk in scope.user_pks:
+            if user_pk in current:
+                self._groups_by_user_pk[user_pk] = current[user_pk]
+            else:
+                self._groups_by_user_pk.pop(user_pk, None)
+
+    def _is_unborn(self, room_id: str) -> bool:
+        """Whether ``room_id`` stands in for a room this (dry-run) pass only planned to create."""
+        return self._pass_executor is not None and self._pass_executor.is_planned(room_id)
+
+    async def _list_room_members(self, room_id: str) -> list[str]:
+        if self._is_unborn(room_id):
+            return []
+        if self.state_cache is not None:
+            members = self.state_cache.members(room_id)
+            if members is not None:
+                return sorted(members)
+        return await self.admin.list_room_members(room_id)
+
+    async def _get_room_state(self, room_id: str, event_type: str) -> dict[str, Any] | None:
+        if self._is_unborn(room_id):
+            return None
+        return await self.effectors.get_room_state(room_id, event_type)
+
+    async def _get_room_power_levels(self, room_id: str) -> dict[str, Any]:
+        if self._is_unborn(room_id):
+            return {}
+        return await self.effectors.get_room_power_levels(room_id)
+
+    async def _gather_room_inventory(self) -> RoomInventory:
+        if not (
+            self.config.sync_matrix_rooms_based_on_authentik_groups.enabled
+            or self.config.create_matrix_rooms_in_a_matrix_space.enabled
+        ):
+            return RoomInventory()
+        perf = self.config.performance
+        return await gather_room_inventory(
+            self.admin,
+            search_term=perf.room_inventory_search_term,
+            alias_prefixes=managed_alias_prefixes(self.config)
+            if perf.room_inventory_managed_aliases_only
+            else None,
+        )
+
+    def _gather_group_rooms(self, inventory: RoomInventory) -> list[MatrixRoom]:
         if not self.config.sync_matrix_rooms_based_on_authentik_groups.enabled:
             return []
-        return [MatrixRoom.from_admin_api(r) for r in await self.admin.list_non_space_rooms()]
+        return inventory.rooms
 
-    async def _gather_group_room_maps(self, rooms: list[MatrixRoom]) -> list[GroupRoomMap]:
-        settings = self.config.sync_matrix_rooms_based_on_authentik_groups
-        if not settings.enabled:
+    def _gather_group_room_maps(
+        self, directory: DirectorySnapshot, rooms: list[MatrixRoom]
+    ) -> list[GroupRoomMap]:
+        if not self.config.sync_matrix_rooms_based_on_authentik_groups.enabled:
             return []
-        groups = await self.authentik.list_groups(filter_by_attribute=settings.only_groups_with_attributes)
-        return build_group_room_maps(groups, rooms, self.config, self.server_name)
+        return build_group_room_maps(directory.room_groups, rooms, self.config, self.server_name)
 
-    async def _resolve_space(self) -> MatrixRoom | None:
+    async def _find_space(self, inventory: RoomInventory) -> MatrixRoom | None:
+        """The configured space, or ``None`` when there is none (yet) or spaces are not used."""
         cfg = self.config.create_matrix_rooms_in_a_matrix_space
         if not cfg.enabled:
             return None
         target_alias = build_canonical(cfg.alias, self.server_name, "#")
-        for sp in await self.admin.list_spaces():
-            if sp.get("canonical_alias") == target_alias:
-                return MatrixRoom.from_admin_api(sp, is_space=True)
+        space = inventory.space(target_alias)
+        if space is not None:
+            return space
+        if inventory.narrowed:
+            # The narrowed listing may simply not have matched the space; ask for it by alias before
+            # concluding it does not exist (and creating a second one).
+            for sp in await self.admin.list_rooms(search_term=target_alias):
+                if sp.get("room_type") == SPACE_ROOM_TYPE and sp.get("canonical_alias") == target_alias:
+                    return MatrixRoom.from_admin_api(sp, is_space=True)
         if not cfg.create_matrix_space_if_not_exists.enabled:
             raise ConfigurationError(
                 f"space {target_alias!r} not found and auto-creation is disabled "
                 "(create_matrix_rooms_in_a_matrix_space.create_matrix_space_if_not_exists.enabled)"
             )
+        return None
+
+    def _plan_space_creation(self) -> tuple[str, ReconcilePlan]:
+        """Create the space and stamp it; returns its canonical alias with the plan."""
+        cfg = self.config.create_matrix_rooms_in_a_matrix_space
         create = cfg.create_matrix_space_if_not_exists
-        room_id = await self.effectors.create_space(
-            alias=cfg.alias, name=create.name, topic=create.topic, params=create.space_params
+        alias = build_canonical(cfg.alias, self.server_name, "#")
+        stage = ReconcilePlan()
+        stage.add(
+            CreateSpace(
+                alias=alias,
+                localpart=cfg.alias,
+                name=create.name,
+                topic=create.topic,
+                params=create.space_params,
+            )
         )
-        await self.effectors.put_room_state(
-            room_id,
-            event_type_name(self.server_name, OnbotRoomType.space),
-            dump_room_state(SpaceRoomState(authentik_server=self.config.authentik_server.url)),
+        stage.add(
+            PutRoomState(
+                alias,
+                event_type_name(self.server_name, OnbotRoomType.space),
+                dump_room_state(SpaceRoomState(authentik_server=self.config.authentik_server.url)),
+            )
         )
-        return MatrixRoom(room_id=room_id, canonical_alias=target_alias, is_space=True)
+        return alias, stage
 
-    async def _converge_avatar(
+    async def _plan_avatar(
         self, room_id: str, room_type: OnbotRoomType, desired: str | None, fresh_state: AnyRoomState
-    ) -> None:
+    ) -> list[Operation]:
         """Set/update a room or space icon (``m.room.avatar``) from a source URL (G6.8).
 
         Re-uploads only when the configured URL differs from the one recorded in the room's onbot
         state event (``avatar_source_url``), so a stable URL costs one state read per tick and no
         upload. Applies to already-existing rooms too, not just freshly created ones. Best-effort:
-        a fetch/upload failure is logged and retried next tick. Clearing the source URL stops future
-        updates but leaves the current icon in place (removing avatars is out of scope). ``fresh_state``
-        seeds the state event (its ``group_id``/``authentik_server``) when the room has none yet.
+        a fetch/upload failure is logged, the source URL is then not recorded, and the next tick
+        retries. Clearing the source URL stops future updates but leaves the current icon in place
+        (removing avatars is out of scope). ``fresh_state`` seeds the state event (its
+        ``group_id``/``authentik_server``) when the room has none yet.
         """
         event_type = event_type_name(self.server_name, room_type)
-        raw = await self.effectors.get_room_state(room_id, event_type)
+        raw = await self._get_room_state(room_id, event_type)
         state = parse_room_state(room_type, raw) if raw else fresh_state
         if desired == state.avatar_source_url:
-            return
+            return []
+        ops: list[Operation] = []
         if desired:
-            try:
-                mxc = await self.effectors.upload_avatar(desired)
-                await self.effectors.set_room_avatar(room_id, mxc)
-            except Exception:
-                log.exception("failed to set avatar of %s from %s", room_id, desired)
-                return
-            log.info("set avatar of %s from %s", room_id, desired)
+            ops.append(SetRoomAvatar(room_id, desired))
         state.avatar_source_url = desired
-        await self.effectors.put_room_state(room_id, event_type, dump_room_state(state))
+        ops.append(PutRoomState(room_id, event_type, dump_room_state(state)))
+        return ops
 
-    async def _converge_space_avatar(self, space: MatrixRoom) -> None:
+    async def _plan_space_avatar(self, space: MatrixRoom) -> list[Operation]:
         space_cfg = self.config.create_matrix_rooms_in_a_matrix_space.create_matrix_space_if_not_exists
-        await self._converge_avatar(
+        return await self._plan_avatar(
             space.room_id,
             OnbotRoomType.space,
             space_cfg.avatar_url,
             SpaceRoomState(authentik_server=self.config.authentik_server.url),
         )
 
-    async def _converge_rooms(self, group_maps: list[GroupRoomMap], space: MatrixRoom | None) -> None:
-        parent_space_id = space.room_id if space else None
+    async def _plan_rooms(self, group_maps: list[GroupRoomMap], parent_space_id: str | None) -> ReconcilePlan:
+        """Create (and stamp) missing group rooms and lobbies; unblock rooms whose group came back."""
+        stage = ReconcilePlan()
         for gm in group_maps:
             if gm.room is None:
-                room_id = await self.effectors.create_group_room(gm.desired, parent_space_id)
-                await self.effectors.put_room_state(
-                    room_id,
-                    event_type_name(self.server_name, OnbotRoomType.group_room),
-                    dump_room_state(
-                        GroupRoomState(
-                            group_id=gm.group_pk,
-                            authentik_server=self.config.authentik_server.url,
-                        )
-                    ),
+                stage.add(CreateRoom(OnbotRoomType.group_room, gm.desired, parent_space_id))
+                stage.add(
+                    PutRoomState(
+                        gm.desired.canonical_alias,
+                        event_type_name(self.server_name, OnbotRoomType.group_room),
+                        dump_room_state(
+                            GroupRoomState(
+                                group_id=gm.group_pk,
+                                authentik_server=self.config.authentik_server.url,
+                            )
+                        ),
+                    )
                 )
-                gm.room = MatrixRoom(room_id=room_id, canonical_alias=gm.desired.canonical_alias)
             elif await self.admin.room_is_blocked(gm.room.room_id):
                 # G2.3: a previously blocked room whose group reappeared gets unblocked.
                 log.info("unblocking room %s (group reappeared)", gm.room.room_id)
-                await self.admin.room_set_blocked(gm.room.room_id, blocked=False)
-
-            await self._converge_avatar(
-                gm.room.room_id,
-                OnbotRoomType.group_room,
-                gm.desired.avatar_source_url,
-                GroupRoomState(group_id=gm.group_pk, authentik_server=self.config.authentik_server.url),
-            )
+                stage.add(SetRoomBlocked(gm.room.room_id, blocked=False))
 
             if gm.lobby_desired is not None:
-                await self._converge_lobby_creation(gm, parent_space_id)
+                stage.extend(self._plan_lobby_creation(gm, parent_space_id))
+        return stage
 
-    async def _converge_lobby_creation(self, gm: GroupRoomMap, parent_space_id: str | None) -> None:
+    def _plan_lobby_creation(self, gm: GroupRoomMap, parent_space_id: str | None) -> list[Operation]:
         """Create the group's visitor lobby if it does not exist yet, and stamp it (ADR-0012).
 
         The lobby is stamped with ``OnbotRoomType.visitor_lobby`` — never ``group_room`` — so no later
@@ -303,28 +645,31 @@ class ReconcilerEngine:
         """
         assert gm.lobby_desired is not None
         if gm.lobby is not None:
-            return
+            return []
         if parent_space_id is None:
             log.warning(
                 "group %s requests a visitor lobby but no parent space is configured; skipping",
                 gm.group_pk,
             )
-            return
+            return []
         join_rules_content = desired_join_rules(OnbotRoomType.visitor_lobby, parent_space_id)
         assert join_rules_content is not None
-        room_id = await self.effectors.create_lobby_room(
-            gm.lobby_desired, parent_space_id, join_rules_content
-        )
-        await self.effectors.put_room_state(
-            room_id,
-            event_type_name(self.server_name, OnbotRoomType.visitor_lobby),
-            dump_room_state(
-                VisitorLobbyRoomState(group_id=gm.group_pk, authentik_server=self.config.authentik_server.url)
+        return [
+            CreateRoom(OnbotRoomType.visitor_lobby, gm.lobby_desired, parent_space_id, join_rules_content),
+            PutRoomState(
+                gm.lobby_desired.canonical_alias,
+                event_type_name(self.server_name, OnbotRoomType.visitor_lobby),
+                dump_room_state(
+                    VisitorLobbyRoomState(
+                        group_id=gm.group_pk, authentik_server=self.config.authentik_server.url
+                    )
+                ),
             ),
-        )
-        gm.lobby = MatrixRoom(room_id=room_id, canonical_alias=gm.lobby_desired.canonical_alias)
+        ]
 
-    async def _converge_obsolete_rooms(self, rooms: list[MatrixRoom], group_maps: list[GroupRoomMap]) -> None:
+    async def _plan_obsolete_rooms(
+        self, rooms: list[MatrixRoom], group_maps: list[GroupRoomMap]
+    ) -> list[Operation]:
         """Tear down rooms whose mapped Authentik group disappeared (G2.3, the inverse of G2.2).
 
         A room is obsolete when it carries our ``group_room`` *or* ``visitor_lobby`` state event but
@@ -337,107 +682,166 @@ class ReconcilerEngine:
         did: a room whose alias changed, or one created earlier in this very pass, must not read as
         obsolete. Rooms with neither of our state events are never touched, so unrelated and
         onboarding rooms are structurally out of reach.
+
+        With a :class:`~onbot.reconciler.classification.RoomClassificationIndex`, rooms already found
+        to carry neither state event are not read again until their answer is due for re-checking.
         """
         settings = self.config.sync_matrix_rooms_based_on_authentik_groups
         if not settings.enabled or not settings.disable_rooms_when_mapped_authentik_group_disappears:
-            return
+            return []
         live_group_pks = {gm.group_pk for gm in group_maps}
         mapped_room_ids = {gm.room.room_id for gm in group_maps if gm.room is not None}
         mapped_room_ids |= {gm.lobby.room_id for gm in group_maps if gm.lobby is not None}
         managed_types = (OnbotRoomType.group_room, OnbotRoomType.visitor_lobby)
-
+        index = self.classification
+        if index is not None:
+            await index.ensure_loaded()
+            index.retain(r.room_id for r in rooms)
+            for gm in group_maps:
+                if gm.room is not None:
+                    index.record(gm.room.room_id, OnbotRoomType.group_room, gm.group_pk)
+                if gm.lobby is not None:
+                    index.record(gm.lobby.room_id, OnbotRoomType.visitor_lobby, gm.group_pk)
+
+        ops: list[Operation] = []
+        skipped = 0
         for room in rooms:
             if room.room_id in mapped_room_ids:
                 continue  # backed by a live group (room or lobby); skip the state read
+            known = index.lookup(room.room_id) if index is not None else None
+            if known is not None and known.is_unmanaged:
+                skipped += 1
+                continue  # probed before and carries none of our state; see classification.py
+            found = None
             for room_type in managed_types:
-                raw = await self.effectors.get_room_state(
-                    room.room_id, event_type_name(self.server_name, room_type)
-                )
+                raw = await self._get_room_state(room.room_id, event_type_name(self.server_name, room_type))
                 if not raw:
                     continue  # not this kind of managed room
+                found = room_type
                 try:
                     state = parse_room_state(room_type, raw)
                 except ValidationError:
                     log.warning("room %s has unreadable onbot state; leaving it alone", room.room_id)
                     break
                 assert isinstance(state, GroupRoomState | VisitorLobbyRoomState)
+                if index is not None:
+                    index.record(room.room_id, room_type, state.group_id)
                 if state.group_id not in live_group_pks:
-                    await self._disable_room(room, state.group_id, settings)
+                    ops.extend(await self._plan_disable_room(room, state.group_id, settings))
                 break  # matched one managed type; do not re-check the other
+            if found is None and index is not None:
+                index.record(room.room_id, UNMANAGED)
 
-    async def _disable_room(
+        if index is not None:
+            log.debug("obsolete-room check: %d known-unmanaged rooms skipped", skipped)
+            if self._pass_executor is None or not self._pass_executor.dry_run:
+                await index.flush()
+        return ops
+
+    async def _plan_disable_room(
         self, room: MatrixRoom, group_id: str, settings: SyncMatrixRoomsBasedOnAuthentikGroups
-    ) -> None:
+    ) -> list[Operation]:
         """Block an obsolete room and clear it of users; optionally delete it (irreversible)."""
         reason = (
             f"The group mapped to this room is no longer synced from the central user directory "
             f"({self.config.authentik_server.url})."
         )
         log.info("disabling room %s: authentik group %s disappeared", room.room_id, group_id)
-        await self.admin.room_set_blocked(room.room_id, blocked=True)
+        ops: list[Operation] = [SetRoomBlocked(room.room_id, blocked=True)]
 
         bot_id = self.config.synapse_server.bot_user_id
-        for mxid in await self.admin.list_room_members(room.room_id):
+        for mxid in await self._list_room_members(room.room_id):
             if mxid == bot_id:
                 continue
-            await self.effectors.kick_user(room.room_id, mxid, reason)
+            ops.append(KickUser(room.room_id, mxid, reason))
 
         if settings.delete_disabled_rooms:
             log.warning("deleting room %s (delete_disabled_rooms is enabled)", room.room_id)
-            await self.admin.delete_room(room.room_id, block=True, purge=True, message=reason)
+            ops.append(DeleteRoom(room.room_id, reason))
+        return ops
 
-    async def _converge_space_membership(self, space: MatrixRoom, users: list[MappedUser]) -> None:
-        members = await self.admin.list_room_members(space.room_id)
+    async def _plan_space_membership(self, space: MatrixRoom, users: list[MappedUser]) -> list[Operation]:
+        members = await self._list_room_members(space.room_id)
         diff = diff_space_membership(users, members)
-        for mxid in diff.to_add:
-            await self.admin.add_user_to_room(space.room_id, mxid)
+        return [JoinUser(space.room_id, mxid) for mxid in diff.to_add]
 
-    async def _converge_room_membership_and_levels(
-        self, group_maps: list[GroupRoomMap], users: list[MappedUser], space: MatrixRoom | None
-    ) -> None:
+    async def _plan_room_membership_and_levels(
+        self,
+        group_maps: list[GroupRoomMap],
+        users: list[MappedUser],
+        space: MatrixRoom | None,
+        directory: DirectorySnapshot,
+    ) -> list[Operation]:
+        room_cfg = self.config.sync_matrix_rooms_based_on_authentik_groups
+        pl_groups = extract_power_level_groups(
+            directory.power_level_groups, room_cfg.authentik_group_attr_for_matrix_power_level
+        )
+        # Who is in which group, inverted once so every room's membership and levels are lookups.
+        index = MembershipIndex.build(users, pl_groups)
+
+        # Rooms are independent of each other, so their reads run on a bounded worker pool, and a room
+        # that cannot be read is logged and left out of the plan rather than aborting the pass. The
+        # operations for one room (membership before power levels) are applied in order.
+        limit = asyncio.Semaphore(self.config.performance.reconcile_room_concurrency)
+
+        async def _plan(gm: GroupRoomMap) -> list[Operation] | None:
+            async with limit:
+                try:
+                    return await self._plan_group_room(gm, index, space)
+                except CircuitOpenError:
+                    raise  # Synapse is down, not this room: end the pass
+                except Exception:
+                    log.exception(
+                        "failed to converge the room of group %s; continuing with the others", gm.group_pk
+                    )
+                    return None
+
+        # `gm.room` is None only if its creation failed or was skipped.
+        results = await gather_or_cancel(*(_plan(gm) for gm in group_maps if gm.room is not None))
+        failed = results.count(None)
+        if failed:
+            log.warning("%d of %d group rooms failed to converge this pass", failed, len(results))
+        return [op for ops in results if ops is not None for op in ops]
+
+    async def _plan_group_room(
+        self,
+        gm: GroupRoomMap,
+        index: MembershipIndex,
+        space: MatrixRoom | None,
+    ) -> list[Operation]:
+        """Plan one group room, then its lobby: membership, power levels, name/topic, join rule."""
+        assert gm.room is not None
         sync_cfg = self.config.sync_authentik_users_with_matrix_rooms
         room_cfg = self.config.sync_matrix_rooms_based_on_authentik_groups
         bot_id = self.config.synapse_server.bot_user_id
+        room_id = gm.room.room_id
+        actual_members = await self._list_room_members(room_id)
+        desired_mxids = desired_room_members_from_index(gm.group_pk, index)
 
-        pl_groups = extract_power_level_groups(
-            await self.authentik.list_groups(
-                filter_has_non_empty_attributes=[room_cfg.authentik_group_attr_for_matrix_power_level]
-            ),
-            room_cfg.authentik_group_attr_for_matrix_power_level,
+        mdiff = diff_room_membership(
+            desired_mxids,
+            actual_members,
+            kick_enabled=sync_cfg.kick_matrix_room_members_not_in_mapped_authentik_group_anymore,
+            protected_ids=[bot_id],
         )
-
-        for gm in group_maps:
-            if gm.room is None:  # freshly created in dry-run with synthetic id is still set; guard anyway
-                continue
-            room_id = gm.room.room_id
-            actual_members = await self.admin.list_room_members(room_id)
-            desired_mxids = desired_room_members(gm.group_pk, users)
-
-            mdiff = diff_room_membership(
-                desired_mxids,
-                actual_members,
-                kick_enabled=sync_cfg.kick_matrix_room_members_not_in_mapped_authentik_group_anymore,
-                protected_ids=[bot_id],
+        ops: list[Operation] = [JoinUser(room_id, mxid) for mxid in mdiff.to_add]
+        ops.extend(
+            KickUser(
+                room_id, mxid, "Removed: missing/revoked group membership in the central user directory."
             )
-            for mxid in mdiff.to_add:
-                await self.admin.add_user_to_room(room_id, mxid)
-            for mxid in mdiff.to_kick:
-                await self.effectors.kick_user(
-                    room_id,
-                    mxid,
-                    "Removed: missing/revoked group membership in the central user directory.",
-                )
-
-            await self._converge_power_levels(room_id, gm.group_pk, users, pl_groups, room_cfg)
-            await self._converge_room_attributes(gm)
+            for mxid in mdiff.to_kick
+        )
+        ops.extend(await self._plan_power_levels(room_id, gm.group_pk, index, room_cfg))
+        ops.extend(self._plan_room_attributes(gm))
 
-            if gm.lobby is not None:
-                await self._converge_lobby_membership_and_join_rules(gm, users, space)
+        if gm.lobby is not None:
+            ops.extend(await self._plan_lobby_membership_and_join_rules(gm, index, space))
+        return ops
 
-    async def _converge_lobby_membership_and_join_rules(
-        self, gm: GroupRoomMap, users: list[MappedUser], space: MatrixRoom | None
-    ) -> None:
-        """Converge a lobby's membership (add-only) and its ``restricted`` join rule (ADR-0012).
+    async def _plan_lobby_membership_and_join_rules(
+        self, gm: GroupRoomMap, index: MembershipIndex, space: MatrixRoom | None
+    ) -> list[Operation]:
+        """Plan a lobby's membership (add-only) and its ``restricted`` join rule (ADR-0012).
 
         A lobby is **add-only**: ``kick_enabled=False``, so nobody is ever removed — a user kicked
         from the group room keeps their seat here, and visitors who joined on purpose stay. When
@@ -455,73 +859,91 @@ class ReconcilerEngine:
         settings = resolve_room_settings(gm.group_pk, self.config)
 
         desired_mxids = (
-            desired_room_members(gm.group_pk, users) if settings.visitor_lobby_inject_group_members else set()
+            desired_room_members_from_index(gm.group_pk, index)
+            if settings.visitor_lobby_inject_group_members
+            else set()
         )
-        actual_members = await self.admin.list_room_members(room_id)
+        actual_members = await self._list_room_members(room_id)
         mdiff = diff_room_membership(
             desired_mxids, actual_members, kick_enabled=False, protected_ids=[bot_id]
         )
-        for mxid in mdiff.to_add:
-            await self.admin.add_user_to_room(room_id, mxid)
+        ops: list[Operation] = [JoinUser(room_id, mxid) for mxid in mdiff.to_add]
 
         if space is None:  # cannot express `restricted` without a space to restrict to
-            return
+            return ops
         desired = desired_join_rules(OnbotRoomType.visitor_lobby, space.room_id)
-        current = await self.effectors.get_room_state(room_id, JOIN_RULES_EVENT_TYPE) or {}
+        current = await self._get_room_state(room_id, JOIN_RULES_EVENT_TYPE) or {}
         change = join_rules_change(current, desired)
-        if change is None:
-            return
-        try:
-            await self.effectors.put_room_state(room_id, JOIN_RULES_EVENT_TYPE, change)
-        except Exception:
-            log.exception("could not set join rules on lobby %s; leaving it and continuing", room_id)
+        if change is not None:
+            ops.append(PutRoomState(room_id, JOIN_RULES_EVENT_TYPE, change))
+        return ops
 
-    async def _converge_power_levels(
+    async def _plan_power_levels(
         self,
         room_id: str,
         group_pk: str,
-        users: list[MappedUser],
-        pl_groups: list[PowerLevelGroup],
+        index: MembershipIndex,
         room_cfg: SyncMatrixRoomsBasedOnAuthentikGroups,
-    ) -> None:
-        members_in_room = [u for u in users if group_pk in u.group_pks]
-        managed = {u.mxid for u in members_in_room}
+    ) -> list[Operation]:
+        managed = set(index.members_of(group_pk))
         if not managed:
-            return
-        desired = compute_desired_user_levels(
-            members_in_room,
-            pl_groups,
+            return []
+        desired = compute_desired_user_levels_from_index(
+            index.users_in(group_pk),
+            index,
             make_superusers_admin=room_cfg.make_authentik_superusers_matrix_room_admin,
         )
-        current = await self.effectors.get_room_power_levels(room_id)
+        current = await self._get_room_power_levels(room_id)
         current_users = dict(current.get("users", {}))
         merged = merge_power_levels(current_users, desired, managed)
-        if merged != current_users:
-            new_levels = {**current, "users": merged}
-            await self.effectors.set_room_power_levels(room_id, new_levels)
+        if merged == current_users:
+            return []
+        return [SetPowerLevels(room_id, {**current, "users": merged})]
 
-    async def _converge_room_attributes(self, gm: GroupRoomMap) -> None:
+    def _plan_room_attributes(self, gm: GroupRoomMap) -> list[Operation]:
         if not self.config.matrix_room_default_settings.keep_updating_matrix_attributes_from_authentik:
-            return
+            return []
         assert gm.room is not None
+        ops: list[Operation] = []
         if gm.desired.name is not None and gm.room.name != gm.desired.name:
-            await self.effectors.set_room_name(gm.room.room_id, gm.desired.name)
+            ops.append(SetRoomName(gm.room.room_id, gm.desired.name))
         if gm.desired.topic is not None and gm.room.topic != gm.desired.topic:
-            await self.effectors.set_room_topic(gm.room.room_id, gm.desired.topic)
+            ops.append(SetRoomTopic(gm.room.room_id, gm.desired.topic))
+        return ops
 
     # --- lifecycle (AD-5, G9.*): quarantined, invoked only from the reconcile result ---
 
-    async def _converge_lifecycle(self, matrix_users: list[dict[str, Any]], active_mxids: set[str]) -> None:
-        if self.lifecycle is None:
-            return
+    @property
+    def _lifecycle_enabled(self) -> bool:
         sync_cfg = self.config.sync_authentik_users_with_matrix_rooms
-        if not sync_cfg.deactivate_disabled_authentik_users_in_matrix.enabled:
+        return self.lifecycle is not None and sync_cfg.deactivate_disabled_authentik_users_in_matrix.enabled
+
+    async def _converge_lifecycle(
+        self,
+        directory: DirectorySnapshot,
+        matrix_users: list[dict[str, Any]],
+        users: list[MappedUser],
+        scope: ReconcileScope | None,
+    ) -> None:
+        if self.lifecycle is None or not self._lifecycle_enabled:
+            return
+        active_mxids = {u.mxid for u in users}
+        if scope is None:
+            await self.lifecycle.reconcile_accounts(
+                self._gather_orphaned_mxids(directory, matrix_users, active_mxids)
+            )
             return
-        orphaned = await self._gather_orphaned_mxids(matrix_users, active_mxids)
-        await self.lifecycle.reconcile_accounts(orphaned)
+        orphaned = self._gather_orphaned_mxids(directory, matrix_users, active_mxids, only_pks=scope.user_pks)
+        in_scope = {u.mxid for u in users if u.pk in scope.user_pks} | orphaned
+        await self.lifecycle.reconcile_accounts(orphaned, only=in_scope)
 
-    async def _gather_orphaned_mxids(
-        self, matrix_users: list[dict[str, Any]], active_mxids: set[str]
+    def _gather_orphaned_mxids(
+        self,
+        directory: DirectorySnapshot,
+        matrix_users: list[dict[str, Any]],
+        active_mxids: set[str],
+        *,
+        only_pks: frozenset[str] | None = None,
     ) -> set[str]:
         """MXIDs whose Authentik account is disabled but a Matrix account still exists (G9.1).
 
@@ -531,16 +953,15 @@ class ReconcilerEngine:
         entry. The bot user and the ignore lists (G12.1) are always excluded.
         """
         cfg = self.config.sync_authentik_users_with_matrix_rooms
-        disabled_users = await self.authentik.list_users(
-            filter_by_attribute=cfg.sync_only_users_with_authentik_attributes,
-            filter_is_active=False,
-        )
+        disabled_users = directory.inactive_users or []
         matrix_mxids = {u["name"] for u in matrix_users}
         bot_id = self.config.synapse_server.bot_user_id
         orphaned: set[str] = set()
         for user in disabled_users:
             if user.get("username") in self.config.authentik_user_ignore_list:
                 continue
+            if only_pks is not None and str(user.get("pk")) not in only_pks:
+                continue
             try:
                 mxid = compute_mxid(
                     user,
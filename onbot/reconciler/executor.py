@@ -0,0 +1,235 @@
+"""Apply a :class:`~onbot.reconciler.plan.ReconcilePlan` to the homeserver.
+
+The executor is the only part of a pass that writes. Given a plan it
+
+* **coalesces** it (:meth:`~onbot.reconciler.plan.ReconcilePlan.coalesced`), so a piece of state
+  written twice is written once;
+* **groups** the operations by room and runs each room's operations strictly in plan order, while
+  different rooms run in parallel up to ``performance.reconcile_room_concurrency``;
+* caps how many operations of one kind are in flight across all rooms
+  (``performance.operation_concurrency``), so for example room creations do not pile up;
+* times every operation and reports per-kind latency in an :class:`ExecutionReport`.
+
+A failing operation is logged and the rest of *its room's* operations are skipped for this pass —
+a room that refuses one write (the bot lost its power level, say) would most likely refuse the next,
+and a later write may depend on the failed one (the state event recording an avatar that did not
+upload). Other rooms carry on; the next pass plans the skipped work again. The exception is an
+open circuit (:class:`~onbot.clients.circuit.CircuitOpenError`): the homeserver itself is down, so
+no room is started after it and :meth:`OperationExecutor.apply` raises it once the rooms already
+under way have stopped.
+
+With ``dry_run`` nothing is written: creations "succeed" with the room's alias standing in for its
+id (:meth:`OperationExecutor.is_planned`), so the rest of a pass can be planned against rooms that
+do not exist yet.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+
+from onbot.clients.circuit import CircuitOpenError
+from onbot.clients.synapse_admin import ApiClientSynapseAdmin
+from onbot.config import OperationKind
+from onbot.logging import get_logger
+from onbot.reconciler.effectors import MatrixEffectors
+from onbot.reconciler.plan import (
+    CreateRoom,
+    CreateSpace,
+    DeleteRoom,
+    JoinUser,
+    KickUser,
+    Operation,
+    PutRoomState,
+    ReconcilePlan,
+    SetPowerLevels,
+    SetRoomAvatar,
+    SetRoomBlocked,
+    SetRoomName,
+    SetRoomTopic,
+)
+from onbot.reconciler.state import OnbotRoomType
+from onbot.state_cache import RoomStateCache
+
+log = get_logger(__name__)
+
+
+@dataclass(slots=True)
+class LatencyStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass(slots=True)
+class ExecutionReport:
+    """What one :meth:`OperationExecutor.apply` did, and how long each kind of operation took."""
+
+    planned: int = 0
+    coalesced: int = 0
+    applied: int = 0
+    skipped: int = 0
+    failures: list[tuple[Operation, BaseException]] = field(default_factory=list)
+    latency: dict[str, LatencyStats] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.applied} of {self.planned} operations applied in {self.elapsed:.2f}s "
+            f"({self.coalesced} coalesced, {len(self.failures)} failed, {self.skipped} skipped)"
+        )
+
+    def latency_summary(self) -> str:
+        return ", ".join(
+            f"{kind} n={s.count} mean={s.mean * 1000:.0f}ms max={s.max * 1000:.0f}ms"
+            for kind, s in sorted(self.latency.items())
+        )
+
+
+class OperationExecutor:
+    """Runs plans: coalesced, per room in order, rooms in parallel, bounded per operation kind."""
+
+    def __init__(
+        self,
+        admin: ApiClientSynapseAdmin,
+        effectors: MatrixEffectors,
+        *,
+        room_concurrency: int = 4,
+        operation_concurrency: Mapping[OperationKind, int] | None = None,
+        state_cache: RoomStateCache | None = None,
+        dry_run: bool = False,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.admin = admin
+        self.effectors = effectors
+        self.state_cache = state_cache
+        self.dry_run = dry_run
+        self._clock = clock
+        self._room_limit = asyncio.Semaphore(room_concurrency)
+        self._kind_limits = {kind: asyncio.Semaphore(n) for kind, n in (operation_concurrency or {}).items()}
+        # Canonical alias -> room id of every room created through this executor.
+        self.created: dict[str, str] = {}
+        # The first CircuitOpenError of the current apply(); the rooms not yet started are skipped.
+        self._aborted: CircuitOpenError | None = None
+
+    def resolve(self, target: str) -> str | None:
+        """The room id ``target`` names: itself, or for an alias the id of the room created under it."""
+        if target.startswith("#"):
+            return self.created.get(target)
+        return target
+
+    def is_planned(self, room_id: str) -> bool:
+        """Whether ``room_id`` is a dry-run stand-in for a room that was never actually created."""
+        return self.dry_run and room_id in self.created
+
+    async def apply(self, plan: ReconcilePlan) -> ExecutionReport:
+        report = ExecutionReport(planned=len(plan))
+        rooms = plan.by_room()
+        report.coalesced = report.planned - sum(len(ops) for ops in rooms.values())
+        started = self._clock()
+        self._aborted = None
+        await asyncio.gather(*(self._apply_room(target, ops, report) for target, ops in rooms.items()))
+        report.elapsed = self._clock() - started
+        if self._aborted is not None:
+            log.warning("stopped applying the plan: %s; %s", self._aborted, report.summary())
+            raise self._aborted
+        if report.planned:
+            log.debug("applied plan: %s; latency: %s", report.summary(), report.latency_summary() or "-")
+        return report
+
+    async def _apply_room(self, target: str, ops: list[Operation], report: ExecutionReport) -> None:
+        async with self._room_limit:
+            for i, op in enumerate(ops):
+                if self._aborted is not None:
+                    report.skipped += len(ops) - i
+                    return
+                try:
+                    await self._apply_one(op, report)
+                except CircuitOpenError as exc:
+                    # The upstream is down: every remaining room would fail the same way.
+                    self._aborted = self._aborted or exc
+                    report.skipped += len(ops) - i
+                    return
+                except Exception as exc:
+                    rest = len(ops) - i - 1
+                    log.exception(
+                        "operation failed: %s; skipping the %d remaining operations on %s this pass",
+                        op.describe(),
+                        rest,
+                        target,
+                    )
+                    report.failures.append((op, exc))
+                    report.skipped += rest
+                    return
+
+    async def _apply_one(self, op: Operation, report: ExecutionReport) -> None:
+        limit = self._kind_limits.get(op.kind)
+        if limit is None:
+            await self._timed(op, report)
+            return
+        async with limit:
+            await self._timed(op, report)
+
+    async def _timed(self, op: Operation, report: ExecutionReport) -> None:
+        started = self._clock()
+        await self._run(op)
+        report.latency.setdefault(op.kind, LatencyStats()).add(self._clock() - started)
+        report.applied += 1
+
+    async def _run(self, op: Operation) -> None:
+        if isinstance(op, CreateSpace | CreateRoom):
+            self.created[op.target] = await self._create(op)
+            return
+        room_id = self.resolve(op.target)
+        if room_id is None:
+            raise LookupError(f"{op.target} was to be created earlier in this plan but was not")
+        if self.dry_run:
+            return
+        match op:
+            case JoinUser():
+                await self.admin.add_user_to_room(room_id, op.user_id)
+                if self.state_cache is not None:
+                    self.state_cache.note_membership(room_id, op.user_id, "join")
+            case KickUser():
+                await self.effectors.kick_user(room_id, op.user_id, op.reason)
+            case SetPowerLevels():
+                await self.effectors.set_room_power_levels(room_id, dict(op.content))
+            case SetRoomName():
+                await self.effectors.set_room_name(room_id, op.name)
+            case SetRoomTopic():
+                await self.effectors.set_room_topic(room_id, op.topic)
+            case SetRoomAvatar():
+                mxc = await self.effectors.upload_avatar(op.source_url)
+                await self.effectors.set_room_avatar(room_id, mxc)
+                log.info("set avatar of %s from %s", room_id, op.source_url)
+            case PutRoomState():
+                await self.effectors.put_room_state(room_id, op.event_type, dict(op.content))
+            case SetRoomBlocked():
+                await self.admin.room_set_blocked(room_id, blocked=op.blocked)
+            case DeleteRoom():
+                await self.admin.delete_room(room_id, block=True, purge=True, message=op.message)
+            case _:  # pragma: no cover - every Operation subclass is handled above
+                raise TypeError(f"unknown operation {op!r}")
+
+    async def _create(self, op: CreateSpace | CreateRoom) -> str:
+        if self.dry_run:
+            return op.target  # the alias stands in for the id of a room that does not exist
+        if isinstance(op, CreateSpace):
+            return await self.effectors.create_space(
+                alias=op.localpart, name=op.name, topic=op.topic, params=op.params
+            )
+        if op.room_type is OnbotRoomType.visitor_lobby:
+            assert op.parent_space_id is not None and op.join_rules is not None
+            return await self.effectors.create_lobby_room(op.attrs, op.parent_space_id, op.join_rules)
+        return await self.effectors.create_group_room(op.attrs, op.parent_space_id)
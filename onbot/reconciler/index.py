@@ -0,0 +1,72 @@
+"""Who is in which group, computed once per pass (pure logic).
+
+Membership and power levels are decided per room, and both questions used to be answered by scanning
+every synced user for every group room — "which users list this group?" for the desired members,
+and again, crossed with every power-level group, for the desired levels. :class:`MembershipIndex`
+inverts that once per pass into lookups: the members of a group, the groups of a member, and each
+user's highest power-level-group level. The pure functions in ``membership`` and ``power_levels``
+accept it in place of the user and group lists they otherwise scan, with identical results.
+
+The index is immutable (read-only mappings over frozensets), so rooms converging concurrently can
+share it freely.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+
+from onbot.models import MappedUser
+
+if TYPE_CHECKING:
+    from onbot.reconciler.power_levels import PowerLevelGroup
+
+
+@dataclass(frozen=True, slots=True)
+class MembershipIndex:
+    """Group → member MXIDs, MXID → group pks, and user pk → highest power-level-group level."""
+
+    members_by_group: Mapping[str, frozenset[str]]
+    groups_by_mxid: Mapping[str, frozenset[str]]
+    users_by_mxid: Mapping[str, MappedUser]
+    level_by_user_pk: Mapping[str, int]
+
+    @classmethod
+    def build(
+        cls, users: Iterable[MappedUser], power_level_groups: Iterable[PowerLevelGroup] = ()
+    ) -> MembershipIndex:
+        members: defaultdict[str, set[str]] = defaultdict(set)
+        groups_by_mxid: dict[str, frozenset[str]] = {}
+        users_by_mxid: dict[str, MappedUser] = {}
+        for user in users:
+            group_pks = frozenset(user.group_pks)  # read groups_obj once per user, not per room
+            groups_by_mxid[user.mxid] = group_pks
+            users_by_mxid[user.mxid] = user
+            for group_pk in group_pks:
+                members[group_pk].add(user.mxid)
+
+        levels: dict[str, int] = {}
+        for group in power_level_groups:
+            for member_pk in group.member_pks:
+                key = str(member_pk)
+                levels[key] = max(levels.get(key, group.level), group.level)
+
+        return cls(
+            members_by_group=MappingProxyType({pk: frozenset(m) for pk, m in members.items()}),
+            groups_by_mxid=MappingProxyType(groups_by_mxid),
+            users_by_mxid=MappingProxyType(users_by_mxid),
+            level_by_user_pk=MappingProxyType(levels),
+        )
+
+    def members_of(self, group_pk: str) -> frozenset[str]:
+        return self.members_by_group.get(group_pk, frozenset())
+
+    def users_in(self, group_pk: str) -> list[MappedUser]:
+        return [self.users_by_mxid[mxid] for mxid in sorted(self.members_of(group_pk))]
+
+    def group_level(self, user_pk: str) -> int | None:
+        """The highest level any power-level group confers on ``user_pk``, if any does."""
+        return self.level_by_user_pk.get(str(user_pk))
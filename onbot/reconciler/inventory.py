@@ -0,0 +1,93 @@
+"""One listing of the homeserver's rooms per reconcile pass.
+
+Finding the space and finding the group rooms used to be two separate walks of the Synapse room
+list, each collecting every room on the server — every DM and every room the bot has nothing to do
+with — into memory before throwing most of it away. :func:`gather_room_inventory` walks the list
+once, page by page, and keeps only a compact :class:`~onbot.models.MatrixRoom` per room of interest
+in a :class:`RoomInventory` indexed by canonical alias and room type, which every phase of the pass
+then shares.
+
+Two optional narrowings keep a large homeserver's unrelated rooms out of the walk altogether
+(``performance.room_inventory_*``):
+
+* a Synapse ``search_term``, matched server-side against room name, alias and id;
+* *managed aliases only*: only rooms whose alias starts with one of the configured alias prefixes
+  are indexed, and when there is a single prefix it is also sent as the ``search_term``.
+
+Spaces are always indexed — there are few of them and the configured space need not share the
+prefix — but a narrowed listing may still have filtered it out server-side, so an inventory records
+whether it was narrowed and the engine then looks the space up by its alias directly.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from onbot.clients.synapse_admin import ApiClientSynapseAdmin
+from onbot.logging import get_logger
+from onbot.models import MatrixRoom
+
+log = get_logger(__name__)
+
+SPACE_ROOM_TYPE = "m.space"
+
+
+def _alias_localpart(canonical_alias: str | None) -> str | None:
+    if not canonical_alias:
+        return None
+    return canonical_alias.removeprefix("#").split(":", 1)[0]
+
+
+@dataclass(slots=True)
+class RoomInventory:
+    """The rooms of one listing: non-space rooms and spaces, each indexed by canonical alias."""
+
+    rooms: list[MatrixRoom] = field(default_factory=list)
+    spaces: list[MatrixRoom] = field(default_factory=list)
+    narrowed: bool = False
+    scanned: int = 0
+    _rooms_by_alias: dict[str, MatrixRoom] = field(default_factory=dict)
+    _spaces_by_alias: dict[str, MatrixRoom] = field(default_factory=dict)
+
+    def add(self, obj: dict[str, Any]) -> None:
+        is_space = obj.get("room_type") == SPACE_ROOM_TYPE
+        room = MatrixRoom.from_admin_api(obj, is_space=is_space)
+        (self.spaces if is_space else self.rooms).append(room)
+        if room.canonical_alias:
+            (self._spaces_by_alias if is_space else self._rooms_by_alias)[room.canonical_alias] = room
+
+    def room(self, canonical_alias: str) -> MatrixRoom | None:
+        return self._rooms_by_alias.get(canonical_alias)
+
+    def space(self, canonical_alias: str) -> MatrixRoom | None:
+        return self._spaces_by_alias.get(canonical_alias)
+
+
+async def gather_room_inventory(
+    admin: ApiClientSynapseAdmin,
+    *,
+    search_term: str | None = None,
+    alias_prefixes: Iterable[str] | None = None,
+) -> RoomInventory:
+    """Walk the room list once, keeping spaces and (with ``alias_prefixes``) only the managed rooms."""
+    prefixes = tuple(alias_prefixes) if alias_prefixes is not None else None
+    if search_term is None and prefixes is not None and len(prefixes) == 1:
+        search_term = prefixes[0]
+    inventory = RoomInventory(narrowed=search_term is not None)
+    async for obj in admin.iter_rooms(search_term=search_term):
+        inventory.scanned += 1
+        if prefixes is not None and obj.get("room_type") != SPACE_ROOM_TYPE:
+            localpart = _alias_localpart(obj.get("canonical_alias"))
+            if localpart is None or not localpart.startswith(prefixes):
+                continue
+        inventory.add(obj)
+    log.debug(
+        "room inventory: %d rooms and %d spaces of %d listed%s",
+        len(inventory.rooms),
+        len(inventory.spaces),
+        inventory.scanned,
+        f" (search_term={search_term!r})" if search_term is not None else "",
+    )
+    return inventory
@@ -11,6 +11,7 @@ from collections.abc import Iterable
 from dataclasses import dataclass, field
 
 from onbot.models import MappedUser
+from onbot.reconciler.index import MembershipIndex
 
 
 @dataclass(frozen=True, slots=True)
@@ -24,6 +25,11 @@ def desired_room_members(group_pk: str, mapped_users: Iterable[MappedUser]) -> s
     return {u.mxid for u in mapped_users if group_pk in u.group_pks}
 
 
+def desired_room_members_from_index(group_pk: str, index: MembershipIndex) -> set[str]:
+    """:func:`desired_room_members` as a lookup in the pass's membership index."""
+    return set(index.members_of(group_pk))
+
+
 def diff_room_membership(
     desired_mxids: set[str],
     actual_member_ids: Iterable[str],
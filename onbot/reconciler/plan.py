@@ -0,0 +1,286 @@
+"""What a reconcile pass is going to change, as data (pure).
+
+The engine used to decide and act in the same breath: each convergence step read a room, worked out
+the difference and wrote it straight away, so nothing could be deduplicated, reordered or run
+alongside another room's writes, and nobody could see what a pass was about to do before it did it.
+
+A pass now *plans* first: the engine's convergence steps only read, and emit typed
+:class:`Operation` values into a :class:`ReconcilePlan`. The
+:class:`~onbot.reconciler.executor.OperationExecutor` then applies the plan. ``onbot plan`` prints
+one without applying it.
+
+A room created in the same plan has no id yet; operations on it name it by its canonical alias
+(``#…``), which the executor resolves once the creation has run. Room ids always start with ``!``,
+so the two never collide.
+
+Every operation has a :attr:`~Operation.key` naming the piece of state it writes. Two operations
+with the same key write the same thing, so only the later one matters; :meth:`ReconcilePlan.coalesced`
+drops the earlier ones.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any, ClassVar
+
+from onbot.config import OperationKind
+from onbot.models import RoomCreateAttributes
+from onbot.reconciler.state import OnbotRoomType
+
+
+@dataclass(frozen=True, slots=True)
+class Operation(ABC):
+    """One write the reconciler wants made. Subclasses set :attr:`kind` and a :attr:`target` room."""
+
+    kind: ClassVar[OperationKind]
+
+    @property
+    @abstractmethod
+    def target(self) -> str:
+        """The room this operation writes to: a room id, or the alias of a room created in the plan."""
+
+    @property
+    def key(self) -> tuple[str, ...]:
+        """What this operation writes; of two operations with the same key, only the later counts."""
+        return (self.kind, self.target)
+
+    @abstractmethod
+    def describe(self) -> str:
+        """One line for ``onbot plan`` and the logs."""
+
+
+@dataclass(frozen=True, slots=True)
+class CreateSpace(Operation):
+    """Create the parent space. ``alias`` is its canonical alias, ``localpart`` the one to request."""
+
+    kind: ClassVar[OperationKind] = "create_room"
+    alias: str
+    localpart: str
+    name: str
+    topic: str
+    params: dict[str, Any]
+
+    @property
+    def target(self) -> str:
+        return self.alias
+
+    def describe(self) -> str:
+        return f"create space {self.alias} ({self.name!r})"
+
+
+@dataclass(frozen=True, slots=True)
+class CreateRoom(Operation):
+    """Create a group room or a visitor lobby (``join_rules`` set at creation, lobbies only)."""
+
+    kind: ClassVar[OperationKind] = "create_room"
+    room_type: OnbotRoomType
+    attrs: RoomCreateAttributes
+    parent_space_id: str | None
+    join_rules: dict[str, Any] | None = None
+
+    @property
+    def target(self) -> str:
+        return self.attrs.canonical_alias
+
+    def describe(self) -> str:
+        where = f" in {self.parent_space_id}" if self.parent_space_id else ""
+        return f"create {self.room_type} {self.attrs.canonical_alias} ({self.attrs.name!r}){where}"
+
+
+@dataclass(frozen=True, slots=True)
+class JoinUser(Operation):
+    """Force-join a user into a room (admin API)."""
+
+    kind: ClassVar[OperationKind] = "join"
+    room_id: str
+    user_id: str
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    @property
+    def key(self) -> tuple[str, ...]:
+        return (self.kind, self.room_id, self.user_id)
+
+    def describe(self) -> str:
+        return f"join {self.user_id} to {self.room_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class KickUser(Operation):
+    kind: ClassVar[OperationKind] = "kick"
+    room_id: str
+    user_id: str
+    reason: str | None = None
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    @property
+    def key(self) -> tuple[str, ...]:
+        return (self.kind, self.room_id, self.user_id)
+
+    def describe(self) -> str:
+        return f"kick {self.user_id} from {self.room_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class SetPowerLevels(Operation):
+    """Replace a room's ``m.room.power_levels`` content."""
+
+    kind: ClassVar[OperationKind] = "set_power_levels"
+    room_id: str
+    content: dict[str, Any]
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    def describe(self) -> str:
+        return f"set power levels in {self.room_id}: users={self.content.get('users', {})}"
+
+
+@dataclass(frozen=True, slots=True)
+class SetRoomName(Operation):
+    kind: ClassVar[OperationKind] = "set_name"
+    room_id: str
+    name: str
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    def describe(self) -> str:
+        return f"set name of {self.room_id} to {self.name!r}"
+
+
+@dataclass(frozen=True, slots=True)
+class SetRoomTopic(Operation):
+    kind: ClassVar[OperationKind] = "set_topic"
+    room_id: str
+    topic: str
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    def describe(self) -> str:
+        return f"set topic of {self.room_id} to {self.topic!r}"
+
+
+@dataclass(frozen=True, slots=True)
+class SetRoomAvatar(Operation):
+    """Fetch ``source_url``, upload it to the media repo and make it the room's avatar."""
+
+    kind: ClassVar[OperationKind] = "set_avatar"
+    room_id: str
+    source_url: str
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    def describe(self) -> str:
+        return f"set avatar of {self.room_id} from {self.source_url}"
+
+
+@dataclass(frozen=True, slots=True)
+class PutRoomState(Operation):
+    kind: ClassVar[OperationKind] = "put_state"
+    room_id: str
+    event_type: str
+    content: dict[str, Any]
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    @property
+    def key(self) -> tuple[str, ...]:
+        return (self.kind, self.room_id, self.event_type)
+
+    def describe(self) -> str:
+        return f"set state {self.event_type} in {self.room_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class SetRoomBlocked(Operation):
+    """Block (or unblock) a room through the admin API."""
+
+    kind: ClassVar[OperationKind] = "block"
+    room_id: str
+    blocked: bool
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    def describe(self) -> str:
+        return f"{'block' if self.blocked else 'unblock'} {self.room_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class DeleteRoom(Operation):
+    """Delete and purge a room, keeping it blocked (irreversible)."""
+
+    kind: ClassVar[OperationKind] = "delete_room"
+    room_id: str
+    message: str
+
+    @property
+    def target(self) -> str:
+        return self.room_id
+
+    def describe(self) -> str:
+        return f"delete {self.room_id}"
+
+
+@dataclass(slots=True)
+class ReconcilePlan:
+    """An ordered list of operations. Order matters within a room; rooms are independent."""
+
+    operations: list[Operation] = field(default_factory=list)
+
+    def add(self, operation: Operation) -> None:
+        self.operations.append(operation)
+
+    def extend(self, operations: Iterable[Operation]) -> None:
+        self.operations.extend(operations)
+
+    def __iter__(self) -> Iterator[Operation]:
+        return iter(self.operations)
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def coalesced(self) -> list[Operation]:
+        """The plan without writes a later operation supersedes; each survivor keeps its last position."""
+        last = {op.key: i for i, op in enumerate(self.operations)}
+        return [op for i, op in enumerate(self.operations) if last[op.key] == i]
+
+    def by_room(self) -> dict[str, list[Operation]]:
+        """The coalesced operations grouped by target room, each group in plan order."""
+        rooms: dict[str, list[Operation]] = {}
+        for op in self.coalesced():
+            rooms.setdefault(op.target, []).append(op)
+        return rooms
+
+    def counts(self) -> Counter[str]:
+        return Counter(op.kind for op in self.operations)
+
+    def render(self) -> str:
+        """A human-readable listing, one room per block, for ``onbot plan``."""
+        if not self.operations:
+            return "Nothing to change."
+        counts = ", ".join(f"{kind} {n}" for kind, n in sorted(self.counts().items()))
+        lines = [f"{len(self.operations)} operations ({counts})"]
+        for room, ops in self.by_room().items():
+            lines.append("")
+            lines.append(room)
+            lines.extend(f"  {op.describe()}" for op in ops)
+        return "\n".join(lines)
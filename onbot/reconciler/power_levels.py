@@ -19,6 +19,7 @@ from dataclasses import dataclass
 from typing import Any
 
 from onbot.models import MappedUser
+from onbot.reconciler.index import MembershipIndex
 from onbot.utils import get_nested_dict_val_by_path
 
 ROOM_ADMIN_LEVEL = 100
@@ -77,6 +78,28 @@ def compute_desired_user_levels(
     return desired
 
 
+def compute_desired_user_levels_from_index(
+    members: Iterable[MappedUser],
+    index: MembershipIndex,
+    *,
+    make_superusers_admin: bool,
+    admin_level: int = ROOM_ADMIN_LEVEL,
+) -> dict[str, int]:
+    """:func:`compute_desired_user_levels` with each member's group level looked up in ``index``.
+
+    The index was built from the pass's power-level groups, so this gives the same result without
+    scanning every group for every member.
+    """
+    desired: dict[str, int] = {}
+    for member in members:
+        level = index.group_level(str(member.authentik_obj.get("pk")))
+        if make_superusers_admin and member.is_superuser:
+            level = admin_level
+        if level is not None:
+            desired[member.mxid] = level
+    return desired
+
+
 def merge_power_levels(
     current_users: dict[str, int],
     desired: dict[str, int],
@@ -28,8 +28,8 @@ log = get_logger(__name__)
 def filter_synced_groups(groups: list[dict[str, Any]], config: OnbotConfig) -> list[dict[str, Any]]:
     """Apply the selective group→room rules (G2.5): ignore list, name prefix, parentage.
 
-    The attribute filter (``only_groups_with_attributes``) is applied at the Authentik query level,
-    so it is not repeated here.
+    The attribute filter (``only_groups_with_attributes``) is applied when the per-pass directory
+    snapshot is built (:mod:`onbot.directory`), so it is not repeated here.
     """
     settings = config.sync_matrix_rooms_based_on_authentik_groups
     result = groups
@@ -62,6 +62,19 @@ def resolve_room_settings(group_pk: str, config: OnbotConfig) -> MatrixDynamicRo
     )
 
 
+def managed_alias_prefixes(config: OnbotConfig) -> set[str]:
+    """The alias localpart prefixes of every room this bot manages, as they appear in the alias.
+
+    Derived from ``alias_prefix`` in the default settings and every per-group override, with the
+    dashes dropped just as :func:`compute_room_attributes` drops them. An empty string in the result
+    means some group's rooms have no prefix at all.
+    """
+    overrides = config.per_authentik_group_pk_matrix_room_settings
+    return {(resolve_room_settings(pk, config).alias_prefix or "").replace("-", "") for pk in overrides} | {
+        (config.matrix_room_default_settings.alias_prefix or "").replace("-", "")
+    }
+
+
 def compute_room_attributes(
     group: dict[str, Any], config: OnbotConfig, server_name: str
 ) -> RoomCreateAttributes:
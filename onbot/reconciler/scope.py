@@ -0,0 +1,84 @@
+"""Which part of the directory a reconcile pass converges (pure logic).
+
+A full pass reads every managed room on the homeserver, which is the right thing on the scheduled
+tick — it is the drift-repair net — and the wrong thing when the caller already knows that one user
+was hired or one group was renamed. A :class:`ReconcileScope` names the Authentik user and group pks
+that changed, and :func:`affected_group_pks` turns that into the set of group rooms a scoped pass
+must visit.
+
+A user who *left* a group no longer lists it in ``groups_obj``, so the current directory alone cannot
+say which room they must be kicked from. The engine therefore remembers each user's groups as of the
+previous pass and hands that in as ``previous_groups``; the affected rooms are the union of before
+and after.
+
+A power-level group is different from a room group: its level applies in every room its members sit
+in, not in a room of its own. :func:`expand_power_level_groups` therefore turns a changed power-level
+group into its members, now and at the previous pass, whose rooms then follow as for any scoped user.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+
+from onbot.models import MappedUser
+
+
+@dataclass(frozen=True, slots=True)
+class ReconcileScope:
+    """Authentik user and group pks a pass should converge; everything else is left alone."""
+
+    user_pks: frozenset[str] = frozenset()
+    group_pks: frozenset[str] = frozenset()
+
+    @classmethod
+    def of(cls, *, user_pks: Iterable[str] = (), group_pks: Iterable[str] = ()) -> ReconcileScope:
+        return cls(frozenset(map(str, user_pks)), frozenset(map(str, group_pks)))
+
+    def __or__(self, other: ReconcileScope) -> ReconcileScope:
+        return ReconcileScope(self.user_pks | other.user_pks, self.group_pks | other.group_pks)
+
+    def __bool__(self) -> bool:
+        return bool(self.user_pks or self.group_pks)
+
+    def __str__(self) -> str:
+        return f"{len(self.user_pks)} users, {len(self.group_pks)} groups"
+
+
+def affected_group_pks(
+    scope: ReconcileScope,
+    users: Iterable[MappedUser],
+    previous_groups: Mapping[str, frozenset[str]],
+) -> set[str]:
+    """Groups whose rooms a scoped pass must converge.
+
+    That is every group named in ``scope``, plus every group a scoped user belongs to now (to be
+    added) or belonged to at the previous pass (to be kicked, or to have a power level dropped).
+    """
+    affected = set(scope.group_pks)
+    for user in users:
+        if user.pk in scope.user_pks:
+            affected |= user.group_pks
+    for user_pk in scope.user_pks:
+        affected |= previous_groups.get(user_pk, frozenset())
+    return affected
+
+
+def expand_power_level_groups(
+    scope: ReconcileScope,
+    users: Iterable[MappedUser],
+    previous_groups: Mapping[str, frozenset[str]],
+    power_level_members: Mapping[str, Iterable[str]],
+) -> ReconcileScope:
+    """Add to ``scope`` every user who is, or was at the previous pass, in a changed power-level group.
+
+    ``power_level_members`` maps each power-level group, current or previous, to the user pks it has
+    listed as members (a group's ``users``); a user's own ``groups_obj`` counts as well.
+    """
+    changed = scope.group_pks & power_level_members.keys()
+    if not changed:
+        return scope
+    members = {str(pk) for group_pk in changed for pk in power_level_members[group_pk]}
+    members |= {user.pk for user in users if user.group_pks & changed}
+    members |= {user_pk for user_pk, groups in previous_groups.items() if groups & changed}
+    return scope | ReconcileScope.of(user_pks=members)
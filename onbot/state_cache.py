@@ -0,0 +1,177 @@
+"""Sync-fed cache of the room facts the reconciler reads every pass.
+
+A reconcile compares desired against *actual* state, and actual state used to mean HTTP: the member
+list of every managed room, its power levels, the onbot state event, and a lobby's join rule — read
+fresh on every tick even though almost none of it changed. The :class:`~onbot.sync.SyncPump` already
+streams exactly those facts, so :class:`RoomStateCache` subscribes to them and keeps a copy current.
+The engine (members) and :class:`~onbot.clients.matrix.CSApiEffectors` (state events) read through
+it, and a steady-state pass then costs close to zero Synapse reads.
+
+A cached answer is only ever given when it is known to be complete and current; everything else is a
+*miss*, and a miss falls back to the HTTP read the caller would have made anyway. Concretely:
+
+* A room is cached from the first slice that carries it with ``initial`` set — the server then sends
+  the full subscribed state — and updated from every later slice. A delta for a room that was never
+  seeded is ignored rather than mistaken for the whole picture.
+* The cache answers nothing while the sync window does not cover every room the bot is in. A room
+  that drops out of the window stops being streamed, silently, and its entry would go stale. The
+  pump then widens the window and reconnects (:mod:`onbot.sync`), and every room is seeded afresh.
+* The whole cache is dropped when the stream restarts (a ``pos``-less request, e.g. after the server
+  forgot our position), since events in the gap were never seen.
+* The cache answers nothing while the stream is stale — no slice for ``max_staleness_sec``, which a
+  healthy long-poll never reaches — so a stuck or stopped pump (``onbot reconcile-once`` runs none)
+  degrades to plain HTTP instead of to old data.
+* The bot's own writes are applied write-through by the callers that make them, so a pass never
+  re-reads what it just wrote while waiting for the echo.
+
+Membership mirrors the Synapse admin member list: joined users only.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from onbot.clients.matrix import SyncResult
+from onbot.logging import get_logger
+from onbot.reconciler.state import OnbotRoomType, event_type_name
+
+log = get_logger(__name__)
+
+MEMBER_EVENT_TYPE = "m.room.member"
+# Room-wide (empty state key) state the reconciler reads; the onbot types are appended per server.
+CACHED_STATE_TYPES = ("m.room.power_levels", "m.room.join_rules", "m.room.name", "m.room.topic")
+# Sliding sync long-polls for 30s, so a healthy stream delivers a slice at least that often.
+DEFAULT_MAX_STALENESS_SEC = 90.0
+
+
+@dataclass(slots=True)
+class _CachedRoom:
+    members: set[str] = field(default_factory=set)
+    state: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+
+class RoomStateCache:
+    """Members and selected room state per room, kept current from the sliding-sync stream."""
+
+    def __init__(
+        self,
+        server_name: str,
+        *,
+        max_staleness_sec: float = DEFAULT_MAX_STALENESS_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        managed = (OnbotRoomType.group_room, OnbotRoomType.visitor_lobby, OnbotRoomType.space)
+        self.state_types = frozenset(
+            (*CACHED_STATE_TYPES, *(event_type_name(server_name, t) for t in managed))
+        )
+        self._max_staleness_sec = max_staleness_sec
+        self._clock = clock
+        self._rooms: dict[str, _CachedRoom] = {}
+        self._last_slice_at: float | None = None
+        self._covers_every_room = True
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def required_state(self) -> list[list[str]]:
+        """The sliding-sync ``required_state`` subscription that keeps this cache complete."""
+        return [[MEMBER_EVENT_TYPE, "*"], *([t, ""] for t in sorted(self.state_types))]
+
+    @property
+    def is_fresh(self) -> bool:
+        return (
+            self._covers_every_room
+            and self._last_slice_at is not None
+            and self._clock() - self._last_slice_at <= self._max_staleness_sec
+        )
+
+    def reset(self) -> None:
+        self._rooms.clear()
+        self._last_slice_at = None
+        self._covers_every_room = True
+
+    # --- feeding ---------------------------------------------------------------
+
+    async def handle_sync(self, result: SyncResult) -> None:
+        if result.initial:
+            self._rooms.clear()  # a new connection: anything cached may have missed the gap
+        for room in result.rooms:
+            if room.initial:
+                entry = self._rooms[room.room_id] = _CachedRoom()
+            elif (existing := self._rooms.get(room.room_id)) is not None:
+                entry = existing
+            else:
+                continue
+            # required_state is the state at the end of the timeline, so it is applied last.
+            for event in (*room.timeline, *room.required_state):
+                self._apply(entry, event)
+        if self._covers_every_room and not result.covers_every_room:
+            log.warning(
+                "sync covers %s of %s rooms; reading room state from Synapse until it covers all",
+                result.window,
+                result.room_count,
+            )
+        self._covers_every_room = result.covers_every_room
+        self._last_slice_at = self._clock()
+
+    def _apply(self, entry: _CachedRoom, event: dict[str, Any]) -> None:
+        event_type, state_key = event.get("type"), event.get("state_key")
+        if state_key is None:
+            return  # not a state event
+        content = event.get("content") or {}
+        if event_type == MEMBER_EVENT_TYPE:
+            if content.get("membership") == "join":
+                entry.members.add(state_key)
+            else:
+                entry.members.discard(state_key)
+        elif event_type in self.state_types and state_key == "":
+            if content:
+                entry.state[event_type] = dict(content)
+            else:
+                entry.state.pop(event_type, None)  # redacted / cleared
+
+    # --- reading ---------------------------------------------------------------
+
+    def _room(self, room_id: str) -> _CachedRoom | None:
+        entry = self._rooms.get(room_id) if self.is_fresh else None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def members(self, room_id: str) -> set[str] | None:
+        """Joined members of ``room_id``, or ``None`` on a miss."""
+        entry = self._room(room_id)
+        return None if entry is None else set(entry.members)
+
+    def lookup_state(
+        self, room_id: str, event_type: str, state_key: str = ""
+    ) -> tuple[bool, dict[str, Any] | None]:
+        """``(hit, content)`` for one state event; on a hit, ``None`` content means "not set"."""
+        if event_type not in self.state_types or state_key != "":
+            return False, None
+        entry = self._room(room_id)
+        if entry is None:
+            return False, None
+        content = entry.state.get(event_type)
+        return True, (dict(content) if content is not None else None)
+
+    # --- write-through ---------------------------------------------------------
+
+    def note_membership(self, room_id: str, user_id: str, membership: str) -> None:
+        if (entry := self._rooms.get(room_id)) is not None:
+            self._apply(
+                entry,
+                {"type": MEMBER_EVENT_TYPE, "state_key": user_id, "content": {"membership": membership}},
+            )
+
+    def note_state(self, room_id: str, event_type: str, content: dict[str, Any], state_key: str = "") -> None:
+        if (entry := self._rooms.get(room_id)) is not None:
+            self._apply(entry, {"type": event_type, "state_key": state_key, "content": content})
+
+    def stats(self) -> str:
+        return f"{len(self._rooms)} rooms cached, {self.hits} hits, {self.misses} misses"
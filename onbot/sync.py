@@ -12,6 +12,20 @@ the error backoff and the stop event, and hands every :class:`~onbot.clients.mat
 each registered handler in turn. Handlers are isolated from one another: one that raises is logged
 and the next still runs, because a broken command router must not stop new employees being welcomed.
 
+Handlers may need more of the stream than member events — the room state cache
+(:mod:`onbot.state_cache`) subscribes to power levels, join rules and the onbot state events — so the
+pump takes the ``required_state`` subscription to request, and whether to ask for the bot's account
+data (the ``m.direct`` index in :mod:`onbot.onboarding.direct_rooms` follows it). When the server no
+longer recognises our stream position (``M_UNKNOWN_POS``), the pump starts a fresh connection rather
+than retrying the dead one forever; the slice that follows is flagged ``initial`` so stateful
+handlers can start over.
+
+The subscription is a window over the bot's rooms, most recently active first. A room that falls out
+of it is simply no longer streamed, and nothing says so. The state cache would then keep answering
+for it from old data. So when the server reports more rooms than the window covers, the pump widens
+the window, with headroom, and starts a fresh connection. That way every room arrives complete again.
+The state cache answers nothing for the one slice in between.
+
 The pump does **not** own replay protection. It starts at ``pos=None`` and the server then replays up
 to ``timeline_limit`` events per room, so every handler sees old events on each restart. Onboarding
 tolerates this because welcoming is idempotent; the control room must not, and guards itself (see
@@ -22,14 +36,21 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
-from typing import Protocol
+from collections.abc import Sequence
+from typing import Any, Protocol
 
+from onbot.clients.base import ApiError
+from onbot.clients.circuit import CircuitOpenError
 from onbot.clients.matrix import ApiClientMatrix, SyncNotSupportedError, SyncResult
 from onbot.logging import get_logger
 
 log = get_logger(__name__)
 
 ERROR_BACKOFF_SEC = 5.0
+# The window grows in steps of this many rooms, with a quarter on top, so growth restarts are rare.
+WINDOW_STEP = 500
+# MSC4186: the server has expired or never issued the `pos` we sent; only a fresh stream recovers.
+UNKNOWN_POS_ERRCODE = "M_UNKNOWN_POS"
 
 
 class SyncHandler(Protocol):
@@ -41,8 +62,20 @@ class SyncHandler(Protocol):
 class SyncPump:
     """Drive Simplified Sliding Sync and fan each slice out to the registered handlers."""
 
-    def __init__(self, client: ApiClientMatrix, *, error_backoff_sec: float = ERROR_BACKOFF_SEC) -> None:
+    def __init__(
+        self,
+        client: ApiClientMatrix,
+        *,
+        error_backoff_sec: float = ERROR_BACKOFF_SEC,
+        required_state: Sequence[Sequence[str]] | None = None,
+        account_data: bool = False,
+    ) -> None:
         self.client = client
+        self._sync_kwargs: dict[str, Any] = {}
+        if required_state is not None:
+            self._sync_kwargs["required_state"] = required_state
+        if account_data:
+            self._sync_kwargs["account_data"] = True
         self._handlers: list[SyncHandler] = []
         self._pos: str | None = None
         self._stop = asyncio.Event()
@@ -60,20 +93,47 @@ class SyncPump:
         log.info("sync pump started (sliding sync), %d handler(s)", len(self._handlers))
         while not self._stop.is_set():
             try:
-                result = await self.client.sliding_sync(self._pos)
+                result = await self.client.sliding_sync(self._pos, **self._sync_kwargs)
             except SyncNotSupportedError:
                 # The homeserver does not support Simplified Sliding Sync. Onboarding still works
                 # off the reconciler signal; the control room simply never sees a command.
                 log.warning("sliding sync unsupported; event-driven features are inactive")
                 break
+            except CircuitOpenError as exc:
+                log.warning("sync paused: %s; backing off %.0fs", exc, self._error_backoff_sec)
+                await self._sleep(self._error_backoff_sec)
+                continue
+            except ApiError as exc:
+                if self._pos is not None and _is_unknown_pos(exc):
+                    log.warning("sync position %s expired; starting a fresh sync stream", self._pos)
+                    self._pos = None
+                    continue
+                log.exception("sync failed; backing off %.0fs", self._error_backoff_sec)
+                await self._sleep(self._error_backoff_sec)
+                continue
             except Exception:
                 log.exception("sync failed; backing off %.0fs", self._error_backoff_sec)
                 await self._sleep(self._error_backoff_sec)
                 continue
             self._pos = result.pos
+            if not result.covers_every_room:
+                self._widen(result)
             await self._dispatch(result)
         log.info("sync pump stopped")
 
+    def _widen(self, result: SyncResult) -> None:
+        assert result.room_count is not None
+        wanted = result.room_count * 5 // 4
+        window = -(-wanted // WINDOW_STEP) * WINDOW_STEP
+        log.info(
+            "the bot is in %d rooms but sync covers %s; widening to %d and reconnecting",
+            result.room_count,
+            result.window,
+            window,
+        )
+        self._sync_kwargs["window"] = window
+        self._pos = None  # rooms outside the old window may have changed unseen
+
     async def _dispatch(self, result: SyncResult) -> None:
         for handler in self._handlers:
             if self._stop.is_set():
@@ -87,3 +147,7 @@ class SyncPump:
         # Sleep, but wake immediately on stop.
         with contextlib.suppress(TimeoutError):
             await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+
+
+def _is_unknown_pos(exc: ApiError) -> bool:
+    return isinstance(exc.payload, dict) and exc.payload.get("errcode") == UNKNOWN_POS_ERRCODE
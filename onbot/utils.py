@@ -8,7 +8,8 @@ authenticated media). The ``Any``-as-sentinel hack is replaced with an explicit
 
 from __future__ import annotations
 
-from collections.abc import Sequence
+import asyncio
+from collections.abc import Awaitable, Sequence
 from typing import Any, Final
 
 
@@ -59,3 +60,21 @@ def dict_has_nested_attr(
     if must_have_val:
         return bool(current)
     return True
+
+
+async def gather_or_cancel(*aws: Awaitable[Any]) -> list[Any]:
+    """Like :func:`asyncio.gather`, but the first failure cancels and awaits the others.
+
+    A plain ``gather`` raises the first exception and leaves the remaining awaitables running:
+    they outlive the caller, may overlap its next run, and their own failures end up as "Task
+    exception was never retrieved". The first exception is re-raised as it is, not wrapped in an
+    ``ExceptionGroup`` as :class:`asyncio.TaskGroup` would, so callers keep catching what they catch.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""Benchmark: decode time and memory of the directory listings, per installed JSON parser.
+
+Builds synthetic listing pages shaped like the real APIs (by default 50,000 Authentik users, each in
+a handful of groups whose full objects are embedded in ``groups_obj``, and 20,000 Synapse rooms),
+encodes them once, and then for each parser :mod:`onbot.clients.jsondecode` can use here:
+
+* times decoding every page (best of ``--repeat``), users both as returned and through
+  :func:`onbot.clients.authentik.compact_user` as ``list_users`` does;
+* measures with ``tracemalloc`` the peak while decoding and what the decoded listing keeps alive.
+
+    python scripts/bench_decode.py
+    python scripts/bench_decode.py --users 10000 --rooms 5000 --repeat 5
+
+Install ``orjson`` and/or ``msgspec`` to compare them with the standard library. No network; the
+times are only meaningful relative to each other.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+import tracemalloc
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from onbot.clients.authentik import compact_user
+from onbot.clients.jsondecode import available_decoders, decoder
+
+_PAGE_SIZE = 100
+
+
+def _group(rng: random.Random, i: int) -> dict[str, Any]:
+    return {
+        "pk": str(uuid.UUID(int=rng.getrandbits(128))),
+        "num_pk": i,
+        "name": f"group-{i}",
+        "is_superuser": False,
+        "parent": None,
+        "parent_name": None,
+        "attributes": {
+            "chat-room": {"alias": f"group-{i}", "name": f"Group {i}", "topic": "A topic " * 8},
+            "chat-powerlevel": rng.choice((0, 25, 50)),
+        },
+    }
+
+
+def _user_pages(n_users: int, n_groups: int, groups_per_user: int, seed: int) -> list[bytes]:
+    rng = random.Random(seed)
+    groups = [_group(rng, i) for i in range(n_groups)]
+    users = []
+    for i in range(n_users):
+        member_of = rng.sample(groups, groups_per_user)
+        users.append(
+            {
+                "pk": i,
+                "username": f"user{i}",
+                "name": f"User Number {i}",
+                "is_active": True,
+                "last_login": "2026-01-01T00:00:00Z",
+                "is_superuser": i % 500 == 0,
+                "groups": [g["pk"] for g in member_of],
+                "groups_obj": member_of,
+                "email": f"user{i}@example.org",
+                "avatar": f"https://example.org/avatar/{i}.png",
+                "attributes": {"matrix_name": f"user{i}", "settings": {"locale": "de"}},
+                "uid": uuid.UUID(int=rng.getrandbits(128)).hex,
+                "path": "users",
+                "type": "internal",
+                "uuid": str(uuid.UUID(int=rng.getrandbits(128))),
+            }
+        )
+    return [
+        json.dumps({"pagination": {"next": 0}, "results": users[i : i + _PAGE_SIZE]}).encode()
+        for i in range(0, n_users, _PAGE_SIZE)
+    ]
+
+
+def _room_pages(n_rooms: int) -> list[bytes]:
+    rooms = [
+        {
+            "room_id": f"!room{i}:bench.test",
+            "name": f"Group {i}",
+            "canonical_alias": f"#group-{i}:bench.test",
+            "joined_members": 12,
+            "joined_local_members": 12,
+            "version": "11",
+            "creator": "@onbot:bench.test",
+            "encryption": None,
+            "federatable": False,
+            "public": False,
+            "join_rules": "invite",
+            "guest_access": None,
+            "history_visibility": "shared",
+            "state_events": 40,
+            "room_type": None,
+        }
+        for i in range(n_rooms)
+    ]
+    return [
+        json.dumps({"rooms": rooms[i : i + _PAGE_SIZE], "total_rooms": n_rooms}).encode()
+        for i in range(0, n_rooms, _PAGE_SIZE)
+    ]
+
+
+Extract = Callable[[Any], list[dict[str, Any]]]
+
+
+def _decode_all(loads: Callable[[bytes], Any], pages: list[bytes], extract: Extract) -> list[dict[str, Any]]:
+    items: list[dict[str, Any]] = []
+    for page in pages:
+        items.extend(extract(loads(page)))
+    return items
+
+
+def _memory(loads: Callable[[bytes], Any], pages: list[bytes], extract: Extract) -> tuple[float, float]:
+    """(peak while decoding, kept alive afterwards), in MiB."""
+    tracemalloc.start()
+    try:
+        items = _decode_all(loads, pages, extract)
+        kept, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del items
+    return peak / 2**20, kept / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--groups", type=int, default=2_000)
+    parser.add_argument("--groups-per-user", type=int, default=5)
+    parser.add_argument("--rooms", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per variant; the best is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    user_pages = _user_pages(args.users, args.groups, args.groups_per_user, args.seed)
+    room_pages = _room_pages(args.rooms)
+    size = sum(map(len, user_pages)) / 2**20, sum(map(len, room_pages)) / 2**20
+    print(f"{args.users} users ({size[0]:.1f} MiB of JSON), {args.rooms} rooms ({size[1]:.1f} MiB)")
+
+    variants: list[tuple[str, list[bytes], Extract]] = [
+        ("users", user_pages, lambda page: page["results"]),
+        ("users, compacted", user_pages, lambda page: [compact_user(u) for u in page["results"]]),
+        ("rooms", room_pages, lambda page: page["rooms"]),
+    ]
+    baseline: dict[str, list[dict[str, Any]]] = {}
+    print(f"  {'parser':8} {'listing':17} {'decode':>10} {'peak':>10} {'kept':>10}")
+    for name in ["json", *(d for d in available_decoders() if d != "json")]:
+        loads = decoder(name)
+        for label, pages, extract in variants:
+            # Every parser must produce exactly what the standard library does.
+            result = _decode_all(loads, pages, extract)
+            if baseline.setdefault(label, result) != result:
+                raise SystemExit(f"{name} decodes the {label} differently from the standard library")
+            elapsed = min(
+                timeit.repeat(lambda: _decode_all(loads, pages, extract), number=1, repeat=args.repeat)  # noqa: B023
+            )
+            peak, kept = _memory(loads, pages, extract)
+            print(f"  {name:8} {label:17} {elapsed * 1000:8.0f}ms {peak:7.1f}MiB {kept:7.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Micro-benchmark: per-room membership and power levels by list scan vs. :class:`MembershipIndex`.
+
+Builds a synthetic directory (by default 8,000 users spread over 1,200 group rooms, each user in a
+handful of groups, a few dozen power-level groups) and times computing every room's desired members
+and desired power levels the way the reconciler did before the index — scanning every user per room
+— against building :class:`onbot.reconciler.index.MembershipIndex` once and looking rooms up in it.
+The index time includes building it. Results are checked equal before anything is timed.
+
+    python scripts/bench_membership_index.py
+    python scripts/bench_membership_index.py --users 20000 --groups 3000 --repeat 3
+
+Pure CPU, no network; the numbers are only meaningful relative to each other.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+
+from onbot.models import MappedUser
+from onbot.reconciler.index import MembershipIndex
+from onbot.reconciler.membership import desired_room_members, desired_room_members_from_index
+from onbot.reconciler.power_levels import (
+    PowerLevelGroup,
+    compute_desired_user_levels,
+    compute_desired_user_levels_from_index,
+)
+
+
+def _directory(
+    n_users: int, n_groups: int, groups_per_user: int, n_pl_groups: int, seed: int
+) -> tuple[list[MappedUser], list[str], list[PowerLevelGroup]]:
+    rng = random.Random(seed)
+    group_pks = [f"group-{i}" for i in range(n_groups)]
+    users = [
+        MappedUser(
+            authentik_obj={
+                "pk": str(i),
+                "is_superuser": i % 500 == 0,
+                "groups_obj": [{"pk": g} for g in rng.sample(group_pks, groups_per_user)],
+            },
+            mxid=f"@user{i}:bench.test",
+        )
+        for i in range(n_users)
+    ]
+    pl_groups = [
+        PowerLevelGroup(
+            member_pks={str(rng.randrange(n_users)) for _ in range(50)}, level=rng.choice((25, 50))
+        )
+        for _ in range(n_pl_groups)
+    ]
+    return users, group_pks, pl_groups
+
+
+def _by_scan(users: list[MappedUser], group_pks: list[str], pl_groups: list[PowerLevelGroup]) -> list:
+    out = []
+    for group_pk in group_pks:
+        desired = desired_room_members(group_pk, users)
+        members = [u for u in users if group_pk in u.group_pks]
+        out.append((desired, compute_desired_user_levels(members, pl_groups, make_superusers_admin=True)))
+    return out
+
+
+def _by_index(users: list[MappedUser], group_pks: list[str], pl_groups: list[PowerLevelGroup]) -> list:
+    index = MembershipIndex.build(users, pl_groups)
+    out = []
+    for group_pk in group_pks:
+        desired = desired_room_members_from_index(group_pk, index)
+        levels = compute_desired_user_levels_from_index(
+            index.users_in(group_pk), index, make_superusers_admin=True
+        )
+        out.append((desired, levels))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--users", type=int, default=8000)
+    parser.add_argument("--groups", type=int, default=1200)
+    parser.add_argument("--groups-per-user", type=int, default=4)
+    parser.add_argument("--pl-groups", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per variant; the best is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    users, group_pks, pl_groups = _directory(
+        args.users, args.groups, args.groups_per_user, args.pl_groups, args.seed
+    )
+    if _by_scan(users, group_pks, pl_groups) != _by_index(users, group_pks, pl_groups):
+        raise SystemExit("scan and index disagree")
+
+    scan = min(timeit.repeat(lambda: _by_scan(users, group_pks, pl_groups), number=1, repeat=args.repeat))
+    index = min(timeit.repeat(lambda: _by_index(users, group_pks, pl_groups), number=1, repeat=args.repeat))
+    print(f"{args.users} users, {args.groups} group rooms, {args.pl_groups} power-level groups")
+    print(f"  list scan: {scan * 1000:10.1f} ms")
+    print(f"  index:     {index * 1000:10.1f} ms  ({scan / index:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 """Contract tests for the Authentik client (pagination + client-side filtering)."""
 
+import json
+
 import httpx
+import pytest
 import respx
 
-from onbot.clients.authentik import ApiClientAuthentik
+from onbot.clients.authentik import ApiClientAuthentik, plan_attribute_filters
 
 
 @respx.mock
@@ -54,3 +57,151 @@ async def test_list_groups_strips_inactive_and_filters_attributes() -> None:
 
     assert [g["pk"] for g in groups] == ["g1"]  # g2 lacks the attribute
     assert groups[0]["users_obj"] == [{"pk": 1, "is_active": True}]  # inactive removed
+
+
+@respx.mock
+async def test_list_users_fetches_the_remaining_pages_concurrently_once_the_total_is_known() -> None:
+    def _page(request: httpx.Request) -> httpx.Response:
+        number = int(request.url.params.get("page", "1"))
+        pagination = {"current": number, "total_pages": 3, "next": number + 1 if number < 3 else 0}
+        return httpx.Response(200, json={"pagination": pagination, "results": [{"username": f"u{number}"}]})
+
+    route = respx.get("https://authentik.test/api/v3/core/users/").mock(side_effect=_page)
+    client = ApiClientAuthentik(url="https://authentik.test", api_key="k", page_concurrency=4)
+    try:
+        users = await client.list_users()
+    finally:
+        await client.aclose()
+    assert [u["username"] for u in users] == ["u1", "u2", "u3"]
+    assert sorted(c.request.url.params.get("page", "1") for c in route.calls) == ["1", "2", "3"]
+
+
+@respx.mock
+async def test_list_users_keeps_only_a_reference_to_each_group() -> None:
+    group = {"pk": "g1", "name": "Team", "attributes": {"chat": {"room_name": "Team"}}, "parent": None}
+    user = {
+        "pk": 7,
+        "username": "ada",
+        "attributes": {"matrix_name": "ada"},
+        "groups_obj": [group],
+        "roles_obj": [{"pk": "r1", "name": "Staff"}],
+    }
+    respx.get("https://authentik.test/api/v3/core/users/").mock(
+        return_value=httpx.Response(200, json={"pagination": {"next": 0}, "results": [user]})
+    )
+    client = ApiClientAuthentik(url="https://authentik.test", api_key="k")
+    try:
+        users = await client.list_users()
+    finally:
+        await client.aclose()
+    assert users == [
+        {
+            "pk": 7,
+            "username": "ada",
+            "attributes": {"matrix_name": "ada"},
+            "groups_obj": [{"pk": "g1", "name": "Team"}],
+        }
+    ]
+
+
+@respx.mock
+async def test_list_groups_can_leave_out_the_embedded_members() -> None:
+    route = respx.get("https://authentik.test/api/v3/core/groups/").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "pagination": {"next": 0},
+                # An Authentik too old for include_users still embeds them.
+                "results": [{"pk": "g1", "name": "Team", "attributes": {}, "users_obj": [{"pk": 1}]}],
+            },
+        )
+    )
+    client = ApiClientAuthentik(url="https://authentik.test", api_key="k")
+    try:
+        groups = await client.list_groups(include_users=False)
+    finally:
+        await client.aclose()
+    assert route.calls[0].request.url.params["include_users"] == "false"
+    assert groups == [{"pk": "g1", "name": "Team", "attributes": {}}]
+
+
+@pytest.mark.parametrize(
+    ("exact", "has", "non_empty", "query", "local_has", "local_non_empty"),
+    [
+        ({"is_chatroom": True}, None, None, {"is_chatroom": True}, [], []),
+        (None, ["chat.room"], None, {"chat__room__isnull": False}, ["chat.room"], []),
+        (None, None, ["chat-powerlevel"], {"chat-powerlevel__isnull": False}, [], ["chat-powerlevel"]),
+        (None, ["a", "b"], None, {}, ["a", "b"], []),  # "any of": not expressible as one query
+        (None, ["odd__key"], None, {}, ["odd__key"], []),  # would be read as a nested path
+    ],
+)
+def test_attribute_filters_are_pushed_where_authentik_can_evaluate_them(
+    exact: dict[str, object] | None,
+    has: list[str] | None,
+    non_empty: list[str] | None,
+    query: dict[str, object],
+    local_has: list[str],
+    local_non_empty: list[str],
+) -> None:
+    plan = plan_attribute_filters(exact, has, non_empty)
+    assert (plan.query, plan.has, plan.non_empty) == (query, local_has, local_non_empty)
+
+
+@respx.mock
+async def test_list_groups_sends_the_pushed_filter_and_checks_the_rest_locally() -> None:
+    route = respx.get("https://authentik.test/api/v3/core/groups/").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "pagination": {"next": 0},
+                "results": [
+                    {"pk": "g1", "name": "Team", "attributes": {"chat": {"level": 50}}},
+                    {"pk": "g2", "name": "Muted", "attributes": {"chat": {"level": 0}}},
+                ],
+            },
+        )
+    )
+    client = ApiClientAuthentik(url="https://authentik.test", api_key="k")
+    try:
+        groups = await client.list_groups(filter_has_non_empty_attributes=["chat.level"])
+    finally:
+        await client.aclose()
+    assert json.loads(route.calls[0].request.url.params["attributes"]) == {"chat__level__isnull": False}
+    assert [g["pk"] for g in groups] == ["g1"]  # level 0 is present but empty
+
+
+@respx.mock
+async def test_a_presence_filter_the_server_ignored_is_still_applied() -> None:
+    # Authentik answers an attributes filter it cannot apply with the whole, unfiltered listing.
+    route = respx.get("https://authentik.test/api/v3/core/groups/").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "pagination": {"next": 0},
+                "results": [
+                    {"pk": "g1", "name": "Team", "attributes": {"chat": {"room": True}}},
+                    {"pk": "g2", "name": "Finance", "attributes": {}},
+                ],
+            },
+        )
+    )
+    client = ApiClientAuthentik(url="https://authentik.test", api_key="k")
+    try:
+        groups = await client.list_groups(filter_has_attributes=["chat.room"])
+    finally:
+        await client.aclose()
+    assert json.loads(route.calls[0].request.url.params["attributes"]) == {"chat__room__isnull": False}
+    assert [g["pk"] for g in groups] == ["g1"]
+
+
+@respx.mock
+async def test_listings_can_ask_only_for_what_changed() -> None:
+    users = respx.get("https://authentik.test/api/v3/core/users/").mock(
+        return_value=httpx.Response(200, json={"pagination": {"next": 0}, "results": []})
+    )
+    client = ApiClientAuthentik(url="https://authentik.test", api_key="k")
+    try:
+        await client.list_users(filter_updated_after="2026-07-01T09:00:00Z")
+    finally:
+        await client.aclose()
+    assert users.calls[0].request.url.params["last_updated__gt"] == "2026-07-01T09:00:00Z"
@@ -1,11 +1,17 @@
 """Contract tests for the async HTTP base client (auth, retries, errors, params)."""
 
+import asyncio
+from collections.abc import Awaitable
+
 import httpx
 import pytest
 import respx
 
 from onbot.auth.token_provider import StaticTokenProvider, TokenProvider
 from onbot.clients.base import ApiError, BaseApiClient
+from onbot.clients.circuit import CircuitBreakerRegistry, CircuitOpenError
+from onbot.clients.ratelimit import RateLimiter
+from onbot.clients.transport import TransportRegistry
 
 
 class _RotatingProvider:
@@ -105,3 +111,301 @@ async def test_request_raw_returns_bytes_and_sends_content() -> None:
     assert data == b"pong"
     assert route.calls[0].request.content == b"ping"
     assert route.calls[0].request.headers["content-type"] == "application/octet-stream"
+
+
+@respx.mock
+async def test_429_waits_as_long_as_synapse_asks(monkeypatch: pytest.MonkeyPatch) -> None:
+    waits: list[float] = []
+
+    async def _sleep(seconds: float) -> None:
+        waits.append(seconds)
+
+    monkeypatch.setattr("asyncio.sleep", _sleep)
+    route = respx.get("https://api.test/thing").mock(
+        side_effect=[
+            httpx.Response(429, json={"errcode": "M_LIMIT_EXCEEDED", "retry_after_ms": 2500}),
+            httpx.Response(200, json={"ok": True}),
+        ]
+    )
+    client = BaseApiClient("https://api.test", "t")
+    try:
+        assert await client.get_json("thing") == {"ok": True}
+    finally:
+        await client.aclose()
+    assert route.call_count == 2
+    assert waits == [2.5]
+
+
+@respx.mock
+async def test_retry_after_pauses_every_client_of_the_host() -> None:
+    now = [0.0]
+    slept: list[float] = []
+
+    async def _sleep(seconds: float) -> None:
+        slept.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(clock=lambda: now[0], sleep=_sleep)
+    respx.get("https://api.test/a").mock(
+        side_effect=[httpx.Response(429, headers={"Retry-After": "3"}), httpx.Response(200, json={})]
+    )
+    respx.get("https://api.test/b").mock(return_value=httpx.Response(200, json={}))
+    first = BaseApiClient("https://api.test", "t", rate_limiter=limiter)
+    second = BaseApiClient("https://api.test/other", "t", rate_limiter=limiter)
+    try:
+        await first.get_json("a")  # throttled once: the retry waits out the pause in the limiter
+        now[0] -= 2  # rewind, as if the second client asked while the pause was still running
+        await second.get_json("https://api.test/b")
+    finally:
+        await first.aclose()
+        await second.aclose()
+    assert slept == [3.0, 2.0]
+    assert limiter.bucket("https://api.test/").throttled == 1
+
+
+@respx.mock
+async def test_an_open_circuit_fails_fast_for_every_client_of_the_host(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def _sleep(seconds: float) -> None:
+        return None
+
+    monkeypatch.setattr("asyncio.sleep", _sleep)
+    now = [0.0]
+    breakers = CircuitBreakerRegistry(failure_threshold=2, reset_after=30, clock=lambda: now[0])
+    down = respx.get("https://api.test/a").mock(return_value=httpx.Response(502))
+    other = respx.get("https://api.test/b").mock(return_value=httpx.Response(200, json={"ok": True}))
+    first = BaseApiClient("https://api.test", "t", circuit_breakers=breakers)
+    second = BaseApiClient("https://api.test", "t", circuit_breakers=breakers)
+    try:
+        with pytest.raises(CircuitOpenError):
+            await first.get_json("a")  # the second 502 opens the circuit; the third try is refused
+        with pytest.raises(CircuitOpenError):
+            await second.get_json("b")  # not even sent
+        now[0] = 30
+        assert await second.get_json("b") == {"ok": True}  # the trial gets through and closes it
+    finally:
+        await first.aclose()
+        await second.aclose()
+    assert down.call_count == 2 and other.call_count == 1
+    assert breakers.open_circuits() == []
+
+
+@pytest.mark.parametrize(
+    ("headers", "body", "expected"),
+    [
+        ({}, {"retry_after_ms": 1200}, 1.2),
+        ({"Retry-After": "7"}, {}, 7.0),
+        ({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, {}, 0.0),  # a date in the past
+        ({"Retry-After": "soon"}, {}, None),
+        ({}, {"errcode": "M_LIMIT_EXCEEDED"}, None),
+    ],
+)
+@respx.mock
+async def test_apierror_carries_the_requested_delay(
+    headers: dict[str, str], body: dict[str, object], expected: float | None
+) -> None:
+    respx.get("https://api.test/thing").mock(return_value=httpx.Response(429, headers=headers, json=body))
+    client = BaseApiClient("https://api.test", "t", max_retry_attempts=1)
+    try:
+        with pytest.raises(ApiError) as exc:
+            await client.get_json("thing")
+    finally:
+        await client.aclose()
+    assert exc.value.retry_after == expected
+
+
+def _numbered_pages(total: int) -> respx.Route:
+    """``/list?page=n`` answers with item ``n``, the later pages faster than the earlier ones."""
+
+    async def _page(request: httpx.Request) -> httpx.Response:
+        number = int(request.url.params.get("page", "1"))
+        await asyncio.sleep(0.01 * (total - number))
+        return httpx.Response(200, json={"items": [number], "current": number, "total": total})
+
+    return respx.get("https://api.test/list").mock(side_effect=_page)
+
+
+def _collect(client: BaseApiClient, **kwargs: object) -> Awaitable[list[object]]:
+    return client.paginate_collect(
+        "list",
+        extract_items=lambda page: page["items"],
+        next_params=lambda page, cur: (
+            {**cur, "page": page["current"] + 1} if page["current"] < page["total"] else None
+        ),
+        **kwargs,  # type: ignore[arg-type]
+    )
+
+
+@respx.mock
+async def test_concurrent_pagination_keeps_page_order_and_its_bound() -> None:
+    route = _numbered_pages(10)
+    serve = route.side_effect
+    in_flight = peak = 0
+
+    # Counted where the requests are served: a fetch the paginator has already consumed may not
+    # have run its own done-callbacks yet, so counting futures on the client side overshoots.
+    async def _counting(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await serve(request)  # type: ignore[misc, operator]
+        finally:
+            in_flight -= 1
+
+    route.side_effect = _counting
+    client = BaseApiClient("https://api.test", "t", page_concurrency=3)
+    try:
+        items = await _collect(
+            client,
+            remaining_params=lambda page, cur: [{**cur, "page": n} for n in range(2, page["total"] + 1)],
+        )
+    finally:
+        await client.aclose()
+    assert items == list(range(1, 11))
+    assert route.call_count == 10
+    assert peak == 3
+
+
+@respx.mock
+async def test_pagination_without_a_total_prefetches_the_next_page() -> None:
+    requested = {n: asyncio.Event() for n in range(1, 5)}
+
+    def _page(request: httpx.Request) -> httpx.Response:
+        number = int(request.url.params.get("page", "1"))
+        requested[number].set()
+        return httpx.Response(200, json={"items": [number], "current": number, "total": 4})
+
+    respx.get("https://api.test/list").mock(side_effect=_page)
+    client = BaseApiClient("https://api.test", "t", page_concurrency=2)
+    seen: list[int] = []
+    try:
+        async for item in client.paginate(
+            "list",
+            extract_items=lambda page: page["items"],
+            next_params=lambda page, cur: (
+                {**cur, "page": page["current"] + 1} if page["current"] < page["total"] else None
+            ),
+        ):
+            # The page after this one is requested while this item is still being handled; fetching
+            # one page after another would wait here forever.
+            if item < 4:
+                await asyncio.wait_for(requested[item + 1].wait(), timeout=1)
+            seen.append(item)
+    finally:
+        await client.aclose()
+    assert seen == [1, 2, 3, 4]
+
+
+@respx.mock
+async def test_a_listing_that_grew_is_followed_past_its_first_total() -> None:
+    pages = {
+        1: {"items": [1], "current": 1, "total": 2},
+        2: {"items": [2], "current": 2, "total": 3},  # a page was added meanwhile
+        3: {"items": [3], "current": 3, "total": 3},
+    }
+    respx.get("https://api.test/list").mock(
+        side_effect=lambda request: httpx.Response(200, json=pages[int(request.url.params.get("page", "1"))])
+    )
+    client = BaseApiClient("https://api.test", "t", page_concurrency=4)
+    try:
+        items = await _collect(
+            client,
+            remaining_params=lambda page, cur: [{**cur, "page": n} for n in range(2, page["total"] + 1)],
+        )
+    finally:
+        await client.aclose()
+    assert items == [1, 2, 3]
+
+
+@respx.mock
+async def test_clients_of_one_host_share_the_registry_pool() -> None:
+    route = respx.get("https://api.test/thing").mock(return_value=httpx.Response(200, json={}))
+    transports = TransportRegistry()
+    admin = BaseApiClient("https://api.test/admin", "t", transports=transports, timeout=5.0)
+    sync = BaseApiClient("https://api.test/client", "t", transports=transports, timeout=60.0)
+    try:
+        assert admin._client is sync._client
+        await admin.get_json("https://api.test/thing")
+        await admin.aclose()  # leaves the shared pool open for the other client
+        await sync.get_json("https://api.test/thing")
+    finally:
+        await sync.aclose()
+        await transports.aclose()
+    assert route.call_count == 2
+    assert all(c.request.headers["accept"] == "application/json" for c in route.calls)
+    assert [c.request.extensions["timeout"]["read"] for c in route.calls] == [5.0, 60.0]
+
+
+def _slow_json(body: object) -> tuple[asyncio.Event, object]:
+    release = asyncio.Event()
+
+    async def _respond(request: httpx.Request) -> httpx.Response:
+        await release.wait()
+        return httpx.Response(200, json=body)
+
+    return release, _respond
+
+
+@respx.mock
+async def test_concurrent_identical_gets_share_one_request_and_not_one_object() -> None:
+    release, respond = _slow_json({"@a:x": ["!r:x"]})
+    route = respx.get("https://api.test/direct").mock(side_effect=respond)
+    client = BaseApiClient("https://api.test", "t", coalesce_gets=True)
+    try:
+        readers = [asyncio.create_task(client.get_json("direct")) for _ in range(5)]
+        other = asyncio.create_task(client.get_json("direct", params={"v": 2}))
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*readers, other)
+    finally:
+        await client.aclose()
+    assert route.call_count == 2  # the five identical reads, and the one with other params
+    assert client.gets_coalesced == 4
+    results[0]["@b:x"] = []  # each caller may change its copy without touching the others'
+    assert results[1] == {"@a:x": ["!r:x"]}
+
+
+@respx.mock
+async def test_cached_reads_are_forgotten_on_a_write_to_the_same_path() -> None:
+    route = respx.get("https://api.test/user/@bot:x/account_data/m.direct").mock(
+        side_effect=[httpx.Response(200, json={"v": 1}), httpx.Response(200, json={"v": 2})]
+    )
+    respx.put("https://api.test/user/@bot:x/account_data/m.direct").mock(return_value=httpx.Response(200))
+    respx.get("https://api.test/other").mock(return_value=httpx.Response(200, json={}))
+    client = BaseApiClient("https://api.test", "t", get_cache_ttls={"user/*/account_data/m.direct": 60})
+    path = "user/@bot:x/account_data/m.direct"
+    try:
+        assert await client.get_json(path) == {"v": 1}
+        assert await client.get_json(path) == {"v": 1}  # from the cache
+        await client.get_json("other")
+        await client.get_json("other")  # no pattern matches: not cached
+        await client.put_json(path, json_body={"v": 2})
+        assert await client.get_json(path) == {"v": 2}
+    finally:
+        await client.aclose()
+    assert route.call_count == 2
+    assert client.gets_cached == 1
+
+
+@respx.mock
+async def test_a_read_in_flight_across_a_write_is_neither_joined_nor_cached() -> None:
+    release, respond = _slow_json({"v": 1})
+    route = respx.get("https://api.test/thing").mock(
+        side_effect=[respond, httpx.Response(200, json={"v": 2}), httpx.Response(200, json={"v": 3})]
+    )
+    respx.put("https://api.test/thing").mock(return_value=httpx.Response(200))
+    client = BaseApiClient("https://api.test", "t", get_cache_ttls={"thing": 60})
+    try:
+        before = asyncio.create_task(client.get_json("thing"))
+        await asyncio.sleep(0.01)
+        await client.put_json("thing", json_body={"v": 2})
+        after = await client.get_json("thing")  # does not wait for the read started before the write
+        release.set()
+        assert await before == {"v": 1}
+        assert after == {"v": 2}
+        assert await client.get_json("thing") == {"v": 2}  # cached from the post-write read
+    finally:
+        await client.aclose()
+    assert route.call_count == 2
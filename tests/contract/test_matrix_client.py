@@ -10,10 +10,13 @@ from onbot.clients.base import ApiError
 from onbot.clients.matrix import (
     ApiClientMatrix,
     CSApiEffectors,
+    RoomSync,
     SyncNotSupportedError,
+    SyncResult,
     _parse_mxc,
 )
 from onbot.models import RoomCreateAttributes
+from onbot.state_cache import RoomStateCache
 
 
 def _client() -> ApiClientMatrix:
@@ -224,6 +227,80 @@ async def test_sliding_sync_normalises_rooms_and_pos() -> None:
     assert result.rooms[0].member_events()[0]["state_key"] == "@a:x"
 
 
+@respx.mock
+async def test_sliding_sync_requests_extra_state_and_flags_initial_rooms() -> None:
+    route = respx.post(url__regex=r".*/unstable/org\.matrix\.simplified_msc3575/sync.*").mock(
+        return_value=httpx.Response(200, json={"pos": "s3", "rooms": {"!r:x": {"initial": True}, "!q:x": {}}})
+    )
+    client = _client()
+    try:
+        result = await client.sliding_sync(
+            "s2", required_state=[["m.room.member", "*"], ["m.room.power_levels", ""]]
+        )
+    finally:
+        await client.aclose()
+    sent = json.loads(route.calls.last.request.content)
+    assert sent["lists"]["onbot"]["required_state"] == [["m.room.member", "*"], ["m.room.power_levels", ""]]
+    assert {room.room_id: room.initial for room in result.rooms} == {"!r:x": True, "!q:x": False}
+    assert result.initial is False  # continued from a pos
+
+
+@respx.mock
+async def test_sliding_sync_requests_its_window_and_reports_the_room_count() -> None:
+    route = respx.post(url__regex=r".*/unstable/org\.matrix\.simplified_msc3575/sync.*").mock(
+        return_value=httpx.Response(200, json={"pos": "s2", "lists": {"onbot": {"count": 2400}}})
+    )
+    client = _client()
+    try:
+        result = await client.sliding_sync(None, window=2000)
+    finally:
+        await client.aclose()
+    assert json.loads(route.calls.last.request.content)["lists"]["onbot"]["ranges"] == [[0, 1999]]
+    assert (result.room_count, result.window) == (2400, 2000)
+    assert not result.covers_every_room
+
+
+@respx.mock
+async def test_sliding_sync_requests_and_returns_global_account_data() -> None:
+    route = respx.post(url__regex=r".*/unstable/org\.matrix\.simplified_msc3575/sync.*").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "pos": "s4",
+                "extensions": {
+                    "account_data": {"global": [{"type": "m.direct", "content": {"@a:x": ["!dm:x"]}}]}
+                },
+            },
+        )
+    )
+    client = _client()
+    try:
+        plain = await client.sliding_sync("s3")
+        result = await client.sliding_sync("s3", account_data=True)
+    finally:
+        await client.aclose()
+    assert "extensions" not in json.loads(route.calls[0].request.content)
+    assert json.loads(route.calls[1].request.content)["extensions"] == {"account_data": {"enabled": True}}
+    assert result.account_data == {"m.direct": {"@a:x": ["!dm:x"]}}
+    assert plain.account_data == result.account_data  # parsed whenever the server sends it
+
+
+@respx.mock
+async def test_send_text_message_uses_a_given_transaction_id() -> None:
+    route = respx.put(url__regex=r".*/v3/rooms/!r:x/send/m\.room\.message/.*").mock(
+        return_value=httpx.Response(200, json={"event_id": "$e"})
+    )
+    client = _client()
+    try:
+        await client.send_text_message("!r:x", "hi", txn_id="onbot-welcome-abc")
+        await client.send_text_message("!r:x", "hi")
+    finally:
+        await client.aclose()
+    paths = [call.request.url.path for call in route.calls]
+    assert paths[0].endswith("/send/m.room.message/onbot-welcome-abc")
+    assert not paths[1].endswith("/onbot-welcome-abc")
+
+
 @respx.mock
 async def test_negotiate_versions_reports_capabilities() -> None:
     respx.get("https://matrix.test/_matrix/client/versions").mock(
@@ -528,6 +605,37 @@ async def test_cs_api_effectors_delegate_to_client() -> None:
     assert create_kwargs["parent_space_id"] == "!space:matrix.test"
 
 
+async def test_cs_api_effectors_read_through_and_write_through_the_state_cache() -> None:
+    cache = RoomStateCache("matrix.test")
+    await cache.handle_sync(
+        SyncResult(
+            pos="s1",
+            initial=True,
+            rooms=[
+                RoomSync(
+                    room_id="!r:x",
+                    initial=True,
+                    required_state=[
+                        {"type": "m.room.power_levels", "state_key": "", "content": {"users": {"@a:x": 50}}}
+                    ],
+                )
+            ],
+        )
+    )
+    client = _RecordingMatrixClient()
+    effectors = CSApiEffectors(client, state_cache=cache)  # type: ignore[arg-type]
+
+    assert await effectors.get_room_power_levels("!r:x") == {"users": {"@a:x": 50}}
+    assert await effectors.get_room_state("!r:x", "test.matrix.onbot.group_room") is None
+    await effectors.set_room_power_levels("!r:x", {"users": {}})
+    assert await effectors.get_room_power_levels("!r:x") == {"users": {}}
+    # Only the write reached the client: every read was answered from the stream.
+    assert [c[0] for c in client.calls] == ["set_room_power_levels"]
+    # A room the stream never delivered falls back to HTTP.
+    assert await effectors.get_room_power_levels("!other:x") == {"users": {}}
+    assert client.calls[-1][0] == "get_room_power_levels"
+
+
 async def test_cs_api_effectors_create_lobby_sets_join_rule_and_suggested() -> None:
     client = _RecordingMatrixClient()
     effectors = CSApiEffectors(client)  # type: ignore[arg-type]
@@ -233,3 +233,23 @@ async def test_delete_room_omits_message_when_absent() -> None:
     body = json.loads(route.calls[0].request.content)
     assert "message" not in body
     assert body == {"block": True, "purge": True, "force_purge": False}
+
+
+@respx.mock
+async def test_list_rooms_fetches_the_remaining_offsets_from_total_rooms() -> None:
+    def _page(request: httpx.Request) -> httpx.Response:
+        start = int(request.url.params.get("from", "0"))
+        rooms = [{"room_id": f"!r{i}:x"} for i in range(start, min(start + 100, 250))]
+        body: dict[str, object] = {"rooms": rooms, "total_rooms": 250, "offset": start}
+        if start + 100 < 250:
+            body["next_batch"] = start + 100
+        return httpx.Response(200, json=body)
+
+    route = respx.get("https://matrix.test/_synapse/admin/v1/rooms").mock(side_effect=_page)
+    client = ApiClientSynapseAdmin(server_url="https://matrix.test", access_token="adm", page_concurrency=4)
+    try:
+        rooms = await client.list_rooms()
+    finally:
+        await client.aclose()
+    assert [r["room_id"] for r in rooms] == [f"!r{i}:x" for i in range(250)]
+    assert route.call_count == 3
@@ -0,0 +1,55 @@
+"""The sharded account-data map: stable placement, partial saves, schema gating."""
+
+from typing import Any
+
+from onbot.account_data import ShardedAccountDataStore
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.account_data: dict[str, dict[str, Any]] = {}
+        self.writes: list[str] = []
+
+    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
+        return dict(self.account_data.get(data_type, {}))
+
+    async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        self.account_data[data_type] = dict(content)
+        self.writes.append(data_type)
+
+
+def _store(client: FakeClient) -> ShardedAccountDataStore:
+    return ShardedAccountDataStore(client, "@bot:x", "org.x.onbot.things", shards=4)
+
+
+async def test_a_full_save_round_trips() -> None:
+    client = FakeClient()
+    entries = {f"!r{i}:x": {"n": i} for i in range(20)}
+    await _store(client).save(entries)
+
+    assert sorted(client.writes) == [f"org.x.onbot.things.{i}" for i in range(4)]
+    assert await _store(client).load() == entries
+
+
+async def test_a_partial_save_rewrites_only_the_touched_shards() -> None:
+    client = FakeClient()
+    store = _store(client)
+    entries = {f"!r{i}:x": {"n": i} for i in range(20)}
+    await store.save(entries)
+    client.writes.clear()
+
+    del entries["!r3:x"]
+    entries["!r4:x"] = {"n": 40}
+    await store.save(entries, keys=["!r3:x", "!r4:x"])
+
+    assert set(client.writes) == {f"org.x.onbot.things.{store.shard_of(k)}" for k in ("!r3:x", "!r4:x")}
+    loaded = await store.load()
+    assert "!r3:x" not in loaded and loaded["!r4:x"] == {"n": 40}
+    assert len(loaded) == 19
+
+
+async def test_shards_from_another_schema_are_ignored() -> None:
+    client = FakeClient()
+    client.account_data["org.x.onbot.things.0"] = {"schema_version": 999, "entries": {"!a:x": 1}}
+
+    assert await _store(client).load() == {}
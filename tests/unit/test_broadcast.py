@@ -3,10 +3,18 @@
 from __future__ import annotations
 
 import asyncio
+from typing import Any
 
 import pytest
 
-from onbot.admin.broadcast import BroadcastFailure, BroadcastResult, BroadcastService
+from onbot.admin.broadcast import (
+    INITIAL_CONCURRENCY,
+    BroadcastFailure,
+    BroadcastResult,
+    BroadcastService,
+    broadcast_txn_id,
+)
+from onbot.admin.broadcast_journal import BroadcastNotFoundError
 from onbot.config import AuthentikServer, OnbotConfig, SynapseServer
 
 BOT = "@bot:matrix.test"
@@ -26,29 +34,48 @@ def _config(**overrides: object) -> OnbotConfig:
 
 
 class _FakeClient:
-    """Serves ``m.direct`` account data and records sends; ``fail_rooms`` raise instead."""
+    """Serves ``m.direct`` and the journals' account data and records sends; ``fail_rooms`` raise.
+
+    Like Synapse, a repeated transaction id returns the original event instead of sending again.
+    """
 
     def __init__(self, direct: dict[str, list[str]], *, fail_rooms: set[str] | None = None) -> None:
         self._direct = direct
         self._fail_rooms = fail_rooms or set()
         self.sends: list[tuple[str, str, str]] = []
+        self.account_data: dict[str, dict[str, Any]] = {}
+        self.txns: dict[str, str] = {}
         self.in_flight = 0
         self.max_in_flight = 0
+        self.gate: asyncio.Event | None = None
 
-    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, list[str]]:
+    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
         assert user_id == BOT
-        assert data_type == "m.direct"
-        return dict(self._direct)
+        if data_type == "m.direct":
+            return dict(self._direct)
+        return dict(self.account_data.get(data_type, {}))
+
+    async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        self.account_data[data_type] = dict(content)
 
-    async def send_text_message(self, room_id: str, body: str, *, msgtype: str = "m.text") -> str:
+    async def send_text_message(
+        self, room_id: str, body: str, *, msgtype: str = "m.text", txn_id: str | None = None
+    ) -> str:
         self.in_flight += 1
         self.max_in_flight = max(self.max_in_flight, self.in_flight)
         try:
             await asyncio.sleep(0)  # let the other senders pile up, so the bound is observable
+            if self.gate is not None:
+                await self.gate.wait()
             if room_id in self._fail_rooms:
                 raise RuntimeError("M_LIMIT_EXCEEDED")
+            if txn_id is not None and txn_id in self.txns:
+                return self.txns[txn_id]
             self.sends.append((room_id, body, msgtype))
-            return f"$evt-{room_id}"
+            event_id = f"$evt-{room_id}"
+            if txn_id is not None:
+                self.txns[txn_id] = event_id
+            return event_id
         finally:
             self.in_flight -= 1
 
@@ -132,3 +159,90 @@ def test_summary_names_the_failures() -> None:
 
     assert "sent to 1 rooms, 1 failed" in summary
     assert "@b:matrix.test (!bad:x): boom" in summary
+
+
+def _users(n: int) -> dict[str, list[str]]:
+    return {f"@u{i}:matrix.test": [f"!r{i}:x"] for i in range(n)}
+
+
+async def test_concurrency_grows_while_sends_succeed() -> None:
+    client = _FakeClient(_users(100))
+
+    result = await _service(client).broadcast("hello")
+
+    assert result.sent_count == 100
+    assert client.max_in_flight > INITIAL_CONCURRENCY
+
+
+async def test_resume_sends_only_to_the_rooms_the_first_run_missed() -> None:
+    client = _FakeClient(_users(4), fail_rooms={"!r1:x", "!r3:x"})
+    first = await _service(client).broadcast("hello")
+    assert first.failed_count == 2
+
+    client._fail_rooms = set()
+    resumed = await _service(client).resume(first.broadcast_id)
+
+    assert sorted(resumed.sent) == ["!r1:x", "!r3:x"]
+    assert resumed.already_delivered == 2
+    assert sorted(room for room, _, _ in client.sends) == ["!r0:x", "!r1:x", "!r2:x", "!r3:x"]
+    assert (
+        f"broadcast {first.broadcast_id}: sent to 2 rooms, 0 failed (2 already had it)" in resumed.summary()
+    )
+
+
+async def test_a_broadcast_killed_half_way_resumes_without_repeating_a_room() -> None:
+    client = _FakeClient(_users(12))
+    service = _service(client, concurrency=3)
+    client.gate = asyncio.Event()
+    task = asyncio.create_task(service.broadcast("hello"))
+    for _ in range(20):
+        await asyncio.sleep(0)
+    assert service.progress is not None
+    broadcast_id = service.progress.broadcast_id
+
+    # Let a few sends through, then kill the run with sends still in flight.
+    client.gate.set()
+    await asyncio.sleep(0)
+    client.gate.clear()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert 0 < len(client.sends) < 12
+
+    client.gate = None
+    await _service(client).resume(broadcast_id)
+
+    rooms = [room for room, _, _ in client.sends]
+    assert sorted(rooms) == sorted(f"!r{i}:x" for i in range(12))  # everyone, and nobody twice
+
+
+async def test_resuming_an_unknown_broadcast_is_an_error() -> None:
+    with pytest.raises(BroadcastNotFoundError):
+        await _service(_FakeClient({})).resume("000000000000")
+    with pytest.raises(BroadcastNotFoundError):
+        await _service(_FakeClient({})).resume("../m.direct")
+
+
+async def test_progress_reports_sent_total_rate_and_eta() -> None:
+    client = _FakeClient(_users(4))
+    clock = [100.0]
+    service = _service(client, clock=lambda: clock[0])
+    client.gate = asyncio.Event()
+    task = asyncio.create_task(service.broadcast("hello"))
+    await asyncio.sleep(0)
+    assert service.progress is not None
+    assert "0/4 sent, 0 failed, 0.0 rooms/s, ETA unknown" in str(service.progress)
+
+    service.progress.sent = 2
+    clock[0] = 110.0
+    assert "2/4 sent, 0 failed, 0.2 rooms/s, ETA 10s, concurrency 5" in str(service.progress)
+
+    client.gate.set()
+    await task
+    assert service.progress is None
+
+
+def test_txn_ids_are_stable_per_broadcast_and_room() -> None:
+    assert broadcast_txn_id("a" * 12, "!r:x") == broadcast_txn_id("a" * 12, "!r:x")
+    assert broadcast_txn_id("a" * 12, "!r:x") != broadcast_txn_id("b" * 12, "!r:x")
+    assert broadcast_txn_id("a" * 12, "!r:x") != broadcast_txn_id("a" * 12, "!s:x")
@@ -0,0 +1,86 @@
+"""The broadcast journal: what survives a restart, and what a failed write costs."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from onbot.admin.broadcast_journal import BroadcastJournal, BroadcastNotFoundError
+
+BOT = "@bot:matrix.test"
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.account_data: dict[str, dict[str, Any]] = {}
+        self.fail_writes = False
+        self.gate: asyncio.Event | None = None
+
+    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
+        return dict(self.account_data.get(data_type, {}))
+
+    async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        if self.fail_writes:
+            raise RuntimeError("synapse is down")
+        if self.gate is not None:
+            await self.gate.wait()
+        self.account_data[data_type] = dict(content)
+
+
+async def test_the_message_and_delivered_rooms_survive_a_restart() -> None:
+    client = FakeClient()
+    journal = await BroadcastJournal.create(client, BOT, "matrix.test", "Maintenance at 22:00")
+    journal.record("!a:x", "$a")
+    journal.record("!b:x", "$b")
+    await journal.flush()
+
+    reopened = await BroadcastJournal.load(client, BOT, "matrix.test", journal.broadcast_id.upper())
+
+    assert reopened.message == "Maintenance at 22:00"
+    assert reopened.delivered == {"!a:x": "$a", "!b:x": "$b"}
+    assert not reopened.completed
+    await reopened.finish()
+    assert (await BroadcastJournal.load(client, BOT, "matrix.test", journal.broadcast_id)).completed
+
+
+async def test_a_failed_flush_is_carried_by_the_next_one() -> None:
+    client = FakeClient()
+    journal = await BroadcastJournal.create(client, BOT, "matrix.test", "hi")
+    journal.record("!a:x", "$a")
+    client.fail_writes = True
+    await journal.flush()  # logged, not raised: the broadcast goes on
+
+    client.fail_writes = False
+    await journal.flush()
+
+    reopened = await BroadcastJournal.load(client, BOT, "matrix.test", journal.broadcast_id)
+    assert reopened.delivered == {"!a:x": "$a"}
+
+
+async def test_a_journal_whose_header_was_never_written_cannot_be_resumed() -> None:
+    client = FakeClient()
+    client.fail_writes = True
+    journal = await BroadcastJournal.create(client, BOT, "matrix.test", "hi")
+
+    with pytest.raises(BroadcastNotFoundError):
+        await BroadcastJournal.load(client, BOT, "matrix.test", journal.broadcast_id)
+
+
+async def test_a_flush_cancelled_mid_save_keeps_its_rooms_for_the_next_one() -> None:
+    client = FakeClient()
+    journal = await BroadcastJournal.create(client, BOT, "matrix.test", "hi")
+    journal.record("!a:x", "$a")
+    client.gate = asyncio.Event()
+    flush = asyncio.create_task(journal.flush())
+    await asyncio.sleep(0)
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+
+    client.gate = None
+    await journal.flush()
+
+    reopened = await BroadcastJournal.load(client, BOT, "matrix.test", journal.broadcast_id)
+    assert reopened.delivered == {"!a:x": "$a"}
@@ -0,0 +1,125 @@
+"""The per-host circuit breaker: opening on consecutive failures, the half-open trial, the registry."""
+
+import pytest
+
+from onbot.clients.circuit import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, CircuitState
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.before_request()
+        breaker.record_failure()
+
+
+def test_opens_after_the_threshold_of_consecutive_failures() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("https://matrix.test:443", failure_threshold=3, reset_after=30, clock=clock)
+    _fail(breaker, 2)
+    assert breaker.state is CircuitState.closed
+
+    _fail(breaker, 1)
+    assert breaker.state is CircuitState.open and breaker.opened == 1
+    clock.now = 10
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_request()
+    assert exc_info.value.retry_in == 20
+    assert "https://matrix.test:443 is unavailable" in str(exc_info.value)
+
+
+def test_a_success_resets_the_count() -> None:
+    breaker = CircuitBreaker("o", failure_threshold=3, clock=_Clock())
+    _fail(breaker, 2)
+    breaker.before_request()
+    breaker.record_success()  # a 4xx lands here too: the server answered
+    _fail(breaker, 2)
+    assert breaker.state is CircuitState.closed and breaker.failures == 2
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("o", failure_threshold=1, reset_after=30, clock=clock)
+    _fail(breaker, 1)
+    clock.now = 30
+
+    breaker.before_request()  # the trial
+    assert breaker.state is CircuitState.half_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()  # everyone else waits for its outcome
+    breaker.record_success()
+    assert breaker.state is CircuitState.closed
+    breaker.before_request()
+
+
+def test_a_failed_trial_reopens_for_another_full_period() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("o", failure_threshold=5, reset_after=30, clock=clock)
+    _fail(breaker, 5)
+    clock.now = 31
+    _fail(breaker, 1)  # one failure is enough while half-open
+
+    assert breaker.state is CircuitState.open and breaker.opened == 2
+    clock.now = 60
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_an_abandoned_trial_frees_the_slot() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("o", failure_threshold=1, reset_after=0, clock=clock)
+    _fail(breaker, 1)
+    breaker.before_request()
+    breaker.abandon()  # the trial was cancelled before an answer came back
+    breaker.before_request()
+
+
+def test_a_long_poll_trial_does_not_hold_up_a_short_request() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("o", failure_threshold=1, reset_after=30, clock=clock)
+    _fail(breaker, 1)
+    clock.now = 30
+
+    breaker.before_request(long_poll=True)  # the sync pump's long-poll, held open by the server
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(long_poll=True)
+    breaker.before_request()  # a short request still gets through alongside it
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()  # the short one answered first and decides
+    assert breaker.state is CircuitState.closed
+
+
+def test_a_long_poll_waits_for_a_short_trial() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("o", failure_threshold=1, reset_after=30, clock=clock)
+    _fail(breaker, 1)
+    clock.now = 30
+
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(long_poll=True)
+    breaker.abandon()
+    breaker.before_request(long_poll=True)
+    breaker.abandon(long_poll=True)
+    breaker.before_request(long_poll=True)
+
+
+def test_the_registry_keeps_one_circuit_per_origin_and_reports_them() -> None:
+    registry = CircuitBreakerRegistry(failure_threshold=1, clock=_Clock())
+    assert registry.stats() == "no requests yet"
+    assert registry.breaker("https://matrix.test/a") is registry.breaker("https://matrix.test:443/b")
+
+    _fail(registry.breaker("https://authentik.test/api"), 1)
+    registry.breaker("https://matrix.test/").record_success()
+    assert registry.open_circuits() == ["https://authentik.test:443"]
+    assert registry.stats() == (
+        "https://authentik.test:443 open (1 consecutive failures, opened 1x); "
+        "https://matrix.test:443 closed (0 consecutive failures, opened 0x)"
+    )
@@ -0,0 +1,119 @@
+"""The room classification index: lookups, staggered expiry, invalidation and persistence."""
+
+from typing import Any
+
+from onbot.account_data import ShardedAccountDataStore
+from onbot.clients.matrix import RoomSync, SyncResult
+from onbot.reconciler.classification import UNMANAGED, RoomClassificationIndex
+from onbot.reconciler.state import OnbotRoomType
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.account_data: dict[str, dict[str, Any]] = {}
+
+    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
+        return dict(self.account_data.get(data_type, {}))
+
+    async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        self.account_data[data_type] = dict(content)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _index(client: FakeClient, clock: Clock) -> RoomClassificationIndex:
+    store = ShardedAccountDataStore(client, "@bot:x", "org.x.onbot.room_classes", shards=2)
+    return RoomClassificationIndex(store, "x", reverify_after_sec=100, clock=clock)
+
+
+async def test_answers_persist_and_reload() -> None:
+    client, clock = FakeClient(), Clock()
+    index = _index(client, clock)
+    await index.ensure_loaded()
+    index.record("!a:x", UNMANAGED)
+    index.record("!b:x", OnbotRoomType.group_room, "g1")
+    await index.flush()
+
+    reloaded = _index(client, clock)
+    await reloaded.ensure_loaded()
+    a, b = reloaded.lookup("!a:x"), reloaded.lookup("!b:x")
+    assert a is not None and a.is_unmanaged
+    assert b is not None and (b.kind, b.group_id) == ("group_room", "g1")
+
+
+async def test_answers_expire_within_the_second_half_of_the_period() -> None:
+    client, clock = FakeClient(), Clock()
+    index = _index(client, clock)
+    await index.ensure_loaded()
+    rooms = [f"!r{i}:x" for i in range(50)]
+    for room_id in rooms:
+        index.record(room_id, UNMANAGED)
+
+    clock.now += 49
+    assert all(index.lookup(r) is not None for r in rooms)
+    clock.now += 26
+    expired = sum(index.lookup(r) is None for r in rooms)
+    assert 0 < expired < len(rooms)  # staggered, not all at once
+    clock.now += 26
+    assert all(index.lookup(r) is None for r in rooms)
+
+
+async def test_sync_invalidates_on_create_and_onbot_state_only() -> None:
+    client, clock = FakeClient(), Clock()
+    index = _index(client, clock)
+    await index.ensure_loaded()
+    for room_id in ("!new:x", "!stamped:x", "!chatty:x"):
+        index.record(room_id, UNMANAGED)
+
+    await index.handle_sync(
+        SyncResult(
+            pos="s1",
+            rooms=[
+                RoomSync(room_id="!new:x", timeline=[{"type": "m.room.create", "state_key": ""}]),
+                RoomSync(
+                    room_id="!stamped:x", required_state=[{"type": "x.onbot.visitor_lobby", "state_key": ""}]
+                ),
+                RoomSync(room_id="!chatty:x", timeline=[{"type": "m.room.message"}]),
+            ],
+        )
+    )
+
+    assert index.lookup("!new:x") is None
+    assert index.lookup("!stamped:x") is None
+    assert index.lookup("!chatty:x") is not None
+
+
+async def test_an_invalidation_before_the_first_load_survives_it() -> None:
+    client, clock = FakeClient(), Clock()
+    seeded = _index(client, clock)
+    await seeded.ensure_loaded()
+    seeded.record("!a:x", UNMANAGED)
+    await seeded.flush()
+
+    index = _index(client, clock)
+    await index.handle_sync(
+        SyncResult(pos="s1", rooms=[RoomSync(room_id="!a:x", timeline=[{"type": "m.room.create"}])])
+    )
+    await index.ensure_loaded()
+
+    assert index.lookup("!a:x") is None
+
+
+async def test_retain_forgets_rooms_that_are_gone() -> None:
+    client, clock = FakeClient(), Clock()
+    index = _index(client, clock)
+    await index.ensure_loaded()
+    index.record("!a:x", UNMANAGED)
+    index.record("!b:x", UNMANAGED)
+    index.retain(["!a:x"])
+    await index.flush()
+
+    reloaded = _index(client, clock)
+    await reloaded.ensure_loaded()
+    assert len(reloaded) == 1
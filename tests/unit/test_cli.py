@@ -70,7 +70,7 @@ def test_broadcast_passes_the_message_and_propagates_its_exit_code(
 ) -> None:
     captured: dict[str, object] = {}
 
-    async def fake_run_broadcast(config: object, message: str) -> int:
+    async def fake_run_broadcast(config: object, message: str, *, resume: str | None = None) -> int:
         captured["message"] = message
         return 1  # a room failed; the exit code must survive to the shell
 
@@ -85,3 +85,34 @@ def test_broadcast_passes_the_message_and_propagates_its_exit_code(
 def test_broadcast_requires_a_message() -> None:
     with pytest.raises(SystemExit):
         cli.main(["broadcast"])
+
+
+def test_broadcast_resume_passes_the_id_instead_of_a_message(monkeypatch: pytest.MonkeyPatch) -> None:
+    captured: dict[str, object] = {}
+
+    async def fake_run_broadcast(config: object, message: str | None, *, resume: str | None = None) -> int:
+        captured.update(message=message, resume=resume)
+        return 0
+
+    monkeypatch.setattr(cli, "load_config", lambda: SimpleNamespace(log_level="INFO"))
+    monkeypatch.setattr(cli, "get_config_file_path", lambda: "config.yml")
+    monkeypatch.setattr("onbot.app.run_broadcast", fake_run_broadcast)
+
+    assert cli.main(["broadcast", "--resume", "3f2a9c1b7d4e"]) == 0
+    assert captured == {"message": None, "resume": "3f2a9c1b7d4e"}
+
+
+def test_broadcast_refuses_a_message_together_with_resume() -> None:
+    with pytest.raises(SystemExit):
+        cli.main(["broadcast", "hello", "--resume", "3f2a9c1b7d4e"])
+
+
+def test_plan_dispatches_and_propagates_its_exit_code(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def fake_run_plan(config: object) -> int:
+        return 0
+
+    monkeypatch.setattr(cli, "load_config", lambda: SimpleNamespace(log_level="INFO"))
+    monkeypatch.setattr(cli, "get_config_file_path", lambda: "config.yml")
+    monkeypatch.setattr("onbot.app.run_plan", fake_run_plan)
+
+    assert cli.main(["plan"]) == 0
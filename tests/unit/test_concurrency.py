@@ -0,0 +1,112 @@
+"""The AIMD concurrency bound: slow growth on success, halving on a 429 or a slow send."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from onbot.admin.concurrency import AdaptiveConcurrency
+from onbot.clients.base import ApiError
+
+
+def _limit(initial: int = 4, maximum: int = 16, *, clock: list[float] | None = None) -> AdaptiveConcurrency:
+    now = clock if clock is not None else [0.0]
+    return AdaptiveConcurrency(initial=initial, maximum=maximum, slow_after=2.0, clock=lambda: now[0])
+
+
+async def _succeed(limit: AdaptiveConcurrency) -> None:
+    async with limit.slot():
+        pass
+
+
+async def _throttled(limit: AdaptiveConcurrency) -> None:
+    with pytest.raises(ApiError):
+        async with limit.slot():
+            raise ApiError("PUT", "https://matrix.test/send", 429)
+
+
+async def test_grows_by_one_per_window_of_successes() -> None:
+    limit = _limit(initial=4)
+
+    for _ in range(4):
+        await _succeed(limit)
+    assert limit.limit == 5
+    for _ in range(4):
+        await _succeed(limit)
+    assert limit.limit == 5  # the next window is five sends long
+    await _succeed(limit)
+    assert limit.limit == 6
+
+
+async def test_never_grows_past_the_maximum() -> None:
+    limit = _limit(initial=2, maximum=3)
+
+    for _ in range(50):
+        await _succeed(limit)
+
+    assert limit.limit == 3
+
+
+async def test_a_429_halves_the_limit_down_to_the_minimum() -> None:
+    limit = _limit(initial=8)
+
+    await _throttled(limit)
+    assert limit.limit == 4
+    for _ in range(5):
+        await _throttled(limit)
+    assert limit.limit == 1
+
+
+async def test_a_slow_send_counts_as_congestion() -> None:
+    clock = [0.0]
+    limit = _limit(initial=8, clock=clock)
+
+    async with limit.slot():
+        clock[0] += 3.0  # a retried 429 comes back as a slow success
+
+    assert limit.limit == 4
+
+
+async def test_other_errors_leave_the_limit_alone() -> None:
+    limit = _limit(initial=4)
+
+    with pytest.raises(ApiError):
+        async with limit.slot():
+            raise ApiError("PUT", "https://matrix.test/send", 403)
+
+    assert limit.limit == 4
+
+
+async def test_a_burst_of_429s_from_one_window_cuts_once() -> None:
+    limit = _limit(initial=8)
+    release = asyncio.Event()
+
+    async def _send() -> None:
+        async with limit.slot():
+            await release.wait()
+            raise ApiError("PUT", "https://matrix.test/send", 429)
+
+    sends = [asyncio.create_task(_send()) for _ in range(8)]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*sends, return_exceptions=True)
+
+    assert limit.limit == 4
+    assert limit.decreases == 1
+
+
+async def test_never_more_in_flight_than_the_limit() -> None:
+    limit = _limit(initial=3, maximum=3)
+    peak = 0
+
+    async def _send() -> None:
+        nonlocal peak
+        async with limit.slot():
+            peak = max(peak, limit.in_flight)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(_send() for _ in range(20)))
+
+    assert peak == 3
+    assert limit.in_flight == 0
@@ -96,6 +96,30 @@ def test_visitor_lobby_with_a_space_is_accepted() -> None:
     assert cfg.matrix_room_default_settings.visitor_lobby_enabled is True
 
 
+def test_managed_aliases_only_requires_an_alias_prefix() -> None:
+    # A group room without the prefix would drop out of the narrowed listing and be re-created.
+    with pytest.raises(ValueError, match="alias_prefix"):
+        OnbotConfig.model_validate(_MINIMAL | {"performance": {"room_inventory_managed_aliases_only": True}})
+    with pytest.raises(ValueError, match="alias_prefix"):
+        OnbotConfig.model_validate(
+            _MINIMAL
+            | {
+                "performance": {"room_inventory_managed_aliases_only": True},
+                "matrix_room_default_settings": {"alias_prefix": "grp-"},
+                "per_authentik_group_pk_matrix_room_settings": {"g1": {"alias_prefix": None}},
+            }
+        )
+    cfg = OnbotConfig.model_validate(
+        _MINIMAL
+        | {
+            "performance": {"room_inventory_managed_aliases_only": True},
+            "matrix_room_default_settings": {"alias_prefix": "grp-"},
+            "per_authentik_group_pk_matrix_room_settings": {"g1": {"topic_prefix": "X:"}},
+        }
+    )
+    assert cfg.performance.room_inventory_managed_aliases_only is True
+
+
 def test_generate_example_config_roundtrips() -> None:
     text = generate_example_config()
     data = yaml.safe_load(text)
@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 from onbot.admin.admins import AdminResolver
 from onbot.admin.broadcast import BroadcastResult
 from onbot.admin.control_room import ControlRoomHandler
+from onbot.clients.circuit import CircuitBreakerRegistry
 from onbot.clients.matrix import RoomSync, SyncResult
+from onbot.clients.ratelimit import RateLimiter
 from onbot.config import AdminRoom, AuthentikServer, OnbotConfig, SynapseServer
+from onbot.onboarding.queue import WelcomeQueue
 
 BOT = "@bot:matrix.test"
 ADMIN = "@admin:matrix.test"
@@ -69,9 +73,13 @@ class _FakeBroadcast:
     def __init__(self) -> None:
         self.calls: list[str] = []
         self.rooms = {"!a:x": "@a:x", "!b:x": "@b:x"}
+        self.progress: object | None = None
+        self.release = asyncio.Event()
+        self.release.set()
 
     async def broadcast(self, message: str) -> BroadcastResult:
         self.calls.append(message)
+        await self.release.wait()
         return BroadcastResult(sent=list(self.rooms))
 
     async def target_rooms(self) -> dict[str, str]:
@@ -86,6 +94,9 @@ def _handler(
     engine: object | None = None,
     remembered_events: int = 200,
     resolver: AdminResolver | None = None,
+    rate_limiter: RateLimiter | None = None,
+    circuit_breakers: CircuitBreakerRegistry | None = None,
+    onboarding: WelcomeQueue | None = None,
 ) -> ControlRoomHandler:
     config = _config(admins)
     handler = ControlRoomHandler(
@@ -94,6 +105,9 @@ def _handler(
         broadcast,  # type: ignore[arg-type]
         resolver or AdminResolver(_FakeAuthentik(), config),  # type: ignore[arg-type]
         engine=engine,  # type: ignore[arg-type]
+        rate_limiter=rate_limiter,
+        circuit_breakers=circuit_breakers,
+        onboarding=onboarding,
         started_at_ms=NOW_MS,
         remembered_events=remembered_events,
     )
@@ -132,6 +146,13 @@ def _message(
 async def _run(handler: ControlRoomHandler, *results: SyncResult) -> None:
     for result in results:
         await handler.handle_sync(result)
+    await _announced(handler)
+
+
+async def _announced(handler: ControlRoomHandler) -> None:
+    """Wait for the announcement the handler started, if any, to finish."""
+    if handler._announcement is not None:
+        await handler._announcement
 
 
 # --- authorisation ---------------------------------------------------------
@@ -143,7 +164,8 @@ async def test_an_allowlisted_admin_can_announce() -> None:
     await _run(_handler(client, broadcast), _message("!announce Maintenance at 22:00"))
 
     assert broadcast.calls == ["Maintenance at 22:00"]
-    assert "sent to 2 rooms, 0 failed" in client.sends[0][1]
+    assert "!status shows how far it has got" in client.sends[0][1]
+    assert "sent to 2 rooms, 0 failed" in client.sends[1][1]
 
 
 async def test_a_member_who_is_not_on_the_allowlist_is_refused() -> None:
@@ -341,9 +363,84 @@ async def test_status_reports_version_reconcile_time_and_room_count() -> None:
     assert "managed rooms: 2" in body
 
 
+async def test_status_reports_throttling_per_host() -> None:
+    client, broadcast = _FakeClient(), _FakeBroadcast()
+    limiter = RateLimiter()
+    limiter.pause("https://matrix.test/_matrix/client/v3/x", 5)
+
+    await _run(_handler(client, broadcast, rate_limiter=limiter), _message("!status"))
+
+    assert "https://matrix.test:443 (uncapped): 0 requests, 1 throttled" in client.sends[0][1]
+
+
+async def test_status_reports_the_circuit_of_each_host() -> None:
+    client, broadcast = _FakeClient(), _FakeBroadcast()
+    breakers = CircuitBreakerRegistry(failure_threshold=1)
+    breakers.breaker("https://authentik.test/api/v3/core/users/").record_failure()
+
+    await _run(_handler(client, broadcast, circuit_breakers=breakers), _message("!status"))
+
+    assert "upstreams: https://authentik.test:443 open (1 consecutive failures" in client.sends[0][1]
+
+
 async def test_status_before_the_first_reconcile_says_so() -> None:
     client, broadcast = _FakeClient(), _FakeBroadcast()
 
     await _run(_handler(client, broadcast), _message("!status"))
 
     assert "last reconcile: not yet" in client.sends[0][1]
+
+
+async def test_status_reports_the_onboarding_queue_depth() -> None:
+    client, broadcast = _FakeClient(), _FakeBroadcast()
+
+    async def _welcome(mxid: str) -> None:
+        return None
+
+    queue = WelcomeQueue(_welcome, workers=2)
+    queue.submit("@new:matrix.test")
+
+    await _run(_handler(client, broadcast, onboarding=queue), _message("!status"))
+
+    assert "onboarding: 1 waiting, 0 in progress (2 workers" in client.sends[0][1]
+
+
+async def test_status_reports_a_running_broadcast_and_a_second_announce_waits() -> None:
+    client, broadcast = _FakeClient(), _FakeBroadcast()
+    broadcast.release.clear()
+    handler = _handler(client, broadcast)
+
+    await handler.handle_sync(_message("!announce first", event_id="$a"))
+    await asyncio.sleep(0)  # the announcement is now sending, beside the sync stream
+    broadcast.progress = "broadcast 3f2a9c1b7d4e: 120/600 sent, 0 failed, 14.2 rooms/s, ETA 34s"
+    await handler.handle_sync(_message("!status", event_id="$b"))
+    await handler.handle_sync(_message("!announce second", event_id="$c"))
+
+    assert "120/600 sent" in client.sends[1][1] and "ETA 34s" in client.sends[1][1]
+    assert "still being sent" in client.sends[2][1]
+    broadcast.release.set()
+    await _announced(handler)
+    assert broadcast.calls == ["first"]
+    assert "sent to 2 rooms" in client.sends[-1][1]
+
+
+class _Progress:
+    broadcast_id = "3f2a9c1b7d4e"
+
+    def __str__(self) -> str:
+        return "broadcast 3f2a9c1b7d4e: 120/600 sent"
+
+
+async def test_shutdown_cancels_a_running_announcement_and_says_how_to_resume_it() -> None:
+    client, broadcast = _FakeClient(), _FakeBroadcast()
+    broadcast.release.clear()
+    handler = _handler(client, broadcast)
+    await handler.handle_sync(_message("!announce first"))
+    await asyncio.sleep(0)
+    broadcast.progress = _Progress()
+
+    await handler.aclose()
+
+    assert "interrupted by a shutdown" in client.sends[-1][1]
+    assert "onbot broadcast --resume 3f2a9c1b7d4e" in client.sends[-1][1]
+    assert handler._announcement is None  # nothing left running
@@ -0,0 +1,56 @@
+"""Unit tests for the per-entity directory digests: exact deltas, and work bounded by what changed."""
+
+from __future__ import annotations
+
+from onbot.digest import BUCKETS, DigestTree, DirectoryDelta, EntityDelta
+
+
+def _tree(n: int, **over: tuple[object, ...]) -> DigestTree:
+    return DigestTree.build([(str(pk), over.get(str(pk), (pk, "same"))) for pk in range(n)])
+
+
+def test_equal_contents_give_equal_roots_whatever_the_order() -> None:
+    entries = [(str(pk), (pk, "x")) for pk in range(500)]
+    assert DigestTree.build(entries).root == DigestTree.build(entries[::-1]).root
+    assert DigestTree.build(entries).root != DigestTree.build(entries[1:]).root
+
+
+def test_diff_reports_exactly_the_added_removed_and_modified_pks() -> None:
+    before = DigestTree.build([("1", ("a",)), ("2", ("b",)), ("3", ("c",))])
+    after = DigestTree.build([("2", ("b",)), ("3", ("changed",)), ("4", ("d",))])
+
+    assert before.diff(after) == EntityDelta(
+        added=frozenset({"4"}), removed=frozenset({"1"}), modified=frozenset({"3"})
+    )
+    assert after.diff(before) == EntityDelta(
+        added=frozenset({"1"}), removed=frozenset({"4"}), modified=frozenset({"3"})
+    )
+    assert not before.diff(before)
+
+
+def test_put_and_remove_keep_the_root_equal_to_a_rebuilt_tree() -> None:
+    tree = _tree(1000)
+    assert tree.put("7", ("changed",)) is True
+    assert tree.put("7", ("changed",)) is False  # no change, no work
+    assert tree.remove("8") is True
+    assert tree.remove("8") is False
+    assert "7" in tree and "8" not in tree
+
+    rebuilt = _tree(1000, **{"7": ("changed",)})
+    rebuilt.remove("8")
+    assert tree.root == rebuilt.root
+    assert len(tree) == 999
+
+
+def test_diff_opens_only_the_buckets_that_changed() -> None:
+    before, after = _tree(20_000), _tree(20_000, **{"123": ("changed",)})
+    changed = [b for b in range(BUCKETS) if before._xor[b] != after._xor[b]]
+    assert len(changed) == 1
+    assert before.diff(after) == EntityDelta(modified=frozenset({"123"}))
+
+
+def test_directory_delta_summarises_both_kinds() -> None:
+    delta = DirectoryDelta(users=EntityDelta(added=frozenset({"1", "2"})), groups=EntityDelta())
+    assert delta
+    assert str(delta) == "users +2 -0 ~0, groups +0 -0 ~0"
+    assert not DirectoryDelta()
@@ -0,0 +1,93 @@
+"""Unit tests for the in-memory ``m.direct`` index: one load, batched writes, and no lost entries."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from onbot.clients.matrix import SyncResult
+from onbot.onboarding.direct_rooms import DirectRoomIndex
+
+BOT = "@bot:matrix.test"
+
+
+class _FakeClient:
+    def __init__(self, direct: dict[str, list[str]] | None = None) -> None:
+        self.direct = dict(direct or {})
+        self.reads = 0
+        self.writes: list[dict[str, list[str]]] = []
+        self.fail_next_write = False
+
+    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
+        assert (user_id, data_type) == (BOT, "m.direct")
+        self.reads += 1
+        await asyncio.sleep(0)
+        return dict(self.direct)
+
+    async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        await asyncio.sleep(0)
+        if self.fail_next_write:
+            self.fail_next_write = False
+            raise RuntimeError("synapse is down")
+        self.direct = dict(content)
+        self.writes.append(dict(content))
+
+
+async def test_loads_once_however_many_readers_arrive_together() -> None:
+    client = _FakeClient({"@a:x": ["!a:x"]})
+    index = DirectRoomIndex(client, BOT)
+
+    rooms = await asyncio.gather(*(index.room_for("@a:x") for _ in range(10)))
+
+    assert rooms == ["!a:x"] * 10
+    assert client.reads == 1
+    assert await index.room_for("@nobody:x") is None
+
+
+async def test_concurrent_adds_share_writes_and_keep_every_entry() -> None:
+    client = _FakeClient({"@old:x": ["!old:x"]})
+    index = DirectRoomIndex(client, BOT)
+
+    await asyncio.gather(*(index.add(f"@u{i}:x", f"!r{i}:x") for i in range(10)))
+
+    assert client.direct == {"@old:x": ["!old:x"], **{f"@u{i}:x": [f"!r{i}:x"] for i in range(10)}}
+    assert len(client.writes) < 10
+    assert index.writes == len(client.writes)
+
+
+async def test_a_failed_write_is_carried_by_the_next_one() -> None:
+    client = _FakeClient()
+    index = DirectRoomIndex(client, BOT)
+    client.fail_next_write = True
+
+    with pytest.raises(RuntimeError):
+        await index.add("@a:x", "!a:x")
+    await index.add("@b:x", "!b:x")
+
+    assert client.direct == {"@a:x": ["!a:x"], "@b:x": ["!b:x"]}
+
+
+async def test_sync_slices_are_merged_not_swapped_in() -> None:
+    """A slice assembled before our write landed must not make the index forget that room."""
+    client = _FakeClient()
+    index = DirectRoomIndex(client, BOT)
+    await index.add("@a:x", "!a:x")
+
+    await index.handle_sync(SyncResult(pos="s1", account_data={"m.direct": {"@other:x": ["!o:x"]}}))
+    await index.handle_sync(SyncResult(pos="s2"))  # no m.direct in this slice: nothing changes
+
+    assert await index.rooms() == {"@a:x": ["!a:x"], "@other:x": ["!o:x"]}
+    await index.add("@b:x", "!b:x")
+    assert set(client.direct) == {"@a:x", "@b:x", "@other:x"}
+
+
+async def test_a_slice_before_first_use_saves_the_load() -> None:
+    client = _FakeClient()
+    index = DirectRoomIndex(client, BOT)
+
+    await index.handle_sync(SyncResult(pos="s1", account_data={"m.direct": {"@a:x": ["!a:x"]}}))
+
+    assert await index.room_for("@a:x") == "!a:x"
+    assert client.reads == 0
@@ -0,0 +1,131 @@
+"""The per-pass Authentik directory snapshot: one concurrent read, filtered in memory."""
+
+import asyncio
+from typing import Any
+
+from onbot.config import OnbotConfig
+from onbot.directory import fetch_directory_snapshot, group_matches_attributes
+
+_BASE = {
+    "synapse_server": {
+        "server_name": "company.org",
+        "server_url": "https://internal.matrix",
+        "bot_user_id": "@bot:company.org",
+        "bot_access_token": "tok",
+    },
+    "authentik_server": {"url": "https://authentik/", "api_key": "key"},
+}
+
+_GROUPS = [
+    {"pk": "g1", "name": "Team", "attributes": {"is_chatroom": True, "chat-systemwide-powerlevel": 50}},
+    {"pk": "g2", "name": "Admins", "attributes": {"chat-systemwide-powerlevel": 100}},
+    {"pk": "g3", "name": "Other", "attributes": {"is_chatroom": True}},
+]
+
+
+class RecordingAuthentik:
+    """Answers per path, records every call, and tracks how many listings run at once."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _listing(self, kind: str, kwargs: dict[str, Any]) -> None:
+        self.calls.append((kind, kwargs))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+
+    async def list_users(self, **kwargs: Any) -> list[dict[str, Any]]:
+        await self._listing("users", kwargs)
+        if kwargs.get("filter_is_active") is False:
+            return [{"username": "dave", "pk": 4}]
+        return {
+            "staff": [{"username": "alice", "pk": 1}, {"username": "bob", "pk": 2}],
+            "guests": [{"username": "bob", "pk": 2}, {"username": "carol", "pk": 3}],
+        }.get(kwargs.get("filter_by_path") or "", [])
+
+    async def list_groups(self, **kwargs: Any) -> list[dict[str, Any]]:
+        await self._listing("groups", kwargs)
+        return _GROUPS
+
+
+def _config(**rooms: Any) -> OnbotConfig:
+    return OnbotConfig.model_validate(
+        {
+            **_BASE,
+            "sync_authentik_users_with_matrix_rooms": {
+                "sync_only_users_in_authentik_pathes": ["staff", "guests"]
+            },
+            "sync_matrix_rooms_based_on_authentik_groups": rooms,
+        }
+    )
+
+
+async def test_one_concurrent_read_deduplicates_users_across_paths() -> None:
+    authentik = RecordingAuthentik()
+    snapshot = await fetch_directory_snapshot(authentik, _config())  # type: ignore[arg-type]
+
+    assert [u["pk"] for u in snapshot.users] == [1, 2, 3]
+    assert [kind for kind, _ in authentik.calls].count("groups") == 1
+    assert len(authentik.calls) == 3  # one per path, one for groups
+    assert authentik.peak == 3  # all in flight together
+    assert snapshot.inactive_users is None
+
+
+async def test_room_and_power_level_groups_are_derived_in_memory() -> None:
+    authentik = RecordingAuthentik()
+    snapshot = await fetch_directory_snapshot(
+        authentik,  # type: ignore[arg-type]
+        _config(only_groups_with_attributes={"is_chatroom": True}),
+    )
+
+    assert [g["pk"] for g in snapshot.room_groups] == ["g1", "g3"]
+    assert [g["pk"] for g in snapshot.power_level_groups] == ["g1", "g2"]
+    assert [g["pk"] for g in snapshot.groups] == ["g1", "g2", "g3"]  # each group once
+    # The room filter and the power-level attribute are sent to Authentik, one listing each.
+    assert sorted((kwargs for kind, kwargs in authentik.calls if kind == "groups"), key=len) == [
+        {"filter_by_attribute": {"is_chatroom": True}, "include_users": False, "filter_updated_after": None},
+        {
+            "filter_has_non_empty_attributes": ["chat-systemwide-powerlevel"],
+            "include_users": False,
+            "filter_updated_after": None,
+        },
+    ]
+
+
+async def test_without_a_room_filter_groups_are_listed_once() -> None:
+    authentik = RecordingAuthentik()
+    snapshot = await fetch_directory_snapshot(authentik, _config())  # type: ignore[arg-type]
+
+    assert [g["pk"] for g in snapshot.room_groups] == ["g1", "g2", "g3"]
+    assert [g["pk"] for g in snapshot.power_level_groups] == ["g1", "g2"]
+    assert ("groups", {"include_users": False, "filter_updated_after": None}) in authentik.calls
+
+
+async def test_inactive_users_are_fetched_only_on_request() -> None:
+    authentik = RecordingAuthentik()
+    snapshot = await fetch_directory_snapshot(authentik, _config(), include_inactive_users=True)  # type: ignore[arg-type]
+
+    assert snapshot.inactive_users == [{"username": "dave", "pk": 4}]
+    assert [u["pk"] for u in snapshot.users] == [1, 2, 3]  # not mixed into the active set
+
+
+async def test_disabled_sync_skips_the_listings() -> None:
+    authentik = RecordingAuthentik()
+    config = _config(enabled=False)
+    config.sync_authentik_users_with_matrix_rooms.enabled = False
+    snapshot = await fetch_directory_snapshot(authentik, config)  # type: ignore[arg-type]
+
+    assert snapshot.users == [] and snapshot.groups == []
+    assert authentik.calls == []
+
+
+def test_attribute_match_is_exact_and_supports_nested_keys() -> None:
+    group = {"attributes": {"is_chatroom": True, "chat": {"enabled": 1}}}
+    assert group_matches_attributes(group, None)
+    assert group_matches_attributes(group, {"is_chatroom": True, "chat__enabled": 1})
+    assert not group_matches_attributes(group, {"is_chatroom": "yes"})
+    assert not group_matches_attributes(group, {"missing": None})
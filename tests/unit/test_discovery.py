@@ -4,15 +4,18 @@ a change triggers an out-of-band reconcile."""
 from __future__ import annotations
 
 import asyncio
+from datetime import datetime
 from typing import Any
 
-from onbot.config import AuthentikServer, OnbotConfig, SynapseServer
+from onbot.config import AuthentikServer, OnbotConfig, Performance, SynapseServer
+from onbot.directory import DirectorySnapshot
 from onbot.discovery import DiscoveryPoller, fingerprint
+from onbot.reconciler.scope import ReconcileScope
 
 ATTR = "username"
 
 
-def _config(*, poll_sec: int = 15) -> OnbotConfig:
+def _config(*, poll_sec: int = 15, full_poll_sec: int = 0) -> OnbotConfig:
     return OnbotConfig(
         synapse_server=SynapseServer(
             server_name="matrix.test",
@@ -22,6 +25,7 @@ def _config(*, poll_sec: int = 15) -> OnbotConfig:
         ),
         authentik_server=AuthentikServer(url="https://authentik.test", api_key="k"),
         authentik_poll_rate_sec=poll_sec,
+        performance=Performance(authentik_full_poll_interval_sec=full_poll_sec),
     )
 
 
@@ -34,20 +38,33 @@ def _group(pk: str = "g1", **over: Any) -> dict[str, Any]:
 
 
 class FakeAuthentik:
-    """Serves whatever user/group lists the test sets, and counts the requests."""
+    """Serves whatever user/group lists the test sets, and counts the requests.
+
+    Honours ``filter_updated_after`` the way Authentik does: only entities with a later
+    ``last_updated`` are listed.
+    """
 
     def __init__(self) -> None:
         self.users: list[dict[str, Any]] = []
         self.groups: list[dict[str, Any]] = []
         self.calls = 0
+        self.since: list[str | None] = []
 
-    async def list_users(self, **_: Any) -> list[dict[str, Any]]:
+    def _listing(self, entities: list[dict[str, Any]], since: str | None) -> list[dict[str, Any]]:
         self.calls += 1
-        return list(self.users)
+        self.since.append(since)
+        if since is None:
+            return list(entities)
+        after = datetime.fromisoformat(since)
+        return [
+            e for e in entities if "last_updated" in e and datetime.fromisoformat(e["last_updated"]) > after
+        ]
 
-    async def list_groups(self, **_: Any) -> list[dict[str, Any]]:
-        self.calls += 1
-        return list(self.groups)
+    async def list_users(self, *, filter_updated_after: str | None = None, **_: Any) -> list[dict[str, Any]]:
+        return self._listing(self.users, filter_updated_after)
+
+    async def list_groups(self, *, filter_updated_after: str | None = None, **_: Any) -> list[dict[str, Any]]:
+        return self._listing(self.groups, filter_updated_after)
 
 
 def test_fingerprint_is_order_independent() -> None:
@@ -100,7 +117,7 @@ async def test_first_poll_establishes_a_baseline_without_triggering() -> None:
     authentik = FakeAuthentik()
     authentik.users = [_user("1")]
     triggered: list[None] = []
-    poller = DiscoveryPoller(authentik, _config(), lambda: triggered.append(None))  # type: ignore[arg-type]
+    poller = DiscoveryPoller(authentik, _config(), lambda *_, **__: triggered.append(None))  # type: ignore[arg-type]
 
     assert await poller.poll_once() is False
     assert triggered == []
@@ -110,7 +127,7 @@ async def test_unchanged_authentik_does_not_trigger() -> None:
     authentik = FakeAuthentik()
     authentik.users = [_user("1")]
     triggered: list[None] = []
-    poller = DiscoveryPoller(authentik, _config(), lambda: triggered.append(None))  # type: ignore[arg-type]
+    poller = DiscoveryPoller(authentik, _config(), lambda *_, **__: triggered.append(None))  # type: ignore[arg-type]
 
     await poller.poll_once()
     assert await poller.poll_once() is False
@@ -121,7 +138,7 @@ async def test_a_new_user_triggers_a_reconcile() -> None:
     authentik = FakeAuthentik()
     authentik.users = [_user("1")]
     triggered: list[None] = []
-    poller = DiscoveryPoller(authentik, _config(), lambda: triggered.append(None))  # type: ignore[arg-type]
+    poller = DiscoveryPoller(authentik, _config(), lambda *_, **__: triggered.append(None))  # type: ignore[arg-type]
 
     await poller.poll_once()
     authentik.users.append(_user("2"))
@@ -138,7 +155,7 @@ async def test_a_deactivated_user_triggers_a_reconcile() -> None:
     authentik = FakeAuthentik()
     authentik.users = [_user("1"), _user("2")]
     triggered: list[None] = []
-    poller = DiscoveryPoller(authentik, _config(), lambda: triggered.append(None))  # type: ignore[arg-type]
+    poller = DiscoveryPoller(authentik, _config(), lambda *_, **__: triggered.append(None))  # type: ignore[arg-type]
 
     await poller.poll_once()
     authentik.users.pop()
@@ -147,6 +164,38 @@ async def test_a_deactivated_user_triggers_a_reconcile() -> None:
     assert len(triggered) == 1
 
 
+async def test_the_trigger_carries_the_snapshot_the_poll_read() -> None:
+    """So the triggered reconcile can reuse it instead of reading Authentik again."""
+    authentik = FakeAuthentik()
+    authentik.users = [_user("1")]
+    snapshots: list[DirectorySnapshot] = []
+    poller = DiscoveryPoller(authentik, _config(), lambda _, *, snapshot: snapshots.append(snapshot))  # type: ignore[arg-type]
+
+    await poller.poll_once()
+    authentik.users.append(_user("2"))
+    await poller.poll_once()
+
+    assert [u["pk"] for u in snapshots[0].users] == ["1", "2"]
+
+
+async def test_a_full_poll_scopes_the_reconcile_to_exactly_what_changed() -> None:
+    authentik = FakeAuthentik()
+    authentik.users = [_user("1"), _user("2"), _user("3")]
+    authentik.groups = [_group("g1"), _group("g2")]
+    scopes: list[ReconcileScope] = []
+    poller = DiscoveryPoller(authentik, _config(), lambda scope, **_: scopes.append(scope))  # type: ignore[arg-type]
+    await poller.poll_once()
+
+    del authentik.users[0]  # removed: the engine must still kick them
+    authentik.users[0] = _user("2", is_superuser=True)  # modified
+    authentik.users.append(_user("4"))  # added
+    authentik.users[1] = _user("3", last_login="2026-07-10T09:00:00Z")  # volatile only
+    authentik.groups[1] = _group("g2", name="renamed")
+    assert await poller.poll_once() is True
+
+    assert scopes == [ReconcileScope.of(user_pks=["1", "2", "4"], group_pks=["g2"])]
+
+
 async def test_poll_touches_only_authentik_and_only_twice() -> None:
     """The whole point: one poll is two Authentik requests and nothing against Synapse."""
     authentik = FakeAuthentik()
@@ -191,3 +240,111 @@ async def test_run_stops_promptly_and_keeps_polling_after_an_error() -> None:
     await asyncio.wait_for(task, timeout=1)
 
     assert len(failures) >= 2  # recovered and polled again rather than dying
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _incremental(authentik: FakeAuthentik) -> tuple[DiscoveryPoller, list[object], _Clock]:
+    triggers: list[object] = []
+    clock = _Clock()
+
+    def _trigger(scope: ReconcileScope | None = None, *, snapshot: DirectorySnapshot | None = None) -> None:
+        triggers.append(scope)
+
+    poller = DiscoveryPoller(authentik, _config(poll_sec=2, full_poll_sec=600), _trigger, clock=clock)  # type: ignore[arg-type]
+    return poller, triggers, clock
+
+
+async def test_incremental_polls_ask_only_for_what_changed_and_scope_the_reconcile() -> None:
+    authentik = FakeAuthentik()
+    authentik.users = [_user("1", last_updated="2026-07-01T08:00:00Z")]
+    authentik.groups = [_group("g1", last_updated="2026-06-01T00:00:00Z")]
+    poller, triggers, _ = _incremental(authentik)
+    await poller.poll_once()  # the full baseline
+    authentik.since.clear()
+
+    authentik.users.append(_user("2", last_updated="2026-07-01T09:00:00Z"))
+    authentik.groups[0] = _group("g1", name="renamed", last_updated="2026-07-01T09:30:00Z")
+    assert await poller.poll_once() is True
+
+    # Both kinds are asked for changes after the older of the two watermarks.
+    assert authentik.since == ["2026-06-01T00:00:00Z", "2026-06-01T00:00:00Z"]
+    assert triggers == [ReconcileScope.of(user_pks=["2"], group_pks=["g1"])]
+    authentik.since.clear()
+    assert await poller.poll_once() is False
+    assert authentik.since == ["2026-07-01T09:00:00Z", "2026-07-01T09:00:00Z"]
+
+
+async def test_watermarks_compare_as_instants_not_strings() -> None:
+    # DRF drops the fraction when it is zero, so as strings "…T10:00:00Z" sorts after "…T10:00:00.5Z".
+    authentik = FakeAuthentik()
+    authentik.users = [
+        _user("1", last_updated="2026-07-01T10:00:00.500000Z"),
+        _user("2", last_updated="2026-07-01T10:00:00Z"),
+    ]
+    poller, triggers, _ = _incremental(authentik)
+    await poller.poll_once()
+    authentik.since.clear()
+    assert await poller.poll_once() is False
+    assert authentik.since[0] == "2026-07-01T10:00:00.500000Z"  # the newest, so user 1 is not listed again
+
+    # The older of the two watermarks, or a group change between them would be skipped.
+    authentik.groups = [_group("g1", last_updated="2026-07-01T10:00:00Z")]
+    authentik.users = [_user("1", last_updated="2026-07-01T10:00:00.500000Z")]
+    poller, triggers, _ = _incremental(authentik)
+    await poller.poll_once()
+    authentik.since.clear()
+    authentik.groups[0] = _group("g1", name="renamed", last_updated="2026-07-01T10:00:00.250000Z")
+    assert await poller.poll_once() is True
+    assert authentik.since == ["2026-07-01T10:00:00Z", "2026-07-01T10:00:00Z"]
+    assert triggers == [ReconcileScope.of(group_pks=["g1"])]
+
+
+async def test_an_update_that_changes_nothing_projected_does_not_trigger() -> None:
+    authentik = FakeAuthentik()
+    authentik.users = [_user("1", last_updated="2026-07-01T08:00:00Z")]
+    poller, triggers, _ = _incremental(authentik)
+    await poller.poll_once()
+
+    authentik.users[0] = _user("1", last_updated="2026-07-01T09:00:00Z", last_login="2026-07-01T09:00:00Z")
+    assert await poller.poll_once() is False
+    assert triggers == []
+
+
+async def test_the_full_read_catches_a_deletion_but_not_what_was_already_reported() -> None:
+    authentik = FakeAuthentik()
+    authentik.users = [
+        _user("1", last_updated="2026-07-01T08:00:00Z"),
+        _user("2", last_updated="2026-07-01T08:00:00Z"),
+    ]
+    poller, triggers, clock = _incremental(authentik)
+    await poller.poll_once()
+
+    authentik.users.append(_user("3", last_updated="2026-07-01T09:00:00Z"))
+    assert await poller.poll_once() is True  # incremental: the new user
+    del authentik.users[0]
+    assert await poller.poll_once() is False  # a deletion is invisible to the watermark...
+
+    clock.now = 600
+    authentik.since.clear()
+    assert await poller.poll_once() is True  # ...until the next full read
+    assert authentik.since == [None, None]
+    assert triggers[-1] == ReconcileScope.of(user_pks=["1"])  # user 3 was not reported a second time
+
+    clock.now = 1200
+    assert await poller.poll_once() is False
+
+
+async def test_without_last_updated_every_poll_reads_everything() -> None:
+    authentik = FakeAuthentik()
+    authentik.users = [_user("1")]
+    poller, _, _ = _incremental(authentik)
+    await poller.poll_once()
+    await poller.poll_once()
+    assert authentik.since == [None, None, None, None]
@@ -1,14 +1,22 @@
 """Integration-style tests for the reconciler engine using in-memory fakes."""
 
 import asyncio
+import time
+from collections.abc import AsyncIterator
 from typing import Any
 
 import pytest
 
+from onbot.account_data import ShardedAccountDataStore
+from onbot.clients.matrix import RoomSync, SyncResult
 from onbot.config import OnbotConfig
+from onbot.directory import DirectorySnapshot, fetch_directory_snapshot
 from onbot.events import EventBus, Signal
+from onbot.reconciler.classification import RoomClassificationIndex
 from onbot.reconciler.effectors import DryRunEffectors
 from onbot.reconciler.engine import ReconcilerEngine
+from onbot.reconciler.scope import ReconcileScope
+from onbot.state_cache import RoomStateCache
 
 _BASE = {
     "synapse_server": {
@@ -55,6 +63,17 @@ class FakeAdmin:
     async def list_spaces(self) -> list[dict[str, Any]]:
         return [{"room_id": "!space:company.org", "canonical_alias": "#OnBotSpace:company.org"}]
 
+    async def iter_rooms(self, *, search_term: str | None = None) -> AsyncIterator[dict[str, Any]]:
+        for room in await self.list_rooms(search_term=search_term):
+            yield room
+
+    async def list_rooms(self, *, search_term: str | None = None) -> list[dict[str, Any]]:
+        rooms = [{**sp, "room_type": "m.space"} for sp in await self.list_spaces()]
+        rooms += await self.list_non_space_rooms()
+        if search_term is None:
+            return rooms
+        return [r for r in rooms if search_term in (r.get("canonical_alias") or "")]
+
     async def list_room_members(self, room_id: str) -> list[str]:
         if room_id == "!space:company.org":
             return ["@alice:company.org"]
@@ -137,6 +156,30 @@ async def test_reconcile_once_converges() -> None:
     assert effectors.power_levels == [("!room1:company.org", {"users": {"@alice:company.org": 50}})]
 
 
+async def test_plan_once_lists_the_changes_and_makes_none() -> None:
+    engine, admin, effectors = _engine()
+    plan = await engine.plan_once()
+
+    assert admin.added == [] and effectors.kicks == [] and effectors.power_levels == []
+    described = [op.describe() for op in plan]
+    assert "join @bob:company.org to !room1:company.org" in described
+    assert "kick @stale:company.org from !room1:company.org" in described
+    assert "set power levels in !room1:company.org: users={'@alice:company.org': 50}" in described
+
+
+async def test_plan_once_plans_a_new_room_under_its_alias() -> None:
+    admin = FakeAdmin()
+    admin.list_non_space_rooms = lambda: _async([])  # type: ignore[method-assign]
+    effectors = RecordingEffectors()
+    engine = ReconcilerEngine(OnbotConfig.model_validate(_BASE), FakeAuthentik(), admin, effectors)  # type: ignore[arg-type]
+    plan = await engine.plan_once()
+
+    rooms = plan.by_room()
+    kinds = [op.kind for op in rooms["#g1:company.org"]]
+    assert kinds == ["create_room", "put_state", "join", "join", "set_power_levels"]
+    assert effectors.state_writes == [] and admin.added == []
+
+
 async def test_space_avatar_set_and_deduplicated() -> None:
     config = OnbotConfig.model_validate(
         {
@@ -281,6 +324,75 @@ async def test_room_of_live_group_survives_an_alias_change() -> None:
     assert all(room != _ORPHAN for room, _ in effectors.kicks)
 
 
+class AccountDataClient:
+    def __init__(self) -> None:
+        self.account_data: dict[str, dict[str, Any]] = {}
+
+    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
+        return dict(self.account_data.get(data_type, {}))
+
+    async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        self.account_data[data_type] = dict(content)
+
+
+class ProbeCountingEffectors(RecordingEffectors):
+    def __init__(self) -> None:
+        super().__init__()
+        self.probed: list[str] = []
+
+    async def get_room_state(
+        self, room_id: str, event_type: str, state_key: str = ""
+    ) -> dict[str, Any] | None:
+        self.probed.append(room_id)
+        return await super().get_room_state(room_id, event_type, state_key)
+
+
+def _classified_engine(
+    client: AccountDataClient, effectors: ProbeCountingEffectors
+) -> tuple[ReconcilerEngine, RoomClassificationIndex]:
+    config = OnbotConfig.model_validate(_BASE)
+    room_cfg = config.sync_matrix_rooms_based_on_authentik_groups
+    room_cfg.disable_rooms_when_mapped_authentik_group_disappears = True
+    store = ShardedAccountDataStore(client, "@bot:company.org", "org.company.onbot.room_classes", shards=2)
+    index = RoomClassificationIndex(store, "company.org", reverify_after_sec=3600)
+    engine = ReconcilerEngine(config, FakeAuthentik(), OrphanAdmin(), effectors, classification=index)  # type: ignore[arg-type]
+    return engine, index
+
+
+async def test_an_unmanaged_room_is_probed_once_and_remembered_across_restarts() -> None:
+    client = AccountDataClient()
+    effectors = ProbeCountingEffectors()
+    engine, _ = _classified_engine(client, effectors)
+    await engine.reconcile_once()
+    await engine.reconcile_once()
+    assert effectors.probed.count(_ORPHAN) == 2  # both managed types, first pass only
+
+    # A restarted bot loads the persisted answer and does not probe either.
+    effectors = ProbeCountingEffectors()
+    engine, _ = _classified_engine(client, effectors)
+    await engine.reconcile_once()
+    assert _ORPHAN not in effectors.probed
+
+
+async def test_a_room_seen_changing_in_sync_is_probed_again() -> None:
+    client = AccountDataClient()
+    effectors = ProbeCountingEffectors()
+    engine, index = _classified_engine(client, effectors)
+    await engine.reconcile_once()
+
+    # The bot stamps the room (say, a manual adoption); the stream carries the state event.
+    effectors.state_store[(_ORPHAN, _GROUP_ROOM_EVENT)] = _state("g-gone")
+    await index.handle_sync(
+        SyncResult(
+            pos="s2",
+            rooms=[RoomSync(room_id=_ORPHAN, timeline=[{"type": _GROUP_ROOM_EVENT, "state_key": ""}])],
+        )
+    )
+    await engine.reconcile_once()
+
+    assert (_ORPHAN, True) in engine.admin.blocked_changes  # type: ignore[attr-defined]
+
+
 async def test_reconcile_emits_user_synced_events() -> None:
     bus = EventBus()
     seen: list[str] = []
@@ -314,7 +426,7 @@ async def test_run_stops_gracefully_after_trigger() -> None:
     engine, _, _ = _engine()
     calls = 0
 
-    async def one_pass() -> None:
+    async def one_pass(_scope: Any = None) -> None:
         nonlocal calls
         calls += 1
         engine.request_stop()
@@ -377,11 +489,95 @@ async def test_lifecycle_skipped_when_disabled() -> None:
     assert lifecycle.calls == []
 
 
+class CallCountingAuthentik(FakeAuthentik):
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def list_users(self, **kwargs: Any) -> list[dict[str, Any]]:
+        self.calls.append("list_users")
+        return await super().list_users(**kwargs)
+
+    async def list_groups(self, **kwargs: Any) -> list[dict[str, Any]]:
+        self.calls.append("list_groups")
+        return await super().list_groups(**kwargs)
+
+
+async def test_a_pass_reads_the_directory_once() -> None:
+    authentik = CallCountingAuthentik()
+    lifecycle = FakeLifecycle()
+    engine = ReconcilerEngine(
+        OnbotConfig.model_validate(_BASE),
+        authentik,
+        FakeAdmin(),
+        RecordingEffectors(),
+        lifecycle=lifecycle,  # type: ignore[arg-type]
+    )
+    await engine.reconcile_once()
+
+    # One group listing (rooms and power levels both derive from it), active and inactive users.
+    assert sorted(authentik.calls) == ["list_groups", "list_users", "list_users"]
+
+
+async def test_a_recent_handed_off_snapshot_replaces_the_directory_read() -> None:
+    authentik = CallCountingAuthentik()
+    admin = FakeAdmin()
+    engine = ReconcilerEngine(OnbotConfig.model_validate(_BASE), authentik, admin, RecordingEffectors())  # type: ignore[arg-type]
+    snapshot = await fetch_directory_snapshot(authentik, engine.config)  # type: ignore[arg-type]
+    authentik.calls.clear()
+
+    engine.trigger(snapshot=snapshot)
+    await engine.reconcile_once()
+
+    assert authentik.calls == []
+    assert ("!room1:company.org", "@bob:company.org") in admin.added  # converged from the snapshot
+
+
+async def test_a_stale_handed_off_snapshot_is_read_afresh() -> None:
+    authentik = CallCountingAuthentik()
+    config = OnbotConfig.model_validate(_BASE)
+    config.performance.authentik_snapshot_max_age_sec = 5
+    engine = ReconcilerEngine(config, authentik, FakeAdmin(), RecordingEffectors())  # type: ignore[arg-type]
+
+    engine.trigger(snapshot=DirectorySnapshot(fetched_at=time.monotonic() - 10))
+    await engine.reconcile_once()
+
+    assert "list_groups" in authentik.calls
+
+
+class InventoryCountingAdmin(FakeAdmin):
+    def __init__(self) -> None:
+        super().__init__()
+        self.search_terms: list[str | None] = []
+
+    async def list_rooms(self, *, search_term: str | None = None) -> list[dict[str, Any]]:
+        self.search_terms.append(search_term)
+        return await super().list_rooms(search_term=search_term)
+
+
+async def test_a_pass_lists_the_rooms_once() -> None:
+    admin = InventoryCountingAdmin()
+    engine = ReconcilerEngine(OnbotConfig.model_validate(_BASE), FakeAuthentik(), admin, RecordingEffectors())  # type: ignore[arg-type]
+    await engine.reconcile_once()
+
+    assert admin.search_terms == [None]
+
+
+async def test_a_narrowed_listing_still_finds_the_space_by_alias() -> None:
+    admin = InventoryCountingAdmin()
+    config = OnbotConfig.model_validate(_BASE | {"performance": {"room_inventory_search_term": "#g1"}})
+    effectors = RecordingEffectors()
+    engine = ReconcilerEngine(config, FakeAuthentik(), admin, effectors)  # type: ignore[arg-type]
+    await engine.reconcile_once()
+
+    assert admin.search_terms == ["#g1", "#OnBotSpace:company.org"]
+    assert ("!space:company.org", "@bob:company.org") in admin.added  # the existing space, not a new one
+
+
 async def test_run_survives_a_failing_pass(caplog: pytest.LogCaptureFixture) -> None:
     engine, _, _ = _engine()
     calls = 0
 
-    async def flaky() -> None:
+    async def flaky(_scope: Any = None) -> None:
         nonlocal calls
         calls += 1
         if calls == 1:
@@ -394,6 +590,269 @@ async def test_run_survives_a_failing_pass(caplog: pytest.LogCaptureFixture) ->
     assert calls == 2  # first pass failed but the loop continued
 
 
+# --- scoped reconcile ---
+
+
+class MutableAuthentik(FakeAuthentik):
+    """FakeAuthentik whose users can be edited between passes."""
+
+    def __init__(self, groups: list[dict[str, Any]] | None = None) -> None:
+        self.users: list[dict[str, Any]] | None = None
+        self.groups = groups if groups is not None else [_GROUP_G1]
+
+    async def list_users(self, **kwargs: Any) -> list[dict[str, Any]]:
+        if self.users is None:
+            self.users = await super().list_users(**kwargs)
+        return self.users
+
+    async def list_groups(self, **_: Any) -> list[dict[str, Any]]:
+        return self.groups
+
+
+class CountingAdmin(FakeAdmin):
+    def __init__(self) -> None:
+        super().__init__()
+        self.member_reads: list[str] = []
+
+    async def list_room_members(self, room_id: str) -> list[str]:
+        self.member_reads.append(room_id)
+        return await super().list_room_members(room_id)
+
+
+def _scoped_engine(
+    events: EventBus | None = None,
+    *,
+    config: dict[str, Any] | None = None,
+    groups: list[dict[str, Any]] | None = None,
+) -> tuple[ReconcilerEngine, MutableAuthentik, CountingAdmin, RecordingEffectors]:
+    authentik = MutableAuthentik(groups)
+    admin = CountingAdmin()
+    effectors = RecordingEffectors()
+    engine = ReconcilerEngine(
+        OnbotConfig.model_validate(config or _BASE), authentik, admin, effectors, events
+    )  # type: ignore[arg-type]
+    return engine, authentik, admin, effectors
+
+
+async def test_scoped_pass_before_any_full_pass_runs_full() -> None:
+    engine, _, _, effectors = _scoped_engine()
+    await engine.reconcile_once(ReconcileScope.of(user_pks=["carol-pk"]))
+    # carol is not in g1, but with no baseline the whole room is converged anyway
+    assert effectors.kicks == [("!room1:company.org", "@stale:company.org")]
+
+
+async def test_scoped_pass_skips_rooms_of_unaffected_groups() -> None:
+    bus = EventBus()
+    synced: list[str] = []
+
+    async def on_synced(event: Any) -> None:
+        synced.append(event.payload["mxid"])
+
+    bus.subscribe(Signal.user_synced, on_synced)
+    engine, _, admin, effectors = _scoped_engine(bus)
+    await engine.reconcile_once()
+    admin.member_reads.clear()
+    effectors.kicks.clear()
+    synced.clear()
+
+    await engine.reconcile_once(ReconcileScope.of(user_pks=["carol-pk"]))  # carol is only in g2: no room
+
+    assert admin.member_reads == ["!space:company.org"]
+    assert effectors.kicks == []
+    assert synced == ["@carol:company.org"]
+
+
+async def test_scoped_pass_kicks_a_user_from_the_group_they_left() -> None:
+    engine, authentik, _, effectors = _scoped_engine()
+    await engine.reconcile_once()
+    effectors.kicks.clear()
+
+    assert authentik.users is not None
+    authentik.users[0]["groups_obj"] = []  # alice leaves g1
+    await engine.reconcile_once(ReconcileScope.of(user_pks=["alice-pk"]))
+
+    assert ("!room1:company.org", "@alice:company.org") in effectors.kicks
+
+
+async def test_scope_naming_a_vanished_group_runs_a_full_pass(caplog: pytest.LogCaptureFixture) -> None:
+    engine, authentik, _, _ = _scoped_engine()
+    await engine.reconcile_once()
+
+    authentik.groups = []  # g1, mirrored as !room1 until now, is deleted
+    await engine.reconcile_once(ReconcileScope.of(group_pks=["g1"]))
+
+    assert "no longer synced; running a full pass" in caplog.text
+
+
+async def test_a_change_to_a_group_that_is_not_synced_stays_scoped(caplog: pytest.LogCaptureFixture) -> None:
+    engine, _, admin, _ = _scoped_engine()
+    await engine.reconcile_once()
+    admin.member_reads.clear()
+
+    await engine.reconcile_once(ReconcileScope.of(group_pks=["g-not-synced"]))
+
+    assert "running a full pass" not in caplog.text
+    assert "!room1:company.org" not in admin.member_reads
+
+
+async def test_a_changed_power_level_group_reconverges_its_members_rooms() -> None:
+    # g1 is the room; g-pl carries a level but no room of its own (it fails the room filter).
+    room_group = {"pk": "g1", "name": "Team", "attributes": {"chat": True}, "users": []}
+    level_group = {
+        "pk": "g-pl",
+        "name": "Leads",
+        "attributes": {"chat-systemwide-powerlevel": 50},
+        "users": [],
+    }
+    config = {
+        **_BASE,
+        "sync_matrix_rooms_based_on_authentik_groups": {"only_groups_with_attributes": {"chat": True}},
+    }
+    engine, authentik, _, effectors = _scoped_engine(config=config, groups=[room_group, level_group])
+    await engine.reconcile_once()
+    assert authentik.users is not None
+    authentik.users[0]["groups_obj"].append({"pk": "g-pl"})  # alice joins the leads
+    level_group["users"] = ["alice-pk"]
+    await engine.reconcile_once(ReconcileScope.of(user_pks=["alice-pk"]))
+    effectors.power_levels.clear()
+
+    level_group["attributes"] = {"chat-systemwide-powerlevel": 75}
+    await engine.reconcile_once(ReconcileScope.of(group_pks=["g-pl"]))
+
+    assert effectors.power_levels == [("!room1:company.org", {"users": {"@alice:company.org": 75}})]
+
+
+async def test_run_merges_scoped_triggers_and_a_tick_or_unscoped_trigger_is_full() -> None:
+    engine, _, _, _ = _scoped_engine()
+    seen: list[ReconcileScope | None] = []
+
+    async def record(scope: ReconcileScope | None = None) -> None:
+        seen.append(scope)
+        if len(seen) == 1:
+            engine.trigger(ReconcileScope.of(user_pks=["a"]))
+            engine.trigger(ReconcileScope.of(group_pks=["g"]))
+        elif len(seen) == 2:
+            engine.trigger(ReconcileScope.of(user_pks=["b"]))
+            engine.trigger()
+        else:
+            engine.request_stop()
+
+    engine.reconcile_once = record  # type: ignore[method-assign]
+    await asyncio.wait_for(engine.run(), timeout=2)
+
+    assert seen == [None, ReconcileScope.of(user_pks=["a"], group_pks=["g"]), None]
+
+
+# --- sync-fed room state cache ---
+
+
+async def test_cached_member_lists_replace_admin_reads() -> None:
+    cache = RoomStateCache("company.org")
+    await cache.handle_sync(
+        SyncResult(
+            pos="s1",
+            initial=True,
+            rooms=[
+                RoomSync(
+                    room_id="!room1:company.org",
+                    initial=True,
+                    required_state=[
+                        {"type": "m.room.member", "state_key": m, "content": {"membership": "join"}}
+                        for m in ("@alice:company.org", "@stale:company.org", "@bot:company.org")
+                    ],
+                )
+            ],
+        )
+    )
+    admin = CountingAdmin()
+    effectors = RecordingEffectors()
+    engine = ReconcilerEngine(
+        OnbotConfig.model_validate(_BASE), FakeAuthentik(), admin, effectors, state_cache=cache
+    )  # type: ignore[arg-type]
+    await engine.reconcile_once()
+
+    assert admin.member_reads == ["!space:company.org"]  # the space was never streamed: HTTP fallback
+    assert effectors.kicks == [("!room1:company.org", "@stale:company.org")]
+    # The join went through the admin API and straight into the cache.
+    assert "@bob:company.org" in (cache.members("!room1:company.org") or set())
+
+
+# --- concurrent room convergence ---
+
+_TEAM_PKS = [f"g{i}" for i in range(1, 7)]
+
+
+class ManyGroupsAuthentik(FakeAuthentik):
+    async def list_groups(self, **_: Any) -> list[dict[str, Any]]:
+        return [{"pk": pk, "name": f"Team {pk}", "attributes": {}, "users": []} for pk in _TEAM_PKS]
+
+
+class ManyRoomsAdmin(FakeAdmin):
+    """One room per group; tracks how many rooms are being read at once, and can fail one of them."""
+
+    def __init__(self, *, failing_room: str | None = None) -> None:
+        super().__init__()
+        self.failing_room = failing_room
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def list_non_space_rooms(self) -> list[dict[str, Any]]:
+        return [
+            {"room_id": f"!{pk}:company.org", "canonical_alias": f"#{pk}:company.org", "name": f"Team {pk}"}
+            for pk in _TEAM_PKS
+        ]
+
+    async def list_room_members(self, room_id: str) -> list[str]:
+        if room_id == "!space:company.org":
+            return await super().list_room_members(room_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if room_id == self.failing_room:
+                raise RuntimeError("403: bot lost its power level")
+            return ["@bot:company.org", "@stale:company.org"]
+        finally:
+            self.in_flight -= 1
+
+
+def _many_rooms_engine(
+    admin: ManyRoomsAdmin, concurrency: int
+) -> tuple[ReconcilerEngine, RecordingEffectors]:
+    config = OnbotConfig.model_validate(_BASE)
+    config.performance.reconcile_room_concurrency = concurrency
+    effectors = RecordingEffectors()
+    return ReconcilerEngine(config, ManyGroupsAuthentik(), admin, effectors), effectors  # type: ignore[arg-type]
+
+
+async def test_rooms_converge_concurrently_up_to_the_configured_limit() -> None:
+    admin = ManyRoomsAdmin()
+    engine, effectors = _many_rooms_engine(admin, concurrency=3)
+    await engine.reconcile_once()
+
+    assert admin.max_in_flight == 3
+    assert sorted(room for room, _ in effectors.kicks) == sorted(f"!{pk}:company.org" for pk in _TEAM_PKS)
+
+
+async def test_concurrency_of_one_converges_rooms_serially() -> None:
+    admin = ManyRoomsAdmin()
+    engine, _ = _many_rooms_engine(admin, concurrency=1)
+    await engine.reconcile_once()
+    assert admin.max_in_flight == 1
+
+
+async def test_a_failing_room_does_not_abort_the_pass(caplog: pytest.LogCaptureFixture) -> None:
+    admin = ManyRoomsAdmin(failing_room="!g2:company.org")
+    engine, effectors = _many_rooms_engine(admin, concurrency=4)
+    await engine.reconcile_once()
+
+    kicked_rooms = {room for room, _ in effectors.kicks}
+    assert "!g2:company.org" not in kicked_rooms
+    assert kicked_rooms == {f"!{pk}:company.org" for pk in _TEAM_PKS if pk != "g2"}
+    assert engine.last_reconcile_at is not None  # the pass still completed
+    assert "1 of 6 group rooms failed to converge" in caplog.text
+
+
 # --- visitor lobby (ADR-0012) ---
 
 _JOIN_RULES = "m.room.join_rules"
@@ -0,0 +1,170 @@
+"""The operation executor: per-room order, parallel rooms, per-kind limits, failure isolation."""
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from onbot.clients.circuit import CircuitOpenError
+from onbot.models import RoomCreateAttributes
+from onbot.reconciler.effectors import DryRunEffectors
+from onbot.reconciler.executor import OperationExecutor
+from onbot.reconciler.plan import (
+    CreateRoom,
+    JoinUser,
+    KickUser,
+    PutRoomState,
+    ReconcilePlan,
+    SetPowerLevels,
+    SetRoomBlocked,
+)
+from onbot.reconciler.state import OnbotRoomType
+
+
+class RecordingAdmin:
+    def __init__(self, *, failing_room: str | None = None, down: bool = False) -> None:
+        self.calls: list[tuple[str, ...]] = []
+        self.failing_room = failing_room
+        self.down = down
+        self.in_flight = 0
+        self.peak = 0
+
+    async def add_user_to_room(self, room_id: str, user_id: str) -> None:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.down:
+                raise CircuitOpenError("https://matrix.test:443", 30)
+            if room_id == self.failing_room:
+                raise RuntimeError("403")
+            self.calls.append(("join", room_id, user_id))
+        finally:
+            self.in_flight -= 1
+
+    async def room_set_blocked(self, room_id: str, *, blocked: bool) -> None:
+        self.calls.append(("block", room_id, str(blocked)))
+
+
+class RecordingEffectors(DryRunEffectors):
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, ...]] = []
+
+    async def create_group_room(self, attrs: Any, parent_space_id: str | None) -> str:
+        self.calls.append(("create", attrs.canonical_alias))
+        return "!created:x"
+
+    async def kick_user(self, room_id: str, user_id: str, reason: str | None = None) -> None:
+        self.calls.append(("kick", room_id, user_id))
+
+    async def set_room_power_levels(self, room_id: str, power_levels: dict[str, Any]) -> None:
+        self.calls.append(("power_levels", room_id))
+
+    async def put_room_state(self, room_id: str, event_type: str, content: dict[str, Any]) -> None:
+        self.calls.append(("state", room_id, event_type))
+
+
+def _executor(admin: RecordingAdmin, effectors: RecordingEffectors, **kwargs: Any) -> OperationExecutor:
+    return OperationExecutor(admin, effectors, **kwargs)  # type: ignore[arg-type]
+
+
+_TEAM = RoomCreateAttributes(alias="team", canonical_alias="#team:x", name="Team")
+
+
+async def test_a_created_room_is_resolved_for_the_operations_after_it() -> None:
+    admin, effectors = RecordingAdmin(), RecordingEffectors()
+    executor = _executor(admin, effectors)
+    plan = ReconcilePlan(
+        [
+            CreateRoom(OnbotRoomType.group_room, _TEAM, None),
+            PutRoomState("#team:x", "org.x.onbot.group_room", {"group_id": "g1"}),
+            JoinUser("#team:x", "@a:x"),
+        ]
+    )
+    report = await executor.apply(plan)
+
+    assert effectors.calls == [("create", "#team:x"), ("state", "!created:x", "org.x.onbot.group_room")]
+    assert admin.calls == [("join", "!created:x", "@a:x")]
+    assert executor.resolve("#team:x") == "!created:x"
+    assert report.applied == 3 and not report.failures
+    assert set(report.latency) == {"create_room", "put_state", "join"}
+
+
+async def test_a_failure_skips_the_rest_of_its_room_only(caplog: pytest.LogCaptureFixture) -> None:
+    admin, effectors = RecordingAdmin(failing_room="!bad:x"), RecordingEffectors()
+    plan = ReconcilePlan(
+        [
+            JoinUser("!bad:x", "@a:x"),
+            SetPowerLevels("!bad:x", {"users": {}}),
+            JoinUser("!good:x", "@a:x"),
+            KickUser("!good:x", "@b:x"),
+        ]
+    )
+    report = await _executor(admin, effectors).apply(plan)
+
+    assert admin.calls == [("join", "!good:x", "@a:x")]
+    assert effectors.calls == [("kick", "!good:x", "@b:x")]  # no power levels for !bad:x
+    assert len(report.failures) == 1 and report.skipped == 1
+    assert "skipping the 1 remaining operations on !bad:x" in caplog.text
+
+
+async def test_rooms_run_in_parallel_but_each_kind_respects_its_limit() -> None:
+    rooms = [f"!r{i}:x" for i in range(6)]
+    plan = ReconcilePlan([JoinUser(r, "@a:x") for r in rooms])
+
+    admin = RecordingAdmin()
+    await _executor(admin, RecordingEffectors(), room_concurrency=4).apply(plan)
+    assert admin.peak == 4
+
+    admin = RecordingAdmin()
+    await _executor(admin, RecordingEffectors(), room_concurrency=4, operation_concurrency={"join": 2}).apply(
+        plan
+    )
+    assert admin.peak == 2
+
+
+async def test_the_operations_of_one_room_run_in_plan_order() -> None:
+    admin, effectors = RecordingAdmin(), RecordingEffectors()
+    plan = ReconcilePlan(
+        [
+            SetRoomBlocked("!r:x", blocked=True),
+            KickUser("!r:x", "@a:x"),
+            KickUser("!r:x", "@b:x"),
+        ]
+    )
+    await _executor(admin, effectors, room_concurrency=8).apply(plan)
+    assert admin.calls == [("block", "!r:x", "True")]
+    assert effectors.calls == [("kick", "!r:x", "@a:x"), ("kick", "!r:x", "@b:x")]
+
+
+async def test_dry_run_writes_nothing_and_stands_the_alias_in_for_a_new_room() -> None:
+    admin, effectors = RecordingAdmin(), RecordingEffectors()
+    executor = _executor(admin, effectors, dry_run=True)
+    plan = ReconcilePlan([CreateRoom(OnbotRoomType.group_room, _TEAM, None), JoinUser("#team:x", "@a:x")])
+    report = await executor.apply(plan)
+
+    assert admin.calls == [] and effectors.calls == []
+    assert report.applied == 2
+    assert executor.resolve("#team:x") == "#team:x"
+    assert executor.is_planned("#team:x")
+    assert not executor.is_planned("!r:x")
+
+
+async def test_superseded_writes_are_counted_as_coalesced() -> None:
+    plan = ReconcilePlan(
+        [SetPowerLevels("!r:x", {"users": {}}), SetPowerLevels("!r:x", {"users": {"@a:x": 50}})]
+    )
+    effectors = RecordingEffectors()
+    report = await _executor(RecordingAdmin(), effectors).apply(plan)
+    assert report.coalesced == 1
+    assert effectors.calls == [("power_levels", "!r:x")]
+
+
+async def test_an_open_circuit_stops_the_whole_plan() -> None:
+    rooms = [f"!r{i}:x" for i in range(6)]
+    plan = ReconcilePlan([op for r in rooms for op in (JoinUser(r, "@a:x"), KickUser(r, "@b:x"))])
+    effectors = RecordingEffectors()
+
+    with pytest.raises(CircuitOpenError):
+        await _executor(RecordingAdmin(down=True), effectors, room_concurrency=2).apply(plan)
+    assert effectors.calls == []  # no room went on to its kick, and no room was started afterwards
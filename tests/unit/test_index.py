@@ -0,0 +1,65 @@
+"""The per-pass membership index answers exactly what the list scans did."""
+
+import pytest
+
+from onbot.models import MappedUser
+from onbot.reconciler.index import MembershipIndex
+from onbot.reconciler.membership import desired_room_members, desired_room_members_from_index
+from onbot.reconciler.power_levels import (
+    PowerLevelGroup,
+    compute_desired_user_levels,
+    compute_desired_user_levels_from_index,
+)
+
+
+def _user(pk: str, mxid: str, *group_pks: str, superuser: bool = False) -> MappedUser:
+    return MappedUser(
+        authentik_obj={"pk": pk, "is_superuser": superuser, "groups_obj": [{"pk": g} for g in group_pks]},
+        mxid=mxid,
+    )
+
+
+USERS = [
+    _user("1", "@a:x", "g1"),
+    _user("2", "@b:x", "g12"),
+    _user("3", "@c:x", "g1", "g2", superuser=True),
+    _user("4", "@d:x"),
+]
+PL_GROUPS = [
+    PowerLevelGroup(member_pks={"1", "3"}, level=25),
+    PowerLevelGroup(member_pks={"1"}, level=50),
+    PowerLevelGroup(member_pks={"9"}, level=75),
+]
+
+
+def test_index_inverts_users_into_groups() -> None:
+    index = MembershipIndex.build(USERS)
+    assert index.members_of("g1") == frozenset({"@a:x", "@c:x"})
+    assert index.members_of("missing") == frozenset()
+    assert index.groups_by_mxid["@c:x"] == frozenset({"g1", "g2"})
+    assert [u.mxid for u in index.users_in("g1")] == ["@a:x", "@c:x"]
+
+
+def test_index_keeps_the_highest_power_level_group_level() -> None:
+    index = MembershipIndex.build(USERS, PL_GROUPS)
+    assert index.group_level("1") == 50
+    assert index.group_level("3") == 25
+    assert index.group_level("2") is None
+
+
+def test_index_is_read_only() -> None:
+    index = MembershipIndex.build(USERS)
+    with pytest.raises(TypeError):
+        index.members_by_group["g1"] = frozenset()  # type: ignore[index]
+
+
+@pytest.mark.parametrize("group_pk", ["g1", "g2", "g12", "missing"])
+def test_index_matches_the_scans(group_pk: str) -> None:
+    index = MembershipIndex.build(USERS, PL_GROUPS)
+    assert desired_room_members_from_index(group_pk, index) == desired_room_members(group_pk, USERS)
+
+    members = [u for u in USERS if group_pk in u.group_pks]
+    for superusers_admin in (True, False):
+        assert compute_desired_user_levels_from_index(
+            index.users_in(group_pk), index, make_superusers_admin=superusers_admin
+        ) == compute_desired_user_levels(members, PL_GROUPS, make_superusers_admin=superusers_admin)
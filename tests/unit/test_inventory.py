@@ -0,0 +1,62 @@
+"""The per-pass room inventory: one streamed listing, indexed by alias and room type."""
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+from onbot.reconciler.inventory import gather_room_inventory
+
+_ROOMS = [
+    {"room_id": "!s:x", "canonical_alias": "#OnBotSpace:x", "room_type": "m.space"},
+    {"room_id": "!g:x", "canonical_alias": "#grpteam:x", "room_type": None, "name": "Team"},
+    {"room_id": "!l:x", "canonical_alias": "#grpteam-lobby:x", "room_type": None},
+    {"room_id": "!dm:x", "canonical_alias": None, "room_type": None},
+    {"room_id": "!o:x", "canonical_alias": "#random:x", "room_type": None},
+]
+
+
+class FakeLister:
+    def __init__(self) -> None:
+        self.search_terms: list[str | None] = []
+
+    async def iter_rooms(self, *, search_term: str | None = None) -> AsyncIterator[dict[str, Any]]:
+        self.search_terms.append(search_term)
+        for room in _ROOMS:
+            yield room
+
+
+async def test_one_listing_indexes_rooms_and_spaces_by_alias() -> None:
+    lister = FakeLister()
+    inventory = await gather_room_inventory(lister)  # type: ignore[arg-type]
+
+    assert lister.search_terms == [None]
+    assert [r.room_id for r in inventory.rooms] == ["!g:x", "!l:x", "!dm:x", "!o:x"]
+    assert inventory.space("#OnBotSpace:x") is not None and inventory.space("#OnBotSpace:x").is_space
+    assert inventory.room("#grpteam:x") is not None and inventory.room("#grpteam:x").name == "Team"
+    assert inventory.room("#OnBotSpace:x") is None  # a space is not a room
+    assert not inventory.narrowed
+
+
+async def test_managed_aliases_only_keeps_prefixed_rooms_and_every_space() -> None:
+    lister = FakeLister()
+    inventory = await gather_room_inventory(lister, alias_prefixes=["grp"])  # type: ignore[arg-type]
+
+    assert lister.search_terms == ["grp"]  # a single prefix is pushed down to Synapse
+    assert [r.room_id for r in inventory.rooms] == ["!g:x", "!l:x"]
+    assert [s.room_id for s in inventory.spaces] == ["!s:x"]
+    assert inventory.narrowed and inventory.scanned == len(_ROOMS)
+
+
+async def test_several_prefixes_are_filtered_client_side_only() -> None:
+    lister = FakeLister()
+    inventory = await gather_room_inventory(lister, alias_prefixes=["grp", "rand"])  # type: ignore[arg-type]
+
+    assert lister.search_terms == [None]
+    assert [r.room_id for r in inventory.rooms] == ["!g:x", "!l:x", "!o:x"]
+    assert not inventory.narrowed
+
+
+async def test_an_explicit_search_term_wins() -> None:
+    lister = FakeLister()
+    await gather_room_inventory(lister, search_term="team", alias_prefixes=["grp"])  # type: ignore[arg-type]
+
+    assert lister.search_terms == ["team"]
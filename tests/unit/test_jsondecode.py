@@ -0,0 +1,25 @@
+"""Response decoding: every installed parser gives the same result; unknown names are rejected."""
+
+import pytest
+
+from onbot.clients import jsondecode
+
+_BODY = '{"results": [{"pk": 1, "name": "Zoë", "attributes": {"a": [1.5, null, true]}}], "next": 0}'
+
+
+@pytest.mark.parametrize("name", jsondecode.available_decoders())
+def test_every_installed_decoder_agrees_with_the_standard_library(name: str) -> None:
+    loads = jsondecode.decoder(name)
+    assert loads(_BODY.encode()) == jsondecode.decoder("json")(_BODY.encode())
+    with pytest.raises(ValueError):
+        loads(b'{"truncated": ')
+
+
+def test_the_preferred_installed_decoder_is_used() -> None:
+    assert jsondecode.available_decoders()[-1] == "json"  # the standard library is always there
+    assert jsondecode.available_decoders()[0] == jsondecode.BACKEND
+
+
+def test_an_unknown_decoder_is_an_error() -> None:
+    with pytest.raises(ValueError, match="unknown JSON decoder"):
+        jsondecode.decoder("simdjson")
@@ -291,6 +291,17 @@ class TestManagerLive:
         assert store.ledger.entries == {}
         assert eff.logouts == [] and eff.erases == []
 
+    async def test_only_restricts_decisions_to_the_scoped_users(self) -> None:
+        store = InMemoryLedgerStore(
+            LifecycleLedger(entries={"@x:company.org": LifecycleEntry(marked_for_disabling_timestamp=1.0)})
+        )
+        eff, clock = RecordingEffectors(), Clock()
+        mgr = _manager(store, eff, clock, dry_run=False)
+        # A scoped pass that only looked at @y must neither re-enable @x nor forget about it.
+        outcomes = await mgr.reconcile_accounts({"@y:company.org"}, only={"@y:company.org"})
+        assert [(o.mxid, o.action) for o in outcomes] == [("@y:company.org", LifecycleAction.mark)]
+        assert set(store.ledger.entries) == {"@x:company.org", "@y:company.org"}
+
     async def test_full_progression_across_ticks(self) -> None:
         """mark → wait → logout → wait → erase, driven by a moving clock (live mode)."""
         store, eff, clock = InMemoryLedgerStore(), RecordingEffectors(), Clock(0.0)
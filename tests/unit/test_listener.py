@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
+
 from onbot.clients.matrix import RoomSync, SyncResult
 from onbot.config import AuthentikServer, OnbotConfig, SynapseServer
 from onbot.events import EventBus, Signal
 from onbot.onboarding.listener import OnboardingListener, extract_joined_users
+from onbot.onboarding.welcomed import WelcomedLedger, messages_digest
 
 
 def _config() -> OnbotConfig:
@@ -29,6 +32,14 @@ class _RecordingWelcome:
         self.welcomed.append(mxid)
 
 
+async def _drain(listener: OnboardingListener) -> None:
+    """Run the listener's workers until everything submitted so far has been handled."""
+    workers = asyncio.create_task(listener.queue.run())
+    await listener.queue.drain()
+    listener.queue.request_stop()
+    await workers
+
+
 def test_extract_joined_users_picks_only_joins() -> None:
     result = SyncResult(
         pos="s1",
@@ -67,6 +78,7 @@ async def test_user_synced_signal_triggers_welcome() -> None:
     listener.start()
 
     await events.emit(Signal.user_synced, mxid="@real:matrix.test")
+    await _drain(listener)
 
     assert welcome.welcomed == ["@real:matrix.test"]
 
@@ -108,6 +120,7 @@ async def test_handle_sync_welcomes_users_who_joined_in_the_slice() -> None:
             ],
         )
     )
+    await _drain(listener)
 
     assert welcome.welcomed == ["@real:matrix.test"]
 
@@ -122,6 +135,7 @@ async def test_an_already_welcomed_user_is_not_welcomed_again() -> None:
 
     for _ in range(3):
         await events.emit(Signal.user_synced, mxid="@real:matrix.test")
+        await _drain(listener)
 
     assert welcome.welcomed == ["@real:matrix.test"]
 
@@ -143,8 +157,76 @@ async def test_a_failed_welcome_is_retried_on_the_next_tick() -> None:
     listener = OnboardingListener(None, welcome, _config(), events)  # type: ignore[arg-type]
     listener.start()
 
+    for _ in range(3):
+        await events.emit(Signal.user_synced, mxid="@real:matrix.test")
+        await _drain(listener)
+
+    assert welcome.attempts == 2  # retried after the failure, then remembered
+
+
+async def test_the_signal_does_not_wait_for_the_welcome() -> None:
+    """The reconcile pass emits user_synced inline; a slow welcome must not hold it up."""
+    release = asyncio.Event()
+
+    class _SlowWelcome:
+        async def welcome_user(self, mxid: str) -> None:
+            await release.wait()
+
+    events = EventBus()
+    listener = OnboardingListener(None, _SlowWelcome(), _config(), events)  # type: ignore[arg-type]
+    listener.start()
+    workers = asyncio.create_task(listener.queue.run())
+
+    await asyncio.wait_for(events.emit(Signal.user_synced, mxid="@real:matrix.test"), timeout=1)
+    await asyncio.sleep(0)
+    assert listener.queue.in_flight == 1
+
+    release.set()
+    await listener.queue.drain()
+    listener.queue.request_stop()
+    await workers
+    assert listener.ledger.is_welcomed("@real:matrix.test")
+
+
+async def test_already_welcomed_users_are_not_even_queued() -> None:
+    welcome = _RecordingWelcome()
+    events = EventBus()
+    listener = OnboardingListener(None, welcome, _config(), events)  # type: ignore[arg-type]
+    listener.start()
     await events.emit(Signal.user_synced, mxid="@real:matrix.test")
+    await _drain(listener)
+
     await events.emit(Signal.user_synced, mxid="@real:matrix.test")
-    await events.emit(Signal.user_synced, mxid="@real:matrix.test")
+    await events.emit(Signal.user_synced, mxid="@bot:matrix.test")
 
-    assert welcome.attempts == 2  # retried after the failure, then remembered
+    assert listener.queue.depth == 0
+
+
+async def test_a_user_in_the_persisted_ledger_skips_matrix_and_passes_flush_it() -> None:
+    class _Store:
+        def __init__(self) -> None:
+            self.saved: dict[str, str] = {}
+
+        async def load(self) -> dict[str, str]:
+            return {"@old:matrix.test": messages_digest(["hi"])}
+
+        async def save(self, entries: dict[str, str], *, keys: object = None) -> None:
+            self.saved = dict(entries)
+
+    config = _config()
+    config.welcome_new_users_messages = ["hi"]
+    store = _Store()
+    ledger = WelcomedLedger(store, ["hi"])  # type: ignore[arg-type]
+    await ledger.ensure_loaded()
+    welcome = _RecordingWelcome()
+    events = EventBus()
+    listener = OnboardingListener(None, welcome, config, events, ledger=ledger)  # type: ignore[arg-type]
+    listener.start()
+
+    await events.emit(Signal.user_synced, mxid="@old:matrix.test")
+    await events.emit(Signal.user_synced, mxid="@new:matrix.test")
+    await _drain(listener)
+    assert welcome.welcomed == ["@new:matrix.test"]
+
+    await events.emit(Signal.reconcile_completed)
+    assert set(store.saved) == {"@old:matrix.test", "@new:matrix.test"}
@@ -6,6 +6,7 @@ import httpx
 import respx
 
 from onbot.clients.matrix import ApiClientMatrix
+from onbot.clients.transport import TransportRegistry
 from onbot.media import MediaUploader
 
 AVATAR_URL = "https://cdn.test/face.png"
@@ -37,3 +38,26 @@ async def test_upload_from_url_uploads_once_and_caches() -> None:
     assert remote.call_count == 1
     assert upload.call_count == 1
     assert upload.calls[0].request.headers["content-type"] == "image/png"
+
+
+@respx.mock
+async def test_upload_through_the_registry_uses_the_avatar_hosts_pool() -> None:
+    respx.get(AVATAR_URL).mock(
+        return_value=httpx.Response(302, headers={"location": "https://cdn.test/v2/face.png"})
+    )
+    respx.get("https://cdn.test/v2/face.png").mock(return_value=httpx.Response(200, content=b"img"))
+    respx.post("https://matrix.test/_matrix/media/v3/upload").mock(
+        return_value=httpx.Response(200, json={"content_uri": "mxc://matrix.test/abc"})
+    )
+    transports = TransportRegistry()
+    client = ApiClientMatrix(
+        server_url="https://matrix.test", access_token="tok", server_name="matrix.test", transports=transports
+    )
+    uploader = MediaUploader(client, transports=transports)
+    try:
+        assert await uploader.upload_from_url(AVATAR_URL) == "mxc://matrix.test/abc"  # redirect followed
+        assert transports.origins == ["https://cdn.test:443", "https://matrix.test:443"]
+    finally:
+        await uploader.aclose()
+        await client.aclose()
+        await transports.aclose()
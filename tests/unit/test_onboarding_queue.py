@@ -0,0 +1,129 @@
+"""Unit tests for the onboarding work queue: coalescing, per-user order, the bound, and stopping."""
+
+from __future__ import annotations
+
+import asyncio
+
+from onbot.onboarding.queue import WelcomeQueue
+
+
+class _Gated:
+    """A handler that records every call and blocks until the test opens its gate."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.active: set[str] = set()
+        self.overlapped = False
+        self.gate = asyncio.Event()
+
+    async def __call__(self, mxid: str) -> None:
+        self.overlapped |= mxid in self.active
+        self.active.add(mxid)
+        self.calls.append(mxid)
+        await self.gate.wait()
+        self.active.discard(mxid)
+
+
+async def _settle() -> None:
+    """Let the workers pick up what is queued (starting the pool takes a few loop iterations)."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _stop(queue: WelcomeQueue, workers: asyncio.Task[None]) -> None:
+    queue.request_stop()
+    await workers
+
+
+async def test_waiting_duplicates_are_coalesced() -> None:
+    handler = _Gated()
+    handler.gate.set()
+    queue = WelcomeQueue(handler, workers=2)
+
+    assert queue.submit("@a:x") is True
+    assert queue.submit("@a:x") is False
+    assert queue.submit("@b:x") is True
+    assert queue.depth == 2
+
+    workers = asyncio.create_task(queue.run())
+    await queue.drain()
+    await _stop(queue, workers)
+    assert sorted(handler.calls) == ["@a:x", "@b:x"]
+    assert queue.stats() == "0 waiting, 0 in progress (2 workers, 2 done, 0 dropped)"
+
+
+async def test_a_user_resubmitted_while_in_progress_runs_again_after_not_beside() -> None:
+    handler = _Gated()
+    queue = WelcomeQueue(handler, workers=4)
+    workers = asyncio.create_task(queue.run())
+    queue.submit("@a:x")
+    await _settle()
+    assert queue.in_flight == 1
+
+    queue.submit("@a:x")  # while the first run is still going
+    await _settle()
+    assert handler.calls == ["@a:x"]  # no second worker took it
+
+    handler.gate.set()
+    await queue.drain()
+    await _stop(queue, workers)
+    assert handler.calls == ["@a:x", "@a:x"]
+    assert not handler.overlapped
+
+
+async def test_the_workers_run_welcomes_concurrently_up_to_the_pool_size() -> None:
+    handler = _Gated()
+    queue = WelcomeQueue(handler, workers=3)
+    workers = asyncio.create_task(queue.run())
+    for i in range(10):
+        queue.submit(f"@u{i}:x")
+    await _settle()
+
+    assert queue.in_flight == 3
+    assert queue.depth == 7
+    assert handler.calls == ["@u0:x", "@u1:x", "@u2:x"]  # in submission order
+
+    handler.gate.set()
+    await queue.drain()
+    await _stop(queue, workers)
+    assert len(handler.calls) == 10
+
+
+async def test_submissions_past_the_bound_are_dropped() -> None:
+    queue = WelcomeQueue(_Gated(), workers=1, maxsize=2)
+    assert queue.submit("@a:x") and queue.submit("@b:x")
+    assert queue.submit("@c:x") is False
+    assert queue.depth == 2
+    assert queue.dropped == 1
+
+
+async def test_a_failing_handler_does_not_kill_its_worker() -> None:
+    seen: list[str] = []
+
+    async def handler(mxid: str) -> None:
+        seen.append(mxid)
+        if mxid == "@bad:x":
+            raise RuntimeError("boom")
+
+    queue = WelcomeQueue(handler, workers=1)
+    workers = asyncio.create_task(queue.run())
+    queue.submit("@bad:x")
+    queue.submit("@good:x")
+    await queue.drain()
+    await _stop(queue, workers)
+    assert seen == ["@bad:x", "@good:x"]
+
+
+async def test_stopping_finishes_the_welcome_in_hand_and_leaves_the_rest() -> None:
+    handler = _Gated()
+    queue = WelcomeQueue(handler, workers=1)
+    workers = asyncio.create_task(queue.run())
+    queue.submit("@a:x")
+    queue.submit("@b:x")
+    await _settle()
+
+    queue.request_stop()
+    handler.gate.set()
+    await asyncio.wait_for(workers, timeout=1)
+    assert handler.calls == ["@a:x"]
+    assert queue.depth == 1
@@ -0,0 +1,82 @@
+"""The reconcile plan: coalescing superseded writes, grouping by room, rendering."""
+
+from dataclasses import dataclass
+from typing import ClassVar
+
+import pytest
+
+from onbot.config import OperationKind
+from onbot.models import RoomCreateAttributes
+from onbot.reconciler.plan import (
+    CreateRoom,
+    JoinUser,
+    KickUser,
+    Operation,
+    PutRoomState,
+    ReconcilePlan,
+    SetPowerLevels,
+    SetRoomName,
+)
+from onbot.reconciler.state import OnbotRoomType
+
+ROOM = "!r:x"
+
+
+def test_a_later_write_of_the_same_state_supersedes_the_earlier_one() -> None:
+    plan = ReconcilePlan()
+    plan.add(SetPowerLevels(ROOM, {"users": {"@a:x": 50}}))
+    plan.add(JoinUser(ROOM, "@a:x"))
+    plan.add(SetPowerLevels(ROOM, {"users": {"@a:x": 100}}))
+    plan.add(JoinUser(ROOM, "@a:x"))
+
+    assert plan.coalesced() == [SetPowerLevels(ROOM, {"users": {"@a:x": 100}}), JoinUser(ROOM, "@a:x")]
+
+
+def test_distinct_users_and_state_keys_are_not_coalesced() -> None:
+    plan = ReconcilePlan(
+        [
+            JoinUser(ROOM, "@a:x"),
+            JoinUser(ROOM, "@b:x"),
+            KickUser(ROOM, "@a:x"),
+            PutRoomState(ROOM, "m.room.join_rules", {}),
+            PutRoomState(ROOM, "org.x.onbot.group_room", {}),
+        ]
+    )
+    assert plan.coalesced() == plan.operations
+
+
+def test_operations_on_a_room_created_in_the_plan_group_under_its_alias() -> None:
+    attrs = RoomCreateAttributes(alias="team", canonical_alias="#team:x", name="Team")
+    plan = ReconcilePlan(
+        [
+            CreateRoom(OnbotRoomType.group_room, attrs, "!space:x"),
+            JoinUser("!other:x", "@a:x"),
+            PutRoomState("#team:x", "org.x.onbot.group_room", {"group_id": "g1"}),
+        ]
+    )
+    rooms = plan.by_room()
+    assert list(rooms) == ["#team:x", "!other:x"]
+    assert [op.kind for op in rooms["#team:x"]] == ["create_room", "put_state"]
+
+
+def test_render_lists_every_room_and_counts_each_kind() -> None:
+    plan = ReconcilePlan([JoinUser(ROOM, "@a:x"), JoinUser(ROOM, "@b:x"), SetRoomName(ROOM, "Team")])
+    text = plan.render()
+    assert text.splitlines()[0] == "3 operations (join 2, set_name 1)"
+    assert "  join @a:x to !r:x" in text
+    assert "  set name of !r:x to 'Team'" in text
+    assert ReconcilePlan().render() == "Nothing to change."
+
+
+def test_an_operation_must_name_its_target_and_describe_itself() -> None:
+    @dataclass(frozen=True, slots=True)
+    class Incomplete(Operation):
+        kind: ClassVar[OperationKind] = "join"
+        room_id: str
+
+        @property
+        def target(self) -> str:
+            return self.room_id
+
+    with pytest.raises(TypeError, match="describe"):
+        Incomplete(ROOM)  # type: ignore[abstract]
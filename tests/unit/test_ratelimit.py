@@ -0,0 +1,68 @@
+"""The per-host rate limiter: steady rate, burst, server pauses, one bucket per origin."""
+
+import asyncio
+
+from onbot.clients.ratelimit import RateLimiter, TokenBucket, origin_of
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_one_origin_per_scheme_host_and_port() -> None:
+    assert origin_of("https://matrix.test/_matrix/client/v3/sync") == "https://matrix.test:443"
+    assert origin_of("https://matrix.test:443/_synapse/admin") == "https://matrix.test:443"
+    assert origin_of("http://mas.test:8080/api") == "http://mas.test:8080"
+
+
+async def test_the_burst_goes_out_at_once_then_requests_are_spaced_by_the_rate() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        await bucket.acquire()
+    assert clock.slept == [0.5, 0.5]
+    assert bucket.requests == 5 and bucket.total_wait == 1.0
+
+
+async def test_no_rate_means_no_wait() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(clock=clock, sleep=clock.sleep)
+    for _ in range(100):
+        await bucket.acquire()
+    assert clock.slept == []
+
+
+async def test_a_pause_holds_every_caller_until_it_ends() -> None:
+    clock = _Clock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+    limiter.pause("https://matrix.test/a", 4)
+
+    await asyncio.gather(limiter.acquire("https://matrix.test/b"), limiter.acquire("https://matrix.test/c"))
+    assert clock.slept == [4]  # the second caller queued behind the first and found the pause over
+    await limiter.acquire("https://other.test/")  # a different host was never paused
+    assert clock.slept == [4]
+
+
+def test_a_shorter_pause_does_not_cut_a_longer_one_short() -> None:
+    clock = _Clock()
+    bucket = TokenBucket(clock=clock, sleep=clock.sleep)
+    bucket.pause(10)
+    bucket.pause(2)
+    assert bucket.current_wait() == 10
+    assert bucket.throttled == 2
+
+
+def test_stats_report_each_origin() -> None:
+    limiter = RateLimiter(rate=5, burst=10)
+    assert limiter.stats() == "no requests yet"
+    limiter.bucket("https://matrix.test/")
+    assert limiter.stats().startswith("https://matrix.test:443 (5/s): 0 requests, 0 throttled, 0 waiting")
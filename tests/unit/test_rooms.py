@@ -8,6 +8,7 @@ from onbot.reconciler.rooms import (
     compute_room_attributes,
     filter_synced_groups,
     lobby_enabled_for_group,
+    managed_alias_prefixes,
     resolve_room_settings,
 )
 
@@ -217,3 +218,14 @@ def test_build_maps_no_lobby_when_disabled() -> None:
     maps = build_group_room_maps(groups, [], cfg, "company.org")
     assert maps[0].lobby_desired is None
     assert maps[0].lobby is None
+
+
+def test_managed_alias_prefixes_cover_overrides_and_drop_dashes() -> None:
+    cfg = _config(
+        matrix_room_default_settings={"alias_prefix": "grp-"},
+        per_authentik_group_pk_matrix_room_settings={
+            "g1": {"alias_prefix": "ext-"},
+            "g2": {"topic_prefix": "X:"},
+        },
+    )
+    assert managed_alias_prefixes(cfg) == {"grp", "ext"}
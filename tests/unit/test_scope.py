@@ -0,0 +1,49 @@
+"""Tests for the scoped-reconcile helpers."""
+
+from onbot.models import MappedUser
+from onbot.reconciler.scope import ReconcileScope, affected_group_pks, expand_power_level_groups
+
+
+def _user(pk: str, *groups: str) -> MappedUser:
+    return MappedUser(
+        authentik_obj={"pk": pk, "groups_obj": [{"pk": g} for g in groups]}, mxid=f"@{pk}:company.org"
+    )
+
+
+def test_scopes_merge_and_report_emptiness() -> None:
+    merged = ReconcileScope.of(user_pks=["u1"]) | ReconcileScope.of(group_pks=["g1"], user_pks=["u2"])
+    assert merged == ReconcileScope(frozenset({"u1", "u2"}), frozenset({"g1"}))
+    assert merged
+    assert not ReconcileScope()
+
+
+def test_affected_groups_cover_named_groups_and_current_memberships() -> None:
+    users = [_user("u1", "g1", "g2"), _user("u2", "g3")]
+    scope = ReconcileScope.of(user_pks=["u1"], group_pks=["g9"])
+    assert affected_group_pks(scope, users, {}) == {"g1", "g2", "g9"}
+
+
+def test_affected_groups_include_groups_a_user_has_left() -> None:
+    users = [_user("u1", "g1")]
+    previous = {"u1": frozenset({"g1", "g2"})}
+    assert affected_group_pks(ReconcileScope.of(user_pks=["u1"]), users, previous) == {"g1", "g2"}
+
+
+def test_a_user_gone_from_the_directory_still_affects_their_old_groups() -> None:
+    previous = {"u1": frozenset({"g1"})}
+    assert affected_group_pks(ReconcileScope.of(user_pks=["u1"]), [], previous) == {"g1"}
+
+
+def test_a_changed_power_level_group_brings_in_its_members_past_and_present() -> None:
+    users = [_user("u1", "g1", "pl"), _user("u2", "g2"), _user("u4", "g4")]
+    previous = {"u2": frozenset({"g2", "pl"}), "u3": frozenset({"g3"})}
+
+    scope = expand_power_level_groups(ReconcileScope.of(group_pks=["pl"]), users, previous, {"pl": ["u4"]})
+
+    assert scope.user_pks == {"u1", "u2", "u4"}
+    assert affected_group_pks(scope, users, previous) == {"pl", "g1", "g2", "g4"}
+
+
+def test_changed_groups_without_a_level_are_not_expanded() -> None:
+    scope = ReconcileScope.of(group_pks=["g1"])
+    assert expand_power_level_groups(scope, [_user("u1", "g1")], {}, {"pl": []}) is scope
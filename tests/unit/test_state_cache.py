@@ -0,0 +1,136 @@
+"""The sync-fed room state cache: seeding, deltas, staleness, write-through."""
+
+from typing import Any
+
+from onbot.clients.matrix import RoomSync, SyncResult
+from onbot.state_cache import RoomStateCache
+
+_GROUP_ROOM = "org.company.onbot.group_room"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _member(user_id: str, membership: str = "join") -> dict[str, Any]:
+    return {"type": "m.room.member", "state_key": user_id, "content": {"membership": membership}}
+
+
+def _state(event_type: str, content: dict[str, Any]) -> dict[str, Any]:
+    return {"type": event_type, "state_key": "", "content": content}
+
+
+def _cache() -> tuple[RoomStateCache, Clock]:
+    clock = Clock()
+    return RoomStateCache("company.org", max_staleness_sec=60, clock=clock), clock
+
+
+async def _seed(cache: RoomStateCache) -> None:
+    await cache.handle_sync(
+        SyncResult(
+            pos="s1",
+            initial=True,
+            rooms=[
+                RoomSync(
+                    room_id="!r:x",
+                    initial=True,
+                    required_state=[
+                        _member("@a:x"),
+                        _member("@b:x", "invite"),
+                        _state("m.room.power_levels", {"users": {"@a:x": 50}}),
+                    ],
+                )
+            ],
+        )
+    )
+
+
+def test_subscription_covers_members_and_the_onbot_state_types() -> None:
+    cache, _ = _cache()
+    assert ["m.room.member", "*"] in cache.required_state
+    assert [_GROUP_ROOM, ""] in cache.required_state
+    assert ["m.room.join_rules", ""] in cache.required_state
+
+
+async def test_seeded_room_answers_members_and_state() -> None:
+    cache, _ = _cache()
+    await _seed(cache)
+
+    assert cache.members("!r:x") == {"@a:x"}  # joined only, like the admin API
+    assert cache.lookup_state("!r:x", "m.room.power_levels") == (True, {"users": {"@a:x": 50}})
+    # Subscribed but absent after a complete snapshot: a hit saying "not set", no HTTP needed.
+    assert cache.lookup_state("!r:x", _GROUP_ROOM) == (True, None)
+
+
+async def test_unknown_rooms_and_unsubscribed_types_are_misses() -> None:
+    cache, _ = _cache()
+    await _seed(cache)
+
+    assert cache.members("!other:x") is None
+    assert cache.lookup_state("!r:x", "m.room.avatar") == (False, None)
+    assert cache.lookup_state("!r:x", "m.space.child", "!child:x") == (False, None)
+
+
+async def test_deltas_update_seeded_rooms_and_are_ignored_for_unseeded_ones() -> None:
+    cache, _ = _cache()
+    await _seed(cache)
+    await cache.handle_sync(
+        SyncResult(
+            pos="s2",
+            rooms=[
+                RoomSync(room_id="!r:x", timeline=[_member("@a:x", "leave"), _member("@c:x")]),
+                RoomSync(room_id="!new:x", timeline=[_member("@a:x")]),
+            ],
+        )
+    )
+
+    assert cache.members("!r:x") == {"@c:x"}
+    assert cache.members("!new:x") is None  # a delta alone is not the whole member list
+
+
+async def test_a_stale_stream_degrades_to_misses() -> None:
+    cache, clock = _cache()
+    await _seed(cache)
+    clock.now = 61
+
+    assert cache.members("!r:x") is None
+    assert cache.lookup_state("!r:x", "m.room.power_levels") == (False, None)
+
+
+async def test_a_restarted_stream_drops_everything_cached_before() -> None:
+    cache, _ = _cache()
+    await _seed(cache)
+    await cache.handle_sync(SyncResult(pos="s9", initial=True, rooms=[]))
+
+    assert cache.members("!r:x") is None
+
+
+async def test_writes_are_applied_through() -> None:
+    cache, _ = _cache()
+    await _seed(cache)
+    cache.note_membership("!r:x", "@d:x", "join")
+    cache.note_membership("!r:x", "@a:x", "leave")
+    cache.note_state("!r:x", "m.room.power_levels", {"users": {}})
+
+    assert cache.members("!r:x") == {"@d:x"}
+    assert cache.lookup_state("!r:x", "m.room.power_levels") == (True, {"users": {}})
+
+
+async def test_a_room_past_the_sync_window_is_read_from_the_server() -> None:
+    cache, _ = _cache()
+    await _seed(cache)
+    assert cache.members("!r:x") == {"@a:x"}
+
+    # The bot joined more rooms than the window covers: a quiet room may have slid out of it, and
+    # nothing in the stream says which.
+    await cache.handle_sync(SyncResult(pos="s2", room_count=1001, window=1000))
+    assert cache.members("!r:x") is None
+    assert cache.lookup_state("!r:x", "m.room.power_levels") == (False, None)
+
+    # The pump reconnects with a wider window; the fresh connection re-seeds every room.
+    await _seed(cache)
+    assert cache.members("!r:x") == {"@a:x"}
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from onbot.clients.base import ApiError
 from onbot.clients.matrix import RoomSync, SyncNotSupportedError, SyncResult
 from onbot.sync import SyncPump
 
@@ -18,10 +19,12 @@ class _ScriptedClient:
         self._results = list(results)
         self.calls = 0
         self.positions: list[str | None] = []
+        self.windows: list[int | None] = []
 
-    async def sliding_sync(self, pos: str | None) -> SyncResult:
+    async def sliding_sync(self, pos: str | None, *, window: int | None = None) -> SyncResult:
         self.calls += 1
         self.positions.append(pos)
+        self.windows.append(window)
         if not self._results:
             self._pump.request_stop()
             return SyncResult(pos=None, rooms=[])
@@ -123,3 +126,26 @@ async def test_stop_requested_before_running_dispatches_nothing() -> None:
 
     assert client.calls == 0
     assert handler.seen == []
+
+
+async def test_an_expired_position_restarts_the_stream() -> None:
+    expired = ApiError("POST", "sync", 400, {"errcode": "M_UNKNOWN_POS", "error": "Unknown position"})
+    pump, client = _pump([_slice("s1"), expired, _slice("s2")])
+
+    await pump.run()
+
+    # s1 → the server forgot it → start over without a pos, no backoff.
+    assert client.positions == [None, "s1", None, "s2"]
+
+
+async def test_more_rooms_than_the_window_widens_it_and_reconnects() -> None:
+    crowded = SyncResult(pos="s1", room_count=1300, window=1000)
+    pump, client = _pump([crowded, _slice("s2")])
+    handler = _RecordingHandler()
+    pump.register(handler)
+
+    await pump.run()
+
+    assert handler.seen[0] is crowded  # still dispatched, so the cache learns it is incomplete
+    assert client.positions == [None, None, "s2"]  # a fresh connection re-sends every room
+    assert client.windows == [None, 2000, 2000]
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+
 import httpx
 import pytest
 import respx
@@ -108,3 +110,87 @@ async def test_oauth2_failed_refresh_falls_back_to_client_credentials() -> None:
         await provider.aclose()
 
     assert b"grant_type=client_credentials" in route.calls[2].request.content
+
+
+@respx.mock
+async def test_concurrent_callers_share_one_refresh() -> None:
+    release = asyncio.Event()
+
+    async def _token(request: httpx.Request) -> httpx.Response:
+        await release.wait()
+        return httpx.Response(200, json={"access_token": "at1", "expires_in": 3600})
+
+    route = respx.post(TOKEN_ENDPOINT).mock(side_effect=_token)
+    provider = _provider()
+    try:
+        callers = [asyncio.create_task(provider.get_token()) for _ in range(10)]
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await asyncio.gather(*callers) == ["at1"] * 10
+    finally:
+        await provider.aclose()
+    assert route.call_count == 1
+
+
+@respx.mock
+async def test_a_caller_giving_up_does_not_cancel_the_shared_refresh() -> None:
+    release = asyncio.Event()
+
+    async def _token(request: httpx.Request) -> httpx.Response:
+        await release.wait()
+        return httpx.Response(200, json={"access_token": "at1", "expires_in": 3600})
+
+    route = respx.post(TOKEN_ENDPOINT).mock(side_effect=_token)
+    provider = _provider()
+    try:
+        impatient = asyncio.create_task(provider.get_token())
+        patient = asyncio.create_task(provider.get_token())
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        release.set()
+        assert await patient == "at1"
+    finally:
+        await provider.aclose()
+    assert route.call_count == 1
+
+
+@respx.mock
+async def test_background_renewal_replaces_the_token_before_it_goes_stale() -> None:
+    renewed = asyncio.Event()
+    responses = iter(
+        [
+            httpx.Response(200, json={"access_token": "at1", "expires_in": 3600, "refresh_token": "rt1"}),
+            httpx.Response(200, json={"access_token": "at2", "expires_in": 3600, "refresh_token": "rt2"}),
+        ]
+    )
+
+    def _token(request: httpx.Request) -> httpx.Response:
+        response = next(responses, None)
+        if response is None:  # the renewal after at2's, scheduled an hour out; not reached here
+            raise AssertionError("renewed too often")
+        if b"refresh_token=rt1" in request.content:
+            renewed.set()
+        return response
+
+    route = respx.post(TOKEN_ENDPOINT).mock(side_effect=_token)
+    provider = OAuth2ClientCredentialsTokenProvider(
+        token_endpoint=TOKEN_ENDPOINT, client_id="bot", client_secret="s", renew_at_fraction=0.00001
+    )
+    try:
+        assert await provider.get_token() == "at1"
+        await asyncio.wait_for(renewed.wait(), timeout=1)
+        for _ in range(100):  # at1 stays valid, and is handed out, until the renewal has landed
+            if await provider.get_token() == "at2":
+                break
+            await asyncio.sleep(0.01)
+        assert await provider.get_token() == "at2"
+    finally:
+        await provider.aclose()
+    assert route.call_count == 2
+
+
+def test_renewal_fraction_must_be_a_share_of_the_lifetime() -> None:
+    with pytest.raises(ValueError):
+        OAuth2ClientCredentialsTokenProvider(
+            token_endpoint=TOKEN_ENDPOINT, client_id="bot", client_secret="s", renew_at_fraction=1.5
+        )
@@ -0,0 +1,25 @@
+"""The transport registry: one pooled client per origin, owned and closed by the registry."""
+
+import pytest
+
+from onbot.clients.transport import TransportRegistry
+
+
+async def test_one_client_per_origin() -> None:
+    registry = TransportRegistry()
+    synapse = registry.client_for("https://matrix.test/_matrix/client")
+    try:
+        assert registry.client_for("https://matrix.test:443/_synapse/admin") is synapse
+        assert registry.client_for("https://auth.test/oauth2/token") is not synapse
+        assert registry.origins == ["https://auth.test:443", "https://matrix.test:443"]
+    finally:
+        await registry.aclose()
+    assert synapse.is_closed
+    assert registry.origins == []
+
+
+async def test_http2_without_h2_falls_back_to_http11(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+    registry = TransportRegistry(http2=True)
+    assert registry.http2 is False
+    await registry.aclose()
@@ -1,8 +1,10 @@
-"""Unit tests for the nested-dict helpers."""
+"""Unit tests for the nested-dict helpers and gather_or_cancel."""
+
+import asyncio
 
 import pytest
 
-from onbot.utils import dict_has_nested_attr, get_nested_dict_val_by_path
+from onbot.utils import dict_has_nested_attr, gather_or_cancel, get_nested_dict_val_by_path
 
 
 def test_get_nested_value() -> None:
@@ -26,3 +28,33 @@ def test_has_nested_attr() -> None:
     assert not dict_has_nested_attr(data, ["attributes", "missing"])
     assert dict_has_nested_attr(data, ["attributes", "empty"])
     assert not dict_has_nested_attr(data, ["attributes", "empty"], must_have_val=True)
+
+
+async def test_gather_or_cancel_returns_results_in_order() -> None:
+    async def value(v: int) -> int:
+        await asyncio.sleep(0)
+        return v
+
+    assert await gather_or_cancel(value(1), value(2)) == [1, 2]
+
+
+async def test_gather_or_cancel_cancels_and_awaits_the_others_on_failure() -> None:
+    cancelled: list[str] = []
+
+    async def slow() -> None:
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def failing_later() -> None:
+        await asyncio.sleep(0)
+        raise RuntimeError("also down")
+
+    async def failing() -> None:
+        raise LookupError("down")
+
+    with pytest.raises(LookupError):  # the first failure itself, not an ExceptionGroup
+        await gather_or_cancel(slow(), failing_later(), failing())
+    assert cancelled == ["slow"]
@@ -10,7 +10,7 @@ from typing import Any
 import pytest
 
 from onbot.clients.base import ApiError
-from onbot.config import AuthentikServer, OnbotConfig, SynapseServer
+from onbot.config import AuthentikServer, OnbotConfig, Performance, SynapseServer
 from onbot.onboarding.notice_board import notice_board_power_levels
 from onbot.onboarding.welcome import WelcomeService
 
@@ -49,6 +49,11 @@ class FakeMatrixClient:
         self.power_levels: dict[str, dict[str, Any]] = {}
         self.power_level_writes: list[str] = []
         self.avatars: dict[str, str] = {}
+        self.account_data_reads = 0
+        self.account_data_writes = 0
+        self.state_writes = 0
+        self.fail_state_writes = 0
+        self.txns: dict[str, str] = {}
 
     async def get_room_power_levels(self, room_id: str) -> dict[str, Any]:
         return dict(self.power_levels.get(room_id, {}))
@@ -67,10 +72,13 @@ class FakeMatrixClient:
         self.space_links.append((space_id, room_id))
 
     async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
+        self.account_data_reads += 1
         return dict(self.account_data.get((user_id, data_type), {}))
 
     async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        await asyncio.sleep(0)  # a round-trip, during which other welcomes carry on
         self.account_data[(user_id, data_type)] = dict(content)
+        self.account_data_writes += 1
 
     async def create_direct_message_room(
         self,
@@ -95,18 +103,32 @@ class FakeMatrixClient:
     async def put_room_state_event(
         self, room_id: str, event_type: str, content: dict[str, Any], state_key: str = ""
     ) -> None:
+        if self.fail_state_writes:
+            self.fail_state_writes -= 1
+            raise RuntimeError("synapse went away")
         self.room_state[(room_id, event_type)] = dict(content)
+        self.state_writes += 1
 
-    async def send_text_message(self, room_id: str, body: str) -> str:
+    async def send_text_message(self, room_id: str, body: str, *, txn_id: str | None = None) -> str:
         # Yield to the loop, as a real HTTP round-trip does: any concurrent welcome for the same user
         # gets to run here, which is exactly where a duplicate would slip in.
         await asyncio.sleep(0)
+        # Like Synapse: a repeated transaction id is answered with the original event.
+        if txn_id is not None and txn_id in self.txns:
+            return self.txns[txn_id]
         self.sent.append((room_id, body))
-        return f"$e{len(self.sent)}"
+        event_id = f"$e{len(self.sent)}"
+        if txn_id is not None:
+            self.txns[txn_id] = event_id
+        return event_id
 
 
 def _config(
-    messages: list[str] | None, *, place_in_space: bool = False, force_join: bool = True
+    messages: list[str] | None,
+    *,
+    place_in_space: bool = False,
+    force_join: bool = True,
+    batched: bool = False,
 ) -> OnbotConfig:
     return OnbotConfig(
         synapse_server=SynapseServer(
@@ -119,6 +141,7 @@ def _config(
         welcome_new_users_messages=messages,
         place_onboarding_rooms_in_space=place_in_space,
         force_join_onboarding_room=force_join,
+        performance=Performance(batched_welcome_delivery=batched),
     )
 
 
@@ -317,3 +340,95 @@ async def test_undrifted_power_levels_are_not_rewritten() -> None:
     await svc.welcome_user(ALICE)
 
     assert client.power_level_writes == []
+
+
+async def test_a_cohort_reads_m_direct_once_and_loses_no_room() -> None:
+    """Concurrent welcomes share one in-memory m.direct and batch their writes to it."""
+    client = FakeMatrixClient()
+    svc = WelcomeService(client, _config(["hi"]))  # type: ignore[arg-type]
+    users = [f"@new{i}:matrix.test" for i in range(20)]
+
+    await asyncio.gather(*(svc.welcome_user(mxid) for mxid in users))
+
+    direct = client.account_data[(BOT, "m.direct")]
+    assert sorted(direct) == sorted(users)
+    assert client.account_data_reads == 1
+    assert client.account_data_writes < len(users)
+
+
+async def test_batched_delivery_writes_the_bookkeeping_once() -> None:
+    per_message, batched = FakeMatrixClient(), FakeMatrixClient()
+    await WelcomeService(per_message, _config(["hi", "rules", "faq"])).welcome_user("@new:matrix.test")  # type: ignore[arg-type]
+    await WelcomeService(batched, _config(["hi", "rules", "faq"], batched=True)).welcome_user(
+        "@new:matrix.test"
+    )  # type: ignore[arg-type]
+
+    assert per_message.state_writes == 4  # on creation, then after each message
+    assert batched.state_writes == 2  # on creation, then once after the last message
+    assert [body for _, body in batched.sent] == ["hi", "rules", "faq"]
+    assert len(_direct_state(batched, "!dm-1:matrix.test")["welcome_messages_sent"]) == 3
+
+
+async def test_batched_delivery_replays_a_crashed_welcome_without_duplicates() -> None:
+    client = FakeMatrixClient()
+    svc = WelcomeService(client, _config(["hi", "rules"], batched=True))  # type: ignore[arg-type]
+    _lose_the_final_write(client)
+
+    with pytest.raises(RuntimeError):
+        await svc.welcome_user("@new:matrix.test")
+    await svc.welcome_user("@new:matrix.test")  # the retry sends both again, under the same txn ids
+
+    assert [body for _, body in client.sent] == ["hi", "rules"]
+    assert len(_direct_state(client, "!dm-1:matrix.test")["welcome_messages_sent"]) == 2
+    await svc.welcome_user("@new:matrix.test")
+    assert client.state_writes == 2  # nothing new to record
+
+
+async def test_batched_delivery_records_the_force_join_before_sending() -> None:
+    client = FakeMatrixClient()
+    admin = FakeSynapseAdmin()
+    svc = WelcomeService(client, _config(["hi", "rules"], batched=True), admin=admin)  # type: ignore[arg-type]
+    _lose_the_final_write(client)
+
+    with pytest.raises(RuntimeError):
+        await svc.welcome_user(ALICE)
+
+    state = _direct_state(client, "!dm-1:matrix.test")
+    assert isinstance(state["force_joined_at"], int)
+    assert state["welcome_messages_sent"] == {}
+
+
+async def test_batched_delivery_records_what_was_sent_when_a_later_send_fails() -> None:
+    client = FakeMatrixClient()
+    svc = WelcomeService(client, _config(["hi", "rules", "faq"], batched=True))  # type: ignore[arg-type]
+    send = client.send_text_message
+
+    async def send_text_message(room_id: str, body: str, *, txn_id: str | None = None) -> str:
+        if body == "rules":
+            raise ApiError("PUT", "/send", 502, {})
+        return await send(room_id, body, txn_id=txn_id)
+
+    client.send_text_message = send_text_message  # type: ignore[method-assign]
+    with pytest.raises(ApiError):
+        await svc.welcome_user("@new:matrix.test")
+
+    assert len(_direct_state(client, "!dm-1:matrix.test")["welcome_messages_sent"]) == 1
+    client.send_text_message = send  # type: ignore[method-assign]
+    client.txns.clear()  # the server no longer remembers the first send
+    await svc.welcome_user("@new:matrix.test")
+    assert [body for _, body in client.sent] == ["hi", "rules", "faq"]
+
+
+def _lose_the_final_write(client: FakeMatrixClient) -> None:
+    """Let the write made on room creation through and fail the one after the last message."""
+    write = client.put_room_state_event
+
+    async def put_room_state_event(
+        room_id: str, event_type: str, content: dict[str, Any], state_key: str = ""
+    ) -> None:
+        if event_type.endswith(".direct_room") and client.state_writes:
+            client.fail_state_writes = 1
+            client.put_room_state_event = write  # type: ignore[method-assign]
+        await write(room_id, event_type, content, state_key)
+
+    client.put_room_state_event = put_room_state_event  # type: ignore[method-assign]
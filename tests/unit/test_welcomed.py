@@ -0,0 +1,94 @@
+"""The welcome ledger: persistence across restarts, and invalidation by a message edit."""
+
+from typing import Any
+
+from onbot.account_data import ShardedAccountDataStore
+from onbot.onboarding.welcomed import WelcomedLedger, messages_digest
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.account_data: dict[str, dict[str, Any]] = {}
+        self.fail_reads = False
+        self.writes = 0
+
+    async def get_account_data(self, user_id: str, data_type: str) -> dict[str, Any]:
+        if self.fail_reads:
+            raise RuntimeError("synapse is down")
+        return dict(self.account_data.get(data_type, {}))
+
+    async def set_account_data(self, user_id: str, data_type: str, content: dict[str, Any]) -> None:
+        self.account_data[data_type] = dict(content)
+        self.writes += 1
+
+
+def _ledger(client: FakeClient, messages: list[str]) -> WelcomedLedger:
+    return WelcomedLedger(ShardedAccountDataStore(client, "@bot:x", "x.onbot.welcomed", shards=4), messages)
+
+
+async def test_welcomes_survive_a_restart() -> None:
+    client = FakeClient()
+    ledger = _ledger(client, ["hi", "rules"])
+    await ledger.ensure_loaded()
+    ledger.record("@a:x")
+    ledger.record("@b:x")
+    await ledger.flush()
+
+    restarted = _ledger(client, ["hi", "rules"])
+    await restarted.ensure_loaded()
+    assert restarted.is_welcomed("@a:x") and restarted.is_welcomed("@b:x")
+    assert not restarted.is_welcomed("@c:x")
+
+
+async def test_editing_the_messages_makes_everybody_due_again() -> None:
+    client = FakeClient()
+    ledger = _ledger(client, ["hi", "rules"])
+    await ledger.ensure_loaded()
+    ledger.record("@a:x")
+    await ledger.flush()
+
+    edited = _ledger(client, ["hi", "new rules"])
+    await edited.ensure_loaded()
+    assert not edited.is_welcomed("@a:x")
+    edited.record("@a:x")
+    assert edited.is_welcomed("@a:x")
+
+
+def test_the_digest_ignores_order_but_not_content() -> None:
+    assert messages_digest(["a", "b"]) == messages_digest(["b", "a"])
+    assert messages_digest(["a", "b"]) != messages_digest(["a", "b."])
+    assert messages_digest(["a"]) != messages_digest(["a", "b"])
+
+
+async def test_flush_writes_only_what_changed_and_only_once() -> None:
+    client = FakeClient()
+    ledger = _ledger(client, ["hi"])
+    await ledger.ensure_loaded()
+    ledger.record("@a:x")
+    await ledger.flush()
+    writes = client.writes
+
+    ledger.record("@a:x")  # already recorded with these messages
+    await ledger.flush()
+    assert client.writes == writes
+
+
+async def test_an_unloadable_ledger_never_overwrites_the_stored_one() -> None:
+    client = FakeClient()
+    first = _ledger(client, ["hi"])
+    await first.ensure_loaded()
+    first.record("@a:x")
+    await first.flush()
+
+    client.fail_reads = True
+    second = _ledger(client, ["hi"])
+    await second.ensure_loaded()
+    second.record("@b:x")  # still remembered in memory
+    assert second.is_welcomed("@b:x")
+    await second.flush()  # but not written over shards it could not read
+
+    client.fail_reads = False
+    await second.flush()  # loads, merges, then writes
+    reloaded = _ledger(client, ["hi"])
+    await reloaded.ensure_loaded()
+    assert reloaded.is_welcomed("@a:x") and reloaded.is_welcomed("@b:x")